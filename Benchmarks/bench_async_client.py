@@ -0,0 +1,173 @@
+"""
+Many headless sessions inside one process : every session is an AsyncClient ( Client/async_client.py ) on the event loop of the benchmark.
+
+For every session count, all the sessions log in ( at most --login-concurrency at once ) and keep their connection. They stay idle for --idle seconds,
+every session waits inside its reading task until the server sends something. Then the sessions are paired up and
+every pair plays ping pong with {CLIENT_MESSAGE} : the first session sends, the second one answers as soon as the message came out of its async iterator.
+All the pairs play at the same time, so the round trips measure the server and the client loop under the load of all the sessions.
+
+idle CPU -- > CPU time of the benchmark process / wall time of the idle window. The receive loop of the old console client polled its non blocking socket
+            and kept a whole core busy for every idle session, the sessions of the event loop cost nothing while nothing arrives.
+client CPU -- > CPU time of the benchmark process per delivered message, the cost of the client side alone
+client RSS -- > Peak resident memory of the benchmark process ( grows with the largest session count )
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_async_client --sessions 100 1000 2000 --idle 3 --round-trips 20
+"""
+
+import argparse  # Command line options of the benchmark
+import asyncio  # All the sessions share one event loop
+import os  # Path of the DB
+import resource  # Peak RSS of the benchmark process
+import shutil  # Remove the generated DB
+import tempfile  # The generated DB lives in a temporary directory
+import time  # Latencies & CPU time
+from ..Client.async_client import AsyncClient  # The headless client API
+from ..DB import passwords  # Scheme of the stored hashes
+from .benchmark_server import raise_open_files_limit, start_server_process, stop_server_process, percentile
+from .bench_password_hashing import generate_hashed_users_db
+
+
+async def login_session(host, port, username, password, binary_protocol, login_semaphore, login_latencies):
+    """
+    Connects & logs in a single session. Returns its AsyncClient.
+    """
+
+    async with login_semaphore:
+        login_start_time = time.perf_counter()
+
+        chat_client = AsyncClient(host, port, binary_protocol=binary_protocol, request_timeout=60.0)
+        await chat_client.connect()
+        await chat_client.login(username, password)
+
+        login_latencies.append(time.perf_counter() - login_start_time)
+
+    return chat_client
+
+
+async def play_ping_pong(first_client, second_client, round_trips, round_trip_latencies):
+    """
+    Sends round_trips messages from the first to the second session, every one answered before the next one is sent.
+    """
+
+    for i in range(round_trips):
+        round_trip_start_time = time.perf_counter()
+
+        await first_client.send(second_client.user.Username, "ping")
+        await second_client.__anext__()
+
+        await second_client.send(first_client.user.Username, "pong")
+        await first_client.__anext__()
+
+        round_trip_latencies.append(time.perf_counter() - round_trip_start_time)
+
+
+async def measure_sessions(host, port, credentials, sessions, idle_duration, round_trips, binary_protocol, login_concurrency):
+    """
+    Logs in sessions AsyncClients, keeps them idle for idle_duration seconds, lets their pairs play ping pong and closes them again. Returns a dict with the results of the run.
+    """
+
+    login_semaphore = asyncio.Semaphore(login_concurrency)
+    login_latencies = []
+
+    login_start_time = time.perf_counter()
+    chat_clients = await asyncio.gather(*(
+        login_session(host, port, username, password, binary_protocol, login_semaphore, login_latencies)
+        for username, password in credentials[:sessions]
+    ))
+    login_duration = time.perf_counter() - login_start_time
+
+    # Nothing is sent, the reading tasks of all the sessions wait for the server
+    cpu_time_before = time.process_time()
+    await asyncio.sleep(idle_duration)
+    idle_cpu = (time.process_time() - cpu_time_before) / idle_duration
+
+    round_trip_latencies = []
+
+    cpu_time_before = time.process_time()
+    ping_pong_start_time = time.perf_counter()
+    await asyncio.gather(*(
+        play_ping_pong(chat_clients[i], chat_clients[i + 1], round_trips, round_trip_latencies)
+        for i in range(0, sessions - 1, 2)
+    ))
+    ping_pong_duration = time.perf_counter() - ping_pong_start_time
+    cpu_time = time.process_time() - cpu_time_before
+
+    await asyncio.gather(*(chat_client.close() for chat_client in chat_clients))
+
+    login_latencies.sort()
+    round_trip_latencies.sort()
+
+    # Every round trip delivers two messages
+    delivered_messages = len(round_trip_latencies) * 2
+
+    return {
+        "logins_per_second": sessions / login_duration,
+        "login_p50": percentile(login_latencies, 0.5),
+        "idle_cpu": idle_cpu,
+        "messages_per_second": delivered_messages / ping_pong_duration,
+        "round_trip_p50": percentile(round_trip_latencies, 0.5),
+        "round_trip_p99": percentile(round_trip_latencies, 0.99),
+        "client_cpu_us_per_message": cpu_time / delivered_messages * 1e6,
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Logins, message round trips & client cost of many AsyncClient sessions inside one process")
+    argument_parser.add_argument("--sessions", type=int, nargs="+", default=[100, 1000, 2000], help="Numbers of sessions ( even, at most --users )")
+    argument_parser.add_argument("--idle", type=float, default=3.0, help="Seconds the logged in sessions stay idle before the ping pong")
+    argument_parser.add_argument("--round-trips", type=int, default=20, help="Ping pong round trips of every pair of sessions")
+    argument_parser.add_argument("--users", type=int, default=None, help="Generated users. Defaults to the largest session count")
+    argument_parser.add_argument("--login-concurrency", type=int, default=100, help="The most logins waiting for the server at once")
+    argument_parser.add_argument("--password-cost", type=int, default=2, help="N of the scrypt hashes. Defaults to 2, a cheap hash keeps the logins from dominating the run")
+    argument_parser.add_argument("--binary", action="store_true", help="Use the compact binary protocol instead of the text protocol")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    users = arguments.users or max(arguments.sessions)
+    if max(arguments.sessions) > users:
+        argument_parser.error("More sessions than users")
+
+    open_files_limit = raise_open_files_limit()
+    if max(arguments.sessions) * 2 + 100 > open_files_limit:
+        argument_parser.error("The open files limit ( {0} ) is too low for {1} sessions".format(open_files_limit, max(arguments.sessions)))
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_async_client_")
+    db_path = os.path.join(db_directory, "users.db")
+
+    server_process = None
+    try:
+        credentials = generate_hashed_users_db(db_path, users, passwords.SCRYPT, arguments.password_cost)
+
+        server_process, port = start_server_process(arguments.host, [
+            "--db", db_path, "--password-cost", str(arguments.password_cost), "--offline-inbox-limit", "0"
+        ])
+
+        print("{0} protocol, {1} CPUs".format("binary" if arguments.binary else "text", os.cpu_count()))
+        print()
+
+        print("{0:>9} | {1:>9} | {2:>15} | {3:>13} | {4:>11} | {5:>14} | {6:>14} | {7:>22}".format(
+            "sessions", "logins/s", "login p50 (ms)", "idle CPU (%)", "messages/s", "round trip p50", "round trip p99", "client CPU (us/message)"
+        ))
+        print("-" * 131)
+
+        for sessions in sorted(arguments.sessions):
+            run = asyncio.run(measure_sessions(
+                arguments.host, port, credentials, sessions - sessions % 2, arguments.idle, arguments.round_trips, arguments.binary, arguments.login_concurrency
+            ))
+
+            print("{0:>9} | {1:>9.0f} | {2:>15.2f} | {3:>13.1f} | {4:>11.0f} | {5:>11.2f} ms | {6:>11.2f} ms | {7:>23.1f}".format(
+                sessions, run["logins_per_second"], run["login_p50"] * 1e3, run["idle_cpu"] * 100, run["messages_per_second"],
+                run["round_trip_p50"] * 1e3, run["round_trip_p99"] * 1e3, run["client_cpu_us_per_message"]
+            ))
+
+        print()
+        print("client RSS peak : {0:.1f} MB".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    finally:
+        if server_process is not None:
+            stop_server_process(server_process)
+        shutil.rmtree(db_directory)
+
+
+if __name__ == "__main__":
+    main()
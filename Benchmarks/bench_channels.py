@@ -0,0 +1,163 @@
+"""
+Fan-out latency of the group channels ( Server/channel_registry.py ) for growing channel sizes.
+
+For every --members size, that many communication sockets join the channel bench<SIZE>. The first member posts --posts messages one after another,
+every post waits until all the other members received it. Measured:
+
+1. client side : time from the post until the first & until the last member received it ( includes the time the benchmark needs to read all the sockets )
+2. server side : channel_fanout_seconds of the server ( admin socket ), the time the event loop spent on a whole fan-out
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_channels --members 10 100 1000 10000 --posts 50
+"""
+
+import argparse  # Command line options of the benchmark
+import json  # Metrics of the server
+import selectors  # Wait for the posts on all the member sockets
+import socket  # The member sockets
+import time  # Measure the fan-out
+from ..Protocol.framing import FrameDecoder, receive_frame, RECV_BUFFER_SIZE  # Read the framed messages of the server
+from ..Server.channel_registry import get_fanout_size_class  # Labels of the server side histograms
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Server side fan-out latencies
+from .benchmark_server import raise_open_files_limit, find_free_port, start_server_process, stop_server_process, send_message, percentile
+
+
+def connect_members(host, port, first_index, count):
+    """
+    Opens count communication sockets ( usernames chanmember<INDEX> ). The registrations are sent without waiting, the JOINED responses of the first join confirm them.
+    Returns a list of tuples -> ( SOCKET, FRAME DECODER )
+    """
+
+    members = []
+    for i in range(first_index, first_index + count):
+        member_socket = socket.create_connection((host, port))
+        send_message(member_socket, "{{CLIENT_COMMUNICATION_DATA}}{{chanmember{0}}}".format(i))
+        members.append((member_socket, FrameDecoder()))
+
+    return members
+
+
+def join_channel(members, channel_name):
+    """
+    Every member joins the channel. All the joins are sent first, then every member waits for its {SERVER_CHANNEL_JOINED}.
+    """
+
+    for member_socket, frame_decoder in members:
+        send_message(member_socket, "{{CLIENT_CHANNEL_JOIN}}{{{0}}}".format(channel_name))
+
+    for member_socket, frame_decoder in members:
+        response = receive_frame(member_socket, frame_decoder)
+        if response != "{{SERVER_CHANNEL_JOINED}}{{{0}}}".format(channel_name).encode("utf-8"):
+            raise RuntimeError("Join failed : {0}".format(response))
+
+
+def measure_posts(members, channel_name, posts):
+    """
+    The first member posts posts messages, each one after the previous one reached all the other members.
+    Returns a tuple -> ( SORTED FIRST MEMBER LATENCIES, SORTED LAST MEMBER LATENCIES ) in seconds
+    """
+
+    poster_socket = members[0][0]
+    receivers = members[1:]
+
+    selector = selectors.DefaultSelector()
+    for member_socket, frame_decoder in receivers:
+        selector.register(member_socket, selectors.EVENT_READ, frame_decoder)
+
+    first_latencies = []
+    last_latencies = []
+
+    try:
+        for i in range(posts):
+            received_posts = 0
+            first_time = None
+
+            start_time = time.perf_counter()
+            send_message(poster_socket, "{{CLIENT_CHANNEL_POST}}{{{0}_Channel post number {1}}}".format(channel_name, i))
+
+            while received_posts < len(receivers):
+                for key, mask in selector.select(30):
+                    data = key.fileobj.recv(RECV_BUFFER_SIZE)
+                    if not data:
+                        raise RuntimeError("The server closed a member connection")
+
+                    received_posts += len(key.data.feed(data))
+                    if first_time is None:
+                        first_time = time.perf_counter()
+
+            last_latencies.append(time.perf_counter() - start_time)
+            first_latencies.append(first_time - start_time)
+    finally:
+        selector.close()
+
+    first_latencies.sort()
+    last_latencies.sort()
+
+    return (first_latencies, last_latencies)
+
+
+def read_fanout_latencies(admin_port):
+    """
+    Returns a dict -> keys : Size class label | values : Summary of the channel_fanout_seconds histogram of the server
+    """
+
+    snapshot = json.loads(query_admin_socket(("127.0.0.1", admin_port), JSON_FORMAT))
+
+    return {
+        histogram["labels"]["members"]: histogram
+        for histogram in snapshot["histograms"] if histogram["name"] == "channel_fanout_seconds"
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Fan-out latency of the group channels for growing channel sizes")
+    argument_parser.add_argument("--members", type=int, nargs="+", default=[10, 100, 1000], help="Channel sizes to measure ( the poster counts as a member )")
+    argument_parser.add_argument("--posts", type=int, default=50, help="Posts per channel size")
+    argument_parser.add_argument("--engine", choices=("selectors", "asyncio"), default="selectors", help="--engine of the server")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    open_files_limit = raise_open_files_limit()
+    if max(arguments.members) + 100 > open_files_limit:
+        argument_parser.error("The open files limit ( {0} ) is too low for {1} members".format(open_files_limit, max(arguments.members)))
+
+    admin_port = find_free_port(arguments.host)
+    # The members only read the posts, they never answer a heartbeat
+    server_process, port = start_server_process(arguments.host, [
+        "--engine", arguments.engine, "--admin-port", str(admin_port), "--heartbeat-interval", "0", "--idle-timeout", "0"
+    ])
+    members = []
+
+    try:
+        print("{0:>8} | {1:>15} | {2:>15} | {3:>15} | {4:>15} | {5:>15}".format(
+            "members", "first p50 (us)", "last p50 (us)", "last p99 (us)", "server p50 (us)", "server p99 (us)"
+        ))
+        print("-" * 101)
+
+        # Every size is its own channel, the members of the smaller channels are reused by the bigger ones
+        for member_count in sorted(arguments.members):
+            if len(members) < member_count:
+                members.extend(connect_members(arguments.host, port, len(members), member_count - len(members)))
+
+            channel_name = "bench{0}".format(member_count)
+            join_channel(members[:member_count], channel_name)
+
+            first_latencies, last_latencies = measure_posts(members[:member_count], channel_name, arguments.posts)
+            server_latencies = read_fanout_latencies(admin_port)[get_fanout_size_class(member_count)]
+
+            print("{0:>8} | {1:>15.1f} | {2:>15.1f} | {3:>15.1f} | {4:>15.1f} | {5:>15.1f}".format(
+                member_count,
+                percentile(first_latencies, 0.5) * 1e6,
+                percentile(last_latencies, 0.5) * 1e6,
+                percentile(last_latencies, 0.99) * 1e6,
+                server_latencies["p50"] * 1e6,
+                server_latencies["p99"] * 1e6
+            ))
+    finally:
+        for member_socket, frame_decoder in members:
+            member_socket.close()
+        stop_server_process(server_process)
+
+
+if __name__ == "__main__":
+    main()
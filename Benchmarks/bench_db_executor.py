@@ -0,0 +1,136 @@
+"""
+Sizes the DB executor of the server ( --db-workers ).
+
+Several login threads flood the server with {CLIENT_LOGIN_INFO_USERNAME_PASSWORD} requests while a sender/receiver pair measures the
+{CLIENT_MESSAGE} round trip at the same time. The logins run on the DB executor, so the chat latency must stay low while the DB is busy.
+The users are generated into a temporary DB and the server hashes their passwords with the cheapest scrypt cost, the DB executor stays the bottleneck
+( Read bench_password_hashing.py for the cost of the real hashes ).
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_db_executor --db-workers 1 2 4 8 --login-threads 8 --duration 5
+"""
+
+import argparse  # Command line options of the benchmark
+import os  # Path of the DB
+import shutil  # Remove the generated DB
+import socket  # Client sockets
+import sqlite3  # Read real credentials from the DB
+import tempfile  # The generated DB lives in a temporary directory
+import threading  # Login flood next to the latency measurement
+import time  # Measuring window
+from ..DB.db_generator import Generator  # Generates the users DB
+from ..Protocol.framing import FrameDecoder, receive_frame  # Read the framed messages of the server
+from .benchmark_server import start_server_process, stop_server_process, send_message, percentile
+from .bench_unicast import SENDER_USERNAME, RECEIVER_USERNAME, connect_communication_socket, wait_until_registered
+
+
+def load_credentials(db_path, limit=100):
+    """
+    Returns a list with ( USERNAME, PASSWORD ) tuples of existing users. The passwords of a generated DB are still plaintext.
+    """
+
+    DB_CONNECTION = sqlite3.connect(db_path)
+    credentials = DB_CONNECTION.execute("SELECT Username, Password FROM users LIMIT ?", (limit,)).fetchall()
+    DB_CONNECTION.close()
+
+    return credentials
+
+
+def run_login_thread(host, port, credentials, stop_event, results):
+    """
+    Logs in with the credentials one after the other until stop_event is set. Appends the number of logins to results.
+    """
+
+    logins = 0
+    while not stop_event.is_set():
+        username, password = credentials[logins % len(credentials)]
+
+        login_socket = socket.create_connection((host, port))
+        send_message(login_socket, "{{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}}{{USERNAME:{0}|PASSWORD:{1}}}".format(username, password))
+        receive_frame(login_socket, FrameDecoder())
+        login_socket.close()
+
+        logins += 1
+
+    results.append(logins)
+
+
+def measure_db_workers(host, db_workers, login_threads, duration, db_path, credentials):
+    """
+    Starts a server with the given number of DB threads.
+    Returns a tuple -> ( LOGINS/S, SORTED {CLIENT_MESSAGE} ROUND TRIPS IN SECONDS )
+    """
+
+    server_process, port = start_server_process(host, ["--db-workers", str(db_workers), "--db", db_path, "--password-cost", "2"])
+
+    try:
+        sender_socket = connect_communication_socket(host, port, SENDER_USERNAME)
+        receiver_socket = connect_communication_socket(host, port, RECEIVER_USERNAME)
+        receiver_decoder = FrameDecoder()
+        wait_until_registered(sender_socket, FrameDecoder(), receiver_socket, receiver_decoder, RECEIVER_USERNAME)
+
+        stop_event = threading.Event()
+        results = []
+        threads = [
+            threading.Thread(target=run_login_thread, args=(host, port, credentials, stop_event, results))
+            for i in range(login_threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        chat_message = "{{CLIENT_MESSAGE}}{{{0}_{1}_hello there}}".format(SENDER_USERNAME, RECEIVER_USERNAME)
+        latencies = []
+        start_time = time.perf_counter()
+        while time.perf_counter() - start_time < duration:
+            message_start_time = time.perf_counter()
+            send_message(sender_socket, chat_message)
+            receive_frame(receiver_socket, receiver_decoder)
+            latencies.append(time.perf_counter() - message_start_time)
+
+            # Leave the CPU to the login threads most of the time
+            time.sleep(0.001)
+
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        elapsed_time = time.perf_counter() - start_time
+
+        sender_socket.close()
+        receiver_socket.close()
+    finally:
+        stop_server_process(server_process)
+
+    latencies.sort()
+    return (sum(results) / elapsed_time, latencies)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Login throughput & chat latency for different numbers of DB executor threads")
+    argument_parser.add_argument("--db-workers", type=int, nargs="+", default=[1, 2, 4, 8], help="DB thread counts to measure")
+    argument_parser.add_argument("--login-threads", type=int, default=8, help="Threads flooding the server with logins")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of measuring per DB thread count")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_db_executor_")
+    db_path = os.path.join(db_directory, "users.db")
+
+    try:
+        Generator(db_path).generate_dummy_users(1000)
+        credentials = load_credentials(db_path)
+
+        print("{0:>10} | {1:>10} | {2:>16} | {3:>16}".format("db workers", "logins/s", "chat avg (us)", "chat p99 (us)"))
+        print("-" * 62)
+
+        for db_workers in arguments.db_workers:
+            logins_per_second, latencies = measure_db_workers(arguments.host, db_workers, arguments.login_threads, arguments.duration, db_path, credentials)
+
+            print("{0:>10} | {1:>10.0f} | {2:>16.1f} | {3:>16.1f}".format(
+                db_workers, logins_per_second, sum(latencies) / len(latencies) * 1e6, percentile(latencies, 0.99) * 1e6
+            ))
+    finally:
+        shutil.rmtree(db_directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compares the two server engines side by side : the selectors loop and the asyncio engine ( --engine of the server ).
+
+For every engine a fresh server process is started and measured on
+- connection rate : connect, get one response ( {CLIENT_MESSAGE} to an unknown user ) and disconnect, one connection after the other
+- throughput : {CLIENT_MESSAGE} deliveries per second of the closed loop used by bench_workers
+- latency : average & p99 round trip of a single {CLIENT_MESSAGE} from the sender through the server to the receiver
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_engines --connections 2000 --messages 5000 --duration 5
+"""
+
+import argparse  # Command line options of the benchmark
+import socket  # Client sockets
+import time  # Measure the connection rate
+import multiprocessing  # The throughput load is generated by several processes
+from ..Protocol.framing import FrameDecoder, receive_frame  # Read the framed messages of the server
+from .benchmark_server import raise_open_files_limit, start_server_process, stop_server_process, send_message, percentile
+from .bench_unicast import SENDER_USERNAME, RECEIVER_USERNAME, connect_communication_socket, wait_until_registered, measure_messages
+from .bench_workers import run_load_process
+
+ENGINES = ("selectors", "asyncio")
+
+
+def measure_connection_rate(host, port, connections):
+    """
+    Returns the connections per second. Every connection waits for one response of the server before it's closed.
+    """
+
+    chat_message = "{CLIENT_MESSAGE}{benchConnect_benchNobody_hello}"
+
+    start_time = time.perf_counter()
+    for i in range(connections):
+        client_socket = socket.create_connection((host, port))
+        send_message(client_socket, chat_message)
+        receive_frame(client_socket, FrameDecoder())
+        client_socket.close()
+
+    return connections / (time.perf_counter() - start_time)
+
+
+def measure_throughput(host, port, load_processes, pairs, window, warm_up, duration):
+    """
+    Returns the delivered {CLIENT_MESSAGE} messages per second
+    """
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_load_process, args=(host, port, i, pairs, window, warm_up, duration, results))
+        for i in range(load_processes)
+    ]
+    for process in processes:
+        process.start()
+
+    delivered_messages = sum(results.get() for process in processes)
+
+    for process in processes:
+        process.join()
+
+    return delivered_messages / duration
+
+
+def measure_engine(engine, arguments):
+    """
+    Starts a server with the given engine and returns a tuple -> ( CONNECTIONS/S, MESSAGES/S, AVG RTT, P99 RTT ). The round trips are in seconds.
+    """
+
+    server_process, port = start_server_process(arguments.host, ["--engine", engine])
+
+    try:
+        connections_per_second = measure_connection_rate(arguments.host, port, arguments.connections)
+
+        sender_socket = connect_communication_socket(arguments.host, port, SENDER_USERNAME)
+        receiver_socket = connect_communication_socket(arguments.host, port, RECEIVER_USERNAME)
+        receiver_decoder = FrameDecoder()
+        wait_until_registered(sender_socket, FrameDecoder(), receiver_socket, receiver_decoder, RECEIVER_USERNAME)
+
+        latencies, _ = measure_messages(sender_socket, receiver_socket, receiver_decoder, arguments.messages)
+
+        sender_socket.close()
+        receiver_socket.close()
+
+        messages_per_second = measure_throughput(
+            arguments.host, port, arguments.load_processes, arguments.pairs, arguments.window, arguments.warm_up, arguments.duration
+        )
+    finally:
+        stop_server_process(server_process)
+
+    return (connections_per_second, messages_per_second, sum(latencies) / len(latencies), percentile(latencies, 0.99))
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Connection rate, throughput & p99 latency of the selectors and the asyncio engine")
+    argument_parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES), help="Engines to measure")
+    argument_parser.add_argument("--connections", type=int, default=2000, help="Connections opened for the connection rate")
+    argument_parser.add_argument("--messages", type=int, default=5000, help="Round trips measured for the latency")
+    argument_parser.add_argument("--load-processes", type=int, default=2, help="Processes generating the throughput load")
+    argument_parser.add_argument("--pairs", type=int, default=50, help="Sender/receiver pairs per load process")
+    argument_parser.add_argument("--window", type=int, default=4, help="Messages in flight per pair")
+    argument_parser.add_argument("--warm-up", type=float, default=1.0, help="Seconds before the throughput is measured")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of throughput measuring per engine")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    raise_open_files_limit()
+
+    print("{0:>10} | {1:>14} | {2:>12} | {3:>12} | {4:>12}".format("engine", "connections/s", "messages/s", "avg rtt (us)", "p99 rtt (us)"))
+    print("-" * 72)
+
+    for engine in arguments.engines:
+        connections_per_second, messages_per_second, average_latency, p99_latency = measure_engine(engine, arguments)
+
+        print("{0:>10} | {1:>14.0f} | {2:>12.0f} | {3:>12.1f} | {4:>12.1f}".format(
+            engine, connections_per_second, messages_per_second, average_latency * 1e6, p99_latency * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
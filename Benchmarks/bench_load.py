@@ -0,0 +1,483 @@
+"""
+Capacity of the server under a mixed workload of thousands of virtual clients, over the real protocol.
+
+The harness:
+1. generates a users DB with DB/db_generator.py ( or uses --db )
+2. starts the server on localhost with that DB ( --workers, --engine are passed on )
+3. starts a few load processes. Every load process connects its virtual clients and drives all of them from a single selectors loop.
+4. every virtual client runs a closed loop : pick an operation from the mix, send it, wait for its answer, think, repeat
+
+The operations of the mix ( --mix login=20,uid_login=20,register=10,chat=50 ):
+login -- > {CLIENT_LOGIN_INFO_USERNAME_PASSWORD} with the credentials of a random user of the DB. Done once the server answers.
+uid_login -- > {CLIENT_LOGIN_INFO_UID_SUCCESSFUL} with the UID of a random user of the DB. Done once the server answers with the profile.
+register -- > {CLIENT_REGISTER_DATA} of a new user. Done once the server answers.
+chat -- > {CLIENT_MESSAGE} to another virtual client of the same load process. Done once the other virtual client receives {MESSAGE_FROM_CLIENT}.
+
+Only the operations that start after the warm up and end inside the measuring window are counted.
+The report shows the throughput & the p50 / p99 / p99.9 latency of every operation and the CPU & RSS of the server processes ( Linux only, read from /proc ).
+The results are saved as JSON ( --output ), --compare prints the difference to a previous results file.
+
+Keep in mind that the load processes share the CPUs with the server. On a small machine they take a good part of the CPU time.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_load --clients 2000 --load-processes 4 --duration 10
+python -m <top_level>.Benchmarks.bench_load --workers 2 --binary --compare bench_load_20240101_120000.json
+"""
+
+import argparse  # Command line options of the benchmark
+import heapq  # The virtual clients waiting for their next operation, ordered by time
+import json  # The results file
+import multiprocessing  # The load is generated by several processes, a single one would be the bottleneck
+import os  # Number of CPUs & paths
+import platform  # Written into the results file
+import random  # Operations, users & think times
+import selectors  # One load process drives all its virtual clients from a single loop
+import shutil  # Remove the generated DB
+import socket  # Sockets of the virtual clients
+import sqlite3  # Read the users the virtual clients log in with
+import tempfile  # The generated DB lives in a temporary directory
+import time  # Latencies & the measuring window
+from ..DB.db_generator import Generator  # Generates the users DB
+from ..Protocol import messages  # Opcodes of the operations
+from ..Protocol import text_protocol, binary_protocol  # The virtual clients speak the text or the binary protocol
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE, encode_frame, receive_frame  # Framing of the messages
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Server side metrics, saved with the results
+from .benchmark_server import raise_open_files_limit, find_free_port, start_server_process, stop_server_process, percentile, read_process_tree_usage
+
+OPERATIONS = ("login", "uid_login", "register", "chat")
+DEFAULT_MIX = "login=20,uid_login=20,register=10,chat=50"
+
+# keys : Operation | values : The answer of the server that completes the operation successfully
+EXPECTED_RESPONSES = {
+    "login": messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL,
+    "uid_login": messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL,
+    "register": messages.SERVER_REGISTER_INFO_SUCCESSFUL,
+}
+
+CHAT_MESSAGE = "Hello there, this is a load test message"
+
+
+class VirtualClient:
+    __slots__ = ("client_socket", "frame_decoder", "username", "operation", "request_start_time")
+
+    def __init__(self, client_socket, username):
+        """
+        A connected client of a load process. operation is the operation waiting for its answer, None while the client thinks.
+        """
+
+        self.client_socket = client_socket
+        self.frame_decoder = FrameDecoder()
+        self.username = username
+        self.operation = None
+        self.request_start_time = 0.0
+
+
+def parse_mix(mix):
+    """
+    Returns a dict -> { OPERATION : WEIGHT } of a mix like login=20,uid_login=20,register=10,chat=50
+    """
+
+    weights = dict()
+
+    for entry in mix.split(","):
+        operation, separator, weight = entry.partition("=")
+        operation = operation.strip()
+
+        if operation not in OPERATIONS or not separator:
+            raise ValueError("Unknown operation inside the mix : {0!r}. Use {1}".format(entry, ", ".join(OPERATIONS)))
+
+        weights[operation] = float(weight)
+
+    if sum(weights.values()) <= 0:
+        raise ValueError("The weights of the mix must add up to more than 0")
+
+    return weights
+
+
+def encode_client_message(binary, opcode, *fields):
+    """
+    Returns the framed message ( bytes ) in the text or in the binary protocol
+    """
+
+    if binary:
+        return encode_frame(binary_protocol.encode_message(opcode, *fields))
+
+    return encode_frame(text_protocol.format_client_message(opcode, *fields).encode("utf-8"))
+
+
+def decode_server_message(binary, frame):
+    """
+    Returns a tuple -> ( OPCODE, FIELDS ) of a frame of the server
+    """
+
+    if binary:
+        return binary_protocol.decode_message(frame)
+
+    return text_protocol.parse_server_message(frame.decode("utf-8"))
+
+
+def connect_virtual_client(host, port, username, binary):
+    """
+    Returns a blocking socket connected to the server, with the protocol negotiated & the username saved for the communication
+    """
+
+    client_socket = socket.create_connection((host, port))
+
+    if binary:
+        client_socket.sendall(encode_client_message(False, messages.CLIENT_PROTOCOL, messages.BINARY_PROTOCOL_NAME))
+        opcode, fields = decode_server_message(False, receive_frame(client_socket, FrameDecoder()))
+
+        if opcode != messages.SERVER_PROTOCOL or fields[0] != messages.BINARY_PROTOCOL_NAME:
+            raise RuntimeError("The server didn't accept the binary protocol")
+
+    client_socket.sendall(encode_client_message(binary, messages.CLIENT_COMMUNICATION_DATA, username))
+
+    return client_socket
+
+
+def run_load_process(host, port, load_process_index, clients, users, weights, binary, think_time, request_timeout, warm_up, duration, start_barrier, results):
+    """
+    Runs inside a load process. Puts a dict with the latencies, the errors & the timeouts of every operation into the results queue.
+    """
+
+    raise_open_files_limit()
+    selector = selectors.DefaultSelector()
+    perf_counter = time.perf_counter
+
+    virtual_clients = []
+    # keys : Username | values : VirtualClient ( finds the sender of a delivered chat message )
+    virtual_clients_by_username = dict()
+
+    for i in range(clients):
+        username = "load{0}client{1}".format(load_process_index, i)
+        virtual_client = VirtualClient(connect_virtual_client(host, port, username, binary), username)
+
+        virtual_clients.append(virtual_client)
+        virtual_clients_by_username[username] = virtual_client
+        selector.register(virtual_client.client_socket, selectors.EVENT_READ, virtual_client)
+
+    operations = list(weights)
+    cumulative_weights = []
+    for operation in operations:
+        cumulative_weights.append((cumulative_weights[-1] if cumulative_weights else 0) + weights[operation])
+
+    # Registered UIDs & usernames must not exist yet, not even from a previous run on the same DB
+    next_register_UID = random.randrange(10 ** 12, 10 ** 15)
+
+    latencies = {operation: [] for operation in operations}
+    errors = dict.fromkeys(operations, 0)
+    timeouts = dict.fromkeys(operations, 0)
+
+    # All the load processes start together, once all the virtual clients are connected
+    start_barrier.wait()
+
+    start_time = perf_counter()
+    measure_start_time = start_time + warm_up
+    measure_end_time = measure_start_time + duration
+    next_timeout_check = start_time + request_timeout
+
+    # ( START TIME, INDEX, VIRTUAL CLIENT ) of the virtual clients waiting for their next operation. The start is spread over the first think time.
+    waiting_clients = [(start_time + random.uniform(0, think_time), i, virtual_client) for i, virtual_client in enumerate(virtual_clients)]
+    heapq.heapify(waiting_clients)
+
+    def start_operation(virtual_client, now):
+        nonlocal next_register_UID
+
+        operation = random.choices(operations, cum_weights=cumulative_weights)[0]
+
+        if operation == "login":
+            UID, username, password = random.choice(users)
+            frame = encode_client_message(binary, messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, username, password)
+        elif operation == "uid_login":
+            frame = encode_client_message(binary, messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL, random.choice(users)[0])
+        elif operation == "register":
+            UID = next_register_UID
+            next_register_UID += 1
+            frame = encode_client_message(
+                binary, messages.CLIENT_REGISTER_DATA,
+                UID, "user{0}".format(UID), "password{0}".format(UID), "FirstName", "LastName", 30, "City", 12345, "StreetName", 1, 2500
+            )
+        else:
+            receiver = virtual_client
+            while receiver is virtual_client:
+                receiver = random.choice(virtual_clients)
+            frame = encode_client_message(binary, messages.CLIENT_MESSAGE, virtual_client.username, receiver.username, CHAT_MESSAGE)
+
+        virtual_client.operation = operation
+        virtual_client.request_start_time = now
+        virtual_client.client_socket.sendall(frame)
+
+    def finish_operation(virtual_client, successful):
+        now = perf_counter()
+        operation = virtual_client.operation
+
+        if virtual_client.request_start_time >= measure_start_time and now <= measure_end_time:
+            if successful:
+                latencies[operation].append(now - virtual_client.request_start_time)
+            else:
+                errors[operation] += 1
+
+        virtual_client.operation = None
+        heapq.heappush(waiting_clients, (now + (random.expovariate(1 / think_time) if think_time else 0), id(virtual_client), virtual_client))
+
+    while True:
+        now = perf_counter()
+        if now >= measure_end_time:
+            break
+
+        while waiting_clients and waiting_clients[0][0] <= now:
+            start_operation(heapq.heappop(waiting_clients)[2], now)
+
+        select_timeout = 0.1 if not waiting_clients else max(0, min(0.1, waiting_clients[0][0] - now))
+
+        for key, mask in selector.select(timeout=select_timeout):
+            virtual_client = key.data
+            data = virtual_client.client_socket.recv(RECV_BUFFER_SIZE)
+            if not data:
+                raise RuntimeError("The server closed the connection of {0}".format(virtual_client.username))
+
+            for frame in virtual_client.frame_decoder.feed(data):
+                opcode, fields = decode_server_message(binary, frame)
+
+                if opcode == messages.SERVER_HEARTBEAT:
+                    # Answered like the console client does, a heartbeat isn't the response of an operation
+                    virtual_client.client_socket.sendall(encode_client_message(binary, messages.CLIENT_HEARTBEAT))
+                elif opcode == messages.MESSAGE_FROM_CLIENT:
+                    # A chat message completes the operation of its sender
+                    sender = virtual_clients_by_username.get(fields[0])
+                    if sender is not None and sender.operation == "chat":
+                        finish_operation(sender, True)
+                elif virtual_client.operation == "chat":
+                    finish_operation(virtual_client, False)
+                elif virtual_client.operation is not None:
+                    finish_operation(virtual_client, opcode == EXPECTED_RESPONSES[virtual_client.operation])
+
+        # A virtual client that waits too long is counted as a timeout and retired, a late answer would be taken for the answer of its next operation
+        if now >= next_timeout_check:
+            next_timeout_check = now + min(request_timeout, 1.0)
+
+            for virtual_client in virtual_clients:
+                if virtual_client.operation is not None and now - virtual_client.request_start_time > request_timeout:
+                    if virtual_client.request_start_time >= measure_start_time:
+                        timeouts[virtual_client.operation] += 1
+                    virtual_client.operation = None
+
+    results.put({"latencies": latencies, "errors": errors, "timeouts": timeouts})
+
+    for virtual_client in virtual_clients:
+        virtual_client.client_socket.close()
+
+
+def generate_users_db(db_path, users):
+    """
+    Generates the users DB with the generator of DB/db_generator.py
+    """
+
+    generator = Generator(db_path)
+    generator.generate_dummy_users(users)
+
+
+def read_users(db_path):
+    """
+    Returns a list of tuples -> ( UID, USERNAME, PASSWORD ) of all the users of the DB
+    """
+
+    DB_CONNECTION = sqlite3.connect(db_path)
+    try:
+        return DB_CONNECTION.execute("SELECT UID, Username, Password FROM users").fetchall()
+    finally:
+        DB_CONNECTION.close()
+
+
+def summarize(process_results, duration):
+    """
+    Returns a dict -> { OPERATION : { requests, throughput, p50_ms, p99_ms, p999_ms, max_ms, errors, timeouts } } including a "total" entry
+    """
+
+    summary = dict()
+    all_latencies = []
+
+    operations = process_results[0]["latencies"].keys()
+    for operation in operations:
+        latencies = sorted(latency for result in process_results for latency in result["latencies"][operation])
+        all_latencies.extend(latencies)
+
+        summary[operation] = {
+            "requests": len(latencies),
+            "throughput": len(latencies) / duration,
+            "p50_ms": percentile(latencies, 0.5) * 1e3,
+            "p99_ms": percentile(latencies, 0.99) * 1e3,
+            "p999_ms": percentile(latencies, 0.999) * 1e3,
+            "max_ms": latencies[-1] * 1e3 if latencies else 0.0,
+            "errors": sum(result["errors"][operation] for result in process_results),
+            "timeouts": sum(result["timeouts"][operation] for result in process_results),
+        }
+
+    all_latencies.sort()
+    summary["total"] = {
+        "requests": len(all_latencies),
+        "throughput": len(all_latencies) / duration,
+        "p50_ms": percentile(all_latencies, 0.5) * 1e3,
+        "p99_ms": percentile(all_latencies, 0.99) * 1e3,
+        "p999_ms": percentile(all_latencies, 0.999) * 1e3,
+        "max_ms": all_latencies[-1] * 1e3 if all_latencies else 0.0,
+        "errors": sum(entry["errors"] for entry in summary.values()),
+        "timeouts": sum(entry["timeouts"] for entry in summary.values()),
+    }
+
+    return summary
+
+
+def print_report(results, previous_results=None):
+    """
+    Prints the operations & the server usage of the results. With previous results, the change of the throughput & of the p99 is printed as well.
+    """
+
+    print("{0:>10} | {1:>9} | {2:>9} | {3:>10} | {4:>9} | {5:>10} | {6:>9} | {7:>7} | {8:>8}".format(
+        "operation", "requests", "req/s", "p50 ( ms )", "p99", "p99.9", "max", "errors", "timeouts"
+    ))
+    print("-" * 104)
+
+    for operation, entry in results["operations"].items():
+        print("{0:>10} | {1:>9} | {2:>9.0f} | {3:>10.2f} | {4:>9.2f} | {5:>10.2f} | {6:>9.2f} | {7:>7} | {8:>8}".format(
+            operation, entry["requests"], entry["throughput"], entry["p50_ms"], entry["p99_ms"], entry["p999_ms"], entry["max_ms"], entry["errors"], entry["timeouts"]
+        ))
+
+    server_usage = results["server"]
+    if server_usage is not None:
+        print()
+        print("server : {0:.0f} % CPU ( {1:.2f} CPU seconds ) | RSS {2:.1f} MB | peak RSS {3:.1f} MB".format(
+            server_usage["cpu_percent"], server_usage["cpu_seconds"], server_usage["rss_mb"], server_usage["peak_rss_mb"]
+        ))
+
+    if previous_results is not None:
+        print()
+        print("compared to {0} :".format(previous_results["started"]))
+
+        for operation, entry in results["operations"].items():
+            previous_entry = previous_results["operations"].get(operation)
+            if previous_entry is None:
+                continue
+
+            print("{0:>10} | req/s {1:>9.0f} -- > {2:>9.0f} ( {3:+.1f} % ) | p99 {4:>8.2f} -- > {5:>8.2f} ms".format(
+                operation, previous_entry["throughput"], entry["throughput"],
+                (entry["throughput"] / previous_entry["throughput"] - 1) * 100 if previous_entry["throughput"] else 0.0,
+                previous_entry["p99_ms"], entry["p99_ms"]
+            ))
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Mixed workload of virtual clients against a local server")
+    argument_parser.add_argument("--clients", type=int, default=2000, help="Virtual clients, spread over the load processes")
+    argument_parser.add_argument("--load-processes", type=int, default=4, help="Processes driving the virtual clients")
+    argument_parser.add_argument("--mix", default=DEFAULT_MIX, help="Weights of the operations. Defaults to " + DEFAULT_MIX)
+    argument_parser.add_argument("--think-time", type=float, default=0.0, help="Average seconds a virtual client waits between two operations. Defaults to 0 ( closed loop )")
+    argument_parser.add_argument("--request-timeout", type=float, default=10.0, help="Seconds after which an operation counts as a timeout")
+    argument_parser.add_argument("--users", type=int, default=10000, help="Users generated into the DB")
+    argument_parser.add_argument("--db", default=None, help="Use this users DB instead of generating one. Registrations are written into it.")
+    argument_parser.add_argument("--binary", action="store_true", help="The virtual clients negotiate the binary protocol")
+    argument_parser.add_argument("--workers", type=int, default=1, help="--workers of the server")
+    argument_parser.add_argument("--engine", choices=("selectors", "asyncio"), default="selectors", help="--engine of the server")
+    argument_parser.add_argument("--warm-up", type=float, default=2.0, help="Seconds before the measuring starts")
+    argument_parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measuring")
+    argument_parser.add_argument("--output", default=None, help="The results file. Defaults to bench_load_<date>_<time>.json")
+    argument_parser.add_argument("--compare", default=None, help="A previous results file to compare with")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    weights = parse_mix(arguments.mix)
+    if arguments.clients < 2 * arguments.load_processes:
+        argument_parser.error("Every load process needs at least 2 virtual clients ( chat partners )")
+
+    raise_open_files_limit()
+    started = time.strftime("%Y-%m-%d %H:%M:%S")
+    output_path = arguments.output or "bench_load_{0}.json".format(time.strftime("%Y%m%d_%H%M%S"))
+
+    db_directory = None
+    db_path = arguments.db
+    if db_path is None:
+        db_directory = tempfile.mkdtemp(prefix="benchmark_load_")
+        db_path = os.path.join(db_directory, "users.db")
+        print("Generating {0} users ...".format(arguments.users))
+        generate_users_db(db_path, arguments.users)
+
+    users = read_users(db_path)
+    admin_port = find_free_port(arguments.host)
+    server_process, port = start_server_process(arguments.host, [
+        "--db", db_path, "--workers", str(arguments.workers), "--engine", arguments.engine, "--admin-port", str(admin_port)
+    ])
+
+    try:
+        results_queue = multiprocessing.Queue()
+        start_barrier = multiprocessing.Barrier(arguments.load_processes + 1)
+
+        processes = []
+        for i in range(arguments.load_processes):
+            # The remaining clients go to the first processes
+            clients = arguments.clients // arguments.load_processes + (1 if i < arguments.clients % arguments.load_processes else 0)
+            processes.append(multiprocessing.Process(target=run_load_process, args=(
+                arguments.host, port, i, clients, users, weights, arguments.binary, arguments.think_time,
+                arguments.request_timeout, arguments.warm_up, arguments.duration, start_barrier, results_queue
+            )))
+
+        for process in processes:
+            process.start()
+
+        print("Connecting {0} virtual clients from {1} load processes ...".format(arguments.clients, arguments.load_processes))
+        start_barrier.wait()
+        time.sleep(arguments.warm_up)
+
+        start_usage = read_process_tree_usage(server_process.pid)
+        time.sleep(arguments.duration)
+        end_usage = read_process_tree_usage(server_process.pid)
+
+        process_results = [results_queue.get() for process in processes]
+        for process in processes:
+            process.join()
+
+        # The server side view of the same run ( every worker has its own admin port )
+        server_metrics = [
+            json.loads(query_admin_socket((arguments.host, admin_port + i), JSON_FORMAT))
+            for i in range(arguments.workers)
+        ]
+    finally:
+        stop_server_process(server_process)
+        if db_directory is not None:
+            shutil.rmtree(db_directory)
+
+    server_usage = None
+    if start_usage is not None and end_usage is not None:
+        cpu_seconds = end_usage[0] - start_usage[0]
+        server_usage = {
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": cpu_seconds / arguments.duration * 100,
+            "rss_mb": end_usage[1] / 2 ** 20,
+            "peak_rss_mb": end_usage[2] / 2 ** 20,
+        }
+
+    results = {
+        "started": started,
+        "configuration": vars(arguments),
+        "environment": {"cpus": os.cpu_count(), "python": platform.python_version(), "platform": platform.platform()},
+        "users": len(users),
+        "operations": summarize(process_results, arguments.duration),
+        "server": server_usage,
+        "server_metrics": server_metrics,
+    }
+
+    previous_results = None
+    if arguments.compare is not None:
+        with open(arguments.compare) as previous_results_file:
+            previous_results = json.load(previous_results_file)
+
+    print()
+    print_report(results, previous_results)
+
+    with open(output_path, "w") as results_file:
+        json.dump(results, results_file, indent=1)
+    print()
+    print("Results saved to {0}".format(output_path))
+
+
+if __name__ == "__main__":
+    main()
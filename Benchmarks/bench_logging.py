@@ -0,0 +1,112 @@
+"""
+Cost of a log call on the event loop thread : the old synchronous StreamHandler & FileHandler against the LogPipeline of Server/log_pipeline.py.
+
+Every event is logged twice ( stream & file logger ), exactly like the handlers of the server do it. The stream output goes to os.devnull
+( a terminal is only slower ), the file output into a temporary directory. The pipeline is measured with & without INFO sampling,
+and with a small queue to show the drop counter.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_logging --events 100000
+"""
+
+import argparse  # Command line options of the benchmark
+import logging  # The loggers that are measured
+import os  # Paths inside the temporary directory
+import shutil  # Remove the temporary directory
+import tempfile  # The log files are written into a temporary directory
+import time  # Measure the log calls
+from ..Server.log_pipeline import LogPipeline, STREAM_OUTPUT, FILE_OUTPUT  # The measured pipeline
+from .benchmark_server import percentile
+
+FORMATTER = logging.Formatter("{asctime} [ {levelname:8} ] > {message}", datefmt="%d.%m.%Y <> %H:%M:%S", style="{")
+
+
+def create_loggers(name, stream_handler, file_handler):
+    """
+    Returns a tuple -> ( STREAM_LOGGER, FILE_LOGGER ) with the given handlers
+    """
+
+    stream_logger = logging.getLogger("bench_stream_" + name)
+    file_logger = logging.getLogger("bench_file_" + name)
+
+    for logger, handler in ((stream_logger, stream_handler), (file_logger, file_handler)):
+        logger.handlers.clear()
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+
+    return (stream_logger, file_logger)
+
+
+def measure_events(stream_logger, file_logger, events):
+    """
+    Logs the events like the server does and returns a tuple -> ( EVENTS PER SECOND, P99 OF A SINGLE EVENT IN MICROSECONDS, CPU TIME OF THE CALLING THREAD PER EVENT IN MICROSECONDS )
+    The CPU time of the calling thread doesn't include the work of the writer thread, even if both share a single core.
+    """
+
+    event_times = []
+    perf_counter = time.perf_counter
+
+    start_thread_time = time.thread_time()
+    start_time = perf_counter()
+    for i in range(events):
+        event_start_time = perf_counter()
+
+        logger_info_message = "New connection established with >> {0}".format(("127.0.0.1", 40000 + i % 20000))
+        stream_logger.info(logger_info_message)
+        file_logger.info(logger_info_message)
+
+        event_times.append(perf_counter() - event_start_time)
+    elapsed_time = perf_counter() - start_time
+    thread_time = time.thread_time() - start_thread_time
+
+    return (events / elapsed_time, percentile(sorted(event_times), 0.99) * 1e6, thread_time / events * 1e6)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Cost of a log call on the event loop thread, synchronous handlers against the log pipeline")
+    argument_parser.add_argument("--events", type=int, default=100000, help="Logged events per configuration")
+    argument_parser.add_argument("--max-bytes", type=int, default=1024 * 1024, help="Rotation size of the pipeline log file")
+    arguments = argument_parser.parse_args()
+
+    temporary_directory = tempfile.mkdtemp()
+    devnull = open(os.devnull, "w")
+
+    try:
+        print("{0:>24} | {1:>10} | {2:>10} | {3:>15} | {4:>8} | {5:>9}".format("configuration", "events/s", "p99 ( µs )", "caller CPU ( µs )", "dropped", "rotations"))
+        print("-" * 94)
+
+        stream_handler = logging.StreamHandler(devnull)
+        file_handler = logging.FileHandler(os.path.join(temporary_directory, "sync.log"))
+        for handler in (stream_handler, file_handler):
+            handler.setFormatter(FORMATTER)
+
+        events_per_second, p99, caller_cpu = measure_events(*create_loggers("sync", stream_handler, file_handler), arguments.events)
+        file_handler.close()
+        print("{0:>24} | {1:>10.0f} | {2:>10.1f} | {3:>16.1f} | {4:>8} | {5:>9}".format("synchronous handlers", events_per_second, p99, caller_cpu, "-", "-"))
+
+        configurations = (
+            ("pipeline", 10000, None),
+            ("pipeline, INFO 1 of 10", 10000, {logging.INFO: 10}),
+            ("pipeline, queue 100", 100, None),
+        )
+
+        for name, queue_size, sample_rates in configurations:
+            log_pipeline = LogPipeline(
+                os.path.join(temporary_directory, "pipeline_{0}.log".format(queue_size)), FORMATTER,
+                max_bytes=arguments.max_bytes, queue_size=queue_size, stream=devnull
+            )
+            loggers = create_loggers(name, log_pipeline.create_handler(STREAM_OUTPUT, sample_rates), log_pipeline.create_handler(FILE_OUTPUT, sample_rates))
+
+            events_per_second, p99, caller_cpu = measure_events(*loggers, arguments.events)
+            log_pipeline.close()
+
+            stats = log_pipeline.stats()
+            print("{0:>24} | {1:>10.0f} | {2:>10.1f} | {3:>16.1f} | {4:>8} | {5:>9}".format(name, events_per_second, p99, caller_cpu, stats["dropped"], stats["rotations"]))
+    finally:
+        devnull.close()
+        shutil.rmtree(temporary_directory)
+
+
+if __name__ == "__main__":
+    main()
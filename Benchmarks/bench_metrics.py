@@ -0,0 +1,73 @@
+"""
+Recording cost of the metrics of Server/metrics.py, the work the server adds to every message it handles.
+
+A handled message costs the server one counter increment ( messages_received ), two perf_counter() calls and one histogram observation
+( handler_seconds ). Both are measured alone and together, against an empty loop, and the render() of a registry with the metrics of a server.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_metrics --iterations 1000000
+"""
+
+import argparse  # Command line options of the benchmark
+import random  # Latencies of the observations
+import time  # Measure the recording
+from ..Server.metrics import MetricsRegistry, TEXT_FORMAT, JSON_FORMAT  # The measured metrics
+
+
+def measure_loop(function, iterations):
+    """
+    Returns the nanoseconds per call of function(i)
+    """
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        function(i)
+
+    return (time.perf_counter() - start_time) / iterations * 1e9
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Recording cost of the counters & histograms of the server metrics")
+    argument_parser.add_argument("--iterations", type=int, default=1000000, help="Recordings per measurement")
+    arguments = argument_parser.parse_args()
+
+    metrics_registry = MetricsRegistry()
+    counter = metrics_registry.counter("messages_received", header="CLIENT_MESSAGE")
+    histogram = metrics_registry.histogram("handler_seconds", handler="client_message")
+    perf_counter = time.perf_counter
+
+    # Latencies between 1 µs & 10 ms, so the observations land in different buckets
+    latencies = [10 ** random.uniform(-6, -2) for i in range(1024)]
+
+    def handle_message(i):
+        counter.increment()
+        start_time = perf_counter()
+        histogram.observe(perf_counter() - start_time)
+
+    measurements = (
+        ("empty loop", lambda i: None),
+        ("counter increment", lambda i: counter.increment()),
+        ("histogram observe", lambda i: histogram.observe(latencies[i & 1023])),
+        ("handled message", handle_message),
+    )
+
+    print("{0:>20} | {1:>10}".format("recording", "ns / call"))
+    print("-" * 33)
+    for name, function in measurements:
+        print("{0:>20} | {1:>10.0f}".format(name, measure_loop(function, arguments.iterations)))
+
+    # Roughly the metrics of a server : a counter & a histogram per header, a few gauges
+    for header in range(7):
+        metrics_registry.counter("messages_received", header=str(header))
+        metrics_registry.histogram("handler_seconds", handler=str(header)).observe(0.0001)
+    for gauge in range(4):
+        metrics_registry.gauge("gauge_{0}".format(gauge), lambda: 0)
+
+    print()
+    for output_format in (TEXT_FORMAT, JSON_FORMAT):
+        render_time = measure_loop(lambda i: metrics_registry.render(output_format), 1000) / 1e3
+        print("render ( {0} ) : {1:.0f} µs per admin request".format(output_format, render_time))
+
+
+if __name__ == "__main__":
+    main()
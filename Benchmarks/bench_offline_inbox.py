@@ -0,0 +1,183 @@
+"""
+Drain throughput of the offline inbox ( Server/offline_inbox.py ).
+
+1. inbox only : store() & take() of the OfflineInbox itself, with everything in memory and with a memory tier of 1/10 of the messages.
+   The spilled messages are read by the spill thread ( take_spilled() ) and handed back through a DB executor, like on the server.
+2. end to end : a sender sends --messages messages to an offline username ( the first user of DB/dummy_db.db, the server only stores messages for users ),
+   then the username connects ( {CLIENT_COMMUNICATION_DATA} )
+   and the time until it received all of them is measured, for every --drain-batch. The order of the received messages is checked as well.
+
+The server is asked through its admin socket ( Read Server/metrics.py ) when all the messages are stored.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_offline_inbox --messages 20000 --drain-batch 1 16 256
+"""
+
+import argparse  # Command line options of the benchmark
+import json  # Metrics of the server
+import os  # Path of the DB of the executor
+import selectors  # Wait for the spilled messages like the event loop does
+import shutil  # Remove the DB of the executor
+import socket  # Sender & receiver sockets
+import tempfile  # The executor of the inbox gets an empty DB
+import time  # Measure the drain
+from ..DB import queries  # The receiver is a user of the DB of the server
+from ..Protocol import messages  # Opcodes of the messages
+from ..Protocol import text_protocol  # The sender & the receiver use the text protocol
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE  # Read the framed messages of the server
+from ..Server.offline_inbox import OfflineInbox  # The measured inbox
+from ..Server.db_executor import DatabaseExecutor  # Hands the spilled messages back to the benchmark loop
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Wait until the server stored all the messages
+from .benchmark_server import find_free_port, start_server_process, stop_server_process, send_message
+
+
+def read_receiver_username():
+    """
+    Returns the username of the first user of DB/dummy_db.db. The generated usernames never contain an underscore, the text protocol separates the fields with it.
+    """
+
+    DB_CONNECTION = queries.connect(queries.DB_PATH)
+    try:
+        return DB_CONNECTION.execute("SELECT Username FROM users ORDER BY UID LIMIT 1").fetchone()[0]
+    finally:
+        DB_CONNECTION.close()
+
+
+def measure_inbox(message_count, memory_messages, usernames=100):
+    """
+    Stores message_count messages for usernames different usernames and takes them again in batches of 256.
+    Returns a tuple -> ( STORED MESSAGES PER SECOND, TAKEN MESSAGES PER SECOND )
+    """
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_offline_inbox_")
+    db_executor = DatabaseExecutor(os.path.join(db_directory, "users.db"), 1)
+    offline_inbox = OfflineInbox(db_executor, limit_per_user=message_count, limit_per_sender=message_count, memory_messages=memory_messages, max_messages=message_count)
+    selector = selectors.DefaultSelector()
+    selector.register(db_executor.completion_socket, selectors.EVENT_READ)
+
+    try:
+        start_time = time.perf_counter()
+        for i in range(message_count):
+            offline_inbox.store("user{0}".format(i % usernames), "sender", "Offline message number {0}".format(i))
+        store_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for i in range(usernames):
+            username = "user{0}".format(i)
+            while username in offline_inbox:
+                taken_batches = []
+                if offline_inbox.take_spilled(username, 256, taken_batches.append):
+                    # Wait for the spill thread like the event loop does
+                    while not taken_batches:
+                        selector.select()
+                        db_executor.run_completion_callbacks()
+                else:
+                    offline_inbox.take(username, 256)
+        take_time = time.perf_counter() - start_time
+    finally:
+        offline_inbox.close()
+        selector.close()
+        db_executor.shutdown()
+        shutil.rmtree(db_directory)
+
+    return (message_count / store_time, message_count / take_time)
+
+
+def read_offline_inbox_stats(admin_port):
+    """
+    Returns a dict with the stats of the offline inbox of the server ( the offline_inbox_* gauges without the prefix )
+    """
+
+    snapshot = json.loads(query_admin_socket(("127.0.0.1", admin_port), JSON_FORMAT))
+
+    return {
+        gauge["name"][len("offline_inbox_"):]: gauge["value"]
+        for gauge in snapshot["gauges"] if gauge["name"].startswith("offline_inbox_")
+    }
+
+
+def measure_drain(host, message_count, drain_batch, memory_messages, receiver_username):
+    """
+    Starts a server, stores message_count messages for the offline receiver and returns a tuple -> ( DRAINED MESSAGES PER SECOND, SPILLED MESSAGES )
+    """
+
+    admin_port = find_free_port(host)
+    server_process, port = start_server_process(host, [
+        "--admin-port", str(admin_port),
+        "--offline-inbox-limit", str(message_count),
+        "--offline-sender-limit", str(message_count),
+        "--offline-memory-messages", str(memory_messages),
+        "--offline-drain-batch", str(drain_batch),
+    ])
+
+    try:
+        with socket.create_connection((host, port)) as sender_socket:
+            for i in range(message_count):
+                send_message(sender_socket, "{{CLIENT_MESSAGE}}{{sender_{0}_Offline message number {1}}}".format(receiver_username, i))
+
+            while True:
+                try:
+                    offline_inbox_stats = read_offline_inbox_stats(admin_port)
+                except ConnectionRefusedError:
+                    # The admin socket of the busy server has no room for another connection yet
+                    offline_inbox_stats = None
+
+                if offline_inbox_stats is not None and offline_inbox_stats["messages"] >= message_count:
+                    break
+                time.sleep(0.01)
+
+            spilled_messages = offline_inbox_stats["spilled"]
+
+            with socket.create_connection((host, port)) as receiver_socket:
+                receiver_socket.settimeout(30)
+                frame_decoder = FrameDecoder()
+                received_messages = 0
+
+                start_time = time.perf_counter()
+                send_message(receiver_socket, "{{CLIENT_COMMUNICATION_DATA}}{{{0}}}".format(receiver_username))
+
+                while received_messages < message_count:
+                    data = receiver_socket.recv(RECV_BUFFER_SIZE)
+                    if not data:
+                        raise RuntimeError("The server closed the receiver connection")
+
+                    for frame in frame_decoder.feed(data):
+                        opcode, fields = text_protocol.parse_server_message(frame.decode("utf-8"))
+
+                        # The messages must arrive in the order they were sent
+                        if opcode != messages.MESSAGE_FROM_CLIENT or fields[1] != "Offline message number {0}".format(received_messages):
+                            raise RuntimeError("Message {0} arrived out of order : {1}".format(received_messages, fields))
+                        received_messages += 1
+
+                drain_time = time.perf_counter() - start_time
+    finally:
+        stop_server_process(server_process)
+
+    return (message_count / drain_time, spilled_messages)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Drain throughput of the offline inbox")
+    argument_parser.add_argument("--messages", type=int, default=20000, help="Messages stored for the offline receiver")
+    argument_parser.add_argument("--drain-batch", type=int, nargs="+", default=[1, 16, 256], help="--offline-drain-batch values to measure")
+    argument_parser.add_argument("--memory-messages", type=int, default=5000, help="--offline-memory-messages of the server, the rest is spilled")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    print("{0:>16} | {1:>12} | {2:>12}".format("inbox", "store ( /s )", "take ( /s )"))
+    print("-" * 46)
+    for name, memory_messages in (("memory", arguments.messages), ("memory 1/10", arguments.messages // 10)):
+        store_rate, take_rate = measure_inbox(arguments.messages, memory_messages)
+        print("{0:>16} | {1:>12.0f} | {2:>12.0f}".format(name, store_rate, take_rate))
+
+    print()
+    print("{0:>12} | {1:>9} | {2:>15}".format("drain batch", "spilled", "drained ( /s )"))
+    print("-" * 42)
+    receiver_username = read_receiver_username()
+    for drain_batch in arguments.drain_batch:
+        drain_rate, spilled_messages = measure_drain(arguments.host, arguments.messages, drain_batch, arguments.memory_messages, receiver_username)
+        print("{0:>12} | {1:>9} | {2:>15.0f}".format(drain_batch, spilled_messages, drain_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Login throughput with hashed passwords ( Server/password_hasher.py ) for different numbers of hashing processes ( --password-workers ).
+
+The users are generated into a temporary DB and their passwords are migrated to hashes with DB/passwords.py before the first server starts.
+For every pool size, several login threads log in with the real passwords one after the other while a sender/receiver pair measures the
+{CLIENT_MESSAGE} round trip at the same time:
+
+- logins/s & login p50 / p99 -- > every login is verified against an scrypt ( or PBKDF2 ) hash
+- chat p50 / p99 -- > --password-workers 0 hashes on the event loop : every chat message waits for the hashes in front of it
+- hash p99 -- > password_hasher_hash_ms_p99 of the server ( admin socket ), the queue wait of the pool included
+- server CPU -- > CPU of the server & its hashing processes
+
+Keep in mind that the login threads share the CPUs with the server. The pool stops scaling once the hashing processes use all the CPUs.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_password_hashing --password-workers 0 1 2 4 --login-threads 8 --duration 5
+"""
+
+import argparse  # Command line options of the benchmark
+import json  # Metrics of the server
+import os  # Path of the DB
+import shutil  # Remove the generated DB
+import socket  # Client sockets
+import sqlite3  # Read the plaintext passwords before the migration
+import tempfile  # The generated DB lives in a temporary directory
+import threading  # Login flood next to the latency measurement
+import time  # Measuring window & latencies
+from ..DB.db_generator import Generator  # Generates the users DB
+from ..DB import passwords  # Migrates the generated passwords to hashes
+from ..Protocol import text_protocol  # Text response of a successful login
+from ..Protocol.framing import FrameDecoder, receive_frame  # Read the framed messages of the server
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Server side hash latencies
+from .benchmark_server import find_free_port, start_server_process, stop_server_process, send_message, percentile, read_process_tree_usage
+from .bench_unicast import SENDER_USERNAME, RECEIVER_USERNAME, connect_communication_socket, wait_until_registered
+
+LOGIN_SUCCESSFUL_PREFIX = text_protocol.SERVER_LOGIN_SUCCESSFUL_PREFIX.encode("utf-8")
+
+
+def generate_hashed_users_db(db_path, users, scheme, cost):
+    """
+    Generates the users DB, replaces its passwords with their hashes and returns a list with ( USERNAME, PASSWORD ) tuples of the users
+    """
+
+    Generator(db_path).generate_dummy_users(users)
+
+    DB_CONNECTION = sqlite3.connect(db_path)
+    credentials = DB_CONNECTION.execute("SELECT Username, Password FROM users").fetchall()
+    DB_CONNECTION.close()
+
+    passwords.migrate_passwords(db_path, scheme, cost)
+
+    return credentials
+
+
+def run_login_thread(host, port, credentials, first_index, stop_event, latencies):
+    """
+    Logs in with the credentials one after the other until stop_event is set. Appends the latency of every login to latencies.
+    """
+
+    login_index = first_index
+    while not stop_event.is_set():
+        username, password = credentials[login_index % len(credentials)]
+        login_index += 1
+
+        login_start_time = time.perf_counter()
+        login_socket = socket.create_connection((host, port))
+        send_message(login_socket, "{{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}}{{USERNAME:{0}|PASSWORD:{1}}}".format(username, password))
+        response = receive_frame(login_socket, FrameDecoder())
+        login_socket.close()
+
+        if not response.startswith(LOGIN_SUCCESSFUL_PREFIX):
+            raise RuntimeError("Login failed : {0}".format(response))
+
+        latencies.append(time.perf_counter() - login_start_time)
+
+
+def read_hash_latency(admin_port):
+    """
+    Returns the password_hasher_hash_ms_p99 gauge of the server
+    """
+
+    snapshot = json.loads(query_admin_socket(("127.0.0.1", admin_port), JSON_FORMAT))
+
+    return next(gauge["value"] for gauge in snapshot["gauges"] if gauge["name"] == "password_hasher_hash_ms_p99")
+
+
+def measure_password_workers(host, password_workers, login_threads, duration, db_path, credentials, scheme, cost):
+    """
+    Starts a server with the given number of hashing processes and floods it with logins.
+    Returns a dict with the results of the run.
+    """
+
+    admin_port = find_free_port(host)
+    server_arguments = [
+        "--db", db_path, "--admin-port", str(admin_port), "--password-workers", str(password_workers), "--password-scheme", scheme,
+        "--heartbeat-interval", "0", "--idle-timeout", "0"
+    ]
+    if cost is not None:
+        server_arguments += ["--password-cost", str(cost)]
+    server_process, port = start_server_process(host, server_arguments)
+
+    try:
+        sender_socket = connect_communication_socket(host, port, SENDER_USERNAME)
+        receiver_socket = connect_communication_socket(host, port, RECEIVER_USERNAME)
+        receiver_decoder = FrameDecoder()
+        wait_until_registered(sender_socket, FrameDecoder(), receiver_socket, receiver_decoder, RECEIVER_USERNAME)
+
+        cpu_seconds_before = read_process_tree_usage(server_process.pid)
+
+        stop_event = threading.Event()
+        login_latencies = []
+        threads = [
+            threading.Thread(target=run_login_thread, args=(host, port, credentials, i * len(credentials) // login_threads, stop_event, login_latencies))
+            for i in range(login_threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        chat_message = "{{CLIENT_MESSAGE}}{{{0}_{1}_hello there}}".format(SENDER_USERNAME, RECEIVER_USERNAME)
+        chat_latencies = []
+        start_time = time.perf_counter()
+        while time.perf_counter() - start_time < duration:
+            message_start_time = time.perf_counter()
+            send_message(sender_socket, chat_message)
+            receive_frame(receiver_socket, receiver_decoder)
+            chat_latencies.append(time.perf_counter() - message_start_time)
+
+            # Leave the CPU to the login threads most of the time
+            time.sleep(0.005)
+
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        elapsed_time = time.perf_counter() - start_time
+
+        server_usage = read_process_tree_usage(server_process.pid)
+        hash_latency = read_hash_latency(admin_port)
+
+        sender_socket.close()
+        receiver_socket.close()
+    finally:
+        stop_server_process(server_process)
+
+    login_latencies.sort()
+    chat_latencies.sort()
+
+    return {
+        "logins_per_second": len(login_latencies) / elapsed_time,
+        "login_p50": percentile(login_latencies, 0.5),
+        "login_p99": percentile(login_latencies, 0.99),
+        "chat_p50": percentile(chat_latencies, 0.5),
+        "chat_p99": percentile(chat_latencies, 0.99),
+        "hash_ms_p99": hash_latency,
+        "cpu_seconds": server_usage[0] - cpu_seconds_before[0] if server_usage and cpu_seconds_before else float("nan"),
+        "elapsed_time": elapsed_time,
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Logins per second & chat latency for different numbers of password hashing processes")
+    argument_parser.add_argument("--password-workers", type=int, nargs="+", default=[0, 1, 2, 4], help="Hashing process counts to measure ( 0 hashes on the event loop )")
+    argument_parser.add_argument("--login-threads", type=int, default=8, help="Threads logging in one after the other")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of measuring per pool size")
+    argument_parser.add_argument("--users", type=int, default=100, help="Generated users")
+    argument_parser.add_argument("--scheme", choices=(passwords.SCRYPT, passwords.PBKDF2), default=passwords.SCRYPT, help="Scheme of the stored hashes. Defaults to scrypt")
+    argument_parser.add_argument("--cost", type=int, default=None, help="N of scrypt or iterations of PBKDF2. Defaults to the default cost of the scheme")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_password_hashing_")
+    db_path = os.path.join(db_directory, "users.db")
+
+    try:
+        start_time = time.perf_counter()
+        credentials = generate_hashed_users_db(db_path, arguments.users, arguments.scheme, arguments.cost)
+        print("Hashed the passwords of {0} users in {1:.1f} s ( {2}, cost {3} ), {4} CPUs".format(
+            len(credentials), time.perf_counter() - start_time, arguments.scheme, passwords.check_scheme(arguments.scheme, arguments.cost), os.cpu_count()
+        ))
+        print()
+
+        print("{0:>8} | {1:>9} | {2:>14} | {3:>14} | {4:>13} | {5:>13} | {6:>13} | {7:>10}".format(
+            "workers", "logins/s", "login p50 (ms)", "login p99 (ms)", "chat p50 (ms)", "chat p99 (ms)", "hash p99 (ms)", "server CPU"
+        ))
+        print("-" * 115)
+
+        for password_workers in arguments.password_workers:
+            run = measure_password_workers(
+                arguments.host, password_workers, arguments.login_threads, arguments.duration, db_path, credentials, arguments.scheme, arguments.cost
+            )
+
+            print("{0:>8} | {1:>9.1f} | {2:>14.1f} | {3:>14.1f} | {4:>13.2f} | {5:>13.2f} | {6:>13.1f} | {7:>9.0f}%".format(
+                password_workers, run["logins_per_second"], run["login_p50"] * 1e3, run["login_p99"] * 1e3,
+                run["chat_p50"] * 1e3, run["chat_p99"] * 1e3, run["hash_ms_p99"], run["cpu_seconds"] / run["elapsed_time"] * 100
+            ))
+    finally:
+        shutil.rmtree(db_directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Cost of the presence subscribers ( Server/presence.py ) with a big roster : the snapshot of a new subscriber and the login / logout storms.
+
+Everything runs inside one process with the PresenceService of the server and the real codecs, only the sockets are left out : a subscriber is a fake session
+whose send_frame() counts the bytes, half of the subscribers speak the binary protocol. The online usernames are a set, exactly what the connection registry checks.
+50000 online usernames need more sockets than one machine usually allows per process, the encoding & fan-out work is the same without them.
+
+For every subscriber count & storm size, one tick is measured:
+the storm -- > changes usernames log out or log in ( half & half ), --reconnect-fraction of the logouts log in again within the same tick
+mark -- > mark_changed() of every change, what the handlers of the server do
+delta -- > flush() at the end of the tick : compare, encode once per protocol, one send per subscriber
+full roster -- > the alternative : every subscriber gets the whole roster again, encoded once per protocol
+The time of a send is left out, so the bytes per subscriber show what the sockets of the server would have to write on top of the measured times.
+per change -- > the other alternative : every change is encoded & sent on its own to every subscriber
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_presence --online 50000 --subscribers 1 100 1000 --changes 100 1000 10000
+"""
+
+import argparse  # Command line options of the benchmark
+import random  # The usernames of the storms
+import time  # Measure the ticks
+from ..Protocol import messages  # Opcodes of the presence messages
+from ..Protocol import text_protocol, binary_protocol  # Both encodings of the subscribers
+from ..Protocol.framing import encode_frame  # The frames the server sends
+from ..Protocol.roster_codec import encode_usernames, decode_usernames  # The username lists
+from ..Server.presence import PresenceService  # The measured service
+
+
+class FakeSession:
+    # The only attribute of a session that the presence reads
+    __slots__ = ("binary_protocol",)
+
+    def __init__(self, binary_protocol):
+        self.binary_protocol = binary_protocol
+
+
+class ByteCounter:
+    def __init__(self):
+        """The send_frame() of the fake sessions, remembers the bytes and the last frame of every protocol"""
+        self.sent_bytes = 0
+        self.last_frames = dict()
+
+    def send_frame(self, client_session, frame):
+        self.sent_bytes += len(frame)
+        self.last_frames[client_session.binary_protocol] = frame
+
+
+def encode_server_message(binary, opcode, *fields):
+    """
+    The frame of a server message, the same as Server.encode_server_message()
+    """
+
+    if binary:
+        return encode_frame(binary_protocol.encode_message(opcode, *fields))
+
+    return encode_frame(text_protocol.format_server_message(opcode, *fields).encode("utf-8"))
+
+
+def decode_frames(binary, frames):
+    """
+    Returns the list of tuples -> ( OPCODE, FIELDS ) of several joined frames
+    """
+
+    decoded_messages = []
+    offset = 0
+    while offset < len(frames):
+        payload_size = int.from_bytes(frames[offset:offset + 4], "big")
+        payload = frames[offset + 4:offset + 4 + payload_size]
+        offset += 4 + payload_size
+
+        if binary:
+            decoded_messages.append(binary_protocol.decode_message(payload))
+        else:
+            decoded_messages.append(text_protocol.parse_server_message(payload.decode("utf-8")))
+
+    return decoded_messages
+
+
+def create_service(online_usernames, subscribers, chunk_size):
+    """
+    Returns a tuple -> ( PresenceService, BYTE COUNTER ) with the given number of subscribed fake sessions. Their snapshots aren't counted.
+    """
+
+    byte_counter = ByteCounter()
+    presence = PresenceService(online_usernames.__contains__, encode_server_message, byte_counter.send_frame, 0.5, chunk_size)
+
+    for index in range(subscribers):
+        presence.subscribers[FakeSession(index % 2 == 1)] = None
+
+    return (presence, byte_counter)
+
+
+def measure_snapshot(online_usernames, chunk_size, repeat):
+    """
+    Returns a dict with the time & the size of the snapshot of a single new subscriber, per protocol
+    """
+
+    results = dict()
+    for binary in (False, True):
+        byte_counter = ByteCounter()
+        presence = PresenceService(online_usernames.__contains__, encode_server_message, byte_counter.send_frame, 0.5, chunk_size)
+
+        best_duration = float("inf")
+        for i in range(repeat):
+            client_session = FakeSession(binary)
+            start_time = time.perf_counter()
+            presence.subscribe(client_session, online_usernames)
+            best_duration = min(best_duration, time.perf_counter() - start_time)
+            presence.unsubscribe(client_session)
+
+        snapshot_messages = decode_frames(binary, byte_counter.last_frames[binary])
+        snapshot_usernames = set()
+        for opcode, (more_parts, usernames_field) in snapshot_messages:
+            snapshot_usernames.update(decode_usernames(usernames_field))
+
+        # The snapshot must contain the roster, every part must stay far below MAX_FRAME_SIZE
+        if snapshot_usernames != online_usernames:
+            raise RuntimeError("The snapshot doesn't contain the online usernames")
+
+        results[binary] = {
+            "seconds": best_duration,
+            "bytes": len(byte_counter.last_frames[binary]),
+            "parts": len(snapshot_messages),
+        }
+
+    return results
+
+
+def create_storm(online_usernames, offline_usernames, changes, reconnects):
+    """
+    Returns the list of tuples -> ( USERNAME, COMES ONLINE ) of a storm, in the order the server sees them.
+    The reconnecting usernames log out & log in again, they don't change their state.
+    """
+
+    logouts = random.sample(sorted(online_usernames), changes // 2)
+    logins = random.sample(offline_usernames, changes - changes // 2)
+
+    storm = [(username, False) for username in logouts] + [(username, True) for username in logins]
+    random.shuffle(storm)
+
+    for username in logouts[:reconnects]:
+        storm.append((username, True))
+
+    return storm
+
+
+def run_storm(online_usernames, storm, presence, now):
+    """
+    Applies the storm to the online usernames, marking every change like the handlers of the server. Returns the seconds it took.
+    """
+
+    start_time = time.perf_counter()
+    for username, comes_online in storm:
+        presence.mark_changed(username, username in online_usernames, now)
+        if comes_online:
+            online_usernames.add(username)
+        else:
+            online_usernames.discard(username)
+
+    return time.perf_counter() - start_time
+
+
+def undo_storm(online_usernames, storm):
+    """
+    Puts the online usernames back into the state before the storm
+    """
+
+    for username, comes_online in reversed(storm):
+        if comes_online:
+            online_usernames.discard(username)
+        else:
+            online_usernames.add(username)
+
+
+def measure_full_roster(online_usernames, subscribers, chunk_size, byte_counter):
+    """
+    The alternative without deltas : every subscriber gets the whole roster again. Returns the seconds it took.
+    """
+
+    start_time = time.perf_counter()
+
+    usernames = list(online_usernames)
+    parts = [usernames[index:index + chunk_size] for index in range(0, len(usernames), chunk_size)]
+
+    frames = dict()
+    for client_session in subscribers:
+        binary = client_session.binary_protocol
+        frame = frames.get(binary)
+        if frame is None:
+            frame = frames[binary] = b"".join([
+                encode_server_message(binary, messages.SERVER_PRESENCE_SNAPSHOT, int(index < len(parts) - 1), encode_usernames(part))
+                for index, part in enumerate(parts)
+            ])
+        byte_counter.send_frame(client_session, frame)
+
+    return time.perf_counter() - start_time
+
+
+def measure_per_change(storm, subscribers, byte_counter):
+    """
+    The alternative without coalescing : every change is encoded & sent to every subscriber on its own. Returns the seconds it took.
+    """
+
+    start_time = time.perf_counter()
+
+    for username, comes_online in storm:
+        fields = (username, "") if comes_online else ("", username)
+        for client_session in subscribers:
+            byte_counter.send_frame(client_session, encode_server_message(client_session.binary_protocol, messages.SERVER_PRESENCE_DELTA, *fields))
+
+    return time.perf_counter() - start_time
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Snapshot & login / logout storm cost of the presence subscribers with a big roster")
+    argument_parser.add_argument("--online", type=int, default=50000, help="Online usernames")
+    argument_parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 100, 1000], help="Numbers of subscribers")
+    argument_parser.add_argument("--changes", type=int, nargs="+", default=[100, 1000, 10000], help="Usernames that log in or out per tick")
+    argument_parser.add_argument("--reconnect-fraction", type=float, default=0.1, help="Part of the logouts that log in again within the same tick. Defaults to 0.1")
+    argument_parser.add_argument("--chunk-size", type=int, default=1000, help="Usernames per presence message ( --presence-chunk-size of the server )")
+    argument_parser.add_argument("--per-change-limit", type=int, default=2000000, help="Skip the per change alternative above this many sends. Defaults to 2000000")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="Runs of every measurement, the best one is reported")
+    arguments = argument_parser.parse_args()
+
+    random.seed(1)
+    online_usernames = {"user{0:08d}".format(index) for index in range(arguments.online)}
+    offline_usernames = ["user{0:08d}".format(index) for index in range(arguments.online, arguments.online + max(arguments.changes))]
+
+    print("{0} online usernames, {1} usernames per message".format(len(online_usernames), arguments.chunk_size))
+    print()
+
+    for binary, snapshot in sorted(measure_snapshot(online_usernames, arguments.chunk_size, arguments.repeat).items()):
+        print("snapshot ( {0:>6} ) : {1:8.2f} ms | {2:10.0f} bytes | {3} parts".format(
+            "binary" if binary else "text", snapshot["seconds"] * 1e3, snapshot["bytes"], snapshot["parts"]
+        ))
+    print()
+
+    print("{0:>11} | {1:>7} | {2:>8} | {3:>9} | {4:>10} | {5:>15} | {6:>16} | {7:>21} | {8:>15}".format(
+        "subscribers", "changes", "in delta", "mark (ms)", "delta (ms)", "delta B/subscr.", "full roster (ms)", "full roster B/subscr.", "per change (ms)"
+    ))
+    print("-" * 140)
+
+    for subscribers in sorted(arguments.subscribers):
+        for changes in sorted(arguments.changes):
+            storm = create_storm(online_usernames, offline_usernames, changes, int(changes // 2 * arguments.reconnect_fraction))
+
+            # keys : Username | values : Its state after the storm. Only the usernames whose state changed belong into the delta.
+            final_states = dict(storm)
+            expected_online = {username for username, online in final_states.items() if online and username not in online_usernames}
+            expected_offline = {username for username, online in final_states.items() if not online and username in online_usernames}
+
+            best_mark = best_delta = best_full_roster = float("inf")
+            full_roster_counter = ByteCounter()
+            for i in range(arguments.repeat):
+                presence, byte_counter = create_service(online_usernames, subscribers, arguments.chunk_size)
+
+                best_mark = min(best_mark, run_storm(online_usernames, storm, presence, 0.0))
+
+                start_time = time.perf_counter()
+                delta_changes = presence.flush(presence.next_flush_time)
+                best_delta = min(best_delta, time.perf_counter() - start_time)
+                delta_bytes = byte_counter.sent_bytes / subscribers
+
+                # Both protocols must carry exactly the usernames that changed
+                for binary, frames in byte_counter.last_frames.items():
+                    delta_online = set()
+                    delta_offline = set()
+                    for opcode, (online_field, offline_field) in decode_frames(binary, frames):
+                        delta_online.update(decode_usernames(online_field))
+                        delta_offline.update(decode_usernames(offline_field))
+
+                    if delta_online != expected_online or delta_offline != expected_offline:
+                        raise RuntimeError("The delta doesn't match the changes of the storm")
+
+                best_full_roster = min(best_full_roster, measure_full_roster(online_usernames, presence.subscribers, arguments.chunk_size, full_roster_counter))
+
+                undo_storm(online_usernames, storm)
+
+            if changes * subscribers <= arguments.per_change_limit:
+                per_change = "{0:>15.2f}".format(measure_per_change(storm, list(presence.subscribers), ByteCounter()) * 1e3)
+            else:
+                per_change = "{0:>15}".format("skipped")
+
+            print("{0:>11} | {1:>7} | {2:>8} | {3:>9.2f} | {4:>10.2f} | {5:>15.0f} | {6:>16.2f} | {7:>21.0f} | {8}".format(
+                subscribers, changes, delta_changes, best_mark * 1e3, best_delta * 1e3, delta_bytes,
+                best_full_roster * 1e3, full_roster_counter.sent_bytes / arguments.repeat / subscribers, per_change
+            ))
+
+
+if __name__ == "__main__":
+    main()
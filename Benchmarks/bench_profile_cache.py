@@ -0,0 +1,105 @@
+"""
+UID logins per second during a reconnect storm, with and without the profile cache ( --profile-cache-size of the server ).
+
+Several connections keep a window of {CLIENT_LOGIN_INFO_UID_SUCCESSFUL} requests in flight for the UIDs of DB/dummy_db.db.
+Without the cache every login runs a DB query and serializes the profile. With the cache only the first login of every UID does.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_profile_cache --cache-sizes 0 10000 --logins 20000
+"""
+
+import argparse  # Command line options of the benchmark
+import socket  # Client sockets
+import selectors  # All the connections are driven from a single loop
+import time  # Measure the logins
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE  # Read the framed responses of the server
+from ..DB import queries  # UIDs of the existing users
+from .benchmark_server import start_server_process, stop_server_process, send_message
+
+
+def load_UIDs():
+    """
+    Returns the UIDs of all the users inside DB/dummy_db.db
+    """
+
+    DB_CONNECTION = queries.connect()
+    UIDs = [row[0] for row in DB_CONNECTION.execute("SELECT UID FROM users")]
+    DB_CONNECTION.close()
+
+    return UIDs
+
+
+def measure_cache_size(host, cache_size, logins, connections, window, UIDs):
+    """
+    Starts a server with the given profile cache size and returns the UID logins per second
+    """
+
+    server_process, port = start_server_process(host, ["--profile-cache-size", str(cache_size)])
+
+    try:
+        selector = selectors.DefaultSelector()
+        for i in range(connections):
+            client_socket = socket.create_connection((host, port))
+            selector.register(client_socket, selectors.EVENT_READ, FrameDecoder())
+
+        sent_logins = 0
+
+        def send_next_login(client_socket):
+            nonlocal sent_logins
+
+            send_message(client_socket, "{{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}}{{UID:{0}}}".format(UIDs[sent_logins % len(UIDs)]))
+            sent_logins += 1
+
+        start_time = time.perf_counter()
+
+        for key in list(selector.get_map().values()):
+            for i in range(window):
+                if sent_logins < logins:
+                    send_next_login(key.fileobj)
+
+        received_responses = 0
+        while received_responses < logins:
+            for key, mask in selector.select():
+                data = key.fileobj.recv(RECV_BUFFER_SIZE)
+                if not data:
+                    raise RuntimeError("The server closed a login connection")
+
+                for frame in key.data.feed(data):
+                    received_responses += 1
+
+                    if sent_logins < logins:
+                        send_next_login(key.fileobj)
+
+        elapsed_time = time.perf_counter() - start_time
+
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+    finally:
+        stop_server_process(server_process)
+
+    return logins / elapsed_time
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="UID logins per second with and without the profile cache")
+    argument_parser.add_argument("--cache-sizes", type=int, nargs="+", default=[0, 10000], help="Profile cache sizes to measure, 0 disables the cache")
+    argument_parser.add_argument("--logins", type=int, default=20000, help="UID logins per cache size")
+    argument_parser.add_argument("--connections", type=int, default=16, help="Connections sending logins")
+    argument_parser.add_argument("--window", type=int, default=8, help="Logins in flight per connection")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    UIDs = load_UIDs()
+
+    print("UIDs : {0}".format(len(UIDs)))
+    print("{0:>10} | {1:>10}".format("cache size", "logins/s"))
+    print("-" * 24)
+
+    for cache_size in arguments.cache_sizes:
+        logins_per_second = measure_cache_size(arguments.host, cache_size, arguments.logins, arguments.connections, arguments.window, UIDs)
+
+        print("{0:>10} | {1:>10.0f}".format(cache_size, logins_per_second))
+
+
+if __name__ == "__main__":
+    main()
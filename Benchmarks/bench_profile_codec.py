@@ -0,0 +1,177 @@
+"""
+Bulk encoding & decoding of user profiles : the python dict of the old UID login against the profile codec ( Protocol/profile_codec.py ).
+
+encode ( server ) :
+dict -- > The dict of the old DB_get_user_data_with_UID() built from the row, then str(dict)
+codec -- > encode_profile() straight on the tuples of the DB
+codec sqlite3.Row -- > encode_profile() straight on sqlite3.Row objects ( row_factory )
+binary -- > binary_protocol.encode_message() of {SERVER_LOGIN_INFO_UID_SUCCESSFUL}
+
+decode ( client ) :
+eval -- > eval() of the dict string, what the client used to do
+literal_eval -- > ast.literal_eval() of the dict string
+codec -- > decode_profile()
+binary -- > binary_protocol.decode_message()
+
+The rows are read from an in memory DB with the users table of the server. Every codec encodes or decodes all of them, the best of --repeat runs is reported.
+The memory of the decoded users is measured with tracemalloc : the User class before __slots__ against the User class now.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_profile_codec --profiles 100000
+"""
+
+import argparse  # Command line options of the benchmark
+import ast  # The dict string of the old client
+import sqlite3  # Rows & sqlite3.Row objects of the users table
+import time  # Measure the codecs
+import tracemalloc  # Memory of the decoded users
+from ..DB import queries  # The users table & the UID lookup
+from ..Protocol import messages  # Opcode of the UID login response
+from ..Protocol import binary_protocol  # The binary encoding of the same profile
+from ..Protocol.profile_codec import encode_profile, decode_profile  # The measured codec
+from ..User.user import User  # The user with __slots__
+
+
+class DictUser:
+    def __init__(self, UID, username, password, firstName, lastName, age, city, postalCode, streetName, houseNumber, salary):
+        """The User class before __slots__, one __dict__ per user"""
+
+        self.UID = UID
+        self.Username = username
+        self.Password = password
+        self.FirstName = firstName
+        self.LastName = lastName
+        self.Age = age
+        self.City = city
+        self.PostalCode = postalCode
+        self.StreetName = streetName
+        self.HouseNumber = houseNumber
+        self.Salary = salary
+
+
+def row_to_dict(db_user_data):
+    """
+    The dict of the old DB_get_user_data_with_UID()
+    """
+
+    return_user_data_dict = dict()
+    return_user_data_dict["UID"] = db_user_data[0]
+    return_user_data_dict["Username"] = db_user_data[1]
+    return_user_data_dict["Password"] = ""
+    return_user_data_dict["FirstName"] = db_user_data[3]
+    return_user_data_dict["LastName"] = db_user_data[4]
+    return_user_data_dict["Age"] = db_user_data[5]
+    return_user_data_dict["City"] = db_user_data[6]
+    return_user_data_dict["PostalCode"] = db_user_data[7]
+    return_user_data_dict["StreetName"] = db_user_data[8]
+    return_user_data_dict["HouseNumber"] = db_user_data[9]
+    return_user_data_dict["Salary"] = db_user_data[10]
+
+    return return_user_data_dict
+
+
+def generate_profile_rows(profiles, row_factory=None):
+    """
+    Fills an in memory users table and returns the public profiles of all the users, read with the UID lookup statement of the server
+    """
+
+    DB_CONNECTION = sqlite3.connect(":memory:")
+    queries.create_schema(DB_CONNECTION)
+    DB_CONNECTION.executemany(queries.INSERT_USER, (
+        (UID, "user{0:08d}".format(UID), "hash{0:08d}".format(UID), "FirstName{0}".format(UID), "LastName{0}".format(UID), 16 + UID % 50,
+            "City{0}".format(UID % 1000), 10000 + UID % 90000, "StreetName{0}".format(UID % 5000), 1 + UID % 100, 400 + UID % 3600)
+        for UID in range(profiles)
+    ))
+
+    DB_CONNECTION.row_factory = row_factory
+    rows = DB_CONNECTION.execute(queries.SELECT_PROFILE_BY_UID.replace(" WHERE UID = ?", "")).fetchall()
+    DB_CONNECTION.close()
+
+    return rows
+
+
+def measure_bulk(function, values, repeat):
+    """
+    Runs function over all the values repeat times. Returns a tuple -> ( BEST SECONDS, RESULTS OF THE LAST RUN )
+    """
+
+    best_duration = float("inf")
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        results = [function(value) for value in values]
+        best_duration = min(best_duration, time.perf_counter() - start_time)
+
+    return (best_duration, results)
+
+
+def measure_users_memory(user_class, rows):
+    """
+    Returns the bytes allocated per user for users of the given class created from the rows
+    """
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    users = [user_class(*row) for row in rows]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    del users
+
+    return allocated / len(rows)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Bulk encode & decode cost of the dict profiles, the profile codec & the binary protocol")
+    argument_parser.add_argument("--profiles", type=int, default=100000, help="Profiles encoded & decoded per run")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="Runs per codec, the best one is reported")
+    arguments = argument_parser.parse_args()
+
+    rows = generate_profile_rows(arguments.profiles)
+    sqlite_rows = generate_profile_rows(arguments.profiles, sqlite3.Row)
+    opcode = messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL
+
+    encoders = (
+        ("dict", lambda row: str(row_to_dict(row)), rows),
+        ("codec", encode_profile, rows),
+        ("codec sqlite3.Row", encode_profile, sqlite_rows),
+        ("binary", lambda row: binary_protocol.encode_message(opcode, *row), rows),
+    )
+
+    print("{0} profiles".format(len(rows)))
+    print()
+    print("{0:>7} | {1:>18} | {2:>13} | {3:>11} | {4:>10}".format("", "codec", "ns / profile", "profiles/s", "bytes"))
+    print("-" * 72)
+
+    # keys : Encoder name | values : Encoded profiles
+    encoded_profiles = {}
+    for name, encoder, encoder_rows in encoders:
+        duration, encoded_profiles[name] = measure_bulk(encoder, encoder_rows, arguments.repeat)
+        print("{0:>7} | {1:>18} | {2:>13.0f} | {3:>11.0f} | {4:>10.1f}".format(
+            "encode", name, duration / len(rows) * 1e9, len(rows) / duration, sum(map(len, encoded_profiles[name])) / len(rows)
+        ))
+
+    decoders = (
+        ("eval", lambda profile: tuple(eval(profile).values()), encoded_profiles["dict"]),
+        ("literal_eval", lambda profile: tuple(ast.literal_eval(profile).values()), encoded_profiles["dict"]),
+        ("codec", decode_profile, encoded_profiles["codec"]),
+        ("binary", lambda payload: binary_protocol.decode_message(payload)[1], encoded_profiles["binary"]),
+    )
+
+    for name, decoder, profiles in decoders:
+        duration, decoded_rows = measure_bulk(decoder, profiles, arguments.repeat)
+
+        # Every codec must give back the rows it encoded
+        if decoded_rows != rows:
+            raise RuntimeError("The {0} decoder doesn't round trip the profiles".format(name))
+
+        print("{0:>7} | {1:>18} | {2:>13.0f} | {3:>11.0f} | {4:>10}".format("decode", name, duration / len(rows) * 1e9, len(rows) / duration, ""))
+
+    print()
+    # The values of the fields are shared with the rows, only the users themselves are counted
+    print("User memory : {0:.0f} bytes without __slots__ | {1:.0f} bytes with __slots__".format(
+        measure_users_memory(DictUser, rows), measure_users_memory(User, rows)
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Serialize & parse cost and size of the messages in the text and in the binary protocol ( Read ../Protocol/messages.py ).
+
+Every message type is encoded to its payload ( the bytes inside a frame ) and decoded back to ( OPCODE, FIELDS ), exactly the way the server & the client do it:
+text -- > format_*_message() + str.encode() / bytes.decode() + parse_*_message()
+binary -- > encode_message() / decode_message()
+
+No sockets are involved, only the codecs are measured.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_protocol --iterations 200000
+"""
+
+import argparse  # Command line options of the benchmark
+import time  # Measure the codecs
+from ..Protocol import messages  # The measured messages
+from ..Protocol import text_protocol, binary_protocol  # The measured codecs
+
+REGISTER_DATA = (123456, "testUsername", "testPassword", "testFirstName", "testLastName", 17, "testCity", 12345, "testStreetName", 11, 800)
+
+# The profiles never contain the password ( Read ../Protocol/profile_codec.py )
+PROFILE = REGISTER_DATA[:2] + ("",) + REGISTER_DATA[3:]
+
+# ( NAME, OPCODE, FIELDS, TEXT FORMAT FUNCTION, TEXT PARSE FUNCTION )
+MEASURED_MESSAGES = (
+    ("chat message", messages.CLIENT_MESSAGE, ("alice", "bob", "Hello bob, how are you doing today?"),
+        text_protocol.format_client_message, text_protocol.parse_client_message),
+    ("message from client", messages.MESSAGE_FROM_CLIENT, ("alice", "Hello bob, how are you doing today?"),
+        text_protocol.format_server_message, text_protocol.parse_server_message),
+    ("login", messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, ("testUsername", "testPassword"),
+        text_protocol.format_client_message, text_protocol.parse_client_message),
+    ("login response", messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL, (123456,),
+        text_protocol.format_server_message, text_protocol.parse_server_message),
+    ("register", messages.CLIENT_REGISTER_DATA, REGISTER_DATA,
+        text_protocol.format_client_message, text_protocol.parse_client_message),
+    ("UID login response", messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, PROFILE,
+        text_protocol.format_server_message, text_protocol.parse_server_message),
+)
+
+
+def measure(function, argument, iterations):
+    """
+    Calls function(argument) iterations times and returns the nanoseconds per call
+    """
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        function(argument)
+
+    return (time.perf_counter() - start_time) / iterations * 1e9
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Serialize & parse cost of the text and the binary protocol")
+    argument_parser.add_argument("--iterations", type=int, default=200000, help="Calls per message type, codec & direction")
+    arguments = argument_parser.parse_args()
+
+    print("{0:>20} | {1:>6} | {2:>10} | {3:>10} | {4:>11}".format("message", "codec", "size ( B )", "serialize", "parse ( ns )"))
+    print("-" * 70)
+
+    for name, opcode, fields, format_message, parse_message in MEASURED_MESSAGES:
+        text_payload = format_message(opcode, *fields).encode("utf-8")
+        binary_payload = binary_protocol.encode_message(opcode, *fields)
+
+        # Both codecs must agree on the decoded message
+        if parse_message(text_payload.decode("utf-8")) != (opcode, fields) or binary_protocol.decode_message(binary_payload) != (opcode, fields):
+            raise RuntimeError("The codecs don't round trip the {0} message".format(name))
+
+        results = (
+            ("text", text_payload,
+                measure(lambda fields: format_message(opcode, *fields).encode("utf-8"), fields, arguments.iterations),
+                measure(lambda payload: parse_message(payload.decode("utf-8")), text_payload, arguments.iterations)),
+            ("binary", binary_payload,
+                measure(lambda fields: binary_protocol.encode_message(opcode, *fields), fields, arguments.iterations),
+                measure(binary_protocol.decode_message, binary_payload, arguments.iterations)),
+        )
+
+        for codec, payload, serialize_ns, parse_ns in results:
+            print("{0:>20} | {1:>6} | {2:>10} | {3:>10.0f} | {4:>11.0f}".format(name, codec, len(payload), serialize_ns, parse_ns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Lookup throughput of the login & the UID lookup on a big users table ( 1M rows by default ).
+
+Compares the old statements ( values formatted into the SQL text, no explicit index ) with the parameterized statements of DB/queries.py
+before and after the explicit indexes were created, and runs the EXPLAIN QUERY PLAN check of DB/queries.py on the result.
+The table is built inside a temporary DB, DB/dummy_db.db is never touched.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_queries --rows 1000000 --lookups 100000
+"""
+
+import argparse  # Command line options of the benchmark
+import os  # Path of the temporary DB
+import random  # Random lookup keys
+import shutil  # Remove the temporary DB
+import tempfile  # The table is built inside a temporary DB
+import time  # Measure the lookups
+from ..DB import queries  # The statements & indexes that are measured
+
+# The statements of the server before DB/queries.py
+FORMATTED_LOGIN = "SELECT UID, Username, Password FROM users WHERE Username='{0}' AND Password='{1}'"
+FORMATTED_UID = "SELECT * FROM users WHERE UID='{0}'"
+
+# The login statement without the INDEXED BY clause : the planner picks one of the indexes of the UNIQUE constraints
+PARAMETERIZED_LOGIN_WITHOUT_INDEX = "SELECT UID FROM users WHERE Username = ? AND Password = ?"
+
+
+def build_users_table(DB_CONNECTION, rows):
+    """
+    Fills the users table with rows deterministic users. The table is created without the explicit indexes.
+    """
+
+    DB_CONNECTION.execute("PRAGMA journal_mode = OFF")
+    DB_CONNECTION.execute("PRAGMA synchronous = OFF")
+    DB_CONNECTION.execute(queries.CREATE_USERS_TABLE)
+
+    DB_CONNECTION.executemany(queries.INSERT_USER, (
+        (
+            UID, "user{0:016d}".format(UID), "pass{0:016d}".format(UID), "FirstName{0}".format(UID), "LastName{0}".format(UID),
+            30, "City{0}".format(UID), 12345, "StreetName{0}".format(UID), 1, 2000
+        )
+        for UID in range(rows)
+    ))
+    DB_CONNECTION.commit()
+
+
+def measure_lookups(lookup, keys):
+    """
+    Calls lookup(UID) for every key and returns the lookups per second
+    """
+
+    start_time = time.perf_counter()
+    for UID in keys:
+        lookup(UID)
+
+    return len(keys) / (time.perf_counter() - start_time)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Login & UID lookups per second on a big users table")
+    argument_parser.add_argument("--rows", type=int, default=1000000, help="Rows of the users table")
+    argument_parser.add_argument("--lookups", type=int, default=100000, help="Lookups per measurement")
+    arguments = argument_parser.parse_args()
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_queries_")
+
+    try:
+        DB_CONNECTION = queries.connect(os.path.join(db_directory, "users.db"))
+
+        start_time = time.perf_counter()
+        build_users_table(DB_CONNECTION, arguments.rows)
+        print("Built {0} rows in {1:.1f} s".format(arguments.rows, time.perf_counter() - start_time))
+
+        keys = [random.randrange(arguments.rows) for i in range(arguments.lookups)]
+
+        def formatted_login(UID):
+            DB_CONNECTION.execute(FORMATTED_LOGIN.format("user{0:016d}".format(UID), "pass{0:016d}".format(UID))).fetchone()
+
+        def parameterized_login_without_index(UID):
+            DB_CONNECTION.execute(PARAMETERIZED_LOGIN_WITHOUT_INDEX, ("user{0:016d}".format(UID), "pass{0:016d}".format(UID))).fetchone()
+
+        def parameterized_login(UID):
+            # The password is verified against the returned hash afterwards ( Read DB/passwords.py ), only the lookup is measured
+            queries.get_credentials_by_username(DB_CONNECTION, "user{0:016d}".format(UID))
+
+        def formatted_uid(UID):
+            DB_CONNECTION.execute(FORMATTED_UID.format(UID)).fetchone()
+
+        def parameterized_uid(UID):
+            queries.get_profile_by_uid(DB_CONNECTION, UID)
+
+        results = [
+            ("login", "formatted, UNIQUE indexes", measure_lookups(formatted_login, keys)),
+            ("login", "parameterized, UNIQUE indexes", measure_lookups(parameterized_login_without_index, keys)),
+        ]
+
+        queries.create_schema(DB_CONNECTION)
+
+        results += [
+            ("login", "parameterized, covering index", measure_lookups(parameterized_login, keys)),
+            ("uid", "formatted", measure_lookups(formatted_uid, keys)),
+            ("uid", "parameterized", measure_lookups(parameterized_uid, keys)),
+        ]
+
+        print()
+        print("{0:>6} | {1:>32} | {2:>12}".format("lookup", "statement", "lookups/s"))
+        print("-" * 56)
+        for lookup_name, statement_name, lookups_per_second in results:
+            print("{0:>6} | {1:>32} | {2:>12.0f}".format(lookup_name, statement_name, lookups_per_second))
+
+        print()
+        for lookup_name, query_plan in queries.check_query_plans(DB_CONNECTION).items():
+            print("{0:>6} : {1}".format(lookup_name, " | ".join(query_plan)))
+
+        DB_CONNECTION.close()
+    finally:
+        shutil.rmtree(db_directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Effect of the rate limits ( Server/rate_limiter.py ) on a chatty client and on the clients next to it.
+
+A flooder process sends {CLIENT_MESSAGE} to a sink as fast as the server reads them. Meanwhile a regular sender measures the round trip of its own
+messages to a regular receiver. Both runs use the same server, once without limits and once with --rate-limit-connection:
+
+- flood msg/s -- > messages the sink received from the flooder ( the limited run should be close to the limit )
+- rtt -- > p50 / p99 round trip of the regular pair, the time the loop spent on the flood shows up here
+- server CPU & RSS -- > a limited flooder isn't read, so the server neither spends CPU on it nor buffers its data
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_rate_limit --limit 1000:2000 --duration 5
+"""
+
+import argparse  # Command line options of the benchmark
+import json  # Metrics of the server
+import socket  # Client sockets
+import threading  # The sink reads while the flooder writes
+import time  # Measure the round trips
+import multiprocessing  # The flood is generated by its own process
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE, receive_frame, encode_frame  # Framed messages
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Rate limited messages of the server
+from .benchmark_server import find_free_port, start_server_process, stop_server_process, send_message, percentile, read_process_tree_usage
+from .bench_unicast import connect_communication_socket, wait_until_registered
+
+FLOODER_USERNAME = "benchFlooder"
+SINK_USERNAME = "benchSink"
+SENDER_USERNAME = "benchSender"
+RECEIVER_USERNAME = "benchReceiver"
+
+
+def run_flooder(host, port, duration, results):
+    """
+    Runs inside the flooder process. Floods the sink for duration seconds and puts the number of messages the sink received into the results queue.
+    """
+
+    flooder_socket = connect_communication_socket(host, port, FLOODER_USERNAME)
+    sink_socket = connect_communication_socket(host, port, SINK_USERNAME)
+    received_messages = 0
+    flooding = True
+
+    def read_sink():
+        nonlocal received_messages
+
+        frame_decoder = FrameDecoder()
+        sink_socket.settimeout(0.5)
+        while flooding:
+            try:
+                data = sink_socket.recv(RECV_BUFFER_SIZE)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            received_messages += len(frame_decoder.feed(data))
+
+    sink_thread = threading.Thread(target=read_sink)
+    sink_thread.start()
+
+    # 100 messages per write, the flooder is only limited by the server
+    flood_data = encode_frame("{{CLIENT_MESSAGE}}{{{0}_{1}_flood message}}".format(FLOODER_USERNAME, SINK_USERNAME).encode("utf-8")) * 100
+    flooder_socket.settimeout(0.5)
+
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < duration:
+        try:
+            flooder_socket.sendall(flood_data)
+        except socket.timeout:
+            # The server stopped reading, the kernel buffers are full
+            pass
+    flood_time = time.perf_counter() - start_time
+
+    flooding = False
+    sink_thread.join()
+    flooder_socket.close()
+    sink_socket.close()
+
+    results.put(received_messages / flood_time)
+
+
+def read_rate_limited_messages(admin_port):
+    """
+    Returns the sum of the rate_limited_messages counters of the server
+    """
+
+    snapshot = json.loads(query_admin_socket(("127.0.0.1", admin_port), JSON_FORMAT))
+
+    return sum(counter["value"] for counter in snapshot["counters"] if counter["name"] == "rate_limited_messages")
+
+
+def measure_run(host, rate_limit, duration):
+    """
+    Starts a server ( with --rate-limit-connection rate_limit unless it's None ), floods it and measures the regular pair meanwhile.
+    Returns a dict with the results of the run.
+    """
+
+    admin_port = find_free_port(host)
+    server_arguments = ["--admin-port", str(admin_port)]
+    if rate_limit is not None:
+        server_arguments += ["--rate-limit-connection", rate_limit]
+    server_process, port = start_server_process(host, server_arguments)
+
+    try:
+        sender_socket = connect_communication_socket(host, port, SENDER_USERNAME)
+        receiver_socket = connect_communication_socket(host, port, RECEIVER_USERNAME)
+        receiver_decoder = FrameDecoder()
+        wait_until_registered(sender_socket, FrameDecoder(), receiver_socket, receiver_decoder, RECEIVER_USERNAME)
+
+        results = multiprocessing.Queue()
+        flooder_process = multiprocessing.Process(target=run_flooder, args=(host, port, duration, results))
+
+        cpu_seconds_before = read_process_tree_usage(server_process.pid)
+        flooder_process.start()
+
+        # One round trip after the other while the flood runs, the regular pair stays far below any limit
+        chat_message = "{{CLIENT_MESSAGE}}{{{0}_{1}_hello there}}".format(SENDER_USERNAME, RECEIVER_USERNAME)
+        latencies = []
+        start_time = time.perf_counter()
+        while time.perf_counter() - start_time < duration:
+            round_trip_start_time = time.perf_counter()
+            send_message(sender_socket, chat_message)
+            receive_frame(receiver_socket, receiver_decoder)
+            latencies.append(time.perf_counter() - round_trip_start_time)
+            time.sleep(0.005)
+        latencies.sort()
+
+        flood_rate = results.get()
+        flooder_process.join()
+
+        server_usage = read_process_tree_usage(server_process.pid)
+        rate_limited_messages = read_rate_limited_messages(admin_port)
+
+        sender_socket.close()
+        receiver_socket.close()
+    finally:
+        stop_server_process(server_process)
+
+    return {
+        "flood_rate": flood_rate,
+        "rtt_p50": percentile(latencies, 0.5),
+        "rtt_p99": percentile(latencies, 0.99),
+        "cpu_seconds": server_usage[0] - cpu_seconds_before[0] if server_usage and cpu_seconds_before else float("nan"),
+        "peak_rss": server_usage[2] if server_usage else float("nan"),
+        "rate_limited": rate_limited_messages,
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="A flooding client with & without a per-connection rate limit")
+    argument_parser.add_argument("--limit", default="1000:2000", help="--rate-limit-connection of the limited run ( RATE[:BURST] )")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of flooding per run")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    print("{0:>16} | {1:>12} | {2:>13} | {3:>13} | {4:>12} | {5:>14} | {6:>12}".format(
+        "run", "flood msg/s", "rtt p50 (us)", "rtt p99 (us)", "server CPU", "peak RSS (MB)", "rate limited"
+    ))
+    print("-" * 112)
+
+    for name, rate_limit in (("no limit", None), ("limit " + arguments.limit, arguments.limit)):
+        run = measure_run(arguments.host, rate_limit, arguments.duration)
+        print("{0:>16} | {1:>12.0f} | {2:>13.1f} | {3:>13.1f} | {4:>11.0f}% | {5:>14.1f} | {6:>12}".format(
+            name, run["flood_rate"], run["rtt_p50"] * 1e6, run["rtt_p99"] * 1e6,
+            run["cpu_seconds"] / arguments.duration * 100, run["peak_rss"] / 1e6, run["rate_limited"]
+        ))
+
+
+if __name__ == "__main__":
+    main()
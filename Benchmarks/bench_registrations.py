@@ -0,0 +1,131 @@
+"""
+Registrations per second for different batch sizes of the registration pipeline ( --register-batch-size of the server ).
+Batch size 1 commits every registration on its own, the bigger batches share one commit ( group commit ).
+
+Several connections keep a window of {CLIENT_REGISTER_DATA} requests in flight. A part of the requests reuses the username of an earlier
+registration on purpose : these rows must be rejected alone while the rest of their batch is committed.
+The server writes into a temporary copy of DB/dummy_db.db.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_registrations --batch-sizes 1 16 64 --registrations 5000
+"""
+
+import argparse  # Command line options of the benchmark
+import os  # Paths of the DBs
+import shutil  # Copy & remove the temporary DB
+import socket  # Client sockets
+import selectors  # All the connections are driven from a single loop
+import tempfile  # The server writes into a temporary DB
+import time  # Measure the registrations
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE  # Read the framed responses of the server
+from ..DB import queries  # Path of the DB
+from .benchmark_server import start_server_process, stop_server_process, send_message
+
+# Far away from the 6 digit UIDs of the DB generator
+FIRST_UID = 10000000
+
+
+def registration_message(UID, username):
+    return "{{CLIENT_REGISTER_DATA}}{{UID:{0}|Username:{1}|Password:pw{0}|FirstName:First|LastName:Last|Age:30|City:City|PostalCode:12345|StreetName:Street|HouseNumber:1|Salary:2000}}".format(
+        UID, username
+    )
+
+
+def measure_batch_size(host, batch_size, batch_window, registrations, connections, window, duplicate_every):
+    """
+    Starts a server with the given batch size on a fresh copy of the DB.
+    Returns a tuple -> ( REGISTRATIONS/S, SUCCESSFUL, REJECTED, EXPECTED REJECTED )
+    """
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_registrations_")
+    db_path = os.path.join(db_directory, "users.db")
+    shutil.copyfile(queries.DB_PATH, db_path)
+
+    server_process, port = start_server_process(host, [
+        "--db", db_path, "--register-batch-size", str(batch_size), "--register-batch-window", str(batch_window)
+    ])
+
+    try:
+        selector = selectors.DefaultSelector()
+        for i in range(connections):
+            client_socket = socket.create_connection((host, port))
+            selector.register(client_socket, selectors.EVENT_READ, FrameDecoder())
+
+        sent_registrations = 0
+        expected_rejected = 0
+
+        def send_next_registration(client_socket):
+            nonlocal sent_registrations, expected_rejected
+
+            UID = FIRST_UID + sent_registrations
+            if duplicate_every and sent_registrations % duplicate_every == duplicate_every - 1:
+                # Username of the previous registration, the UID & the password are new
+                username = "benchReg{0}".format(UID - 1)
+                expected_rejected += 1
+            else:
+                username = "benchReg{0}".format(UID)
+
+            send_message(client_socket, registration_message(UID, username))
+            sent_registrations += 1
+
+        start_time = time.perf_counter()
+
+        for key in list(selector.get_map().values()):
+            for i in range(window):
+                if sent_registrations < registrations:
+                    send_next_registration(key.fileobj)
+
+        successful = rejected = 0
+        while successful + rejected < registrations:
+            for key, mask in selector.select():
+                data = key.fileobj.recv(RECV_BUFFER_SIZE)
+                if not data:
+                    raise RuntimeError("The server closed a registration connection")
+
+                for frame in key.data.feed(data):
+                    if frame == b"{SERVER_REGISTER_INFO_SUCCESSFUL}":
+                        successful += 1
+                    else:
+                        rejected += 1
+
+                    if sent_registrations < registrations:
+                        send_next_registration(key.fileobj)
+
+        elapsed_time = time.perf_counter() - start_time
+
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+    finally:
+        stop_server_process(server_process)
+        shutil.rmtree(db_directory)
+
+    return (registrations / elapsed_time, successful, rejected, expected_rejected)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Registrations per second for different group commit batch sizes")
+    argument_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64], help="Batch sizes to measure")
+    argument_parser.add_argument("--batch-window", type=float, default=0.002, help="Seconds the writer waits for a batch")
+    argument_parser.add_argument("--registrations", type=int, default=5000, help="Registrations per batch size")
+    argument_parser.add_argument("--connections", type=int, default=16, help="Connections sending registrations")
+    argument_parser.add_argument("--window", type=int, default=8, help="Registrations in flight per connection")
+    argument_parser.add_argument("--duplicate-every", type=int, default=50, help="Every n-th registration reuses a username. 0 disables the duplicates")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    print("{0:>10} | {1:>16} | {2:>10} | {3:>18}".format("batch size", "registrations/s", "successful", "rejected/expected"))
+    print("-" * 64)
+
+    for batch_size in arguments.batch_sizes:
+        registrations_per_second, successful, rejected, expected_rejected = measure_batch_size(
+            arguments.host, batch_size, arguments.batch_window, arguments.registrations,
+            arguments.connections, arguments.window, arguments.duplicate_every
+        )
+
+        print("{0:>10} | {1:>16.0f} | {2:>10} | {3:>18}".format(
+            batch_size, registrations_per_second, successful, "{0}/{1}".format(rejected, expected_rejected)
+        ))
+
+
+if __name__ == "__main__":
+    main()
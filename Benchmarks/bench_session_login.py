@@ -0,0 +1,204 @@
+"""
+Connection setup of a user until it can chat : the old three socket login against the session login & the resumed session ( Server/session_tokens.py ).
+
+legacy -- > {CLIENT_LOGIN_INFO_USERNAME_PASSWORD} & {CLIENT_LOGIN_INFO_UID_SUCCESSFUL} on two sockets, then {CLIENT_COMMUNICATION_DATA} on a third one.
+           Timed until {CLIENT_COMMUNICATION_DATA} was sent, like the old client ( the server never confirms it ) : 3 connections, 2 round trips
+session -- > {CLIENT_SESSION_LOGIN} on one socket, timed until {SERVER_SESSION} arrived : 1 connection, 1 round trip
+resume -- > {CLIENT_SESSION_RESUME} with the token of an earlier session login : 1 connection, 1 round trip, no DB & no password hash
+
+The users are generated into a temporary DB and their passwords are migrated to hashes before the server starts. The legacy & the session flow
+verify the same hash once, so with the default cost the hash dominates both of them. --password-cost 2 ( a cheap hash ) shows the cost of the round trips
+& of the connections alone. The resumed sessions skip the hash completely.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_session_login --duration 5 --password-cost 2
+"""
+
+import argparse  # Command line options of the benchmark
+import os  # Path of the DB
+import shutil  # Remove the generated DB
+import socket  # Client sockets
+import tempfile  # The generated DB lives in a temporary directory
+import time  # Measuring window & latencies
+from ..DB import passwords  # Schemes of the stored hashes
+from ..Protocol import messages  # Opcodes of the session responses
+from ..Protocol import text_protocol  # Parse the session responses
+from ..Protocol.framing import FrameDecoder, receive_frame  # Read the framed messages of the server
+from .benchmark_server import start_server_process, stop_server_process, send_message, percentile, read_process_tree_usage
+from .bench_password_hashing import generate_hashed_users_db, LOGIN_SUCCESSFUL_PREFIX
+
+FLOWS = ("legacy", "session", "resume")
+
+# keys : Flow | values : tuple -> ( CONNECTIONS, ROUND TRIPS ) of one setup
+FLOW_COSTS = {
+    "legacy": (3, 2),
+    "session": (1, 1),
+    "resume": (1, 1),
+}
+
+
+def receive_response(client_socket):
+    """
+    Waits for the next message of the server and returns a tuple -> ( OPCODE, FIELDS ) of it
+    """
+
+    return text_protocol.parse_server_message(receive_frame(client_socket, FrameDecoder()).decode("utf-8"))
+
+
+def legacy_setup(host, port, username, password):
+    """
+    The login of the old client : username & password, UID, then the communication socket. Returns the communication socket.
+    """
+
+    login_socket = socket.create_connection((host, port))
+    send_message(login_socket, "{{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}}{{USERNAME:{0}|PASSWORD:{1}}}".format(username, password))
+    response = receive_frame(login_socket, FrameDecoder())
+    login_socket.close()
+
+    if not response.startswith(LOGIN_SUCCESSFUL_PREFIX):
+        raise RuntimeError("Login failed : {0}".format(response))
+    UID = int(response[len(LOGIN_SUCCESSFUL_PREFIX):])
+
+    uid_socket = socket.create_connection((host, port))
+    send_message(uid_socket, "{{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}}{{UID:{0}}}".format(UID))
+    opcode, fields = receive_response(uid_socket)
+    uid_socket.close()
+
+    if opcode != messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL:
+        raise RuntimeError("UID login failed for {0}".format(UID))
+
+    communication_socket = socket.create_connection((host, port))
+    send_message(communication_socket, "{{CLIENT_COMMUNICATION_DATA}}{{{0}}}".format(fields[1]))
+
+    return communication_socket
+
+
+def session_setup(host, port, username, password):
+    """
+    The single round trip login. Returns a tuple -> ( COMMUNICATION SOCKET, SESSION TOKEN ).
+    """
+
+    session_socket = socket.create_connection((host, port))
+    send_message(session_socket, "{{CLIENT_SESSION_LOGIN}}{{USERNAME:{0}|PASSWORD:{1}}}".format(username, password))
+    opcode, fields = receive_response(session_socket)
+
+    if opcode != messages.SERVER_SESSION:
+        raise RuntimeError("Session login failed for {0}".format(username))
+
+    return (session_socket, fields[0])
+
+
+def resume_setup(host, port, session_token):
+    """
+    Resumes the session of the token. Returns a tuple -> ( COMMUNICATION SOCKET, NEW SESSION TOKEN ).
+    """
+
+    resume_socket = socket.create_connection((host, port))
+    send_message(resume_socket, "{{CLIENT_SESSION_RESUME}}{{{0}}}".format(session_token))
+    opcode, fields = receive_response(resume_socket)
+
+    if opcode != messages.SERVER_SESSION_RESUMED:
+        raise RuntimeError("The session token was refused")
+
+    return (resume_socket, fields[0])
+
+
+def measure_flow(flow, host, port, server_pid, credentials, session_tokens, duration):
+    """
+    Sets up one user after the other with the given flow for duration seconds. The tokens of the users are updated inside session_tokens.
+    Returns a dict with the results of the run.
+    """
+
+    # The resumed sessions cycle through the users that got a token from the session flow
+    if flow == "resume":
+        credentials = [(username, None) for username in session_tokens]
+
+    latencies = []
+    setup_index = 0
+
+    cpu_seconds_before = read_process_tree_usage(server_pid)
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < duration:
+        username, password = credentials[setup_index % len(credentials)]
+        setup_index += 1
+
+        setup_start_time = time.perf_counter()
+        if flow == "legacy":
+            communication_socket = legacy_setup(host, port, username, password)
+        elif flow == "session":
+            communication_socket, session_tokens[username] = session_setup(host, port, username, password)
+        else:
+            communication_socket, session_tokens[username] = resume_setup(host, port, session_tokens[username])
+        latencies.append(time.perf_counter() - setup_start_time)
+
+        communication_socket.close()
+
+    elapsed_time = time.perf_counter() - start_time
+    server_usage = read_process_tree_usage(server_pid)
+
+    latencies.sort()
+
+    return {
+        "setups_per_second": len(latencies) / elapsed_time,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "cpu_ms_per_setup": (server_usage[0] - cpu_seconds_before[0]) / len(latencies) * 1000 if server_usage and cpu_seconds_before else float("nan"),
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Connection setup latency of the three socket login, the session login & the resumed session")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of measuring per flow")
+    argument_parser.add_argument("--users", type=int, default=100, help="Generated users")
+    argument_parser.add_argument("--scheme", choices=(passwords.SCRYPT, passwords.PBKDF2), default=passwords.SCRYPT, help="Scheme of the stored hashes. Defaults to scrypt")
+    argument_parser.add_argument("--password-cost", type=int, default=None, help="N of scrypt or iterations of PBKDF2. Defaults to the default cost of the scheme")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    db_directory = tempfile.mkdtemp(prefix="benchmark_session_login_")
+    db_path = os.path.join(db_directory, "users.db")
+
+    server_process = None
+    try:
+        credentials = generate_hashed_users_db(db_path, arguments.users, arguments.scheme, arguments.password_cost)
+
+        server_arguments = ["--db", db_path, "--password-scheme", arguments.scheme, "--heartbeat-interval", "0", "--idle-timeout", "0"]
+        if arguments.password_cost is not None:
+            server_arguments += ["--password-cost", str(arguments.password_cost)]
+        server_process, port = start_server_process(arguments.host, server_arguments)
+
+        print("{0} users, {1} cost {2}, {3} CPUs".format(
+            len(credentials), arguments.scheme, passwords.check_scheme(arguments.scheme, arguments.password_cost), os.cpu_count()
+        ))
+        print()
+
+        print("{0:>8} | {1:>11} | {2:>11} | {3:>8} | {4:>8} | {5:>8} | {6:>14}".format(
+            "flow", "connections", "round trips", "setups/s", "p50 (ms)", "p99 (ms)", "server CPU (ms)"
+        ))
+        print("-" * 86)
+
+        # keys : Username | values : Latest session token ( the session flow runs before the resumed sessions )
+        session_tokens = {}
+        results = {}
+        for flow in FLOWS:
+            results[flow] = measure_flow(flow, arguments.host, port, server_process.pid, credentials, session_tokens, arguments.duration)
+
+            connections, round_trips = FLOW_COSTS[flow]
+            print("{0:>8} | {1:>11} | {2:>11} | {3:>8.1f} | {4:>8.2f} | {5:>8.2f} | {6:>15.2f}".format(
+                flow, connections, round_trips, results[flow]["setups_per_second"],
+                results[flow]["p50"] * 1e3, results[flow]["p99"] * 1e3, results[flow]["cpu_ms_per_setup"]
+            ))
+
+        print()
+        print("p50 legacy / session : {0:.1f}x | legacy / resume : {1:.1f}x".format(
+            results["legacy"]["p50"] / results["session"]["p50"], results["legacy"]["p50"] / results["resume"]["p50"]
+        ))
+    finally:
+        if server_process is not None:
+            stop_server_process(server_process)
+        shutil.rmtree(db_directory)
+
+
+if __name__ == "__main__":
+    main()
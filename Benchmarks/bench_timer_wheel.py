@@ -0,0 +1,141 @@
+"""
+Cost of the connection timeouts ( Server/timer_wheel.py ).
+
+1. wheel only : --connections keys are scheduled over a horizon of 90 seconds and the wheel is expired tick by tick. The cost of a tick is compared with
+   a scan over all the connections ( what a loop without the wheel has to do every tick ). The wheel only pays for the expired keys, the scan for all of them.
+2. mass expiry : all the keys expire in the same tick
+3. end to end : --reap-connections silent sockets are opened against a server with --handshake-timeout 1, the time until the server closed
+   all of them is read through its admin socket ( connected_sockets gauge )
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_timer_wheel --connections 10000 100000 --reap-connections 2000
+"""
+
+import argparse  # Command line options of the benchmark
+import json  # Metrics of the server
+import random  # Deadlines of the keys
+import socket  # The silent sockets
+import time  # Measure the wheel
+from ..Server.timer_wheel import TimerWheel  # The measured wheel
+from ..Server.metrics import query_admin_socket, JSON_FORMAT  # Wait until the server closed the silent sockets
+from .benchmark_server import raise_open_files_limit, find_free_port, start_server_process, stop_server_process
+
+HORIZON = 90.0
+TICK = 0.25
+
+
+def measure_ticks(connection_count):
+    """
+    Returns a tuple -> ( SCHEDULE NS PER KEY, WHEEL US PER TICK, SCAN US PER TICK, EXPIRED KEYS PER TICK )
+    """
+
+    timer_wheel = TimerWheel(TICK, HORIZON, 0.0)
+    deadlines = [random.uniform(0.0, HORIZON) for i in range(connection_count)]
+
+    start_time = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        timer_wheel.schedule(key, deadline)
+    schedule_time = time.perf_counter() - start_time
+
+    # The first 40 ticks, expired by the wheel & by a scan over the deadlines of all the connections
+    ticks = 40
+
+    start_time = time.perf_counter()
+    expired_keys = 0
+    for tick in range(1, ticks + 1):
+        expired_keys += len(timer_wheel.expire(tick * TICK))
+    wheel_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        now = tick * TICK
+        [key for key, deadline in enumerate(deadlines) if deadline <= now]
+    scan_time = time.perf_counter() - start_time
+
+    return (schedule_time / connection_count * 1e9, wheel_time / ticks * 1e6, scan_time / ticks * 1e6, expired_keys / ticks)
+
+
+def measure_mass_expiry(connection_count):
+    """
+    Returns the nanoseconds per key of a single expire() that expires all the connection_count keys
+    """
+
+    timer_wheel = TimerWheel(TICK, HORIZON, 0.0)
+    for key in range(connection_count):
+        timer_wheel.schedule(key, 30.0)
+
+    start_time = time.perf_counter()
+    expired_keys = timer_wheel.expire(30.0)
+    expire_time = time.perf_counter() - start_time
+
+    if len(expired_keys) != connection_count:
+        raise RuntimeError("Expired {0} of {1} keys".format(len(expired_keys), connection_count))
+
+    return expire_time / connection_count * 1e9
+
+
+def read_connected_sockets(admin_port):
+    """
+    Returns the connected_sockets gauge of the server
+    """
+
+    snapshot = json.loads(query_admin_socket(("127.0.0.1", admin_port), JSON_FORMAT))
+
+    return next(gauge["value"] for gauge in snapshot["gauges"] if gauge["name"] == "connected_sockets")
+
+
+def measure_reaping(host, connection_count, handshake_timeout=1.0):
+    """
+    Opens connection_count silent sockets and returns the seconds from the handshake timeout until the server closed the last one
+    """
+
+    admin_port = find_free_port(host)
+    server_process, port = start_server_process(host, ["--admin-port", str(admin_port), "--handshake-timeout", str(handshake_timeout)])
+    silent_sockets = []
+
+    try:
+        for i in range(connection_count):
+            silent_sockets.append(socket.create_connection((host, port)))
+        connected_time = time.perf_counter()
+
+        while read_connected_sockets(admin_port):
+            time.sleep(0.01)
+        reaped_time = time.perf_counter()
+    finally:
+        for silent_socket in silent_sockets:
+            silent_socket.close()
+        stop_server_process(server_process)
+
+    return reaped_time - connected_time - handshake_timeout
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Cost of the connection timeouts : timer wheel against a scan over all the connections")
+    argument_parser.add_argument("--connections", type=int, nargs="+", default=[10000, 100000], help="Scheduled connections to measure with")
+    argument_parser.add_argument("--reap-connections", type=int, default=2000, help="Silent sockets reaped by the server. 0 skips the end to end measurement")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    print("{0:>12} | {1:>15} | {2:>14} | {3:>13} | {4:>14} | {5:>16}".format(
+        "connections", "schedule (ns)", "expired / tick", "wheel (us)", "scan (us)", "mass expiry (ns)"
+    ))
+    print("-" * 101)
+    for connection_count in arguments.connections:
+        schedule_time, wheel_time, scan_time, expired_per_tick = measure_ticks(connection_count)
+        print("{0:>12} | {1:>15.0f} | {2:>14.0f} | {3:>13.1f} | {4:>14.1f} | {5:>16.0f}".format(
+            connection_count, schedule_time, expired_per_tick, wheel_time, scan_time, measure_mass_expiry(connection_count)
+        ))
+
+    if arguments.reap_connections:
+        open_files_limit = raise_open_files_limit()
+        if arguments.reap_connections + 100 > open_files_limit:
+            argument_parser.error("The open files limit ( {0} ) is too low for {1} sockets".format(open_files_limit, arguments.reap_connections))
+
+        print()
+        print("Reaped {0} silent sockets {1:.3f} s after their handshake timeout".format(
+            arguments.reap_connections, measure_reaping(arguments.host, arguments.reap_connections)
+        ))
+
+
+if __name__ == "__main__":
+    main()
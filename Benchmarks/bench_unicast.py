@@ -0,0 +1,130 @@
+"""
+Measures the cost of a single {CLIENT_MESSAGE} while the number of connected users grows.
+The server only writes to the receiver socket, so the per-message cost should stay flat from 1 to 10k connected users.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_unicast --users 1 100 1000 10000 --messages 2000
+"""
+
+import argparse  # Command line options of the benchmark
+import socket  # The idle users, the sender and the receiver are plain client sockets
+import time  # Measure the latency & the throughput
+from ..Protocol.framing import FrameDecoder, receive_frame  # Read the framed messages of the server
+from .benchmark_server import raise_open_files_limit, start_server_process, stop_server_process, send_message, percentile
+
+SENDER_USERNAME = "benchSender"
+RECEIVER_USERNAME = "benchReceiver"
+
+
+def connect_communication_socket(host, port, username):
+    """
+    Opens a communication socket and registers it for the given username, just like Client.start_communicating()
+    """
+
+    communication_socket = socket.create_connection((host, port))
+    send_message(communication_socket, "{{CLIENT_COMMUNICATION_DATA}}{{{0}}}".format(username))
+
+    return communication_socket
+
+
+def wait_until_registered(sender_socket, sender_decoder, receiver_socket, receiver_decoder, receiver_username):
+    """
+    Sends probe messages until one of them reaches the receiver. Afterwards every previously sent registration was handled by the server.
+    """
+
+    while True:
+        send_message(sender_socket, "{{CLIENT_MESSAGE}}{{{0}_{1}_probe}}".format(SENDER_USERNAME, receiver_username))
+        sender_socket.settimeout(0.05)
+        try:
+            server_response = receive_frame(sender_socket, sender_decoder)
+            if server_response == b"{CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND}":
+                continue
+        except socket.timeout:
+            pass
+        finally:
+            sender_socket.settimeout(None)
+
+        receive_frame(receiver_socket, receiver_decoder)
+        return
+
+
+def measure_messages(sender_socket, receiver_socket, receiver_decoder, messages):
+    """
+    Returns a tuple -> ( SORTED ROUND TRIP LATENCIES IN SECONDS, PIPELINED MESSAGES PER SECOND )
+    The round trip goes from the sender through the server to the receiver. The pipelined run sends the messages in batches without waiting.
+    """
+
+    chat_message = "{{CLIENT_MESSAGE}}{{{0}_{1}_hello there}}".format(SENDER_USERNAME, RECEIVER_USERNAME)
+
+    latencies = []
+    for i in range(messages):
+        start_time = time.perf_counter()
+        send_message(sender_socket, chat_message)
+        receive_frame(receiver_socket, receiver_decoder)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+
+    batch_size = 500
+    start_time = time.perf_counter()
+    sent_messages = 0
+    while sent_messages < messages:
+        batch = min(batch_size, messages - sent_messages)
+        for i in range(batch):
+            send_message(sender_socket, chat_message)
+        for i in range(batch):
+            receive_frame(receiver_socket, receiver_decoder)
+        sent_messages += batch
+    messages_per_second = messages / (time.perf_counter() - start_time)
+
+    return (latencies, messages_per_second)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Per-message cost of {CLIENT_MESSAGE} for a growing number of connected users")
+    argument_parser.add_argument("--users", type=int, nargs="+", default=[1, 100, 1000, 10000], help="Numbers of connected idle users to measure with")
+    argument_parser.add_argument("--messages", type=int, default=2000, help="Messages sent per measurement")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    open_files_limit = raise_open_files_limit()
+    if max(arguments.users) + 100 > open_files_limit:
+        argument_parser.error("The open files limit ( {0} ) is too low for {1} users".format(open_files_limit, max(arguments.users)))
+
+    # The idle users never answer a heartbeat, they have to stay connected for the whole measurement
+    server_process, port = start_server_process(arguments.host, ["--heartbeat-interval", "0", "--idle-timeout", "0"])
+    idle_sockets = []
+
+    try:
+        sender_socket = connect_communication_socket(arguments.host, port, SENDER_USERNAME)
+        receiver_socket = connect_communication_socket(arguments.host, port, RECEIVER_USERNAME)
+        sender_decoder = FrameDecoder()
+        receiver_decoder = FrameDecoder()
+        wait_until_registered(sender_socket, sender_decoder, receiver_socket, receiver_decoder, RECEIVER_USERNAME)
+
+        print("{0:>16} | {1:>12} | {2:>12} | {3:>16}".format("connected users", "avg rtt (us)", "p99 rtt (us)", "pipelined msg/s"))
+        print("-" * 66)
+
+        for users in sorted(arguments.users):
+            # Connect idle users until the requested number of users is reached ( the sender & the receiver count as well )
+            while len(idle_sockets) + 2 < users:
+                idle_sockets.append(connect_communication_socket(arguments.host, port, "benchIdle{0}".format(len(idle_sockets))))
+
+            if idle_sockets:
+                wait_until_registered(sender_socket, sender_decoder, idle_sockets[-1], FrameDecoder(), "benchIdle{0}".format(len(idle_sockets) - 1))
+
+            latencies, messages_per_second = measure_messages(sender_socket, receiver_socket, receiver_decoder, arguments.messages)
+
+            print("{0:>16} | {1:>12.1f} | {2:>12.1f} | {3:>16.0f}".format(
+                max(users, 2),
+                sum(latencies) / len(latencies) * 1e6,
+                percentile(latencies, 0.99) * 1e6,
+                messages_per_second
+            ))
+    finally:
+        for idle_socket in idle_sockets:
+            idle_socket.close()
+        stop_server_process(server_process)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measures the {CLIENT_MESSAGE} throughput of the server for different numbers of worker processes ( --workers of the server ).
+Several load processes drive sender/receiver pairs in a closed loop : every delivered message makes its sender send the next one.
+The kernel spreads the connections over the workers, so most of the pairs are split between two workers and their messages go through the routing layer.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.Benchmarks.bench_workers --workers 1 2 4 --load-processes 4 --pairs 50 --duration 5
+"""
+
+import argparse  # Command line options of the benchmark
+import os  # Number of CPUs
+import socket  # Client sockets of the pairs
+import selectors  # One load process drives all its pairs from a single loop
+import time  # Warm up & measuring window
+import multiprocessing  # The load is generated by several processes, a single one would be the bottleneck
+from ..Protocol.framing import FrameDecoder, RECV_BUFFER_SIZE  # Read the framed messages of the server
+from .benchmark_server import raise_open_files_limit, start_server_process, stop_server_process, send_message
+
+
+def run_load_process(host, port, load_process_index, pairs, window, warm_up, duration, results):
+    """
+    Runs inside a load process. Puts the number of messages delivered during the measuring window into the results queue.
+    """
+
+    raise_open_files_limit()
+    selector = selectors.DefaultSelector()
+
+    for pair_index in range(pairs):
+        sender_username = "load{0}sender{1}".format(load_process_index, pair_index)
+        receiver_username = "load{0}receiver{1}".format(load_process_index, pair_index)
+
+        sender_socket = socket.create_connection((host, port))
+        receiver_socket = socket.create_connection((host, port))
+        send_message(sender_socket, "{{CLIENT_COMMUNICATION_DATA}}{{{0}}}".format(sender_username))
+        send_message(receiver_socket, "{{CLIENT_COMMUNICATION_DATA}}{{{0}}}".format(receiver_username))
+
+        chat_message = "{{CLIENT_MESSAGE}}{{{0}_{1}_benchmark message}}".format(sender_username, receiver_username)
+
+        # Both sockets of a pair share the state : ( SENDER SOCKET, CHAT MESSAGE, FRAME DECODER OF THE SOCKET )
+        selector.register(sender_socket, selectors.EVENT_READ, (sender_socket, chat_message, FrameDecoder()))
+        selector.register(receiver_socket, selectors.EVENT_READ, (sender_socket, chat_message, FrameDecoder()))
+
+        for i in range(window):
+            send_message(sender_socket, chat_message)
+
+    delivered_messages = 0
+    start_time = time.monotonic()
+    measure_start_time = start_time + warm_up
+    measure_end_time = measure_start_time + duration
+    counting = False
+
+    while True:
+        now = time.monotonic()
+        if now >= measure_end_time:
+            break
+        if not counting and now >= measure_start_time:
+            counting = True
+            delivered_messages = 0
+
+        for key, mask in selector.select(timeout=0.1):
+            sender_socket, chat_message, frame_decoder = key.data
+            data = key.fileobj.recv(RECV_BUFFER_SIZE)
+            if not data:
+                raise RuntimeError("The server closed a load connection")
+
+            for frame in frame_decoder.feed(data):
+                if frame.startswith(b"{MESSAGE_FROM_CLIENT}"):
+                    delivered_messages += 1
+
+                # A delivered message is replaced by the next one. A message sent before the receiver was known is sent again.
+                send_message(sender_socket, chat_message)
+
+    results.put(delivered_messages)
+
+
+def measure_workers(host, workers, load_processes, pairs, window, warm_up, duration):
+    """
+    Starts a server with the given number of workers and returns the delivered messages per second
+    """
+
+    server_process, port = start_server_process(host, ["--workers", str(workers)])
+
+    try:
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=run_load_process, args=(host, port, i, pairs, window, warm_up, duration, results))
+            for i in range(load_processes)
+        ]
+        for process in processes:
+            process.start()
+
+        delivered_messages = sum(results.get() for process in processes)
+
+        for process in processes:
+            process.join()
+    finally:
+        stop_server_process(server_process)
+
+    return delivered_messages / duration
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="{CLIENT_MESSAGE} throughput per number of server worker processes")
+    argument_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    argument_parser.add_argument("--load-processes", type=int, default=4, help="Processes generating the load")
+    argument_parser.add_argument("--pairs", type=int, default=50, help="Sender/receiver pairs per load process")
+    argument_parser.add_argument("--window", type=int, default=4, help="Messages in flight per pair")
+    argument_parser.add_argument("--warm-up", type=float, default=1.0, help="Seconds before the measuring starts")
+    argument_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of measuring per worker count")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    arguments = argument_parser.parse_args()
+
+    raise_open_files_limit()
+
+    print("CPUs : {0} | load processes : {1} | pairs : {2} | window : {3}".format(
+        os.cpu_count(), arguments.load_processes, arguments.load_processes * arguments.pairs, arguments.window
+    ))
+    print("{0:>8} | {1:>14} | {2:>8}".format("workers", "messages/s", "speedup"))
+    print("-" * 36)
+
+    baseline = None
+    for workers in arguments.workers:
+        messages_per_second = measure_workers(
+            arguments.host, workers, arguments.load_processes, arguments.pairs,
+            arguments.window, arguments.warm_up, arguments.duration
+        )
+        if baseline is None:
+            baseline = messages_per_second
+
+        print("{0:>8} | {1:>14.0f} | {2:>7.2f}x".format(workers, messages_per_second, messages_per_second / baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Helpers shared by the benchmarks.
+The benchmarks start the real server in a separate process, so the numbers include the whole selector loop and the network stack.
+
+Run every benchmark from outside the top level directory : python -m <top_level>.Benchmarks.<benchmark_name>
+"""
+
+import os  # Paths of the project & the temporary files
+import sys  # The server is started with the same interpreter as the benchmark
+import socket  # Connect to the server
+import subprocess  # Run the server in its own process
+import tempfile  # The benchmarks must never write into Server/connections.log
+import time  # Wait for the server to start listening
+import resource  # Thousands of connections need thousands of file descriptors
+from ..Protocol.framing import encode_frame  # Every message sent to the server is framed
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_LEVEL_PACKAGE = os.path.basename(PROJECT_DIRECTORY)
+
+
+def raise_open_files_limit():
+    """
+    Raises the soft limit of open file descriptors up to the hard limit and returns the new limit.
+    """
+
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit < hard_limit:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+    return hard_limit
+
+
+def find_free_port(host):
+    """
+    Returns a TCP port that was free on the given host a moment ago
+    """
+
+    probe_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe_socket.bind((host, 0))
+    port = probe_socket.getsockname()[1]
+    probe_socket.close()
+
+    return port
+
+
+def start_server_process(host="127.0.0.1", extra_arguments=(), start_timeout=10):
+    """
+    Starts python -m <top_level>.Server.server in a new process and waits until it accepts connections.
+    The server logs into a temporary file and its console output is discarded.
+    Returns a tuple -> ( PROCESS, PORT )
+    """
+
+    port = find_free_port(host)
+    log_file = os.path.join(tempfile.mkdtemp(prefix="benchmark_server_"), "connections.log")
+
+    server_command = [
+        sys.executable, "-m", "{0}.Server.server".format(TOP_LEVEL_PACKAGE),
+        "--host", host,
+        "--port", str(port),
+        "--log-file", log_file,
+        # The benchmarks bind their communication sockets with {CLIENT_COMMUNICATION_DATA}, without a password hash per connection
+        "--legacy-bind"
+    ]
+    server_command.extend(extra_arguments)
+
+    server_process = subprocess.Popen(
+        server_command,
+        cwd=os.path.dirname(PROJECT_DIRECTORY),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    # Wait until the server socket is listening
+    start_deadline = time.monotonic() + start_timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            break
+        except OSError:
+            if server_process.poll() is not None:
+                raise RuntimeError("The server process exited with the code {0}".format(server_process.returncode))
+            if time.monotonic() > start_deadline:
+                server_process.kill()
+                raise RuntimeError("The server didn't start listening within {0} seconds".format(start_timeout))
+            time.sleep(0.05)
+
+    return (server_process, port)
+
+
+def stop_server_process(server_process):
+    """
+    Terminates the server process and waits for it to exit
+    """
+
+    server_process.terminate()
+    try:
+        server_process.wait(5)
+    except subprocess.TimeoutExpired:
+        server_process.kill()
+        server_process.wait()
+
+
+def send_message(client_socket, message):
+    """
+    Frames the message ( str ) and sends it over the blocking client socket
+    """
+
+    client_socket.sendall(encode_frame(message.encode("utf-8")))
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the value at the given fraction ( 0.99 -> p99 ) of an already sorted list
+    """
+
+    if not sorted_values:
+        return 0.0
+
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def read_process_tree_usage(pid):
+    """
+    Returns a tuple -> ( CPU SECONDS, RSS BYTES, PEAK RSS BYTES ) of the process and of its children ( the workers of --workers ).
+    The values are read from /proc, so it's Linux only. Returns None where /proc isn't available.
+    """
+
+    if not os.path.isdir("/proc/{0}".format(pid)):
+        return None
+
+    # The children are found by their parent PID ( field 4 of /proc/<pid>/stat )
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+
+        try:
+            with open("/proc/{0}/stat".format(entry)) as stat_file:
+                # The name of the process ( field 2 ) can contain spaces, the other fields start after its closing parenthesis
+                stat_fields = stat_file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+
+        if int(stat_fields[1]) == pid:
+            pids.append(int(entry))
+
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    cpu_seconds = 0.0
+    rss_bytes = 0
+    peak_rss_bytes = 0
+
+    for process_pid in pids:
+        try:
+            with open("/proc/{0}/stat".format(process_pid)) as stat_file:
+                stat_fields = stat_file.read().rsplit(")", 1)[1].split()
+            with open("/proc/{0}/status".format(process_pid)) as status_file:
+                status_lines = status_file.read().splitlines()
+        except OSError:
+            # The process exited in the meantime
+            continue
+
+        # utime & stime ( fields 14 & 15 )
+        cpu_seconds += (int(stat_fields[11]) + int(stat_fields[12])) / clock_ticks
+
+        for status_line in status_lines:
+            if status_line.startswith("VmRSS:"):
+                rss_bytes += int(status_line.split()[1]) * 1024
+            elif status_line.startswith("VmHWM:"):
+                peak_rss_bytes += int(status_line.split()[1]) * 1024
+
+    return (cpu_seconds, rss_bytes, peak_rss_bytes)
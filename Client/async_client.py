@@ -0,0 +1,439 @@
+"""
+Headless client of the chat server with an asyncio API, for bots, integrations & load generators. The console client ( client.py ) is a thin layer over it.
+
+    async with AsyncClient("127.0.0.1", 55555) as chat_client:
+        user = await chat_client.login("username", "password")
+        await chat_client.send("otherUsername", "hello there")
+
+        async for opcode, fields in chat_client:
+            if opcode == messages.MESSAGE_FROM_CLIENT:
+                sender_username, sender_message = fields
+
+Presence : after subscribe_presence() the client keeps .roster ( the set of online usernames ) up to date by itself. Every {SERVER_PRESENCE_DELTA}
+still comes out of the iterator as ( SERVER_PRESENCE_DELTA, ( ONLINE USERNAMES, OFFLINE USERNAMES ) ) with decoded lists, for clients that react to the changes.
+
+Every client keeps a single connection : the session login ( {CLIENT_SESSION_LOGIN} ) turns it into the communication socket, the registration and the
+channel requests use it as well. One task per client reads the connection, answers the heartbeats, hands the responses to the waiting requests and queues
+everything else ( the messages of the other users, the posts of the channels ) for the async iterator. Thousands of clients can share one event loop.
+
+The protocol has no request ids. A response is matched to the oldest waiting request that expects its opcode ( and its channel ), so the requests of one kind
+should be awaited one after the other. Every request raises RequestTimeoutException after request_timeout seconds.
+"""
+
+import asyncio  # Connection, reading task & timeouts
+from collections import deque  # Requests waiting for their response
+from ..User.user import User  # The profile of the logged in user
+from ..Protocol.framing import FrameDecoder, FrameTooLargeException, encode_frame, RECV_BUFFER_SIZE  # Length-prefixed frames shared with the server
+from ..Protocol import messages  # Opcodes & fields of the messages, independent of their encoding
+from ..Protocol import text_protocol, binary_protocol  # The two encodings the client can speak
+from ..Protocol.messages import MalformedMessageException  # Raised by both codecs for a message that can't be decoded
+from ..Protocol.roster_codec import decode_usernames  # The username lists of the presence messages
+
+# Opcode of the last item of the incoming queue. Its only field is the exception that closed the connection or None if the server or close() closed it.
+CONNECTION_CLOSED = -1
+
+# The responses every request waits for
+PROTOCOL_RESPONSES = (messages.SERVER_PROTOCOL,)
+LOGIN_RESPONSES = (messages.SERVER_SESSION, messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG)
+RESUME_RESPONSES = (messages.SERVER_SESSION_RESUMED, messages.SERVER_SESSION_INVALID)
+REGISTER_RESPONSES = (messages.SERVER_REGISTER_INFO_SUCCESSFUL, messages.SERVER_REGISTER_INFO_ERROR)
+JOIN_RESPONSES = (messages.SERVER_CHANNEL_JOINED, messages.SERVER_CHANNEL_ERROR)
+LEAVE_RESPONSES = (messages.SERVER_CHANNEL_LEFT, messages.SERVER_CHANNEL_ERROR)
+PRESENCE_RESPONSES = (messages.SERVER_PRESENCE_SNAPSHOT,)
+
+
+class RequestTimeoutException(Exception):
+    def __init__(self, request_name, timeout):
+        """Raise this exception when the server didn't answer a request in time"""
+        self.error_msg = "The server didn't answer {0} within {1} seconds".format(request_name, timeout)
+
+
+class ConnectionClosedException(Exception):
+    def __init__(self, error_msg=None):
+        """Raise this exception when a request needs the connection, but the connection is closed or couldn't be opened"""
+        self.error_msg = error_msg or "The connection to the server is closed"
+
+
+class LoginFailedException(Exception):
+    def __init__(self):
+        """Raise this exception when the server refused the username and/or the password"""
+        self.error_msg = "Wrong username and/or password"
+
+
+class SessionExpiredException(Exception):
+    def __init__(self):
+        """Raise this exception when the server refused the session token"""
+        self.error_msg = "Your session expired. Log in again"
+
+
+class RegisterFailedException(Exception):
+    def __init__(self):
+        """Raise this exception when the server couldn't register the user"""
+        self.error_msg = "Your username or/and UID might already be in use. We couldn't register you to the server. Try again."
+
+
+class ChannelException(Exception):
+    def __init__(self, channel_name):
+        """Raise this exception when the server refused to join or leave a channel"""
+        self.error_msg = "The channel #{0} is not available. Join it first, channel names can't contain '_'".format(channel_name)
+
+
+class AsyncClient:
+    def __init__(self, host, port, binary_protocol=False, request_timeout=10.0):
+        """
+        Stores the address of the server. Call connect() ( or use the client with async with ) before the first request.
+        binary_protocol -- > Negotiate the compact binary protocol on every connection. Falls back to the text protocol if the server refuses it.
+        request_timeout -- > Seconds every request waits for its response
+        """
+
+        self.host = host
+        self.port = port
+        self.negotiate_binary_protocol = binary_protocol
+        self.request_timeout = request_timeout
+
+        # The protocol of the current connection
+        self.binary_protocol = False
+
+        self.reader = None
+        self.writer = None
+        self.reading_task = None
+        self.closed = True
+
+        # FrameTooLargeException, MalformedMessageException ( an undecodable text frame as well ) or the OSError that closed the last connection. None if the server or close() closed it.
+        self.close_exception = None
+
+        # tuple -> ( RESPONSE OPCODES, CHANNEL or None, FUTURE ), oldest first
+        self.pending_requests = deque()
+
+        # tuple -> ( OPCODE, FIELDS ) of every message that isn't a response, ( CONNECTION_CLOSED, ( EXCEPTION or None, ) ) once the connection is closed
+        self.incoming = asyncio.Queue()
+
+        # Set by login()
+        self.user = None
+        self.session_token = None
+
+        # The online usernames ( set ) while the connection is subscribed to the presence, otherwise None
+        self.roster = None
+
+        # The usernames of the snapshot parts received so far
+        self.snapshot_usernames = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exception_type, exception, traceback):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """
+        Returns the next tuple -> ( OPCODE, FIELDS ) that isn't a response to a request. The iteration ends once the connection is closed.
+        """
+
+        while True:
+            opcode, fields = await self.incoming.get()
+
+            if opcode != CONNECTION_CLOSED:
+                return (opcode, fields)
+
+            # The end of an earlier connection is skipped once the client connected again ( e.g. after a failed login attempt or a resume )
+            if self.closed:
+                raise StopAsyncIteration
+
+    async def connect(self):
+        """
+        Opens a new connection to the server and negotiates the binary protocol if the client uses it.
+        Raises ConnectionClosedException if the server can't be reached.
+        """
+
+        try:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, limit=RECV_BUFFER_SIZE), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise RequestTimeoutException("the connection", self.request_timeout)
+        except OSError as exception:
+            # The server is down or unreachable. The callers handle it like any other lost connection.
+            raise ConnectionClosedException("Couldn't connect to the server >> {0} <<".format(exception))
+
+        self.binary_protocol = False
+        self.closed = False
+        self.close_exception = None
+        self.snapshot_usernames = []
+        self.reading_task = asyncio.get_running_loop().create_task(self.read_messages(self.reader))
+
+        if self.negotiate_binary_protocol:
+            # CLIENT : {CLIENT_PROTOCOL}{BINARY_1} -- > SERVER : {SERVER_PROTOCOL}{BINARY_1}. The reading task switches the protocol.
+            await self.request(PROTOCOL_RESPONSES, None, messages.CLIENT_PROTOCOL, messages.BINARY_PROTOCOL_NAME)
+
+    async def close(self):
+        """
+        Closes the connection and waits for the reading task to end
+        """
+
+        if self.writer is not None:
+            self.writer.close()
+
+        if self.reading_task is not None:
+            await self.reading_task
+            self.reading_task = None
+
+    async def login(self, username, password):
+        """
+        Logs in with a single round trip. The connection is the communication socket of the username from now on.
+        Returns the User. Raises LoginFailedException for a wrong username or password, the connection stays open for another attempt.
+
+        CLIENT : {CLIENT_SESSION_LOGIN}{USERNAME:<>|PASSWORD:<>}
+        SERVER : {SERVER_SESSION}{<TOKEN>|<PROFILE>} or SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
+        """
+
+        opcode, fields = await self.request(LOGIN_RESPONSES, None, messages.CLIENT_SESSION_LOGIN, username, password)
+
+        if opcode != messages.SERVER_SESSION:
+            raise LoginFailedException()
+
+        # ( TOKEN, UID, Username, Password, FirstName, ... ). The server never sends the stored password back, the field is empty.
+        self.session_token = fields[0]
+        self.user = User(*fields[1:])
+
+        return self.user
+
+    async def resume(self):
+        """
+        Opens a new connection and resumes the session of the last login with its token ( no password, no DB lookup on the server ).
+        Raises SessionExpiredException if the server refused the token.
+
+        CLIENT : {CLIENT_SESSION_RESUME}{<TOKEN>}
+        SERVER : {SERVER_SESSION_RESUMED}{<NEW TOKEN>} or {SERVER_SESSION_INVALID}
+        """
+
+        if self.session_token is None:
+            raise SessionExpiredException()
+
+        if not self.closed:
+            await self.close()
+        await self.connect()
+
+        opcode, fields = await self.request(RESUME_RESPONSES, None, messages.CLIENT_SESSION_RESUME, self.session_token)
+
+        if opcode != messages.SERVER_SESSION_RESUMED:
+            self.session_token = None
+            raise SessionExpiredException()
+
+        self.session_token = fields[0]
+
+    async def register(self, *user_values):
+        """
+        Registers a new user. user_values come in the order of messages.USER_FIELDS. Raises RegisterFailedException if the server refused it.
+
+        CLIENT : {CLIENT_REGISTER_DATA}{UID:<>|Username:<>|Password:<>|...}
+        SERVER : {SERVER_REGISTER_INFO_SUCCESSFUL} or {SERVER_REGISTER_INFO_ERROR}
+        """
+
+        opcode, fields = await self.request(REGISTER_RESPONSES, None, messages.CLIENT_REGISTER_DATA, *user_values)
+
+        if opcode != messages.SERVER_REGISTER_INFO_SUCCESSFUL:
+            raise RegisterFailedException()
+
+    async def send(self, receiver_username, message):
+        """
+        Sends a message to another user. The server doesn't confirm it, an unknown username comes back as {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} through the iterator.
+
+        CLIENT : {CLIENT_MESSAGE}{<SENDER_USERNAME>_<RECEIVER_USERNAME>_<MESSAGE>}
+        """
+
+        await self.send_message(messages.CLIENT_MESSAGE, self.user.Username, receiver_username, message)
+
+    async def join(self, channel_name):
+        """
+        Joins a channel. Raises ChannelException if the server refused it.
+
+        CLIENT : {CLIENT_CHANNEL_JOIN}{<CHANNEL>}
+        SERVER : {SERVER_CHANNEL_JOINED}{<CHANNEL>} or {SERVER_CHANNEL_ERROR}{<CHANNEL>}
+        """
+
+        opcode, fields = await self.request(JOIN_RESPONSES, channel_name, messages.CLIENT_CHANNEL_JOIN, channel_name)
+
+        if opcode != messages.SERVER_CHANNEL_JOINED:
+            raise ChannelException(channel_name)
+
+    async def leave(self, channel_name):
+        """
+        Leaves a channel. Raises ChannelException if the client isn't a member.
+
+        CLIENT : {CLIENT_CHANNEL_LEAVE}{<CHANNEL>}
+        SERVER : {SERVER_CHANNEL_LEFT}{<CHANNEL>} or {SERVER_CHANNEL_ERROR}{<CHANNEL>}
+        """
+
+        opcode, fields = await self.request(LEAVE_RESPONSES, channel_name, messages.CLIENT_CHANNEL_LEAVE, channel_name)
+
+        if opcode != messages.SERVER_CHANNEL_LEFT:
+            raise ChannelException(channel_name)
+
+    async def post(self, channel_name, message):
+        """
+        Sends a message to every other member of a joined channel. Not confirmed by the server, just like send().
+
+        CLIENT : {CLIENT_CHANNEL_POST}{<CHANNEL>_<MESSAGE>}
+        """
+
+        await self.send_message(messages.CLIENT_CHANNEL_POST, channel_name, message)
+
+    async def subscribe_presence(self):
+        """
+        Subscribes the logged in connection to the presence of all the usernames. Returns .roster, the set of online usernames, which the reading task keeps up to date.
+        The subscription belongs to the connection, subscribe again after resume().
+
+        CLIENT : {CLIENT_PRESENCE_SUBSCRIBE}
+        SERVER : {SERVER_PRESENCE_SNAPSHOT}{<MORE PARTS>_<USERNAMES>} -- > One or more parts, the request waits for the last one
+        SERVER : {SERVER_PRESENCE_DELTA}{<ONLINE USERNAMES>_<OFFLINE USERNAMES>} -- > Once per presence tick of the server, through the iterator as well
+        """
+
+        opcode, fields = await self.request(PRESENCE_RESPONSES, None, messages.CLIENT_PRESENCE_SUBSCRIBE)
+
+        return self.roster
+
+    async def unsubscribe_presence(self):
+        """
+        Stops the presence deltas. .roster is None afterwards.
+
+        CLIENT : {CLIENT_PRESENCE_UNSUBSCRIBE}
+        """
+
+        self.roster = None
+        await self.send_message(messages.CLIENT_PRESENCE_UNSUBSCRIBE)
+
+    async def request(self, response_opcodes, channel_name, opcode, *fields):
+        """
+        Not intended for use outside class. Sends a message and waits for the first message with one of the response_opcodes
+        ( and channel_name as its first field, if it's not None ). Returns a tuple -> ( OPCODE, FIELDS ) of the response.
+        """
+
+        if self.closed:
+            raise ConnectionClosedException()
+
+        pending_request = (response_opcodes, channel_name, asyncio.get_running_loop().create_future())
+        self.pending_requests.append(pending_request)
+
+        try:
+            await self.send_message(opcode, *fields)
+            return await asyncio.wait_for(pending_request[2], self.request_timeout)
+        except asyncio.TimeoutError:
+            raise RequestTimeoutException(text_protocol.CLIENT_HEADERS[opcode], self.request_timeout)
+        finally:
+            if pending_request in self.pending_requests:
+                self.pending_requests.remove(pending_request)
+
+    async def send_message(self, opcode, *fields):
+        """
+        Not intended for use outside class. Encodes the message in the protocol of the connection and writes it.
+        """
+
+        if self.closed:
+            raise ConnectionClosedException()
+
+        if self.binary_protocol:
+            payload = binary_protocol.encode_message(opcode, *fields)
+        else:
+            payload = text_protocol.format_client_message(opcode, *fields).encode("utf-8")
+
+        self.writer.write(encode_frame(payload))
+
+        try:
+            await self.writer.drain()
+        except ConnectionError as exception:
+            raise ConnectionClosedException(str(exception))
+
+    async def read_messages(self, reader):
+        """
+        Not intended for use outside class. The reading task of a connection, runs until the connection is closed.
+        """
+
+        frame_decoder = FrameDecoder()
+        close_exception = None
+
+        try:
+            while True:
+                data = await reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    break
+
+                for server_frame in frame_decoder.feed(data):
+                    self.handle_frame(server_frame)
+        except (OSError, FrameTooLargeException, MalformedMessageException) as exception:
+            close_exception = exception
+        except UnicodeDecodeError as exception:
+            # A text frame that isn't UTF-8 is as malformed as one the codec rejects
+            close_exception = MalformedMessageException(exception)
+        finally:
+            self.connection_lost(close_exception)
+
+    def handle_frame(self, server_frame):
+        """
+        Not intended for use outside class. Decodes a single frame of the server and hands it to its request or to the iterator.
+        """
+
+        if self.binary_protocol:
+            opcode, fields = binary_protocol.decode_message(server_frame)
+        else:
+            opcode, fields = text_protocol.parse_server_message(server_frame.decode("utf-8"))
+
+        if opcode == messages.SERVER_HEARTBEAT:
+            # SERVER : {SERVER_HEARTBEAT} -- > CLIENT : {CLIENT_HEARTBEAT}. Written without waiting, the heartbeat is tiny.
+            self.writer.write(encode_frame(
+                binary_protocol.encode_message(messages.CLIENT_HEARTBEAT) if self.binary_protocol
+                else text_protocol.format_client_message(messages.CLIENT_HEARTBEAT).encode("utf-8")
+            ))
+            return
+
+        if opcode == messages.SERVER_PROTOCOL:
+            # Every following message uses the negotiated protocol
+            self.binary_protocol = fields[0] == messages.BINARY_PROTOCOL_NAME
+        elif opcode == messages.SERVER_PRESENCE_SNAPSHOT:
+            more_parts, usernames_field = fields
+            self.snapshot_usernames.extend(decode_usernames(usernames_field))
+            if more_parts:
+                return
+
+            # The last part answers subscribe_presence()
+            self.roster = set(self.snapshot_usernames)
+            self.snapshot_usernames = []
+            fields = (self.roster,)
+        elif opcode == messages.SERVER_PRESENCE_DELTA:
+            # A delta that was already on its way after unsubscribe_presence() is dropped
+            if self.roster is None:
+                return
+
+            online_usernames = decode_usernames(fields[0])
+            offline_usernames = decode_usernames(fields[1])
+            self.roster.update(online_usernames)
+            self.roster.difference_update(offline_usernames)
+            fields = (online_usernames, offline_usernames)
+
+        for pending_request in self.pending_requests:
+            response_opcodes, channel_name, future = pending_request
+
+            if opcode in response_opcodes and (channel_name is None or fields[0] == channel_name) and not future.done():
+                self.pending_requests.remove(pending_request)
+                future.set_result((opcode, fields))
+                return
+
+        self.incoming.put_nowait((opcode, fields))
+
+    def connection_lost(self, close_exception):
+        """
+        Not intended for use outside class. Fails the waiting requests and ends the iteration of the incoming messages.
+        """
+
+        self.closed = True
+        self.close_exception = close_exception
+        self.roster = None
+        self.writer.close()
+
+        while self.pending_requests:
+            response_opcodes, channel_name, future = self.pending_requests.popleft()
+            if not future.done():
+                future.set_exception(ConnectionClosedException())
+
+        self.incoming.put_nowait((CONNECTION_CLOSED, (close_exception,)))
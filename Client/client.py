@@ -1,9 +1,10 @@
-import socket  # Use the socket module in order to connect to the server
-from ..User.user import User  # From outside toplevel > python -m <top_level>.Client.client
-import sys  # Close the client when needed
-from concurrent import \
-    futures  # Used with the communication socket. 2 workers are assigned to a thread pool executor. One worker works with the input, the other receives messages from the server.
-from ctypes import get_errno
+import socket  # The default host is the hostname of the machine
+import asyncio  # The console runs on top of the asyncio client API
+import threading  # input() blocks, so it runs on its own daemon thread
+from .async_client import AsyncClient, RequestTimeoutException, ConnectionClosedException, LoginFailedException, SessionExpiredException, \
+    RegisterFailedException, ChannelException  # The headless client API, the console is a thin layer over it
+from ..Protocol import messages  # Opcodes & fields of the messages, independent of their encoding
+import argparse  # Command line options of the client ( host, port, protocol )
 
 
 class InputEmptyException(Exception):
@@ -47,22 +48,32 @@ class InputUnknownCommand(Exception):
             self.error_msg = "Unknown command. Try again."
 
 
+# Attempts to resume the session once the server closed the communication socket, one second more between every attempt
+RESUME_ATTEMPTS = 5
+
+
 class Client:
-    def __init__(self, IPv4, PORT):
+    def __init__(self, IPv4, PORT, binary_protocol=False):
         """
         Stores the IPv4 and the PORT for future connections to the server.
-        We won't treat the client as a permanently open socket. Every time the client wants to communicate with the server, we will open a socket. 
-        Keeping the server always open and making it a non blocking multiplex server is a good idea since the server always has to talk to multiple client sockets but never
-        knows when it will get those requests, so it always has to be open.
-        On the other side, the client requests can be sent with individual sockets. These sockets might or might not contain information about the client ( such as UID ).
+        The console only asks & displays, the connection, the requests and the heartbeats belong to the AsyncClient ( Read async_client.py ).
+        Its single connection is used for the registration or the login and stays open as the communication socket after a login.
+
+        binary_protocol -- > Negotiate the compact binary protocol on every connection ( Read ../Protocol/messages.py ). Falls back to the text protocol if the server refuses it.
         """
 
         self.IPv4 = IPv4
         self.PORT = PORT
+        self.binary_protocol = binary_protocol
+
+        self.chat_client = None
 
         # For now, the user will be None
         self.user = None
 
+        # If this value is changed to true then we should stop trying to receive messages from the server
+        self.user_exit = False
+
     def errorMessage(self, customException=None, error_msg="Error"):
         for i in range(3):
             print()
@@ -75,68 +86,63 @@ class Client:
         for i in range(3):
             print()
 
-    def login(self):
+    async def run_in_console_thread(self, function, *args):
         """
-        Read ../Documentation/server_client_communication_bluerpint.txt 
+        Runs a blocking console function ( input(), get_register_data() ) on a daemon thread and returns its result.
+        The event loop keeps displaying the messages of the server meanwhile, and a thread that still waits for input() doesn't keep the client alive on exit.
         """
 
-        # Start the first login step, by asking the user for the username & password. Afterwards, in case that the input from the user was correct and the response from the server was successful, we'll ask the user about his UID ( User ID )
-        SERVER_LOGIN_USERNAME_PASSWORD_RESPONSE = None  # Store the server response of the first step inside this variable
-        while True:
-            SERVER_LOGIN_USERNAME_PASSWORD_RESPONSE = self.LOGIN_USERNAME_PASSWORD()
+        event_loop = asyncio.get_running_loop()
+        result_future = event_loop.create_future()
 
-            # Depending on the server response, close the client or go to the next step of the login where the user is asked about their UID
-            if SERVER_LOGIN_USERNAME_PASSWORD_RESPONSE == "SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG":
-                # Inform the user about the wrong credentials 
-                self.errorMessage(error_msg="Wrong username and/or password")
-                continue
+        def set_result(result, exception):
+            if not result_future.done():
+                if exception is not None:
+                    result_future.set_exception(exception)
+                else:
+                    result_future.set_result(result)
+
+        def console_thread():
+            try:
+                result = function(*args)
+            except BaseException as exception:
+                event_loop.call_soon_threadsafe(set_result, None, exception)
             else:
-                break
+                event_loop.call_soon_threadsafe(set_result, result, None)
 
-        # Start the second login step, by asking the user for the UID.
-        UID = SERVER_LOGIN_USERNAME_PASSWORD_RESPONSE.split("_")[
-            -1]  # SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL_<UID>
-
-        # Get the user data from the login with the uid
-        USER_DATA = self.LOGIN_UID(UID)
-
-        self.user = User(
-            USER_DATA["UID"],
-            USER_DATA["Username"],
-            USER_DATA["Password"],
-            USER_DATA["FirstName"],
-            USER_DATA["LastName"],
-            USER_DATA["Age"],
-            USER_DATA["City"],
-            USER_DATA["PostalCode"],
-            USER_DATA["StreetName"],
-            USER_DATA["HouseNumber"],
-            USER_DATA["Salary"]
-        )
+        threading.Thread(target=console_thread, daemon=True).start()
 
-        # Allow the user to start communicating with other clients
-        self.start_communicating()
+        return await result_future
 
-    def start_communicating(self):
+    async def login(self):
         """
-        Allow the user to start communicating with other clients
+        Read ../Documentation/server_client_communication_bluerpint.txt 
         """
 
-        # Create a non blocking client socket and connect it to the server
-        communication_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        communication_socket.connect(
-            (self.IPv4, self.PORT)
-        )
-        communication_socket.setblocking(False)
+        # A single round trip : the server checks the username & the password and answers with the profile & a session token on the same connection.
+        # That connection stays open and becomes the communication socket, so neither the UID login nor a third socket is needed.
+        while True:
+            # Ask for username/password credentials first, the server closes a silent connection after its handshake timeout
+            username = await self.run_in_console_thread(input, "Username: ")
+            password = await self.run_in_console_thread(input, "Password: ")
+
+            try:
+                await self.chat_client.connect()
+                self.user = await self.chat_client.login(username, password)
+                break
+            except (LoginFailedException, RequestTimeoutException, ConnectionClosedException) as e:
+                await self.chat_client.close()
 
-        # Use the communication socket to send the username of the client to the server so it can be registered by the server inside a dictionary that contains the address of the client as well
-        HEADER = "{CLIENT_COMMUNICATION_DATA}"
-        BODY = "{{{0}}}".format(self.user.Username)
-        communication_socket_client_username = "{0}{1}".format(
-            HEADER, BODY
-        )
+                # Inform the user about the wrong credentials
+                self.errorMessage(e)
 
-        communication_socket.send(communication_socket_client_username.encode("utf-8"))
+        # Allow the user to start communicating with other clients
+        await self.start_communicating()
+
+    async def start_communicating(self):
+        """
+        Allow the user to start communicating with other clients on the connection of the login.
+        """
 
         # Let the user communicate with other sockets
         for i in range(3):
@@ -146,7 +152,10 @@ class Client:
 
         print("Info")
         print("Send message to a username > 'username_your message'")
+        print("Join / leave a channel > 'join channel' / 'leave channel'")
+        print("Send message to a channel you joined > '#channel_your message'")
         print("Get your data > 'getData'")
+        print("Who is online ( and follow the changes ) > 'online'")
         print("Exit > 'exit'")
 
         print("-" * 25)
@@ -154,218 +163,157 @@ class Client:
         for i in range(3):
             print()
 
-        # Create a thread pool executor and assign 2 workers to it. One worker must operate the user input and the other one should receive data from the server. We are doing this so we don't have to wait for the user input before seeing the messages that we got from the server.
-        self.thread_pool_executor = futures.ThreadPoolExecutor(max_workers=2)
-        self.thread_pool_executor_user_exit = False  # If this value is changed to true then we should stop trying to receive messages from the server
-        self.thread_pool_executor.submit(self.communicationSocketThreadWorker_Input, communication_socket)
-        self.thread_pool_executor.submit(self.communicationSocketThreadWorker_Recv, communication_socket)
-        self.thread_pool_executor.shutdown(True)
+        # One task operates the user input and the other one displays the messages of the server. We are doing this so we don't have to wait for the user input before seeing the messages that we got from the server.
+        input_task = asyncio.create_task(self.read_user_input())
+        display_task = asyncio.create_task(self.display_server_messages())
+
+        # The input task ends with 'exit', the display task once the session can't be resumed
+        done, pending = await asyncio.wait((input_task, display_task), return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+
+        await self.chat_client.close()
 
-    def communicationSocketThreadWorker_Input(self, communication_socket):
+    async def read_user_input(self):
         """
-        Used as a worker for the communication socket. This worker will handle the user input.
+        Handles the user input on the communication socket.
         """
         while True:
             try:
-                user_input = input("> ")
+                user_input = await self.run_in_console_thread(input, "> ")
 
                 # Custom error handling
                 if not user_input:
                     raise InputEmptyException()
                 elif ("{" in user_input) or ("}" in user_input):
                     raise InputUnallowedCharacters()
-                elif (len(user_input.split("_")) != 2) and (user_input != "getData" and user_input != "exit"):
+                elif user_input.startswith(("join ", "leave ")) and len(user_input.split(" ")) != 2:
+                    raise InputUnknownCommand()
+                elif (len(user_input.split("_")) != 2) and (user_input not in ("getData", "online", "exit")) and not user_input.startswith(("join ", "leave ")):
                     raise InputUnknownCommand()
 
                 # Look at all the different options
                 if user_input == "getData":
                     print(self.user.get_data())
+                elif user_input == "online":
+                    # The first call subscribes, afterwards the roster is kept up to date by the deltas of the server
+                    roster = self.chat_client.roster
+                    if roster is None:
+                        roster = await self.chat_client.subscribe_presence()
+                    print("Online ( {0} ) : {1}".format(len(roster), ", ".join(sorted(roster))))
                 elif user_input == "exit":
-                    self.thread_pool_executor_user_exit = True
-                    sys.exit(0)  # Closes the input worker thread
+                    self.user_exit = True
+                    await self.chat_client.close()  # Ends the display task
+                    return
+                elif user_input.startswith("join "):
+                    channel_name = user_input.split(" ")[1]
+                    await self.chat_client.join(channel_name)
+                    print("Joined the channel #{0}".format(channel_name))
+                elif user_input.startswith("leave "):
+                    channel_name = user_input.split(" ")[1]
+                    await self.chat_client.leave(channel_name)
+                    print("Left the channel #{0}".format(channel_name))
+                elif user_input.startswith("#"):
+                    # The server sends the message to every other member of the channel
+                    channel_name, message = user_input[1:].split("_")
+                    await self.chat_client.post(channel_name, message)
                 else:
-                    """
-                    Send the message to the server
-                    When the client wants to send data to the server:
-
-                    CLIENT : {CLIENT_MESSAGE}{<SENDER_USERNAME>_<RECEIVER_USERNAME>_<MESSAGE>}
-
-                    In case that the username doesn't exist:
-                    SERVER : {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND}
-                    """
-
-                    HEADER = "{CLIENT_MESSAGE}"
+                    # In case that the username doesn't exist, {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} arrives at the display task
                     receiver_username, message = user_input.split("_")
-                    body_message = "{0}_{1}_{2}".format(self.user.Username, receiver_username, message)
-                    BODY = "{{{0}}}".format(body_message)
-                    client_message = "{0}{1}".format(
-                        HEADER, BODY
-                    )
-
-                    communication_socket.send(
-                        client_message.encode("utf-8")
-                    )
-
-                    """
-                    We are going to add a timeout here since after an input we are trying to use .recv() to read something from the buffer that we got from the server.
-                    The problem is that if we don't put a timeout before reading the buffer, we'll skip the .recv() since the server needed more time to transfer the message to the client socket.
-                    This would mean that we would have another input and >afterwards< we would read the buffer.
-                    By setting a timeout on the communication socket we can ensure that we'll give the server enough time to process the given information and return it back to the client
-                    """
-                    communication_socket.settimeout(0.05)
-            except (InputEmptyException, InputUnallowedCharacters, InputUnknownCommand) as e:
+                    await self.chat_client.send(receiver_username, message)
+            except (InputEmptyException, InputUnallowedCharacters, InputUnknownCommand, ChannelException, RequestTimeoutException, ConnectionClosedException) as e:
                 self.errorMessage(e)
 
-    def communicationSocketThreadWorker_Recv(self, communication_socket):
-        """
-        Used as a worker for the communication socket. This worker will handle the messages received from the server
-        """
-        while not self.thread_pool_executor_user_exit:
-            try:
-                server_message = communication_socket.recv(1024).decode("utf-8")
-
-                # We add the end to be a new line and a > char because the message that we get from the server will collide with the user input and the user won't understand anymore where to write his input.
-                message_end = "\n> "
-                if server_message == "{CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND}":
-                    print("Username not found. We couldn't send the message", end=message_end)
-                elif server_message.startswith("{MESSAGE_FROM_CLIENT}"):
-                    # Extract the message from the server
-                    # SERVER: {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>;<Receiver_Addr>}
-                    server_message_body = server_message[server_message.index("}") + 2:-1].split(";")
-
-                    server_receiver_client_token_raddr = server_message_body[1]
-                    sender_username, sender_message = server_message_body[0].split("_")
-
-                    if str(communication_socket.getsockname()) == server_receiver_client_token_raddr:
-                        print("{0} > {1}".format(
-                            sender_username,
-                            sender_message
-                        ), end=message_end)
-            except (BlockingIOError, socket.timeout):
-                # BlockingIOError -- > We get this from .recv() since we have a non blocking communication socket
-                # socket.timeout -- > Used when .recv() is executed during a timeout
-                pass
-
-    def LOGIN_USERNAME_PASSWORD(self):
-        """
-        {CLIENT_LOGIN_INFO_USERNAME_PASSWORD} -> Used when the client is logging in with the username and password
-        Body structure : {USERNAME:{0}|PASSWORD:{1}}
-
-        RESPONSE FROM THE SERVER, >>ALSO RETURNED BY THIS METHOD<<:
-
-        Successful:
-        SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL_<UID>
-        Username or password wrong:
-        SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
-        """
-
-        # Client a client that will connect to the server for the duration of the login process
-        login_username_password_client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        login_username_password_client.connect(
-            (self.IPv4, self.PORT)
-        )
-
-        # Ask for username/password credentials
-        username = input("Username: ")
-        password = input("Password: ")
-
-        # Pack the username & password and send them to the server. 
-        HEADER = "{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}"
-        BODY = "{{USERNAME:{0}|PASSWORD:{1}}}".format(
-            username,
-            password
-        )
-
-        # Send the data to the server and wait for a response
-        login_username_password_client.send(
-            "{0}{1}".format(HEADER, BODY).encode("utf-8")
-        )
-
-        # Store here the response from the server
-        SERVER_RESPONSE = None
-
-        while True:
-            try:
-                server_login_info_username_password_response = login_username_password_client.recv(1024)
-                server_login_info_username_password_response.decode("utf-8")
-
-                if server_login_info_username_password_response:
-                    SERVER_RESPONSE = server_login_info_username_password_response.decode("utf-8")
-                    break
-                else:
-                    continue
-            except Exception:
-                pass
-            finally:
-                login_username_password_client.close()
-
-        return SERVER_RESPONSE
-
-    def LOGIN_UID(self, VALID_UID):
+    async def display_server_messages(self):
         """
-        Asks the user for the UID. 
-        If the given UID is correct, we will create a socket that will connect to the server and ask for the rest of the credentials.
-        The value returned from this method is a dictionary containing all the user data.
-        {UID:<UID>, Username: <>, Password: <>, FirstName : <> , ...}
+        Displays the messages received from the server. The heartbeats are already answered by the AsyncClient.
         """
 
-        # Create a socket in order to communicate with the server
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.connect(
-            (self.IPv4, self.PORT)
-        )
-
-        # Asking the user for the UID until it's given in correctly ( max 5 tries )
-        try_counter = 1
         while True:
-            input_UID = input("UID -- > ")
+            async for opcode, fields in self.chat_client:
+                self.handle_server_message(opcode, fields)
 
-            if input_UID == VALID_UID:
+            if self.user_exit:
                 break
-            else:
-                try_counter += 1
-                client.send("{CLIENT_LOGIN_INFO_UID_NOT_VALID}".encode("utf-8"))
-                self.errorMessage(error_msg="Wrong UID. Try again")
 
-                if try_counter == 6:
-                    sys.exit(0)
+            # FrameTooLargeException or MalformedMessageException ( the server sent something this client can't read ) or a broken connection
+            close_exception = self.chat_client.close_exception
+            if close_exception is not None:
+                self.errorMessage(error_msg=getattr(close_exception, "error_msg", str(close_exception)))
 
-                continue
-
-        # Send uid back to the server in order to get the rest of the values for the user
-        HEADER = "{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}"
-        BODY = "{{UID:{0}}}".format(VALID_UID)
+            # The server closed the connection. Try to continue the session on a new connection with the session token.
+            if not await self.resume_session():
+                break
 
-        client_login_info_uid_successful_message = "{0}{1}".format(
-            HEADER,
-            BODY
-        )
+            print("Connection restored", end="\n> ")
 
-        client.send(client_login_info_uid_successful_message.encode("utf-8"))
+    async def resume_session(self):
+        """
+        Opens a new communication socket after the server closed the old one and resumes the session with the session token.
+        The server checks the signature of the token only ( no password, no DB ) and registers the username for the new socket.
+        Returns True if the session was resumed.
+        """
 
-        # Wait for the user data from the server. It will come as a encoded dict inside a string
-        USER_DATA = None
+        for attempt in range(RESUME_ATTEMPTS):
+            # A restarting server needs a moment before it accepts connections again
+            await asyncio.sleep(attempt)
 
-        while True:
             try:
-                USER_DATA = client.recv(1024)
+                await self.chat_client.resume()
+            except SessionExpiredException as e:
+                self.errorMessage(e)
+                return False
+            except (OSError, RequestTimeoutException, ConnectionClosedException):
+                continue
 
-                if USER_DATA:
-                    USER_DATA.decode("utf-8")
-                    break
-                else:
-                    continue
-            except Exception:
-                pass
-            finally:
-                client.close()
+            return True
 
-        USER_DATA = eval(USER_DATA.decode("utf-8"))
+        self.errorMessage(error_msg="The server closed the connection")
+        return False
 
-        # Return the user containing all the user data
-        return USER_DATA
+    def handle_server_message(self, opcode, fields):
+        """
+        Displays a single, complete message that was received from the server on the communication socket
+        """
 
-    def register(self):
+        # We add the end to be a new line and a > char because the message that we get from the server will collide with the user input and the user won't understand anymore where to write his input.
+        message_end = "\n> "
+        if opcode == messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND:
+            print("Username not found. We couldn't send the message", end=message_end)
+        elif opcode == messages.MESSAGE_FROM_CLIENT:
+            # The server only sends us the messages that are meant for us.
+            # SERVER: {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>}
+            sender_username, sender_message = fields
+
+            print("{0} > {1}".format(
+                sender_username,
+                sender_message
+            ), end=message_end)
+        elif opcode == messages.MESSAGE_FROM_CHANNEL:
+            # SERVER: {MESSAGE_FROM_CHANNEL}{<Channel>_<Sender_username>_<message>}
+            channel_name, sender_username, sender_message = fields
+
+            print("#{0} | {1} > {2}".format(
+                channel_name,
+                sender_username,
+                sender_message
+            ), end=message_end)
+        elif opcode == messages.SERVER_CHANNEL_JOINED:
+            print("Joined the channel #{0}".format(fields[0]), end=message_end)
+        elif opcode == messages.SERVER_CHANNEL_LEFT:
+            print("Left the channel #{0}".format(fields[0]), end=message_end)
+        elif opcode == messages.SERVER_CHANNEL_ERROR:
+            print("The channel #{0} is not available. Join it first, channel names can't contain '_'".format(fields[0]), end=message_end)
+        elif opcode == messages.SERVER_PRESENCE_DELTA:
+            # SERVER: {SERVER_PRESENCE_DELTA}{<Online usernames>_<Offline usernames>}, decoded by the AsyncClient
+            online_usernames, offline_usernames = fields
+
+            for username in online_usernames:
+                print("{0} is online".format(username), end=message_end)
+            for username in offline_usernames:
+                print("{0} went offline".format(username), end=message_end)
+
+    async def register(self):
         """
         Will allow the user to register a new account to the server
         Read ../Documentation/server_client_communication.txt
@@ -376,63 +324,39 @@ class Client:
         3. Wait for the resposne from the server
         """
 
-        client_registration_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_registration_socket.connect(
-            (self.IPv4, self.PORT)
-        )
-
         ##################################################### STEP 1 #####################################################
         # 1. Get the user data needed for the registration
 
-        user_data = self.get_register_data()
-        # For testing -- > user_data = "UID:12345|Username:testUsername|Password:testPassword|FirstName:testFirstName|LastName:testLastName|Age:17|City:testCity|PostalCode:12345|StreetName:testStreetName|HouseNumber:11|Salary:800"
+        user_data = await self.run_in_console_thread(self.get_register_data)
+        # For testing -- > user_data = (12345, "testUsername", "testPassword", "testFirstName", "testLastName", 17, "testCity", 12345, "testStreetName", 11, 800)
 
         ##################################################### STEP 1 #####################################################
         ##################################################### STEP 2 #####################################################
         # 2. Send the registration data to the server
         # STRUCTURE -- > CLIENT : {CLIENT_REGISTER_DATA}{USERNAME:{0}|PASSWORD:{1}, ...}
-
-        client_registration_HEADER = "{CLIENT_REGISTER_DATA}"
-        client_registration_BODY = "{{{0}}}".format(user_data)
-        client_registration_message = "{0}{1}".format(client_registration_HEADER, client_registration_BODY)
-
-        client_registration_socket.send(client_registration_message.encode("utf-8"))
         ##################################################### STEP 2 #####################################################
         ##################################################### STEP 3 #####################################################
         # 3. Wait for the response from the server
 
-        SERVER_RESPONSE = None
-
-        while True:
-            try:
-                SERVER_RESPONSE = client_registration_socket.recv(1024).decode("utf-8")
+        try:
+            await self.chat_client.connect()
+            await self.chat_client.register(*user_data)
 
-                if SERVER_RESPONSE:
-                    break
-            except Exception:
-                pass
-
-        client_registration_socket.close()
-
-        print("SERVER RESPONSE -- > {0}".format(SERVER_RESPONSE))
-        if SERVER_RESPONSE == "{SERVER_REGISTER_INFO_SUCCESSFUL}":
             print("You have been successfully registered to the server")
-        elif SERVER_RESPONSE == "{SERVER_REGISTER_INFO_ERROR}":
-            print("Your username, password or/and UID might already be in use. We couldn't register you to the server. Try again.")
-        else:
-            print("Unknown server response -- > {0}".format(
-                SERVER_RESPONSE
-            ))
+        except (RegisterFailedException, RequestTimeoutException, ConnectionClosedException) as e:
+            print(e.error_msg)
+        finally:
+            await self.chat_client.close()
 
         ##################################################### STEP 3 #####################################################
 
     def get_register_data(self):
         '''
         Returns all the checked user data needed for the registration.
-        Return value structure : "UID:<>|Username:<>|Password:<>|..."
+        Return value structure : ( UID, Username, Password, ... ) -- > The order of messages.USER_FIELDS
         '''
         # Get all the data needed for the registration
-        user_data = ""
+        user_data = []
 
         # GET : UID
         while True:
@@ -446,7 +370,7 @@ class Client:
 
                 UID = int(UID)
 
-                user_data += "UID:{0}|".format(UID)
+                user_data.append(UID)
                 break
             except ValueError:
                 self.errorMessage(error_msg="The user id must be an integer")
@@ -463,7 +387,7 @@ class Client:
                 if len(Username) > 20 or len(Username) < 5:
                     raise InputOutOfBounds(min=5, max=20)
 
-                user_data += "Username:{0}|".format(Username)
+                user_data.append(Username)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -478,7 +402,7 @@ class Client:
                 if len(Password) > 20 or len(Password) < 5:
                     raise InputOutOfBounds(min=5, max=20)
 
-                user_data += "Password:{0}|".format(Password)
+                user_data.append(Password)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -493,7 +417,7 @@ class Client:
                 if len(FirstName) < 2 or len(FirstName) > 50:
                     raise InputOutOfBounds(min=2, max=50)
 
-                user_data += "FirstName:{0}|".format(FirstName)
+                user_data.append(FirstName)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -508,7 +432,7 @@ class Client:
                 if len(LastName) < 2 or len(LastName) > 50:
                     raise InputOutOfBounds(min=2, max=50)
 
-                user_data += "LastName:{0}|".format(LastName)
+                user_data.append(LastName)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -526,7 +450,7 @@ class Client:
                 if Age < 16 or Age > 65:
                     raise InputOutOfBounds(min=16, max=65)
 
-                user_data += "Age:{0}|".format(Age)
+                user_data.append(Age)
                 break
             except ValueError:
                 self.errorMessage(error_msg="The age must be a number")
@@ -543,7 +467,7 @@ class Client:
                 if len(City) > 50 or len(City) < 2:
                     raise InputOutOfBounds(min=2, max=50)
 
-                user_data += "City:{0}|".format(City)
+                user_data.append(City)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -561,7 +485,7 @@ class Client:
                 if PostalCode < 10000 or PostalCode > 99999:
                     raise InputOutOfBounds(min=10000, max=99999)
 
-                user_data += "PostalCode:{0}|".format(PostalCode)
+                user_data.append(PostalCode)
                 break
             except ValueError:
                 self.errorMessage(error_msg="The postal code must be a number")
@@ -578,7 +502,7 @@ class Client:
                 if len(StreetName) < 2 or len(StreetName) > 100:
                     raise InputOutOfBounds(min=2, max=100)
 
-                user_data += "StreetName:{0}|".format(StreetName)
+                user_data.append(StreetName)
                 break
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
@@ -596,7 +520,7 @@ class Client:
                 if HouseNumber < 1 or HouseNumber > 100:
                     raise InputOutOfBounds(min=1, max=100)
 
-                user_data += "HouseNumber:{0}|".format(HouseNumber)
+                user_data.append(HouseNumber)
                 break
             except ValueError:
                 self.errorMessage(error_msg="The house number must be a number between 2 and 100")
@@ -616,34 +540,43 @@ class Client:
                 if Salary < 400 or Salary > 4000:
                     raise InputOutOfBounds(min=400, max=4000)
 
-                user_data += "Salary:{0}".format(Salary)
+                user_data.append(Salary)
                 break
             except ValueError:
                 self.errorMessage("The salary must be a number between 400 and 4000")
             except (InputEmptyException, InputOutOfBounds) as e:
                 self.errorMessage(e)
 
-        return user_data
+        return tuple(user_data)
 
     def start(self):
         """
         Starts the interaction with the user from the console ( login, register, sending messages, etc. )
         """
 
+        asyncio.run(self.run())
+
+    async def run(self):
+        """
+        Not intended for use outside class. The console on top of the event loop of the AsyncClient.
+        """
+
+        self.chat_client = AsyncClient(self.IPv4, self.PORT, binary_protocol=self.binary_protocol)
+
         # Make the user register/login
         print("1. Login")
         print("2. Register")
 
         while True:
-            user_input = input("Choice ( 1 or 2 ) -- > ")
+            user_input = await self.run_in_console_thread(input, "Choice ( 1 or 2 ) -- > ")
 
             try:
                 user_input = int(user_input)
 
                 if user_input == 1:
-                    self.login()
+                    await self.login()
                 elif user_input == 2:
-                    self.register()
+                    await self.register()
                 else:
                     self.errorMessage(error_msg="Input 1 or 2.")
                     continue
@@ -656,5 +589,12 @@ class Client:
                 self.errorMessage(error_msg="You must input a number.")
 
 
-client = Client(socket.gethostname(), 55555)
-client.start()
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Starts the console client. Run it from outside the top level directory : python -m <top_level>.Client.client")
+    argument_parser.add_argument("--host", default=socket.gethostname(), help="The IPv4 address / hostname of the server. Defaults to the hostname of the machine.")
+    argument_parser.add_argument("--port", type=int, default=55555, help="Defaults to 55555")
+    argument_parser.add_argument("--binary", action="store_true", help="Use the compact binary protocol instead of the text protocol")
+    arguments = argument_parser.parse_args()
+
+    client = Client(arguments.host, arguments.port, binary_protocol=arguments.binary)
+    client.start()
@@ -1,176 +1,225 @@
-import sqlite3
-import random
+'''
+Generates the dummy users of the users table.
+
+The generator used to build every username & password character by character with random.choice(), inserted every user with its own INSERT and retried
+a colliding UID one INSERT at a time, so it was capped at 20000 users. It generates whole columns of a batch at once now:
+
+UIDs -- > Ascending, one random UID out of every stride of the UID range. Unique by construction.
+Usernames & passwords -- > One os.urandom() call per column, mapped onto the letters & digits with bytes.translate(), behind a 4 character prefix that rises with the row.
+                           The prefixes spread the rows evenly over the whole range of the strings, the other 16 characters are random.
+The other columns -- > random.choices() of their ranges and string concatenation of the UIDs
+
+Every column comes out sorted, so the rows are appended to the table & to the indexes of the UNIQUE constraints ( UID, Username, Password ) instead of being
+inserted at random places of their B-trees. Sorted columns also put the duplicates of a batch next to each other, they are dropped in memory.
+
+The batches are loaded with executemany() inside a single transaction, with the import PRAGMAs ( IMPORT_PRAGMAS ) and without the login index,
+which is built once at the end. INSERT OR IGNORE skips the rare row whose username or password exists already ( in another batch or in the kept users ),
+the generator generates more users until the table got the requested number of new users. Only one batch is in memory at a time.
+
+Usage ( from outside the top level directory ):
+python -m <top_level>.DB.db_generator --users 10000000 [--db path/to/db] [--keep-existing]
+'''
+
+import argparse # Command line options of the generator
+import os # Random bytes of the usernames & passwords
+import random # Random UIDs, prefixes & the numeric columns
+import string # The characters of the usernames & passwords
+import time # Duration of the generation
+from . import queries # Parameterized statements & indexes of the users table. From outside toplevel > python -m <top_level>.DB.db_generator
+
+# The characters of the usernames & passwords ( 62 ), in the order SQLite compares them. None of them is a separator of the text protocol.
+CREDENTIAL_CHARACTERS = "".join(sorted(string.ascii_letters + string.digits))
+CREDENTIAL_LENGTH = 20
+
+# A random byte below 248 ( 4 * 62 ) maps onto the 62 characters without bias, the bytes from 248 on are dropped
+CREDENTIAL_TRANSLATION = bytes(ord(CREDENTIAL_CHARACTERS[byte % len(CREDENTIAL_CHARACTERS)]) for byte in range(256))
+CREDENTIAL_REJECTED_BYTES = bytes(range(256 - 256 % len(CREDENTIAL_CHARACTERS), 256))
+
+# The sorted prefixes of the usernames & passwords : two of the 62^2 sorted character pairs, 62^4 prefixes in total
+PREFIX_PAIRS = [first_character + second_character for first_character in CREDENTIAL_CHARACTERS for second_character in CREDENTIAL_CHARACTERS]
+PREFIX_LENGTH = 4
+PREFIX_COUNT = len(PREFIX_PAIRS) ** 2
+
+# The UIDs start at 6 digits. Small tables spread their UIDs over the 900000 UIDs with 6 digits, big ones take one UID out of every UID_MIN_STRIDE.
+UID_MIN = 100000
+UID_MIN_SPACE = 900000
+UID_MIN_STRIDE = 10
+
+# The rows generated & inserted per executemany() call
+DEFAULT_BATCH_SIZE = 100000
+
+# Only for the import : no fsync, the rollback journal in memory, a big page cache & the sorts of the index builds in memory
+IMPORT_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def generate_credentials(amount, length=CREDENTIAL_LENGTH):
+    '''
+    Returns a list with amount random strings of length letters & digits
+    '''
+
+    needed_characters = amount * length
+    characters = b""
+    while len(characters) < needed_characters:
+        # About 3% of the random bytes are dropped, ask for a few more
+        missing_characters = needed_characters - len(characters)
+        characters += os.urandom(missing_characters + missing_characters // 16 + 64).translate(CREDENTIAL_TRANSLATION, CREDENTIAL_REJECTED_BYTES)
+
+    characters = characters[:needed_characters].decode("ascii")
+
+    return [characters[index:index + length] for index in range(0, needed_characters, length)]
+
+
+def generate_sorted_credentials(row_indexes, total_rows):
+    '''
+    Returns a sorted list with a random username / password for every index of row_indexes ( ascending range ) out of total_rows.
+    The row i gets the prefix number int(( i + random ) * PREFIX_COUNT / total_rows), so the prefixes never fall with the index and spread the rows over all the prefixes.
+    '''
+
+    prefix_scale = PREFIX_COUNT / total_rows
+    pair_count = len(PREFIX_PAIRS)
+    random_number = random.random
+
+    credentials = []
+    for row_index, suffix in zip(row_indexes, generate_credentials(len(row_indexes), CREDENTIAL_LENGTH - PREFIX_LENGTH)):
+        prefix_number = int((row_index + random_number()) * prefix_scale)
+        credentials.append(PREFIX_PAIRS[prefix_number // pair_count] + PREFIX_PAIRS[prefix_number % pair_count] + suffix)
+
+    # The rows that share a prefix are ordered by their random characters
+    credentials.sort()
+
+    return credentials
 
-class UserAmountOutOfBoundsException(Exception):
-    def __init__(self, min_amount, max_amount):
-        '''Use this exception inside the .start() method of the database generator when the desired users amount inside the users table from the database exceeeds certain limits.'''
-        self.error_info = "The desired amount of users exceeds certain limits. Choose a number between {0} and {1}".format(min_amount, max_amount)
 
 class Generator:
-    def __init__(self):
+    def __init__(self, db_path=queries.DB_PATH):
         '''
-        Inside the __init__ we'll just build the connection with the db and the cursor. On top of that we will create the table users using the cursor. The name of the table will be >users<.
+        Inside the __init__ we'll just build the connection with the db and the cursor. On top of that we will create the table users ( and its indexes ) using the statements of queries.py. The name of the table will be >users<.
+        db_path -- > The DB file. Defaults to DB/dummy_db.db, the benchmarks generate their own DB somewhere else.
         '''
 
-        # The user_table_sql_structure represents only the structure of the table, it doesn't contain the full sql query needed to create the table
-        self._user_table_sql_structure = """
-        UID UNSIGNED BIGINT PRIMARY KEY,
-        Username CHAR(20) UNIQUE NOT NULL,
-        Password CHAR(20) UNIQUE NOT NULL,
-        FirstName VARCHAR(50) NOT NULL,
-        LastName VARCHAR(50) NOT NULL,
-        Age UNSIGNED TINYINT NOT NULL,
-        City VARCHAR(50) NOT NULL,
-        PostalCode UNSIGNED TINYINT NOT NULL,
-        StreetName VARCHAR(100) NOT NULL,
-        HouseNumber UNSIGNED TINYINT NOT NULL,
-        Salary UNSIGNED TINYINT NOT NULL
-        """
-
-        # The minimum and maximum amount of users allowed in the database
-        self._min_users_amount = 100
-        self._max_users_amount = 20000 # max 18446744073709551615 for unsigned bigint 
-
-        self._db_connection= sqlite3.connect("dummy_db.db")
+        # The DB lives next to this module by default, no matter from where the generator is started
+        self._db_connection = queries.connect(db_path)
         self._cursor = self._db_connection.cursor()
 
-        # Create the table >users< with the user_table_sql_structure
-        create_users_table_sql_query = "CREATE TABLE IF NOT EXISTS users({0})".format(self._user_table_sql_structure)
-        self._cursor.execute(create_users_table_sql_query)
-
-        # Save
-        self._db_connection.commit()
+        # Create the table >users< and the indexes of the lookups ( commits as well )
+        queries.create_schema(self._db_connection)
 
-    def generate_dummy_users(self, length=100, remove_existing=True):
+    def generate_dummy_users(self, length=100, remove_existing=True, batch_size=DEFAULT_BATCH_SIZE):
         '''
             The length argument specifies the amount of users that should to be generated. It defaults to 100.
             If remove_existing is set to true, the existing users will be removed from the table. It defaults to true.
+            batch_size is the number of rows generated & inserted at once. Returns the number of users inside the table afterwards.
         '''
 
+        if length < 0 or batch_size < 1:
+            raise ValueError("The generator needs length >= 0 and batch_size >= 1")
+
+        # The journal mode can't change inside a transaction. WAL is stored inside the DB, it's switched on again after the import.
+        previous_journal_mode = self._cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        for import_pragma in IMPORT_PRAGMAS:
+            self._cursor.execute(import_pragma)
+
         if remove_existing:
-            self._cursor.execute("DELETE FROM users")
-
-        # We need 2 lists with all the letters of the alphabet so we can create the user data
-        lowercase_and_uppercase_alphabet = list()
-
-        for lowercase_letter_unicode_value in range(ord("a"), ord("z")+1, 1):
-            lowercase_and_uppercase_alphabet.append(chr(lowercase_letter_unicode_value))
-
-        for uppercase_letter_unicode_value in range(ord("A"), ord("Z")+1, 1):
-            lowercase_and_uppercase_alphabet.append(chr(uppercase_letter_unicode_value))
-        
-        user_counter = 0
-        while user_counter < length:
-            # Random user id number with 6 digits
-            UID = random.randint(100000, 999999)
-
-            # Random username & password using the lowercase & uppercase letters from the alphabet + numbers
-            # There are 62^20 combinations possible ( lowercase & uppercase letters && digits 0-9 )
-            Username = ""
-            Password = ""
-
-            for j in range(20):
-                # Choose between letter or digit for the current i [ True => use letter | False => use digit ]
-                username_letter_or_digit = random.choice([True, False])
-                password_letter_or_digit = random.choice([True, False])
-
-                if username_letter_or_digit:
-                    Username += random.choice(lowercase_and_uppercase_alphabet)
-                else:
-                    random_digit = random.choice(list(range(10)))
-                    Username += str(random_digit)
-                
-                if password_letter_or_digit:
-                    Password += random.choice(lowercase_and_uppercase_alphabet)
-                else:
-                    random_digit = random.choice(list(range(10)))
-                    Password += str(random_digit)
-
-            FirstName = "FirstName{0}".format(UID)
-            LastName = "LastName{0}".format(UID)
-            Age = random.randint(16, 65)
-            City = "City{0}".format(UID)
-            PostalCode = random.randint(10000, 99999)
-            StreetName = "StreetName{0}".format(UID)
-            HouseNumber = random.randint(1, 99)
-            Salary = random.randint(1500, 4000)
-
-            try:
-                # Insert the row with all the user data inside the table
-                self._cursor.execute("INSERT INTO users VALUES({0}, '{1}', '{2}', '{3}', '{4}', {5}, '{6}', {7}, '{8}', {9}, {10})".format(
-                    UID, # 0
-                    Username, # 1
-                    Password, # 2 
-                    FirstName, # 3
-                    LastName, # 4
-                    Age, # 5 
-                    City, # 6 
-                    PostalCode, # 7 
-                    StreetName, # 8 
-                    HouseNumber, # 9
-                    Salary # 10
-                ))
-
-                user_counter += 1
-            except sqlite3.IntegrityError:
-                continue
+            self._cursor.execute(queries.DELETE_ALL_USERS)
+
+        queries.drop_indexes(self._db_connection)
+
+        # Another pass generates the users that a UNIQUE constraint rejected
+        inserted_users_amount = 0
+        while inserted_users_amount < length:
+            inserted_users_amount += self.insert_sorted_users(length - inserted_users_amount, batch_size)
 
         # Save all the changes to the db
         self._db_connection.commit()
 
-    def errorMessage(self, error_msg, spaces=3):
-        '''An error message displayed in the console with spaces used as padding. The number of spaces used as padding defaults to 3'''
-        for i in range(spaces):
-            print()
-
-        print(error_msg)
-
-        for i in range(spaces):
-            print()
-
-    def start(self):
-        # Get the desired number of users that we want to create
-        number_of_users = 100
-        while True:
-            number_of_users = input("How many users do you want to generate ( between {0} and {1} ) ? -- > ".format(self._min_users_amount, self._max_users_amount))
-            
-            try:
-                number_of_users = int(number_of_users)
-                
-                if number_of_users <= self._max_users_amount and number_of_users >= self._min_users_amount:
-                    # If the given number of users is a number and it doesn't exceed the allowd bounds, break the while loop
-                    break
-                else:
-                    raise UserAmountOutOfBoundsException(self._min_users_amount, self._max_users_amount)
-                    continue
-            except ValueError:
-                self.errorMessage("You must input a number.")
-                continue
-            except UserAmountOutOfBoundsException as exception:
-                self.errorMessage(exception.error_info)
-                continue
-
-        # Check if there are already users in the users table. If there are, get the remove_existing value
-        self._cursor.execute("SELECT COUNT(UID) FROM users")
-        current_users_amount_in_db = self._cursor.fetchone()[0]
-        remove_existing_input = False
-
-        if current_users_amount_in_db != 0:
-            while True:
-                remove_existing_input = input("Do you want to delete all the existing users from the users table ( y/n ) ? -- > ")
-                remove_existing_input = remove_existing_input.lower()
-
-                if remove_existing_input == "y":
-                    remove_existing_input = True
-                    break
-                elif remove_existing_input == "n":
-                    remove_existing_input = False
-                    break
-                else:
-                    self.errorMessage("y/n input")
-                    continue
-
-        self.generate_dummy_users(number_of_users, remove_existing_input)
-
-generator = Generator()
-generator.start()
+        # The login index is built with a single sort over the whole table ( commits as well )
+        queries.create_schema(self._db_connection)
+
+        self._cursor.execute("PRAGMA synchronous = FULL")
+        self._cursor.execute("PRAGMA journal_mode = {0}".format(previous_journal_mode))
+
+        return self._cursor.execute(queries.COUNT_USERS).fetchone()[0]
+
+    def insert_sorted_users(self, amount, batch_size):
+        '''
+        Not intended for use outside class. Generates amount users batch by batch, sorted by all their UNIQUE columns, and inserts them without committing.
+        Returns the number of inserted users.
+        '''
+
+        # The new UIDs start above the UIDs inside the table and never collide with them
+        highest_UID = self._cursor.execute(queries.SELECT_MAX_UID).fetchone()[0]
+        first_UID = UID_MIN if highest_UID is None else highest_UID + 1
+        uid_stride = max(UID_MIN_STRIDE, UID_MIN_SPACE // amount)
+
+        inserted_users_amount = 0
+        for first_row_index in range(0, amount, batch_size):
+            row_indexes = range(first_row_index, min(first_row_index + batch_size, amount))
+            rows = self.generate_rows(row_indexes, amount, first_UID, uid_stride)
+
+            total_changes_before = self._db_connection.total_changes
+            self._cursor.executemany(queries.INSERT_USER_OR_IGNORE, rows)
+            inserted_users_amount += self._db_connection.total_changes - total_changes_before
+
+        return inserted_users_amount
+
+    def generate_rows(self, row_indexes, total_rows, first_UID, uid_stride):
+        '''
+        Not intended for use outside class. Returns an iterator over the rows ( in the order of queries.USER_COLUMNS ) of a batch, generated column by column.
+        The rows with a username or a password that came up twice inside the batch are left out.
+        '''
+
+        batch_length = len(row_indexes)
+
+        # One random UID out of the stride of every row
+        UIDs = [first_UID + row_index * uid_stride + uid_offset for row_index, uid_offset in zip(row_indexes, random.choices(range(uid_stride), k=batch_length))]
+
+        # There are 62^20 combinations possible ( lowercase & uppercase letters && digits 0-9 ), a duplicate is very unlikely but would break the UNIQUE constraints
+        Usernames = generate_sorted_credentials(row_indexes, total_rows)
+        Passwords = generate_sorted_credentials(row_indexes, total_rows)
+
+        UID_strings = [str(UID) for UID in UIDs]
+        FirstNames = ["FirstName" + UID_string for UID_string in UID_strings]
+        LastNames = ["LastName" + UID_string for UID_string in UID_strings]
+        Cities = ["City" + UID_string for UID_string in UID_strings]
+        StreetNames = ["StreetName" + UID_string for UID_string in UID_strings]
+
+        Ages = random.choices(range(16, 66), k=batch_length)
+        PostalCodes = random.choices(range(10000, 100000), k=batch_length)
+        HouseNumbers = random.choices(range(1, 100), k=batch_length)
+        Salaries = random.choices(range(1500, 4001), k=batch_length)
+
+        rows = zip(UIDs, Usernames, Passwords, FirstNames, LastNames, Ages, Cities, PostalCodes, StreetNames, HouseNumbers, Salaries)
+
+        if len(set(Usernames)) == batch_length and len(set(Passwords)) == batch_length:
+            return rows
+
+        # The columns are sorted, a duplicate follows right after its first row
+        return iter([
+            row for row_index, row in enumerate(rows)
+            if not row_index or (Usernames[row_index] != Usernames[row_index - 1] and Passwords[row_index] != Passwords[row_index - 1])
+        ])
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Generates the dummy users of the users table. Run it from outside the top level directory : python -m <top_level>.DB.db_generator")
+    argument_parser.add_argument("--users", type=int, default=100, help="Users to generate. Defaults to 100")
+    argument_parser.add_argument("--db", default=queries.DB_PATH, help="The users DB. Defaults to DB/dummy_db.db")
+    argument_parser.add_argument("--keep-existing", action="store_true", help="Add the users to the existing ones instead of deleting them first")
+    argument_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows generated & inserted at once. Defaults to {0}".format(DEFAULT_BATCH_SIZE))
+    arguments = argument_parser.parse_args()
+
+    if arguments.users < 0 or arguments.batch_size < 1:
+        argument_parser.error("--users must be >= 0 and --batch-size >= 1")
+
+    start_time = time.perf_counter()
+    users_amount = Generator(arguments.db).generate_dummy_users(arguments.users, not arguments.keep_existing, arguments.batch_size)
+    duration = time.perf_counter() - start_time
+
+    print("Generated {0} users in {1:.1f} seconds ( {2:.0f} users/s ). The users table holds {3} users.".format(
+        arguments.users, duration, arguments.users / duration if duration else 0, users_amount
+    ))
@@ -0,0 +1,195 @@
+"""
+Storage format of the Password column.
+
+The users table stores a salted hash of every password instead of the password itself. A stored hash names its scheme & its cost, so the cost
+can be raised later : the server verifies the old hashes as they are and hashes the password again with the current settings on the next login.
+
+scrypt -- > scrypt$<N>$<R>$<P>$<SALT HEX>$<HASH HEX> ( memory hard, the default )
+pbkdf2_sha256 -- > pbkdf2_sha256$<ITERATIONS>$<SALT HEX>$<HASH HEX> ( for the builds of Python whose OpenSSL lacks scrypt )
+
+A value without a known scheme is a plaintext password written before the hashes were introduced. It's still accepted ( compared in constant time )
+and replaced by a hash on the next successful login. All the plaintext passwords of a DB can be migrated at once with:
+python -m <top_level>.DB.passwords [--db path/to/db] [--workers N]
+
+Both hash functions cost tens of milliseconds of CPU on purpose. The server never calls them on its event loop ( Read Server/password_hasher.py ).
+"""
+
+import argparse  # Command line options of the migration
+import hashlib  # scrypt & PBKDF2
+import hmac  # Constant time comparisons
+import os  # Random salts
+import time  # Duration of the migration
+from concurrent.futures import ProcessPoolExecutor  # The migration hashes on all the CPUs
+from itertools import repeat  # Same scheme & cost for every password of a batch
+from . import queries  # Statements of the users table. From outside toplevel > python -m <top_level>.DB.passwords
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2_sha256"
+
+# keys : Scheme | values : Default cost ( N of scrypt, iterations of PBKDF2 ). Both take roughly 50 - 100 ms on a current CPU.
+DEFAULT_COSTS = {
+    SCRYPT: 2 ** 14,
+    PBKDF2: 600000,
+}
+
+# Block size & parallelization of scrypt
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+SALT_SIZE = 16
+HASH_SIZE = 32
+
+SEPARATOR = "$"
+
+
+class PasswordSchemeException(Exception):
+    def __init__(self, scheme, cost):
+        """Raise this exception for an unknown scheme or a cost that the scheme doesn't accept"""
+        self.error_msg = "Unknown password scheme or invalid cost >> {0} : {1} <<".format(scheme, cost)
+
+
+def check_scheme(scheme, cost=None):
+    """
+    Returns the cost to use for the scheme ( the default cost if cost is None ). Raises PasswordSchemeException for an unknown scheme or a bad cost.
+    """
+
+    if scheme == SCRYPT and not hasattr(hashlib, "scrypt"):
+        raise PasswordSchemeException(scheme, cost)
+
+    if scheme not in DEFAULT_COSTS:
+        raise PasswordSchemeException(scheme, cost)
+
+    if cost is None:
+        return DEFAULT_COSTS[scheme]
+
+    # N of scrypt has to be a power of 2
+    if cost < 2 or (scheme == SCRYPT and cost & (cost - 1)):
+        raise PasswordSchemeException(scheme, cost)
+
+    return cost
+
+
+def derive_key(password, salt, scheme, cost):
+    """
+    Not intended for use outside this module. Returns the raw hash of the password.
+    """
+
+    if scheme == SCRYPT:
+        # The memory of scrypt is 128 * N * R bytes, the default limit of OpenSSL ( 32 MB ) would reject the higher costs
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=cost, r=SCRYPT_R, p=SCRYPT_P,
+            maxmem=128 * SCRYPT_R * (cost + SCRYPT_P + 2) + 1024 * 1024, dklen=HASH_SIZE
+        )
+
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, cost, HASH_SIZE)
+
+
+def hash_password(password, scheme=SCRYPT, cost=None):
+    """
+    Returns the value stored inside the Password column for the password : the scheme, its parameters, a random salt and the hash
+    """
+
+    cost = check_scheme(scheme, cost)
+    salt = os.urandom(SALT_SIZE)
+    password_hash = derive_key(password, salt, scheme, cost)
+
+    if scheme == SCRYPT:
+        fields = (SCRYPT, cost, SCRYPT_R, SCRYPT_P, salt.hex(), password_hash.hex())
+    else:
+        fields = (PBKDF2, cost, salt.hex(), password_hash.hex())
+
+    return SEPARATOR.join(str(field) for field in fields)
+
+
+def parse_password_hash(stored_password):
+    """
+    Returns a tuple -> ( SCHEME, COST, SALT, HASH ) of a stored hash or None for a plaintext password ( or a value that can't be parsed )
+    """
+
+    fields = stored_password.split(SEPARATOR)
+
+    try:
+        if fields[0] == SCRYPT and len(fields) == 6:
+            if int(fields[2]) != SCRYPT_R or int(fields[3]) != SCRYPT_P:
+                return None
+            return (SCRYPT, int(fields[1]), bytes.fromhex(fields[4]), bytes.fromhex(fields[5]))
+
+        if fields[0] == PBKDF2 and len(fields) == 4:
+            return (PBKDF2, int(fields[1]), bytes.fromhex(fields[2]), bytes.fromhex(fields[3]))
+    except ValueError:
+        pass
+
+    return None
+
+
+def is_password_hash(stored_password):
+    """Checks if the stored password is a hash ( and not a plaintext password of an old DB )"""
+    return parse_password_hash(stored_password) is not None
+
+
+def verify_password(password, stored_password):
+    """
+    Checks if the password matches the value of the Password column. A plaintext value is compared in constant time as well.
+    """
+
+    parsed_hash = parse_password_hash(stored_password)
+    if parsed_hash is None:
+        return hmac.compare_digest(password.encode("utf-8"), stored_password.encode("utf-8"))
+
+    scheme, cost, salt, password_hash = parsed_hash
+
+    return hmac.compare_digest(derive_key(password, salt, scheme, cost), password_hash)
+
+
+def needs_rehash(stored_password, scheme=SCRYPT, cost=None):
+    """
+    Checks if the stored password has to be hashed again : a plaintext password or a hash with another scheme or cost
+    """
+
+    parsed_hash = parse_password_hash(stored_password)
+
+    return parsed_hash is None or parsed_hash[:2] != (scheme, check_scheme(scheme, cost))
+
+
+def migrate_passwords(db_path=queries.DB_PATH, scheme=SCRYPT, cost=None, workers=None, batch_size=1000):
+    """
+    Replaces every plaintext password of the DB at db_path with its hash. The hashes are computed by workers processes ( None for one per CPU ).
+    Every batch of batch_size rows is committed on its own, an interrupted migration continues where it stopped. A row is only updated if its password
+    didn't change in the meantime, so a running server may upgrade the same rows on login.
+    Returns the number of migrated rows.
+    """
+
+    cost = check_scheme(scheme, cost)
+
+    DB_CONNECTION = queries.connect(db_path)
+    plaintext_rows = [(UID, password) for UID, password in DB_CONNECTION.execute(queries.SELECT_ALL_PASSWORDS) if not is_password_hash(password)]
+
+    migrated_rows = 0
+
+    with ProcessPoolExecutor(workers) as process_pool:
+        for batch_start in range(0, len(plaintext_rows), batch_size):
+            batch = plaintext_rows[batch_start:batch_start + batch_size]
+            password_hashes = process_pool.map(hash_password, [password for UID, password in batch], repeat(scheme), repeat(cost), chunksize=16)
+
+            DB_CONNECTION.executemany(queries.UPDATE_PASSWORD, [
+                (password_hash, UID, password) for (UID, password), password_hash in zip(batch, password_hashes)
+            ])
+            DB_CONNECTION.commit()
+            migrated_rows += len(batch)
+
+    DB_CONNECTION.close()
+
+    return migrated_rows
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Replaces the plaintext passwords of a users DB with their hashes")
+    argument_parser.add_argument("--db", default=queries.DB_PATH, help="The users DB. Defaults to DB/dummy_db.db")
+    argument_parser.add_argument("--scheme", choices=(SCRYPT, PBKDF2), default=SCRYPT, help="Defaults to scrypt")
+    argument_parser.add_argument("--cost", type=int, default=None, help="N of scrypt or iterations of PBKDF2. Defaults to {0} & {1}".format(DEFAULT_COSTS[SCRYPT], DEFAULT_COSTS[PBKDF2]))
+    argument_parser.add_argument("--workers", type=int, default=None, help="Hashing processes. Defaults to one per CPU")
+    arguments = argument_parser.parse_args()
+
+    start_time = time.perf_counter()
+    migrated_rows = migrate_passwords(arguments.db, arguments.scheme, arguments.cost, arguments.workers)
+    print("Hashed {0} plaintext passwords in {1:.1f} s".format(migrated_rows, time.perf_counter() - start_time))
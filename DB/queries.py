@@ -0,0 +1,242 @@
+"""
+Every SQL statement used on the users table.
+
+All the statements are parameterized ( ? placeholders ). The values are never formatted into the SQL text, which closes the injection hole
+and keeps the SQL text of every statement constant, so sqlite3 compiles it once per connection and reuses it from its statement cache.
+
+The login & the UID lookup must never scan the table. Run the EXPLAIN QUERY PLAN check after changing a statement or an index:
+python -m <top_level>.DB.queries [path/to/db]
+"""
+
+import os  # Default path of the DB
+import sys  # DB path of the EXPLAIN QUERY PLAN check
+import sqlite3  # The DB driver
+
+DB_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(DB_DIRECTORY, "dummy_db.db")
+
+# The server only uses a handful of statements. Every one of them stays compiled for the lifetime of the connection.
+STATEMENT_CACHE_SIZE = 32
+
+# The order of the columns inside the users table
+USER_COLUMNS = (
+    "UID", "Username", "Password", "FirstName", "LastName", "Age",
+    "City", "PostalCode", "StreetName", "HouseNumber", "Salary"
+)
+
+# The columns stored as integers. SQLite stores signed 64 bit integers, a bigger value can't even be bound to a statement ( OverflowError ).
+INTEGER_COLUMNS = frozenset(("UID", "Age", "PostalCode", "HouseNumber", "Salary"))
+MAX_INTEGER = 2 ** 63 - 1
+
+CREATE_USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users(
+    UID UNSIGNED BIGINT PRIMARY KEY,
+    Username CHAR(20) UNIQUE NOT NULL,
+    Password CHAR(20) UNIQUE NOT NULL,
+    FirstName VARCHAR(50) NOT NULL,
+    LastName VARCHAR(50) NOT NULL,
+    Age UNSIGNED TINYINT NOT NULL,
+    City VARCHAR(50) NOT NULL,
+    PostalCode UNSIGNED TINYINT NOT NULL,
+    StreetName VARCHAR(100) NOT NULL,
+    HouseNumber UNSIGNED TINYINT NOT NULL,
+    Salary UNSIGNED TINYINT NOT NULL
+)
+"""
+
+"""
+Indexes of the lookup paths:
+users_login_index -- > The login looks up the UID & the stored password hash by username. The index holds all three columns, so the login never reads the table row ( covering index ).
+The login names the index ( INDEXED BY ) instead of depending on whichever index of the UNIQUE constraints the planner picks. Without the index the statement fails loudly.
+The session login ( the whole row by username ) seeks the same index and reads the table row of the UID it found.
+The UID lookup uses the index of the PRIMARY KEY. A second index on UID would only slow down the inserts.
+"""
+LOGIN_INDEX = "users_login_index"
+CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {0} ON users(Username, Password, UID)".format(LOGIN_INDEX),
+)
+# A bulk import drops the indexes first and builds them again afterwards with create_schema() : one sort instead of one B-tree insert per row
+DROP_INDEXES = (
+    "DROP INDEX IF EXISTS {0}".format(LOGIN_INDEX),
+)
+
+SELECT_CREDENTIALS_BY_USERNAME = "SELECT UID, Password FROM users INDEXED BY {0} WHERE Username = ?".format(LOGIN_INDEX)
+SELECT_USER_BY_USERNAME = "SELECT {0} FROM users INDEXED BY {1} WHERE Username = ?".format(", ".join(USER_COLUMNS), LOGIN_INDEX)
+# The offline inbox only stores messages for existing usernames. The login index covers the lookup, the table isn't read.
+SELECT_UID_BY_USERNAME = "SELECT UID FROM users INDEXED BY {0} WHERE Username = ?".format(LOGIN_INDEX)
+# The UID lookup reads the public profile : knowing a UID mustn't be enough to get the stored password hash, the Password column comes back empty
+SELECT_PROFILE_BY_UID = "SELECT {0} FROM users WHERE UID = ?".format(", ".join("''" if column == "Password" else column for column in USER_COLUMNS))
+INSERT_USER = "INSERT INTO users({0}) VALUES({1})".format(", ".join(USER_COLUMNS), ", ".join("?" * len(USER_COLUMNS)))
+# The bulk import skips the rows whose UID, username or password is taken already and generates new ones instead
+INSERT_USER_OR_IGNORE = INSERT_USER.replace("INSERT", "INSERT OR IGNORE", 1)
+UPDATE_PASSWORD = "UPDATE users SET Password = ? WHERE UID = ? AND Password = ?"
+SELECT_ALL_PASSWORDS = "SELECT UID, Password FROM users"
+COUNT_USERS = "SELECT COUNT(UID) FROM users"
+SELECT_MAX_UID = "SELECT MAX(UID) FROM users"
+DELETE_ALL_USERS = "DELETE FROM users"
+
+# The lookups that have to use an index : ( NAME, STATEMENT, EXAMPLE PARAMETERS, REQUIRED INDEX or None for any index )
+INDEXED_LOOKUPS = (
+    ("login", SELECT_CREDENTIALS_BY_USERNAME, ("username",), LOGIN_INDEX),
+    ("session_login", SELECT_USER_BY_USERNAME, ("username",), LOGIN_INDEX),
+    ("username", SELECT_UID_BY_USERNAME, ("username",), LOGIN_INDEX),
+    ("uid", SELECT_PROFILE_BY_UID, (0,), None),
+)
+
+
+class QueryPlanException(Exception):
+    def __init__(self, lookup_name, query_plan):
+        """Raise this exception when a lookup that must use an index scans the whole users table"""
+        self.error_msg = "The {0} lookup scans the users table >> {1} <<".format(lookup_name, " | ".join(query_plan))
+
+
+def connect(db_path=DB_PATH, **connect_options):
+    """
+    Returns a connection to the DB with the tuned statement cache
+    """
+
+    return sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE, **connect_options)
+
+
+def create_schema(DB_CONNECTION):
+    """
+    Creates the users table and its indexes if they don't exist yet
+    """
+
+    DB_CONNECTION.execute(CREATE_USERS_TABLE)
+    for create_index in CREATE_INDEXES:
+        DB_CONNECTION.execute(create_index)
+    DB_CONNECTION.commit()
+
+
+def drop_indexes(DB_CONNECTION):
+    """
+    Drops the indexes of CREATE_INDEXES before a bulk import. The UNIQUE constraints keep their indexes. create_schema() creates them again.
+    """
+
+    for drop_index in DROP_INDEXES:
+        DB_CONNECTION.execute(drop_index)
+
+
+def enable_wal(DB_CONNECTION):
+    """
+    Switches the DB to WAL mode. The mode is stored inside the DB file, every later connection uses it as well.
+    In WAL mode the readers don't wait for a committing writer and a commit appends to the log instead of rewriting the pages of the DB.
+    """
+
+    DB_CONNECTION.execute("PRAGMA journal_mode = WAL")
+
+
+def get_credentials_by_username(DB_CONNECTION, username):
+    """
+    Returns a tuple -> ( UID, STORED PASSWORD ) of the user with the given username or None. The stored password is checked with DB/passwords.py.
+    """
+
+    return DB_CONNECTION.execute(SELECT_CREDENTIALS_BY_USERNAME, (username,)).fetchone()
+
+
+def get_user_by_username(DB_CONNECTION, username):
+    """
+    Returns the row ( tuple in the order of USER_COLUMNS ) of the user with the given username or None
+    """
+
+    return DB_CONNECTION.execute(SELECT_USER_BY_USERNAME, (username,)).fetchone()
+
+
+def username_exists(DB_CONNECTION, username):
+    """
+    Checks if a user with the given username exists
+    """
+
+    return DB_CONNECTION.execute(SELECT_UID_BY_USERNAME, (username,)).fetchone() is not None
+
+
+def get_profile_by_uid(DB_CONNECTION, UID):
+    """
+    Returns the row ( tuple in the order of USER_COLUMNS, with an empty Password ) of the user with the given UID or None
+    """
+
+    return DB_CONNECTION.execute(SELECT_PROFILE_BY_UID, (UID,)).fetchone()
+
+
+def insert_user(DB_CONNECTION, user_values):
+    """
+    Inserts a user. user_values is a sequence in the order of USER_COLUMNS.
+    Raises sqlite3.IntegrityError if the UID or the username is already taken ( the salted password hashes never collide ). Nothing is committed.
+    """
+
+    DB_CONNECTION.execute(INSERT_USER, user_values)
+
+
+def is_valid_user_row(user_values):
+    """
+    Checks a row before it's inserted : one value per column of USER_COLUMNS, the integer columns between 0 and MAX_INTEGER and strings everywhere else
+    """
+
+    if len(user_values) != len(USER_COLUMNS):
+        return False
+
+    for column, value in zip(USER_COLUMNS, user_values):
+        if column in INTEGER_COLUMNS:
+            if type(value) is not int or not 0 <= value <= MAX_INTEGER:
+                return False
+        elif not isinstance(value, str):
+            return False
+
+    return True
+
+
+def update_password(DB_CONNECTION, UID, old_stored_password, new_stored_password):
+    """
+    Replaces the stored password of the user ( e.g. a plaintext password with its hash ) and commits.
+    Nothing changes if the stored password isn't old_stored_password anymore. Returns True if the row was updated.
+    """
+
+    updated_rows = DB_CONNECTION.execute(UPDATE_PASSWORD, (new_stored_password, UID, old_stored_password)).rowcount
+    DB_CONNECTION.commit()
+
+    return updated_rows == 1
+
+
+def explain_query_plans(DB_CONNECTION):
+    """
+    Returns a dict -> keys : Name of the lookup | values : List with the detail lines of its EXPLAIN QUERY PLAN
+    """
+
+    return {
+        lookup_name: [row[-1] for row in DB_CONNECTION.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+        for lookup_name, statement, parameters, required_index in INDEXED_LOOKUPS
+    }
+
+
+def check_query_plans(DB_CONNECTION):
+    """
+    Raises QueryPlanException if one of the INDEXED_LOOKUPS doesn't use its index. Returns the query plans otherwise.
+    """
+
+    query_plans = explain_query_plans(DB_CONNECTION)
+
+    for lookup_name, statement, parameters, required_index in INDEXED_LOOKUPS:
+        query_plan = query_plans[lookup_name]
+
+        if required_index is None:
+            uses_index = any(detail.startswith("SEARCH") and "INDEX" in detail for detail in query_plan)
+        else:
+            uses_index = any(detail.startswith("SEARCH") and "INDEX {0} ".format(required_index) in detail for detail in query_plan)
+
+        if not uses_index:
+            raise QueryPlanException(lookup_name, query_plan)
+
+    return query_plans
+
+
+if __name__ == "__main__":
+    DB_CONNECTION = connect(sys.argv[1] if len(sys.argv) > 1 else DB_PATH)
+    create_schema(DB_CONNECTION)
+
+    try:
+        for lookup_name, query_plan in check_query_plans(DB_CONNECTION).items():
+            print("{0:>6} : {1}".format(lookup_name, " | ".join(query_plan)))
+    except QueryPlanException as exception:
+        print(exception.error_msg)
+        sys.exit(1)
@@ -0,0 +1,140 @@
+"""
+Binary encoding of the messages ( Read messages.py ).
+
+The payload of a frame ( Read framing.py ) is:
+
++------------------------+----------+----------+-----+
+| OPCODE ( 1 byte )      | FIELD 1  | FIELD 2  | ... |
++------------------------+----------+----------+-----+
+
+u field -- > unsigned varint ( 7 bits per byte, least significant group first, the high bit marks that another byte follows, at most 9 bytes : 0 <= value <= messages.MAX_UNSIGNED )
+s field -- > varint with the length of the UTF-8 bytes, followed by the bytes
+
+The fields are length-delimited, so a field can contain any character ( "_", "|", "{", ... ). Nothing is split or searched while parsing.
+"""
+
+import struct  # Pack the opcode
+from .messages import FIELD_TYPES, MAX_UNSIGNED, MalformedMessageException
+
+OPCODE = struct.Struct("!B")
+
+# 9 bytes carry 63 bits, the varint of the biggest u field ( messages.MAX_UNSIGNED ). A longer varint is malformed.
+MAX_VARINT_SIZE = 9
+
+# Most of the varints ( lengths of usernames & short messages, small numbers ) fit into a single byte
+SMALL_VARINTS = tuple(bytes((value,)) for value in range(0x80))
+
+# The packed opcodes
+OPCODE_BYTES = {opcode: OPCODE.pack(opcode) for opcode in FIELD_TYPES}
+
+
+def encode_varint(value):
+    """
+    Returns the unsigned varint ( bytes ) of the integer. Raises ValueError if it's negative or bigger than messages.MAX_UNSIGNED.
+    """
+
+    if 0 <= value < 0x80:
+        return SMALL_VARINTS[value]
+    if value < 0 or value > MAX_UNSIGNED:
+        raise ValueError("A varint must be within 0 and {0} : {1}".format(MAX_UNSIGNED, value))
+
+    varint = bytearray()
+    while value >= 0x80:
+        varint.append((value & 0x7F) | 0x80)
+        value >>= 7
+    varint.append(value)
+
+    return bytes(varint)
+
+
+def decode_varint(data, offset):
+    """
+    Decodes the varint that starts at the offset of data ( bytes ).
+    Returns a tuple -> ( VALUE, OFFSET AFTER THE VARINT )
+    """
+
+    value = 0
+    shift = 0
+    end = min(len(data), offset + MAX_VARINT_SIZE)
+
+    while offset < end:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+
+        if not byte & 0x80:
+            return (value, offset)
+        shift += 7
+
+    raise MalformedMessageException("Truncated or oversized varint")
+
+
+def encode_message(opcode, *fields):
+    """
+    Returns the payload ( bytes ) of the message. The fields must match FIELD_TYPES[opcode], a wrong number of fields raises TypeError.
+    """
+
+    field_types = FIELD_TYPES[opcode]
+    if len(fields) != len(field_types):
+        raise TypeError("Opcode {0:#04x} has {1} fields, not {2}".format(opcode, len(field_types), len(fields)))
+
+    parts = [OPCODE_BYTES[opcode]]
+    for field_type, field in zip(field_types, fields):
+        if field_type == "u":
+            parts.append(SMALL_VARINTS[field] if 0 <= field < 0x80 else encode_varint(field))
+        else:
+            field = field.encode("utf-8")
+            field_size = len(field)
+            parts.append(SMALL_VARINTS[field_size] if field_size < 0x80 else encode_varint(field_size))
+            parts.append(field)
+
+    return b"".join(parts)
+
+
+def decode_message(payload):
+    """
+    Returns a tuple -> ( OPCODE, FIELDS ) of the payload ( bytes ).
+    Raises MalformedMessageException if the payload doesn't match the fields of its opcode.
+    """
+
+    if not payload:
+        raise MalformedMessageException("Empty payload")
+
+    opcode = payload[0]
+    field_types = FIELD_TYPES.get(opcode)
+    if field_types is None:
+        raise MalformedMessageException("Unknown opcode {0:#04x}".format(opcode))
+
+    payload_size = len(payload)
+    fields = []
+    offset = 1
+
+    for field_type in field_types:
+        if offset >= payload_size:
+            raise MalformedMessageException("Truncated payload of opcode {0:#04x}".format(opcode))
+
+        # Almost every varint fits into a single byte
+        value = payload[offset]
+        if value < 0x80:
+            offset += 1
+        else:
+            value, offset = decode_varint(payload, offset)
+
+        if field_type == "u":
+            fields.append(value)
+            continue
+
+        end = offset + value
+        if end > payload_size:
+            raise MalformedMessageException("Truncated payload of opcode {0:#04x}".format(opcode))
+
+        try:
+            fields.append(payload[offset:end].decode("utf-8"))
+        except UnicodeDecodeError:
+            raise MalformedMessageException("Field of opcode {0:#04x} isn't valid UTF-8".format(opcode))
+        offset = end
+
+    if offset != payload_size:
+        raise MalformedMessageException("Payload size doesn't match the fields of opcode {0:#04x}".format(opcode))
+
+    return (opcode, tuple(fields))
@@ -0,0 +1,111 @@
+"""
+Length-prefixed framing used by the Server and the Client.
+
+TCP is a byte stream, so a single .recv() can return half of a message or several messages glued together.
+Every message is therefore wrapped inside a frame before it is sent:
+
++------------------------------------------+----------------------------------------+
+| LENGTH ( 4 bytes, unsigned, big endian ) | PAYLOAD ( LENGTH bytes )               |
++------------------------------------------+----------------------------------------+
+
+The payload is the UTF-8 encoded {HEADER}{BODY} message described in ../Documentation/server_client_communication_blueprint.txt
+"""
+
+import struct  # Pack & unpack the length prefix of the frames
+from collections import deque  # Frames that were decoded but not yet consumed by a blocking reader
+
+# Unsigned 32 bit integer in network byte order
+FRAME_HEADER = struct.Struct("!I")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+# No message of the protocol comes anywhere near this size. A bigger length prefix means that the peer is broken or malicious.
+MAX_FRAME_SIZE = 1024 * 1024
+
+# How many bytes we try to read from a socket at once. Several frames can fit inside a single read.
+RECV_BUFFER_SIZE = 65536
+
+
+class FrameTooLargeException(Exception):
+    def __init__(self, frame_size, max_frame_size):
+        """Raise this exception when the length prefix of a frame exceeds the maximum allowed frame size"""
+        self.error_msg = "The frame size exceeds certain limits >> Frame size : {0} | Max : {1} <<".format(
+            frame_size, max_frame_size
+        )
+
+
+def encode_frame(payload):
+    """
+    Returns the payload ( bytes ) prefixed with its length, ready to be sent over the socket.
+    """
+
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    # The server keeps one decoder per connected socket
+    __slots__ = ("max_frame_size", "_buffer", "pending_frames")
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        """
+        An incremental decoder for one connection.
+        Feed it the bytes exactly as they come out of .recv(). It keeps the incomplete tail of the stream and returns every complete frame.
+        """
+
+        self.max_frame_size = max_frame_size
+
+        # Bytes received from the socket that don't form a complete frame yet
+        self._buffer = bytearray()
+
+        # Used by receive_frame() for frames that came in the same read as the frame that was returned
+        self.pending_frames = deque()
+
+    def feed(self, data):
+        """
+        Adds the received data to the internal buffer and returns a list with the payloads ( bytes ) of all the complete frames.
+        Raises FrameTooLargeException if a length prefix exceeds max_frame_size.
+        """
+
+        buffer = self._buffer
+        buffer += data
+
+        frames = []
+        offset = 0
+        buffer_size = len(buffer)
+
+        while buffer_size - offset >= FRAME_HEADER_SIZE:
+            frame_size = FRAME_HEADER.unpack_from(buffer, offset)[0]
+
+            if frame_size > self.max_frame_size:
+                raise FrameTooLargeException(frame_size, self.max_frame_size)
+
+            frame_end = offset + FRAME_HEADER_SIZE + frame_size
+            if frame_end > buffer_size:
+                # The rest of the frame is still on its way
+                break
+
+            frames.append(bytes(buffer[offset + FRAME_HEADER_SIZE:frame_end]))
+            offset = frame_end
+
+        # Drop all the consumed bytes at once instead of once per frame
+        if offset:
+            del buffer[:offset]
+
+        return frames
+
+
+def receive_frame(blocking_socket, frame_decoder):
+    """
+    Blocks until one complete frame was received from the socket and returns its payload ( bytes ).
+    Returns None if the peer closed the connection before a complete frame arrived.
+    Frames that arrived inside the same read are kept by the frame_decoder and returned by the next calls.
+    """
+
+    while not frame_decoder.pending_frames:
+        data = blocking_socket.recv(RECV_BUFFER_SIZE)
+
+        if not data:
+            return None
+
+        frame_decoder.pending_frames.extend(frame_decoder.feed(data))
+
+    return frame_decoder.pending_frames.popleft()
@@ -0,0 +1,134 @@
+"""
+The messages of the protocol, independent of their encoding.
+
+Every message is an opcode plus a tuple of fields. The Server & the Client work with ( OPCODE, FIELDS ) only, the encoding is done by one of the two codecs:
+text_protocol.py -- > The original {HEADER}{BODY} strings. Used by every client that doesn't negotiate anything.
+binary_protocol.py -- > Struct packed opcodes & length-delimited fields. Negotiated at connect time with {CLIENT_PROTOCOL}{BINARY_1}.
+
+The field types of every message ( FIELD_TYPES ):
+u -- > unsigned integer, 0 <= value <= MAX_UNSIGNED ( the range of an INTEGER column of the DB ). Both codecs reject any other value as malformed.
+s -- > string
+"""
+
+# Client -> Server
+CLIENT_LOGIN_INFO_USERNAME_PASSWORD = 0x01  # USERNAME, PASSWORD
+CLIENT_LOGIN_INFO_UID_NOT_VALID = 0x02
+CLIENT_LOGIN_INFO_UID_SUCCESSFUL = 0x03  # UID
+CLIENT_REGISTER_DATA = 0x04  # USER_FIELDS
+CLIENT_COMMUNICATION_DATA = 0x05  # USERNAME
+CLIENT_MESSAGE = 0x06  # SENDER USERNAME, RECEIVER USERNAME, MESSAGE
+CLIENT_PROTOCOL = 0x07  # PROTOCOL NAME ( text only, negotiates the encoding of the connection )
+CLIENT_CHANNEL_JOIN = 0x08  # CHANNEL
+CLIENT_CHANNEL_LEAVE = 0x09  # CHANNEL
+CLIENT_CHANNEL_POST = 0x0A  # CHANNEL, MESSAGE
+CLIENT_HEARTBEAT = 0x0B  # Answers SERVER_HEARTBEAT
+CLIENT_SESSION_LOGIN = 0x0C  # USERNAME, PASSWORD ( the connection stays open as the communication socket )
+CLIENT_SESSION_RESUME = 0x0D  # SESSION TOKEN
+CLIENT_PRESENCE_SUBSCRIBE = 0x0E  # Answered with SERVER_PRESENCE_SNAPSHOT, followed by SERVER_PRESENCE_DELTA
+CLIENT_PRESENCE_UNSUBSCRIBE = 0x0F
+
+# Server -> Client
+SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL = 0x81  # UID
+SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG = 0x82
+SERVER_LOGIN_INFO_UID_SUCCESSFUL = 0x83  # USER_FIELDS
+SERVER_REGISTER_INFO_SUCCESSFUL = 0x84
+SERVER_REGISTER_INFO_ERROR = 0x85
+CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND = 0x86
+MESSAGE_FROM_CLIENT = 0x87  # SENDER USERNAME, MESSAGE
+SERVER_PROTOCOL = 0x88  # PROTOCOL NAME ( text only, answers CLIENT_PROTOCOL )
+MESSAGE_FROM_CHANNEL = 0x89  # CHANNEL, SENDER USERNAME, MESSAGE
+SERVER_CHANNEL_JOINED = 0x8A  # CHANNEL
+SERVER_CHANNEL_LEFT = 0x8B  # CHANNEL
+SERVER_CHANNEL_ERROR = 0x8C  # CHANNEL
+SERVER_HEARTBEAT = 0x8D  # Sent to a silent communication socket
+SERVER_SESSION = 0x8E  # SESSION TOKEN, USER_FIELDS ( answers CLIENT_SESSION_LOGIN )
+SERVER_SESSION_RESUMED = 0x8F  # SESSION TOKEN ( answers CLIENT_SESSION_RESUME )
+SERVER_SESSION_INVALID = 0x90  # The session token is forged or expired
+SERVER_PRESENCE_SNAPSHOT = 0x91  # MORE PARTS ( 1 / 0 ), USERNAMES ( Read roster_codec.py )
+SERVER_PRESENCE_DELTA = 0x92  # ONLINE USERNAMES, OFFLINE USERNAMES
+
+# Worker -> Worker ( multi-process mode, always binary )
+WORKER_CLIENT_MESSAGE = 0xC1  # RECEIVER USERNAME, SENDER USERNAME, MESSAGE
+WORKER_USER_ONLINE = 0xC2  # USERNAME
+WORKER_USER_OFFLINE = 0xC3  # USERNAME
+WORKER_CHANNEL_POST = 0xC4  # CHANNEL, SENDER USERNAME, MESSAGE
+
+# The fields of a user, in the order of the columns of the users table
+USER_FIELDS = (
+    "UID", "Username", "Password", "FirstName", "LastName", "Age",
+    "City", "PostalCode", "StreetName", "HouseNumber", "Salary"
+)
+USER_FIELD_TYPES = "ussssususuu"
+
+# keys : Opcode | values : The types of its fields
+FIELD_TYPES = {
+    CLIENT_LOGIN_INFO_USERNAME_PASSWORD: "ss",
+    CLIENT_LOGIN_INFO_UID_NOT_VALID: "",
+    CLIENT_LOGIN_INFO_UID_SUCCESSFUL: "u",
+    CLIENT_REGISTER_DATA: USER_FIELD_TYPES,
+    CLIENT_COMMUNICATION_DATA: "s",
+    CLIENT_MESSAGE: "sss",
+    CLIENT_PROTOCOL: "s",
+    CLIENT_CHANNEL_JOIN: "s",
+    CLIENT_CHANNEL_LEAVE: "s",
+    CLIENT_CHANNEL_POST: "ss",
+    CLIENT_HEARTBEAT: "",
+    CLIENT_SESSION_LOGIN: "ss",
+    CLIENT_SESSION_RESUME: "s",
+    CLIENT_PRESENCE_SUBSCRIBE: "",
+    CLIENT_PRESENCE_UNSUBSCRIBE: "",
+
+    SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL: "u",
+    SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG: "",
+    SERVER_LOGIN_INFO_UID_SUCCESSFUL: USER_FIELD_TYPES,
+    SERVER_REGISTER_INFO_SUCCESSFUL: "",
+    SERVER_REGISTER_INFO_ERROR: "",
+    CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND: "",
+    MESSAGE_FROM_CLIENT: "ss",
+    SERVER_PROTOCOL: "s",
+    MESSAGE_FROM_CHANNEL: "sss",
+    SERVER_CHANNEL_JOINED: "s",
+    SERVER_CHANNEL_LEFT: "s",
+    SERVER_CHANNEL_ERROR: "s",
+    SERVER_HEARTBEAT: "",
+    SERVER_SESSION: "s" + USER_FIELD_TYPES,
+    SERVER_SESSION_RESUMED: "s",
+    SERVER_SESSION_INVALID: "",
+    SERVER_PRESENCE_SNAPSHOT: "us",
+    SERVER_PRESENCE_DELTA: "ss",
+
+    WORKER_CLIENT_MESSAGE: "sss",
+    WORKER_USER_ONLINE: "s",
+    WORKER_USER_OFFLINE: "s",
+    WORKER_CHANNEL_POST: "sss",
+}
+
+# Largest value of a u field. A bigger integer can't be stored in the DB nor encoded as a varint of at most 9 bytes.
+MAX_UNSIGNED = 2 ** 63 - 1
+MAX_UNSIGNED_DIGITS = len(str(MAX_UNSIGNED))
+
+# Names of the encodings, sent inside {CLIENT_PROTOCOL} & {SERVER_PROTOCOL}
+TEXT_PROTOCOL_NAME = "TEXT"
+BINARY_PROTOCOL_NAME = "BINARY_1"
+
+
+class MalformedMessageException(Exception):
+    def __init__(self, error_msg):
+        """Raise this exception when a received message can't be decoded by its codec"""
+        self.error_msg = "Malformed message >> {0} <<".format(error_msg)
+
+
+def parse_unsigned(text):
+    """
+    Returns the integer of a u field received as text ( decimal digits only, no sign & no whitespace ).
+    Raises MalformedMessageException if the text isn't an unsigned integer of at most MAX_UNSIGNED.
+    """
+
+    if not text.isascii() or not text.isdigit() or len(text) > MAX_UNSIGNED_DIGITS:
+        raise MalformedMessageException("Not an unsigned integer : {0!r}".format(text[:MAX_UNSIGNED_DIGITS + 1]))
+
+    value = int(text)
+    if value > MAX_UNSIGNED:
+        raise MalformedMessageException("Unsigned integer out of range : {0}".format(value))
+
+    return value
@@ -0,0 +1,104 @@
+"""
+Versioned codec of the user profiles ( the public fields of a user ), shared by the server & the clients. Used by the text protocol, the binary protocol
+sends the fields of a profile as typed fields already ( Read binary_protocol.py ).
+
+The text protocol used to send a profile as the string of a python dict, which the client parsed with eval() and later with ast.literal_eval().
+Building the dict, printing it & parsing it again cost more than the rest of the UID login, and eval() let the server run code on the client.
+A profile is a single line now:
+
+<VERSION>|<UID>|<Username>|<FirstName>|<LastName>|<Age>|<City>|<PostalCode>|<StreetName>|<HouseNumber>|<Salary>
+
+The password ( its hash ) is never part of a profile, a decoded profile has an empty Password.
+A "\\" inside a field is sent as "\\\\" and a "|" as "\\p", so the fields can contain any character and a profile can always be split at its "|".
+Almost no profile contains either of them, those are formatted & split without looking at the single fields.
+
+encode_profile() reads the fields of a row by their index ( the order of messages.USER_FIELDS ), so it works on the tuples of the DB, on sqlite3.Row objects
+and on User.to_row() without building a dict first. The layout of a version never changes : a new field means a new version with its own template & decoder,
+and the decoders of the older versions stay, so a client can still read the profiles of an older server.
+"""
+
+import re  # Unescape the fields that contain "\" or "|"
+from .messages import MalformedMessageException, parse_unsigned
+
+PROFILE_VERSION = 1
+
+# Version 1 : the fields of a row in the order of messages.USER_FIELDS, without the Password ( index 2 )
+PROFILE_TEMPLATE_1 = "1|{0}|{1}|{3}|{4}|{5}|{6}|{7}|{8}|{9}|{10}"
+PROFILE_SEPARATORS_1 = PROFILE_TEMPLATE_1.count("|")
+
+UNESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+UNESCAPED_CHARACTERS = {"\\": "\\", "p": "|"}
+
+
+def escape_field(value):
+    """
+    Returns the field with its "\\" and "|" escaped. Numbers are returned as they are.
+    """
+
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("|", "\\p")
+
+    return value
+
+
+def unescape_field(field):
+    """
+    Returns the original value of an escaped field. Raises KeyError for an unknown escape sequence.
+    """
+
+    return UNESCAPE_PATTERN.sub(lambda match: UNESCAPED_CHARACTERS[match.group(1)], field)
+
+
+def encode_profile(row):
+    """
+    Returns the profile ( str ) of a row in the order of messages.USER_FIELDS ( tuple, sqlite3.Row, User.to_row() ). The password of the row is left out.
+    """
+
+    profile = PROFILE_TEMPLATE_1.format(*row)
+
+    # A field with a "|" adds a separator, a field with a "\" would be unescaped by the client. Both are rare, only those profiles escape their fields.
+    if profile.count("|") == PROFILE_SEPARATORS_1 and "\\" not in profile:
+        return profile
+
+    return PROFILE_TEMPLATE_1.format(*[escape_field(value) for value in row])
+
+
+def decode_profile_1(fields):
+    """
+    Not intended for use outside module. Returns the row of the fields of a version 1 profile.
+    """
+
+    if len(fields) != PROFILE_SEPARATORS_1 + 1:
+        raise MalformedMessageException("A version 1 profile has {0} fields, not {1}".format(PROFILE_SEPARATORS_1 + 1, len(fields)))
+
+    return (
+        parse_unsigned(fields[1]), fields[2], "", fields[3], fields[4], parse_unsigned(fields[5]),
+        fields[6], parse_unsigned(fields[7]), fields[8], parse_unsigned(fields[9]), parse_unsigned(fields[10])
+    )
+
+
+# keys : Version ( the first field of a profile ) | values : The decoder of its fields
+PROFILE_DECODERS = {
+    "1": decode_profile_1,
+}
+
+
+def decode_profile(profile):
+    """
+    Returns the row ( tuple in the order of messages.USER_FIELDS, with an empty Password ) of a profile ( str ). User(*row) creates the user.
+    Raises MalformedMessageException for an unknown version or a profile that doesn't match its version.
+    """
+
+    fields = profile.split("|")
+
+    decoder = PROFILE_DECODERS.get(fields[0])
+    if decoder is None:
+        raise MalformedMessageException("Unknown profile version {0}".format(fields[0][:16]))
+
+    try:
+        if "\\" in profile:
+            fields = [unescape_field(field) for field in fields]
+
+        return decoder(fields)
+    except (ValueError, KeyError) as exception:
+        raise MalformedMessageException("Invalid profile field : {0}".format(exception))
@@ -0,0 +1,57 @@
+"""
+Codec of the username lists of the presence messages ( {SERVER_PRESENCE_SNAPSHOT} & {SERVER_PRESENCE_DELTA}, read ../Server/presence.py ).
+Both protocols send a list as a single string field:
+
+<USERNAME>|<USERNAME>|...
+
+An empty list is an empty string. The binary protocol allows any character inside a username and the text protocol splits the body of the presence messages at "_",
+so a "\\" inside a username is sent as "\\\\", a "|" as "\\p" and a "_" as "\\u". Almost no list contains any of them, those are joined & split without looking at the usernames.
+"""
+
+import re  # Unescape the usernames that contain "\", "|" or "_"
+from .messages import MalformedMessageException
+
+USERNAME_SEPARATOR = "|"
+
+UNESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+UNESCAPED_CHARACTERS = {"\\": "\\", "p": "|", "u": "_"}
+
+
+def escape_username(username):
+    """
+    Returns the username with its "\\", "|" and "_" escaped
+    """
+
+    return username.replace("\\", "\\\\").replace("|", "\\p").replace("_", "\\u")
+
+
+def encode_usernames(usernames):
+    """
+    Returns the field ( str ) of a list of usernames
+    """
+
+    usernames_field = USERNAME_SEPARATOR.join(usernames)
+
+    # A single check of the joined string instead of one per username. The separators of the join itself are counted.
+    if "\\" not in usernames_field and "_" not in usernames_field and usernames_field.count(USERNAME_SEPARATOR) == len(usernames) - 1:
+        return usernames_field
+
+    return USERNAME_SEPARATOR.join([escape_username(username) for username in usernames])
+
+
+def decode_usernames(usernames_field):
+    """
+    Returns the list of usernames of a field. Raises MalformedMessageException for an unknown escape sequence.
+    """
+
+    if not usernames_field:
+        return []
+
+    usernames = usernames_field.split(USERNAME_SEPARATOR)
+    if "\\" not in usernames_field:
+        return usernames
+
+    try:
+        return [UNESCAPE_PATTERN.sub(lambda match: UNESCAPED_CHARACTERS[match.group(1)], username) for username in usernames]
+    except KeyError as exception:
+        raise MalformedMessageException("Invalid escape sequence in a username list : {0}".format(exception))
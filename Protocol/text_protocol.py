@@ -0,0 +1,229 @@
+"""
+Text encoding of the messages ( Read messages.py ). These are the original {HEADER}{BODY} strings of
+../Documentation/server_client_communication_blueprint.txt, every client that doesn't negotiate the binary protocol uses them.
+
+The bodies are split at "_", "|" and ":", so these characters can't be used inside the fields ( except inside the text of a chat message ).
+"""
+
+import ast  # Parse the profile dict of the servers before the profile codec without eval()
+from . import messages
+from .messages import USER_FIELDS, FIELD_TYPES, MalformedMessageException, parse_unsigned
+from .profile_codec import encode_profile, decode_profile  # The profiles of the UID login & of the session login
+
+CLIENT_HEADERS = {
+    messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD: "{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}",
+    messages.CLIENT_LOGIN_INFO_UID_NOT_VALID: "{CLIENT_LOGIN_INFO_UID_NOT_VALID}",
+    messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL: "{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}",
+    messages.CLIENT_REGISTER_DATA: "{CLIENT_REGISTER_DATA}",
+    messages.CLIENT_COMMUNICATION_DATA: "{CLIENT_COMMUNICATION_DATA}",
+    messages.CLIENT_MESSAGE: "{CLIENT_MESSAGE}",
+    messages.CLIENT_PROTOCOL: "{CLIENT_PROTOCOL}",
+    messages.CLIENT_CHANNEL_JOIN: "{CLIENT_CHANNEL_JOIN}",
+    messages.CLIENT_CHANNEL_LEAVE: "{CLIENT_CHANNEL_LEAVE}",
+    messages.CLIENT_CHANNEL_POST: "{CLIENT_CHANNEL_POST}",
+    messages.CLIENT_HEARTBEAT: "{CLIENT_HEARTBEAT}",
+    messages.CLIENT_SESSION_LOGIN: "{CLIENT_SESSION_LOGIN}",
+    messages.CLIENT_SESSION_RESUME: "{CLIENT_SESSION_RESUME}",
+    messages.CLIENT_PRESENCE_SUBSCRIBE: "{CLIENT_PRESENCE_SUBSCRIBE}",
+    messages.CLIENT_PRESENCE_UNSUBSCRIBE: "{CLIENT_PRESENCE_UNSUBSCRIBE}",
+}
+OPCODES_BY_CLIENT_HEADER = {header: opcode for opcode, header in CLIENT_HEADERS.items()}
+
+# The responses of the login don't use the {HEADER}{BODY} style
+SERVER_LOGIN_SUCCESSFUL_PREFIX = "SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL_"
+SERVER_LOGIN_WRONG = "SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG"
+
+# The server responses that never have a body
+SERVER_CONSTANT_MESSAGES = {
+    messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG: SERVER_LOGIN_WRONG,
+    messages.SERVER_REGISTER_INFO_SUCCESSFUL: "{SERVER_REGISTER_INFO_SUCCESSFUL}",
+    messages.SERVER_REGISTER_INFO_ERROR: "{SERVER_REGISTER_INFO_ERROR}",
+    messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND: "{CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND}",
+    messages.SERVER_HEARTBEAT: "{SERVER_HEARTBEAT}",
+    messages.SERVER_SESSION_INVALID: "{SERVER_SESSION_INVALID}",
+}
+OPCODES_BY_SERVER_CONSTANT_MESSAGE = {message: opcode for opcode, message in SERVER_CONSTANT_MESSAGES.items()}
+
+# The server responses about a channel, {HEADER}{<CHANNEL>}
+SERVER_CHANNEL_HEADERS = {
+    messages.SERVER_CHANNEL_JOINED: "{SERVER_CHANNEL_JOINED}",
+    messages.SERVER_CHANNEL_LEFT: "{SERVER_CHANNEL_LEFT}",
+    messages.SERVER_CHANNEL_ERROR: "{SERVER_CHANNEL_ERROR}",
+}
+OPCODES_BY_SERVER_CHANNEL_HEADER = {header: opcode for opcode, header in SERVER_CHANNEL_HEADERS.items()}
+
+# {SERVER_LOGIN_INFO_UID_SUCCESSFUL}{<PROFILE>} -- > Read profile_codec.py
+SERVER_PROFILE_HEADER = "{SERVER_LOGIN_INFO_UID_SUCCESSFUL}"
+
+# {SERVER_SESSION}{<TOKEN>|<PROFILE>} -- > The session token & the profile. The token never contains a "|".
+SERVER_SESSION_HEADER = "{SERVER_SESSION}"
+
+# {SERVER_PRESENCE_SNAPSHOT}{<MORE PARTS>_<USERNAMES>} & {SERVER_PRESENCE_DELTA}{<ONLINE USERNAMES>_<OFFLINE USERNAMES>} -- > Read roster_codec.py, the lists never contain a raw "_"
+SERVER_PRESENCE_SNAPSHOT_HEADER = "{SERVER_PRESENCE_SNAPSHOT}"
+SERVER_PRESENCE_DELTA_HEADER = "{SERVER_PRESENCE_DELTA}"
+
+# The client messages that never have a body
+CLIENT_BODYLESS_OPCODES = frozenset((
+    messages.CLIENT_LOGIN_INFO_UID_NOT_VALID, messages.CLIENT_HEARTBEAT, messages.CLIENT_PRESENCE_SUBSCRIBE, messages.CLIENT_PRESENCE_UNSUBSCRIBE
+))
+
+
+def get_body(message):
+    """
+    Returns the body of a {HEADER}{BODY} message without its curly braces
+    """
+
+    return message[message.index("}")+2:-1]
+
+
+def format_client_message(opcode, *fields):
+    """
+    Returns the text ( str ) of a client message
+    """
+
+    HEADER = CLIENT_HEADERS[opcode]
+
+    if opcode in (messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, messages.CLIENT_SESSION_LOGIN):
+        BODY = "{{USERNAME:{0}|PASSWORD:{1}}}".format(*fields)
+    elif opcode in CLIENT_BODYLESS_OPCODES:
+        BODY = ""
+    elif opcode == messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL:
+        BODY = "{{UID:{0}}}".format(*fields)
+    elif opcode == messages.CLIENT_REGISTER_DATA:
+        BODY = "{{{0}}}".format("|".join("{0}:{1}".format(key, value) for key, value in zip(USER_FIELDS, fields)))
+    elif opcode == messages.CLIENT_MESSAGE:
+        BODY = "{{{0}_{1}_{2}}}".format(*fields)
+    elif opcode == messages.CLIENT_CHANNEL_POST:
+        BODY = "{{{0}_{1}}}".format(*fields)
+    else:
+        # {CLIENT_COMMUNICATION_DATA}, {CLIENT_PROTOCOL}, {CLIENT_CHANNEL_JOIN}, {CLIENT_CHANNEL_LEAVE} & {CLIENT_SESSION_RESUME}
+        BODY = "{{{0}}}".format(*fields)
+
+    return HEADER + BODY
+
+
+def parse_client_message(client_message):
+    """
+    Returns a tuple -> ( OPCODE, FIELDS ) of a client message ( str ). The opcode is None for an unknown header.
+    Raises MalformedMessageException if the body doesn't match its header.
+    """
+
+    try:
+        opcode = OPCODES_BY_CLIENT_HEADER.get(client_message[:client_message.index("}")+1])
+
+        if opcode is None or opcode in CLIENT_BODYLESS_OPCODES:
+            return (opcode, ())
+
+        client_message_body = get_body(client_message)
+
+        if opcode == messages.CLIENT_MESSAGE:
+            # The message itself is allowed to contain underscores
+            sender_username, receiver_username, sender_message = client_message_body.split("_", 2)
+            return (opcode, (sender_username, receiver_username, sender_message))
+        if opcode == messages.CLIENT_CHANNEL_POST:
+            # {<CHANNEL>_<MESSAGE>}, the message is allowed to contain underscores as well
+            channel_name, channel_message = client_message_body.split("_", 1)
+            return (opcode, (channel_name, channel_message))
+        if opcode == messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD or opcode == messages.CLIENT_SESSION_LOGIN:
+            # {USERNAME:<>|PASSWORD:<>}
+            username, password = client_message_body.split("|")
+            return (opcode, (username.split(":")[1], password.split(":")[1]))
+        if opcode == messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL:
+            # {UID:<>}
+            return (opcode, (parse_unsigned(client_message_body.split(":")[1]),))
+        if opcode == messages.CLIENT_REGISTER_DATA:
+            # {UID:<>|Username:<>|Password:<>|...}
+            user_data = dict(data.split(":") for data in client_message_body.split("|"))
+            return (opcode, tuple(
+                parse_unsigned(user_data[key]) if field_type == "u" else user_data[key]
+                for key, field_type in zip(USER_FIELDS, FIELD_TYPES[opcode])
+            ))
+
+        # {CLIENT_COMMUNICATION_DATA}{<USERNAME>}, {CLIENT_PROTOCOL}{<PROTOCOL NAME>}, {CLIENT_CHANNEL_JOIN / LEAVE}{<CHANNEL>} & {CLIENT_SESSION_RESUME}{<TOKEN>}
+        return (opcode, (client_message_body,))
+    except (ValueError, IndexError, KeyError) as exception:
+        raise MalformedMessageException("{0} : {1}".format(client_message[:64], exception))
+
+
+def format_server_message(opcode, *fields):
+    """
+    Returns the text ( str ) of a server message
+    """
+
+    server_message = SERVER_CONSTANT_MESSAGES.get(opcode)
+    if server_message is not None:
+        return server_message
+
+    if opcode == messages.MESSAGE_FROM_CLIENT:
+        # {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>}
+        return "{{MESSAGE_FROM_CLIENT}}{{{0}_{1}}}".format(*fields)
+    if opcode == messages.MESSAGE_FROM_CHANNEL:
+        # {MESSAGE_FROM_CHANNEL}{<Channel>_<Sender_username>_<message>}
+        return "{{MESSAGE_FROM_CHANNEL}}{{{0}_{1}_{2}}}".format(*fields)
+    if opcode in SERVER_CHANNEL_HEADERS:
+        return "{0}{{{1}}}".format(SERVER_CHANNEL_HEADERS[opcode], *fields)
+    if opcode == messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL:
+        return "{0}{1}".format(SERVER_LOGIN_SUCCESSFUL_PREFIX, *fields)
+    if opcode == messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL:
+        return "{0}{{{1}}}".format(SERVER_PROFILE_HEADER, encode_profile(fields))
+    if opcode == messages.SERVER_PROTOCOL:
+        return "{{SERVER_PROTOCOL}}{{{0}}}".format(*fields)
+    if opcode == messages.SERVER_SESSION:
+        # The fields of the profile start after the token, the indexes of the template are the indexes of a row
+        return "{0}{{{1}|{2}}}".format(SERVER_SESSION_HEADER, fields[0], encode_profile(fields[1:]))
+    if opcode == messages.SERVER_SESSION_RESUMED:
+        return "{{SERVER_SESSION_RESUMED}}{{{0}}}".format(*fields)
+    if opcode == messages.SERVER_PRESENCE_SNAPSHOT:
+        return "{0}{{{1}_{2}}}".format(SERVER_PRESENCE_SNAPSHOT_HEADER, *fields)
+    if opcode == messages.SERVER_PRESENCE_DELTA:
+        return "{0}{{{1}_{2}}}".format(SERVER_PRESENCE_DELTA_HEADER, *fields)
+
+    raise ValueError("Opcode {0:#04x} has no text encoding".format(opcode))
+
+
+def parse_server_message(server_message):
+    """
+    Returns a tuple -> ( OPCODE, FIELDS ) of a server message ( str ). The opcode is None for an unknown message.
+    Raises MalformedMessageException if the message can't be parsed.
+    """
+
+    try:
+        opcode = OPCODES_BY_SERVER_CONSTANT_MESSAGE.get(server_message)
+        if opcode is not None:
+            return (opcode, ())
+
+        if server_message.startswith("{MESSAGE_FROM_CLIENT}"):
+            sender_username, sender_message = get_body(server_message).split("_", 1)
+            return (messages.MESSAGE_FROM_CLIENT, (sender_username, sender_message))
+        if server_message.startswith("{MESSAGE_FROM_CHANNEL}"):
+            channel_name, sender_username, channel_message = get_body(server_message).split("_", 2)
+            return (messages.MESSAGE_FROM_CHANNEL, (channel_name, sender_username, channel_message))
+        if server_message.startswith("{SERVER_CHANNEL_"):
+            opcode = OPCODES_BY_SERVER_CHANNEL_HEADER.get(server_message[:server_message.index("}")+1])
+            if opcode is not None:
+                return (opcode, (get_body(server_message),))
+        if server_message.startswith(SERVER_LOGIN_SUCCESSFUL_PREFIX):
+            return (messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL, (parse_unsigned(server_message[len(SERVER_LOGIN_SUCCESSFUL_PREFIX):]),))
+        if server_message.startswith(SERVER_PROFILE_HEADER):
+            return (messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, decode_profile(get_body(server_message)))
+        if server_message.startswith("{'"):
+            # The string of a python dict, sent by the servers before the profile codec
+            user_data = ast.literal_eval(server_message)
+            return (messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, tuple(user_data[key] for key in USER_FIELDS))
+        if server_message.startswith("{SERVER_PROTOCOL}"):
+            return (messages.SERVER_PROTOCOL, (get_body(server_message),))
+        if server_message.startswith(SERVER_SESSION_HEADER):
+            session_token, profile = get_body(server_message).split("|", 1)
+            return (messages.SERVER_SESSION, (session_token,) + decode_profile(profile))
+        if server_message.startswith("{SERVER_SESSION_RESUMED}"):
+            return (messages.SERVER_SESSION_RESUMED, (get_body(server_message),))
+        if server_message.startswith(SERVER_PRESENCE_SNAPSHOT_HEADER):
+            more_parts, usernames_field = get_body(server_message).split("_", 1)
+            return (messages.SERVER_PRESENCE_SNAPSHOT, (parse_unsigned(more_parts), usernames_field))
+        if server_message.startswith(SERVER_PRESENCE_DELTA_HEADER):
+            online_usernames_field, offline_usernames_field = get_body(server_message).split("_", 1)
+            return (messages.SERVER_PRESENCE_DELTA, (online_usernames_field, offline_usernames_field))
+    except (ValueError, IndexError, KeyError, SyntaxError) as exception:
+        raise MalformedMessageException("{0} : {1}".format(server_message[:64], exception))
+
+    return (None, ())
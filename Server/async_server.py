@@ -0,0 +1,278 @@
+"""
+asyncio engine of the server ( python -m <top_level>.Server.server --engine asyncio ).
+
+The AsyncServer speaks exactly the same protocol as the selectors loop of the Server ( text & binary ), because it reuses all its handlers
+( login, UID login, register, communication, message relay, protocol negotiation ). Only the transport is different:
+every connection is served by its own coroutine that reads with a StreamReader and answers with a StreamWriter.
+
+What asyncio gives us on top of the selectors loop:
+- timeouts : the handshake, heartbeat & idle timeouts of the Server ( its timer wheel ) are expired by a task of the loop, no read creates a timer of its own
+- presence : the deltas of the presence subscribers are sent by another task, once per presence tick
+- backpressure : a connection stops being read while its own responses wait inside the transport ( writer.drain() )
+- rate limits : the coroutine of a throttled connection sleeps until its buckets refilled, nothing is read in the meantime
+- offloading : the DB queries run on the DB executor, whose completion socket is watched with loop.add_reader()
+
+The admin socket ( --admin-port / --admin-socket ) is served by asyncio as well, with the metrics of Server.create_metrics().
+"""
+
+import asyncio  # Event loop, streams & timeouts
+from ..Protocol.framing import FrameDecoder, FrameTooLargeException, RECV_BUFFER_SIZE  # Same framing as the selectors loop
+from .metrics import MAX_ADMIN_REQUEST_SIZE  # Longest request line of the admin socket
+from .server import Server  # All the protocol handlers are shared with the selectors loop
+
+
+class AsyncClientSession:
+    # Same attributes as the ClientSession that the handlers & the ConnectionRegistry rely on, but the socket is replaced by the asyncio streams
+    __slots__ = ("reader", "writer", "fd", "client_address", "username", "frame_decoder", "closed", "binary_protocol", "offline_inbox_pending", "channels", "last_activity", "heartbeat_time", "rate_buckets")
+
+    def __init__(self, reader, writer):
+        """
+        Everything the asyncio engine has to remember about one connected client
+        """
+
+        self.reader = reader
+        self.writer = writer
+        self.fd = writer.get_extra_info("socket").fileno()
+        self.client_address = writer.get_extra_info("peername")
+        self.username = None
+        self.frame_decoder = FrameDecoder()
+        self.closed = False
+        self.binary_protocol = False
+        self.offline_inbox_pending = False
+        self.channels = None
+        self.last_activity = 0.0
+        self.heartbeat_time = 0.0
+        self.rate_buckets = None
+
+
+class AsyncServer(Server):
+    def __init__(self, IPv4, PORT, monitoringFileName, **server_options):
+        """
+        Same as the Server ( the server socket, the loggers, the DB executor, the registry and the timer wheel are created by it ), but served by asyncio.
+        The asyncio engine runs in a single process : it can't be a worker of a WorkerPool, reuse_port=True raises ValueError.
+        """
+
+        if server_options.get("reuse_port"):
+            raise ValueError("The asyncio engine runs in a single process, it can't share its port with the workers of a WorkerPool")
+
+        super().__init__(IPv4, PORT, monitoringFileName, **server_options)
+
+        # asyncio accepts the connections on the same server socket & watches the DB executor itself, the selector of the Server isn't used
+        self.selector.unregister(self.server_socket)
+        self.selector.unregister(self.db_executor.completion_socket)
+        self.selector.close()
+
+    def serve_forever(self):
+        """
+        Runs the asyncio event loop until the process is stopped
+        """
+
+        asyncio.run(self.serve_forever_async())
+
+    async def serve_forever_async(self):
+        """
+        Accepts the connections on the server socket and serves every connection with handle_connection()
+        """
+
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.db_executor.completion_socket, self.db_executor.run_completion_callbacks)
+
+        for admin_server_socket in self.create_admin_sockets():
+            await asyncio.start_server(self.handle_admin_connection, sock=admin_server_socket, limit=MAX_ADMIN_REQUEST_SIZE)
+
+        # Wakes up whenever the next connection timer is due, re-checked at least every second since new timers can be earlier
+        self.loop.create_task(self.expire_connection_timers_forever())
+        self.loop.create_task(self.flush_presence_forever())
+
+        asyncio_server = await asyncio.start_server(self.handle_connection, sock=self.server_socket, limit=RECV_BUFFER_SIZE)
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+
+    async def expire_connection_timers_forever(self):
+        """
+        Not intended for use outside class. The asyncio version of the timer handling of Server.serve_forever().
+        """
+
+        while True:
+            timeout = self.timer_wheel.next_timeout(self.loop.time())
+            await asyncio.sleep(1.0 if timeout is None else min(timeout, 1.0))
+
+            self.loop_time = self.loop.time()
+            self.expire_connection_timers()
+
+    async def flush_presence_forever(self):
+        """
+        Not intended for use outside class. The asyncio version of the presence deltas of Server.serve_forever(). Sleeps a whole tick while nothing changed.
+        """
+
+        while True:
+            timeout = self.presence.next_timeout(self.loop.time())
+            await asyncio.sleep(self.presence.tick if timeout is None else timeout)
+
+            self.loop_time = self.loop.time()
+            self.presence.flush(self.loop_time)
+
+    async def handle_admin_connection(self, reader, writer):
+        """
+        Not intended for use outside class. Answers the request line of an admin connection with the metrics and closes the connection.
+        """
+
+        try:
+            admin_request = await asyncio.wait_for(reader.readline(), 5.0)
+            writer.write(self.render_admin_response(admin_request))
+            await writer.drain()
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            # Silent, too long ( above the limit of the reader ) or reset requests don't get an answer
+            pass
+        finally:
+            writer.close()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Not intended for use outside class. Serves a single client connection until it's closed.
+        """
+
+        client_session = AsyncClientSession(reader, writer)
+        client_session.last_activity = self.loop.time()
+
+        # The watermarks of the transport are the watermarks of the selectors loop. drain() waits while the outbound data is above the high watermark.
+        writer.transport.set_write_buffer_limits(high=self.outbound_high_watermark, low=self.outbound_low_watermark)
+
+        self.connection_registry.add(client_session)
+        self.connections_accepted.increment()
+        self.schedule_connection_timer(client_session)
+
+        logger_info_message = "New connection established with >> {0}".format(client_session.client_address)
+        self.file_logger.info(logger_info_message)
+        self.stream_logger.info(logger_info_message)
+
+        try:
+            while not client_session.closed:
+                # A timed out connection is closed by check_connection_timer(), the read returns b"" afterwards
+                client_data = await reader.read(RECV_BUFFER_SIZE)
+                if not client_data:
+                    break
+
+                client_session.last_activity = self.loop_time = self.loop.time()
+
+                # A single read can contain several messages or only a part of one. Handle every complete message.
+                try:
+                    client_frames = client_session.frame_decoder.feed(client_data)
+                except FrameTooLargeException as exception:
+                    self.stream_logger.critical("{0}. Client address : {1}".format(exception.error_msg, client_session.client_address))
+                    self.file_logger.critical("{0}. Client address : {1}".format(exception.error_msg, client_session.client_address))
+                    break
+
+                for client_frame in client_frames:
+                    throttle_wait = self.handle_client_message(client_frame, client_session)
+
+                    # A rate limit was hit. Nothing is read from the client while the coroutine sleeps, then the same frame is tried again.
+                    while throttle_wait and not client_session.closed:
+                        await asyncio.sleep(throttle_wait)
+                        self.loop_time = self.loop.time()
+                        throttle_wait = self.handle_client_message(client_frame, client_session)
+
+                    if client_session.closed:
+                        break
+
+                # Backpressure : don't read more from a client that doesn't read its responses
+                await writer.drain()
+
+                # The stored messages of the username are sent batch by batch, each one once the transport took the previous one
+                await self.send_offline_inbox(client_session)
+        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+            # Handle a reset connection just like a closed one
+            pass
+        finally:
+            self.close_client_connection(client_session)
+
+    async def send_offline_inbox(self, client_session):
+        """
+        Not intended for use outside class. Drains the offline inbox of the session batch by batch, each one once the transport took the previous one.
+        Stops while a batch is read from the spill file, resume_offline_inbox() continues once it's there.
+        """
+
+        while client_session.offline_inbox_pending and not client_session.closed:
+            self.drain_offline_inbox(client_session)
+
+            if self.offline_inbox.is_spilled(client_session.username):
+                return
+
+            try:
+                await client_session.writer.drain()
+            except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+                # The coroutine of the connection closes it
+                return
+
+    def resume_offline_inbox(self, client_session):
+        """
+        Not intended for use outside class. The coroutine of the session might wait for a message of the client, the rest of the inbox is sent by its own task.
+        """
+
+        client_session.offline_inbox_pending = True
+        self.loop.create_task(self.send_offline_inbox(client_session))
+
+    def send_frame_to_client(self, client_session, frame):
+        """
+        Hands the framed message ( bytes ) to the transport of the client session. The transport writes it as soon as the socket is writable.
+        Messages for sessions that are no longer connected are dropped, slow clients are disconnected once outbound_max_size is exceeded.
+        send_to_client() of the Server encodes & frames the message and calls this method.
+        """
+
+        if client_session.closed:
+            return
+
+        transport = client_session.writer.transport
+        transport.write(frame)
+
+        if transport.get_write_buffer_size() > self.outbound_max_size:
+            logger_message = "Outbound queue limit exceeded ( {0} bytes ). Closing the connection to the slow client {1}".format(
+                transport.get_write_buffer_size(), client_session.client_address
+            )
+            self.stream_logger.critical(logger_message)
+            self.file_logger.critical(logger_message)
+            self.slow_client_disconnects.increment()
+            self.close_client_connection(client_session)
+
+    def close_timed_out_connection(self, client_session, reason, timeout_counter):
+        """
+        Not intended for use outside class. A silent peer doesn't read either, its outbound data is dropped instead of waiting for it.
+        """
+
+        super().close_timed_out_connection(client_session, reason, timeout_counter)
+        client_session.writer.transport.abort()
+
+    def client_outbound_size(self, client_session):
+        """
+        Not intended for use outside class. Returns the number of bytes waiting inside the transport of the client session.
+        """
+
+        return client_session.writer.transport.get_write_buffer_size()
+
+    def close_client_connection(self, client_session):
+        """
+        Not intended for use outside class. Forgets everything about the client session ( including its username ) and closes its transport.
+        """
+
+        if not self.connection_registry.remove(client_session):
+            # Already closed
+            return
+        client_session.closed = True
+        self.connections_closed.increment()
+        self.channel_registry.leave_all(client_session)
+        self.presence.unsubscribe(client_session)
+        self.timer_wheel.cancel(client_session)
+
+        if client_session.username is not None:
+            self.presence.mark_changed(client_session.username, True, self.loop_time)
+
+        transport = client_session.writer.transport
+        if transport.get_write_buffer_size() > self.outbound_max_size:
+            # A slow client is dropped without waiting for its outbound data
+            transport.abort()
+        else:
+            transport.close()
+
+        logger_info_string = "Connection lost with {0}".format(client_session.client_address)
+        self.stream_logger.info(logger_info_string)
+        self.file_logger.info(logger_info_string)
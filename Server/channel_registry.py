@@ -0,0 +1,141 @@
+"""
+The group channels of the server : named channels that the communication sessions join, leave and post to.
+
+A post is fanned out to every member of the channel. The server encodes the {MESSAGE_FROM_CHANNEL} message at most once per protocol
+( text & binary ) and hands the same frame ( bytes ) to the outbound queue of every member, nothing is formatted per recipient.
+
+The membership belongs to the connection : a closed session leaves all its channels, a reconnecting client joins them again.
+In the multi-process mode every worker only knows its own members, a post is forwarded once to every sibling worker ( WORKER_CHANNEL_POST ).
+"""
+
+# The most characters of a channel name
+MAX_CHANNEL_NAME_LENGTH = 64
+
+# Upper bounds of the member counts that the fan-out latencies are grouped by. Bigger channels are counted by the last group.
+FANOUT_SIZE_CLASSES = (10, 100, 1000, 10000)
+
+
+class ChannelRegistry:
+    def __init__(self):
+        """
+        channels -- > keys : Channel name | values : dict with the member sessions as keys ( None as values ). A dict keeps the join order & removes in O(1).
+        The names of the channels of a session are stored on the session itself ( .channels ), so leaving all of them never scans the channels.
+        """
+
+        self.channels = dict()
+
+        self.joins = 0
+        self.leaves = 0
+        self.largest_channel = 0
+
+    def __len__(self):
+        """Returns the number of channels with at least one member"""
+        return len(self.channels)
+
+    def members(self, channel_name):
+        """
+        Returns the dict of the member sessions of the channel or None. The dict must not be changed by the caller.
+        """
+
+        return self.channels.get(channel_name)
+
+    def is_member(self, client_session, channel_name):
+        """Checks if the session joined the channel"""
+        return client_session.channels is not None and channel_name in client_session.channels
+
+    def join(self, client_session, channel_name):
+        """
+        Adds the session to the members of the channel. The channel is created by its first member.
+        Returns False if the session was already a member.
+        """
+
+        if self.is_member(client_session, channel_name):
+            return False
+
+        members = self.channels.get(channel_name)
+        if members is None:
+            members = self.channels[channel_name] = dict()
+        members[client_session] = None
+
+        # Most of the sessions never join a channel, their set is only created by the first join
+        if client_session.channels is None:
+            client_session.channels = set()
+        client_session.channels.add(channel_name)
+
+        self.joins += 1
+        if len(members) > self.largest_channel:
+            self.largest_channel = len(members)
+
+        return True
+
+    def leave(self, client_session, channel_name):
+        """
+        Removes the session from the members of the channel. The channel is deleted with its last member.
+        Returns False if the session wasn't a member.
+        """
+
+        if not self.is_member(client_session, channel_name):
+            return False
+
+        client_session.channels.discard(channel_name)
+        self.remove_member(client_session, channel_name)
+
+        return True
+
+    def leave_all(self, client_session):
+        """
+        Removes the session from all its channels ( the session is closed )
+        """
+
+        if not client_session.channels:
+            return
+
+        for channel_name in client_session.channels:
+            self.remove_member(client_session, channel_name)
+        client_session.channels = None
+
+    def remove_member(self, client_session, channel_name):
+        """
+        Not intended for use outside class.
+        """
+
+        members = self.channels[channel_name]
+        del members[client_session]
+
+        if not members:
+            del self.channels[channel_name]
+
+        self.leaves += 1
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the registry
+        """
+
+        return {
+            "channels": len(self.channels),
+            "memberships": sum(len(members) for members in self.channels.values()),
+            "joins": self.joins,
+            "leaves": self.leaves,
+            "largest_channel": self.largest_channel,
+        }
+
+
+def is_valid_channel_name(channel_name):
+    """
+    Checks the name of a channel : not empty, at most MAX_CHANNEL_NAME_LENGTH characters and no character that the text protocol uses as a separator
+    """
+
+    return 0 < len(channel_name) <= MAX_CHANNEL_NAME_LENGTH and not any(character in channel_name for character in "_{}|:")
+
+
+def get_fanout_size_class(member_count):
+    """
+    Returns the label ( str ) of the FANOUT_SIZE_CLASSES group of a channel with member_count members, e.g. "<=100"
+    """
+
+    for size_bound in FANOUT_SIZE_CLASSES:
+        if member_count <= size_bound:
+            return "<={0}".format(size_bound)
+
+    return ">{0}".format(FANOUT_SIZE_CLASSES[-1])
@@ -0,0 +1,107 @@
+from collections import deque  # Outbound queue of encoded frames waiting to be written to the socket
+from ..Protocol.framing import FrameDecoder  # Every connection needs its own incremental frame decoder
+
+# The most chunks handed to a single sendmsg() call. Linux allows up to 1024 ( IOV_MAX ).
+MAX_CHUNKS_PER_SEND = 64
+
+
+class ClientSession:
+    # Tens of thousands of sessions can be alive at the same time. __slots__ keeps every session small and the attribute access fast.
+    __slots__ = (
+        "client_socket_token", "fd", "client_address", "username", "frame_decoder",
+        "outbound_queue", "outbound_queue_size", "reading_paused", "closed", "binary_protocol",
+        "offline_inbox_pending", "channels", "last_activity", "heartbeat_time", "rate_buckets", "throttled_frames"
+    )
+
+    def __init__(self, client_socket_token, client_address):
+        """
+        Everything the server has to remember about one connected client socket:
+        its address, the username once it registered for communication, the frame decoder for the incoming data and the queue with the outgoing data that the kernel didn't accept yet.
+        """
+
+        self.client_socket_token = client_socket_token
+
+        # The registry & the selector both key the session by its file descriptor. It's stored because fileno() returns -1 after close().
+        self.fd = client_socket_token.fileno()
+
+        # Stored once, getpeername() raises as soon as the peer reset the connection
+        self.client_address = client_address
+
+        # Set by the ConnectionRegistry after {CLIENT_COMMUNICATION_DATA}
+        self.username = None
+
+        self.frame_decoder = FrameDecoder()
+
+        # Encoded frames ( bytes or memoryview ) that still have to be written. The first chunk might have been written partially already.
+        self.outbound_queue = deque()
+        self.outbound_queue_size = 0
+
+        # True while the server doesn't read from the socket because its outbound queue is above the high watermark
+        self.reading_paused = False
+
+        self.closed = False
+
+        # Every connection starts with the text protocol. Set by the server once the client negotiated the binary protocol ( {CLIENT_PROTOCOL} ).
+        self.binary_protocol = False
+
+        # True while the stored messages of the username are still being sent ( Read Server.drain_offline_inbox() )
+        self.offline_inbox_pending = False
+
+        # Names of the joined channels, created by the first join ( Read channel_registry.py )
+        self.channels = None
+
+        # Loop time of the last data received from the peer & of the last {SERVER_HEARTBEAT} sent to it ( Read Server.check_connection_timer() )
+        self.last_activity = 0.0
+        self.heartbeat_time = 0.0
+
+        # The token buckets of the connection, created by the first limited message ( Read rate_limiter.py )
+        self.rate_buckets = None
+
+        # The frames that were read but not handled yet because of a rate limit. The session isn't read while it's not None.
+        self.throttled_frames = None
+
+    def queue_outbound(self, data):
+        """
+        Appends the encoded data at the end of the outbound queue. Nothing is written to the socket.
+        """
+
+        self.outbound_queue.append(data)
+        self.outbound_queue_size += len(data)
+
+    def flush_outbound(self):
+        """
+        Writes as much of the outbound queue as the kernel accepts right now, without blocking.
+        Returns True if the queue is empty afterwards.
+        Socket errors like BrokenPipeError or ConnectionResetError are passed on to the caller.
+        """
+
+        outbound_queue = self.outbound_queue
+
+        while outbound_queue:
+            # Gather several frames into one system call
+            if len(outbound_queue) == 1:
+                chunks = (outbound_queue[0],)
+            else:
+                chunks = [outbound_queue[i] for i in range(min(len(outbound_queue), MAX_CHUNKS_PER_SEND))]
+
+            try:
+                sent = self.client_socket_token.sendmsg(chunks)
+            except (BlockingIOError, InterruptedError):
+                return False
+
+            self.outbound_queue_size -= sent
+
+            # Drop the chunks that were written completely and keep the unwritten rest of a partially written one
+            for chunk in chunks:
+                chunk_size = len(chunk)
+
+                if sent >= chunk_size:
+                    outbound_queue.popleft()
+                    sent -= chunk_size
+                else:
+                    outbound_queue[0] = memoryview(chunk)[sent:]
+
+                    # Short write. The kernel buffer is full, wait for EVENT_WRITE
+                    return False
+
+        return True
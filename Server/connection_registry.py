@@ -0,0 +1,88 @@
+class ConnectionRegistry:
+    def __init__(self):
+        """
+        Keeps track of every connected client session. Two dicts are kept consistent with each other:
+
+        sessions_by_fd -- > keys : File descriptor of the client socket | values : ClientSession ( every connected socket )
+        sessions_by_username -- > keys : Username | values : ClientSession ( only the communication sockets, after {CLIENT_COMMUNICATION_DATA} )
+
+        The username of a session is stored on the session itself, so adding, looking up and removing a session never has to scan the dicts.
+        """
+
+        self.sessions_by_fd = dict()
+        self.sessions_by_username = dict()
+
+    def __len__(self):
+        """Returns the number of connected sockets"""
+        return len(self.sessions_by_fd)
+
+    def __iter__(self):
+        """Iterates over all the connected sessions"""
+        return iter(self.sessions_by_fd.values())
+
+    def __contains__(self, username):
+        """Checks if a communication socket is registered for the username"""
+        return username in self.sessions_by_username
+
+    def add(self, client_session):
+        """Registers a new connected session"""
+        self.sessions_by_fd[client_session.fd] = client_session
+
+    def get_by_fd(self, fd):
+        """Returns the session of the file descriptor or None"""
+        return self.sessions_by_fd.get(fd)
+
+    def get_by_username(self, username):
+        """Returns the communication session of the username or None"""
+        return self.sessions_by_username.get(username)
+
+    def bind_username(self, client_session, username):
+        """
+        Makes the session the communication session of the username.
+        A previous session of the same username loses the username ( the newest communication socket receives the messages ),
+        and a previous username of the same session is released.
+        Returns the previous session that lost the username or None. Everything it did with the username ( channels, presence ) has to end as well.
+        """
+
+        if client_session.username is not None and self.sessions_by_username.get(client_session.username) is client_session:
+            del self.sessions_by_username[client_session.username]
+
+        previous_session = self.sessions_by_username.get(username)
+        if previous_session is not None:
+            previous_session.username = None
+
+        client_session.username = username
+        self.sessions_by_username[username] = client_session
+
+        return previous_session
+
+    def release_username(self, username):
+        """
+        Takes the username away from its local communication session, e.g. because it connected to a sibling worker ( the newest communication socket receives the messages ).
+        Returns the session that lost the username or None. The session stays registered by its file descriptor.
+        """
+
+        client_session = self.sessions_by_username.pop(username, None)
+        if client_session is not None:
+            client_session.username = None
+
+        return client_session
+
+    def remove(self, client_session):
+        """
+        Forgets the session and releases its username.
+        Returns False if the session wasn't registered ( already removed ).
+        """
+
+        if self.sessions_by_fd.pop(client_session.fd, None) is None:
+            return False
+
+        username = client_session.username
+        if username is not None and self.sessions_by_username.get(username) is client_session:
+            del self.sessions_by_username[username]
+
+        return True
+
+    def usernames(self):
+        """Returns a view of all the usernames that currently have a communication socket"""
+        return self.sessions_by_username.keys()
@@ -0,0 +1,231 @@
+"""
+Database access layer of the server.
+
+sqlite3 calls block. A slow query or a slow commit on the event loop thread stalls every connected client, so the queries run on a bounded
+pool of threads instead. Every thread opens its own connection to the DB ( a sqlite3 connection must not be shared between threads ).
+
+The results are handed back to the event loop through a socket pair : a finished query queues its future and writes a wake up byte.
+The event loop watches the other end of the socket pair ( completion_socket ) like any other socket and calls run_completion_callbacks(),
+which runs the callbacks of the finished queries on the event loop thread. The handlers can therefore keep using send_to_client() & the registry without locks.
+
+A callback that raises never reaches the event loop. Its exception is handed to the callback_error_handler together with the client session the callback
+was submitted for, the server logs it and closes only that session. The other callbacks & connections aren't affected.
+"""
+
+import socket  # Wake up socket pair between the DB threads and the event loop
+import threading  # Thread local connections & the counters shared with the DB threads
+import time  # Queue wait & query latencies
+import traceback  # Default report of a failed callback
+from collections import deque  # Finished queries waiting for the event loop, latency samples
+from concurrent.futures import ThreadPoolExecutor  # Bounded pool of DB threads
+from ..DB import queries  # Connections with the tuned statement cache
+
+# The percentiles of the stats are computed over the latest samples only
+LATENCY_SAMPLES = 4096
+
+
+class DatabaseExecutor:
+    def __init__(self, db_path, max_workers=4, callback_error_handler=None):
+        """
+        Runs the queries on max_workers threads, each with its own connection to the DB at db_path.
+        Register completion_socket for reading on the event loop and call run_completion_callbacks() when it's readable.
+        callback_error_handler -- > Called with ( CLIENT SESSION or None, EXCEPTION ) on the event loop thread when a callback raised. Defaults to printing the traceback.
+        """
+
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.callback_error_handler = callback_error_handler or print_callback_error
+
+        # Connection of the current DB thread
+        self.thread_local = threading.local()
+
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db", initializer=self.open_thread_connection)
+
+        # ( CALLBACK, FUTURE, TIMINGS, CLIENT SESSION ) of the finished queries. deque.append() & .popleft() are thread safe.
+        self.completed_queries = deque()
+
+        self.completion_socket, self.wakeup_socket = socket.socketpair()
+        self.completion_socket.setblocking(False)
+        self.wakeup_socket.setblocking(False)
+
+        # Only touched on the event loop thread
+        self.submitted_queries = 0
+        self.completed_query_count = 0
+        self.failed_queries = 0
+        self.failed_callbacks = 0
+        self.max_queue_depth = 0
+        self.wait_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.query_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+        # Queries that a DB thread is running right now
+        self.running_queries = 0
+        self.running_queries_lock = threading.Lock()
+
+    def open_thread_connection(self):
+        """
+        Not intended for use outside class. Runs once inside every DB thread.
+        """
+
+        self.thread_local.connection = queries.connect(self.db_path)
+
+    def submit(self, callback, query_function, *query_arguments, client_session=None):
+        """
+        Runs query_function(DB_CONNECTION, *query_arguments) on a DB thread.
+        Once it finished, callback(future) is called on the event loop thread. future.result() returns the result of the query or raises its exception.
+        Queries of a single client aren't ordered, every request of the protocol is answered on its own.
+        client_session -- > The session the callback answers. It's handed to the callback_error_handler if the callback raises.
+        """
+
+        self.submitted_queries += 1
+
+        # [ SUBMIT TIME, START TIME, END TIME ]. The DB thread adds the start & the end time.
+        timings = [time.perf_counter()]
+
+        future = self.thread_pool.submit(self.run_query, timings, query_function, query_arguments)
+        future.add_done_callback(lambda future: self.query_done(callback, future, timings, client_session))
+
+        queue_depth = self.get_queue_depth()
+        if queue_depth > self.max_queue_depth:
+            self.max_queue_depth = queue_depth
+
+        return future
+
+    def run_query(self, timings, query_function, query_arguments):
+        """
+        Not intended for use outside class. Runs on a DB thread.
+        """
+
+        timings.append(time.perf_counter())
+
+        with self.running_queries_lock:
+            self.running_queries += 1
+        try:
+            return query_function(self.thread_local.connection, *query_arguments)
+        finally:
+            with self.running_queries_lock:
+                self.running_queries -= 1
+
+            timings.append(time.perf_counter())
+
+    def query_done(self, callback, future, timings, client_session):
+        """
+        Not intended for use outside class. Runs on the DB thread that finished the query and wakes up the event loop.
+        """
+
+        self.completed_queries.append((callback, future, timings, client_session))
+
+        try:
+            self.wakeup_socket.send(b"\x00")
+        except BlockingIOError:
+            # The socket buffer is full of wake up bytes, the event loop will wake up anyway
+            pass
+
+    def call_on_event_loop(self, callback, future, client_session=None):
+        """
+        Thread safe. Hands a future that was resolved outside of the DB executor ( e.g. by the registration pipeline ) to the event loop,
+        which calls callback(future) from run_completion_callbacks(). The stats of the executor don't count it.
+        """
+
+        self.query_done(callback, future, None, client_session)
+
+    def run_callback(self, callback, future, client_session=None):
+        """
+        Call this on the event loop thread. Calls callback(future) and hands an exception of the callback to the callback_error_handler instead of raising it.
+        """
+
+        try:
+            callback(future)
+        except Exception as exception:
+            self.failed_callbacks += 1
+            self.callback_error_handler(client_session, exception)
+
+    def run_completion_callbacks(self):
+        """
+        Call this on the event loop thread when completion_socket is readable. Runs the callbacks of all the finished queries.
+        """
+
+        try:
+            while self.completion_socket.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        completed_queries = self.completed_queries
+        while completed_queries:
+            callback, future, timings, client_session = completed_queries.popleft()
+
+            if timings is None:
+                # Not a query of the executor
+                self.run_callback(callback, future, client_session)
+                continue
+
+            self.completed_query_count += 1
+
+            if future.cancelled() or future.exception() is not None:
+                self.failed_queries += 1
+
+            # A cancelled query never started
+            if len(timings) == 3:
+                submit_time, start_time, end_time = timings
+                self.wait_latencies.append(start_time - submit_time)
+                self.query_latencies.append(end_time - start_time)
+
+            self.run_callback(callback, future, client_session)
+
+    def get_queue_depth(self):
+        """
+        Returns the number of queries waiting for a free DB thread
+        """
+
+        return self.submitted_queries - self.completed_query_count - len(self.completed_queries) - self.running_queries
+
+    def stats(self):
+        """
+        Returns a dict with the counters and the latencies ( in milliseconds ) of the executor, used to size the pool
+        """
+
+        wait_latencies = sorted(self.wait_latencies)
+        query_latencies = sorted(self.query_latencies)
+
+        return {
+            "workers": self.max_workers,
+            "submitted": self.submitted_queries,
+            "completed": self.completed_query_count,
+            "failed": self.failed_queries,
+            "failed_callbacks": self.failed_callbacks,
+            "in_flight": self.submitted_queries - self.completed_query_count,
+            "queue_depth": self.get_queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "wait_ms_avg": average(wait_latencies) * 1000,
+            "wait_ms_p99": percentile(wait_latencies, 0.99) * 1000,
+            "query_ms_avg": average(query_latencies) * 1000,
+            "query_ms_p99": percentile(query_latencies, 0.99) * 1000,
+        }
+
+    def shutdown(self):
+        """
+        Waits for the submitted queries and stops the DB threads
+        """
+
+        self.thread_pool.shutdown(wait=True)
+        self.completion_socket.close()
+        self.wakeup_socket.close()
+
+
+def print_callback_error(client_session, exception):
+    """
+    Default callback_error_handler of the DatabaseExecutor. Prints the traceback of the exception.
+    """
+
+    traceback.print_exception(exception)
+
+
+def average(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
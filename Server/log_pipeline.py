@@ -0,0 +1,304 @@
+"""
+Asynchronous, batched backend of the stream & file loggers of the server.
+
+The handlers of the server log every accepted connection, every login and every disconnect, twice ( terminal & connections.log ).
+With a plain StreamHandler / FileHandler the event loop formats every record and waits for the terminal & the disk each time.
+
+The LogPipeline moves all of that to a background thread:
+
+event loop -- > LogPipelineHandler -- > bounded queue -- > writer thread -- > one write() per batch & output
+
+- the event loop only creates the record and puts it into the queue, it never blocks : a full queue drops the record and counts it
+- the writer thread formats the records and writes everything it finds in the queue with a single write() & flush() per output
+- connections.log is rotated once it would grow above max_bytes ( connections.log.1, connections.log.2, ... like RotatingFileHandler )
+- sampling : keep only every n-th record of a level ( e.g. 1 of 10 INFO records during a connection storm ). Warnings & errors are never sampled by default.
+
+The drops are reported inside the log itself as soon as the queue has room again.
+"""
+
+import logging  # Records, formatters & the handler base class
+import os  # Rotation of the log file
+import queue  # Queue between the event loop & the writer thread
+import sys  # The terminal output
+import threading  # The writer thread
+import atexit  # Write the queued records when the process exits normally
+
+# Destinations of the records
+STREAM_OUTPUT = "stream"
+FILE_OUTPUT = "file"
+
+
+class LogPipelineHandler(logging.Handler):
+    def __init__(self, log_pipeline, output, sample_rates=None):
+        """
+        Puts the records of a logger into the queue of the log pipeline. Nothing is formatted or written on the calling thread.
+        output -- > STREAM_OUTPUT or FILE_OUTPUT
+        sample_rates -- > keys : Level | values : Only every n-th record of the level is kept. Levels that aren't inside the dict are never sampled.
+        """
+
+        super().__init__()
+
+        self.log_pipeline = log_pipeline
+        self.output = output
+        self.sample_rates = dict(sample_rates or {})
+
+        # keys : Level | values : Number of records of the level seen so far
+        self.sample_counters = dict.fromkeys(self.sample_rates, 0)
+
+    def handle(self, record):
+        """
+        Samples & queues the record. The queue is thread safe, the lock of logging.Handler isn't needed.
+        """
+
+        sample_rate = self.sample_rates.get(record.levelno)
+        if sample_rate is not None:
+            sample_counter = self.sample_counters[record.levelno]
+            self.sample_counters[record.levelno] = sample_counter + 1
+
+            if sample_counter % sample_rate:
+                self.log_pipeline.sampled_out += 1
+                return False
+
+        if not self.filter(record):
+            return False
+
+        self.log_pipeline.put(self.output, record)
+        return True
+
+    def emit(self, record):
+        self.log_pipeline.put(self.output, record)
+
+
+class LogPipeline:
+    def __init__(self, file_name, formatter, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000, batch_size=512, flush_interval=0.1, stream=None):
+        """
+        Starts the writer thread of the stream & file outputs.
+
+        file_name -- > The log file ( connections.log )
+        formatter -- > Formats the records of both outputs
+        max_bytes -- > The log file is rotated before it grows above this size. 0 disables the rotation.
+        backup_count -- > Rotated files kept ( file_name.1 is the newest one )
+        queue_size -- > The most records waiting for the writer thread. Records logged while the queue is full are dropped.
+        batch_size -- > The most records written together
+        flush_interval -- > Seconds the writer thread waits for the first record of a batch before it checks for drops to report
+        stream -- > The terminal output. Defaults to sys.stderr, just like logging.StreamHandler.
+        """
+
+        if max_bytes < 0 or backup_count < 0 or queue_size < 1 or batch_size < 1:
+            raise ValueError("The log pipeline needs max_bytes >= 0, backup_count >= 0, queue_size >= 1 and batch_size >= 1")
+
+        self.file_name = os.path.abspath(file_name)
+        self.formatter = formatter
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stream = stream if stream is not None else sys.stderr
+
+        # A SimpleQueue is implemented in C and much cheaper to put into than a queue.Queue. It's unbounded, put() checks the size itself.
+        self.queue = queue.SimpleQueue()
+        self.queue_size = queue_size
+
+        # Written by the event loop thread only
+        self.dropped = 0
+        self.sampled_out = 0
+
+        # Written by the writer thread only
+        self.reported_drops = 0
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+
+        self.file = None
+        self.file_inode = None
+        self.open_file()
+
+        self.writer_thread = threading.Thread(target=self.run_writer, name="log-pipeline-writer", daemon=True)
+        self.writer_thread.start()
+
+        atexit.register(self.close)
+
+    def create_handler(self, output, sample_rates=None):
+        """
+        Returns a handler that sends the records of a logger to the output ( STREAM_OUTPUT or FILE_OUTPUT ) of the pipeline
+        """
+
+        return LogPipelineHandler(self, output, sample_rates)
+
+    def put(self, output, record):
+        """
+        Queues the record for the output without blocking. Returns False if the queue was full and the record was dropped.
+        """
+
+        # Only the event loop thread puts records and the writer thread only makes the queue shorter, so the size never passes queue_size
+        if self.queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            return False
+
+        self.queue.put((output, record))
+        return True
+
+    def run_writer(self):
+        """
+        Not intended for use outside class. Runs on the writer thread : waits for records and writes them in batches until close() is called.
+        """
+
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+
+            # Everything that is already waiting is written together
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopped = None in batch
+            self.write_batch([entry for entry in batch if entry is not None])
+
+            if stopped:
+                return
+
+    def write_batch(self, batch):
+        """
+        Not intended for use outside class. Formats the records of the batch and writes them with one write() per output.
+        """
+
+        stream_lines = []
+        file_lines = []
+
+        # The drops can't be logged when they happen ( the queue is full ), they're reported with the next batch instead
+        dropped = self.dropped
+        if dropped != self.reported_drops:
+            drop_message = self.format_drop_message(dropped - self.reported_drops)
+            stream_lines.append(drop_message)
+            file_lines.append(drop_message)
+            self.reported_drops = dropped
+
+        for output, record in batch:
+            try:
+                line = self.formatter.format(record) + "\n"
+            except Exception:
+                # A record that can't be formatted must not stop the writer thread
+                line = "Unformattable log record : {0!r}\n".format(record.msg)
+
+            if output == FILE_OUTPUT:
+                file_lines.append(line)
+            else:
+                stream_lines.append(line)
+
+        if stream_lines:
+            try:
+                self.stream.write("".join(stream_lines))
+                self.stream.flush()
+            except (OSError, ValueError):
+                # The terminal is gone, the file still gets the records
+                pass
+
+        if file_lines:
+            self.write_file("".join(file_lines))
+
+        self.written += len(batch)
+        if batch:
+            self.batches += 1
+
+    def format_drop_message(self, dropped_records):
+        """
+        Not intended for use outside class. Returns the formatted line that reports the dropped records.
+        """
+
+        record = logging.LogRecord("log_pipeline", logging.WARNING, __file__, 0, "Log queue full, dropped {0} records", (), None)
+        record.msg = record.msg.format(dropped_records)
+
+        return self.formatter.format(record) + "\n"
+
+    def write_file(self, data):
+        """
+        Not intended for use outside class. Appends the data to the log file and rotates the file first if the data doesn't fit anymore.
+        """
+
+        data = data.encode("utf-8")
+
+        try:
+            # Another worker process ( --workers ) might have rotated the file already, the records belong into the new one
+            try:
+                file_status = os.stat(self.file_name)
+            except FileNotFoundError:
+                file_status = None
+
+            if file_status is None or file_status.st_ino != self.file_inode:
+                self.open_file()
+                file_size = 0 if file_status is None else os.fstat(self.file.fileno()).st_size
+            else:
+                file_size = file_status.st_size
+
+            if self.max_bytes and file_size and file_size + len(data) > self.max_bytes:
+                self.rotate_file()
+
+            self.file.write(data)
+            self.file.flush()
+        except OSError as exception:
+            try:
+                self.stream.write("Couldn't write the log file {0} : {1}\n".format(self.file_name, exception))
+            except (OSError, ValueError):
+                pass
+
+    def open_file(self):
+        """
+        Not intended for use outside class. ( Re- )opens the log file in append mode.
+        """
+
+        if self.file is not None:
+            self.file.close()
+
+        self.file = open(self.file_name, "ab")
+        self.file_inode = os.fstat(self.file.fileno()).st_ino
+
+    def rotate_file(self):
+        """
+        Not intended for use outside class. file_name -- > file_name.1 -- > file_name.2 ... The oldest backup is deleted.
+        """
+
+        self.file.close()
+        self.file = None
+
+        if self.backup_count:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = "{0}.{1}".format(self.file_name, i)
+                if os.path.exists(source):
+                    os.replace(source, "{0}.{1}".format(self.file_name, i + 1))
+
+            os.replace(self.file_name, self.file_name + ".1")
+        else:
+            os.remove(self.file_name)
+
+        self.rotations += 1
+        self.open_file()
+
+    def close(self):
+        """
+        Writes the queued records and stops the writer thread. Waits at most a second for the queue to drain.
+        """
+
+        if not self.writer_thread.is_alive():
+            return
+
+        self.queue.put(None)
+        self.writer_thread.join(1.0)
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the pipeline
+        """
+
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "rotations": self.rotations,
+        }
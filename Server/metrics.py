@@ -0,0 +1,290 @@
+"""
+Metrics of the server : counters, gauges & latency histograms, exposed on the admin socket ( --admin-port / --admin-socket of the server ).
+
+Recording has to stay cheap enough to be always on:
+- Counter.increment() & Histogram.observe() only add to a few integers on the event loop thread. There are no locks, every server process has its own registry.
+- Histograms use fixed, exponential buckets ( 1 µs, 2 µs, 4 µs, ... ~134 s ). The percentiles are estimated from the buckets when the metrics are read.
+- Gauges & collectors are functions that are only called when the metrics are read ( e.g. len() of the connection registry, stats() of the DB executor ).
+
+The admin socket answers a single request line and closes the connection:
+text -- > one metric per line ( name{label="value"} value ), the histograms as _count, _sum, _max & quantiles, like the Prometheus text format
+json -- > the same metrics as a JSON document
+
+Query it with ( from outside the top level directory ):
+python -m <top_level>.Server.metrics --port 9100 [--json]
+python -m <top_level>.Server.metrics --unix-socket /tmp/server_admin.sock
+"""
+
+import argparse  # Command line options of the admin query
+import bisect  # Find the bucket of a histogram value
+import json  # JSON output of the admin socket
+import socket  # Query the admin socket
+
+# Upper bounds ( in seconds ) of the histogram buckets. Values above the last bound are counted by the overflow bucket.
+HISTOGRAM_BUCKETS = tuple(1e-6 * 2 ** i for i in range(28))
+
+# The quantiles written for every histogram
+HISTOGRAM_QUANTILES = (0.5, 0.99, 0.999)
+
+# The most bytes of an admin request line
+MAX_ADMIN_REQUEST_SIZE = 64
+
+TEXT_FORMAT = "text"
+JSON_FORMAT = "json"
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        """A value that only grows ( messages received, connections accepted, ... )"""
+        self.value = 0
+
+    def increment(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bucket_counts", "count", "sum", "max")
+
+    def __init__(self):
+        """The distribution of a latency ( in seconds ). Read the module docstring for the buckets."""
+        self.bucket_counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        Records a single value ( in seconds )
+        """
+
+        self.bucket_counts[bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, fraction):
+        """
+        Returns the estimated value at the fraction ( 0.99 -> p99 ) : the upper bound of the bucket that contains it, at most the largest value recorded
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = fraction * self.count
+        cumulative_count = 0
+
+        for i, bucket_count in enumerate(self.bucket_counts):
+            cumulative_count += bucket_count
+
+            if cumulative_count >= rank and bucket_count:
+                return min(HISTOGRAM_BUCKETS[i], self.max) if i < len(HISTOGRAM_BUCKETS) else self.max
+
+        return self.max
+
+    def summary(self):
+        """
+        Returns a dict with the count, the sum, the average, the max & the quantiles of the histogram
+        """
+
+        histogram_summary = {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+        for fraction in HISTOGRAM_QUANTILES:
+            histogram_summary["p{0:g}".format(fraction * 100)] = self.quantile(fraction)
+
+        return histogram_summary
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Creates & keeps the metrics of a server process. Every metric is identified by its name & its labels ( keyword arguments ).
+
+        counters, histograms -- > keys : ( NAME, LABELS ) | values : Counter / Histogram
+        gauges -- > keys : ( NAME, LABELS ) | values : Function that returns the current value
+        collectors -- > keys : Prefix | values : Function that returns a dict of values, every key becomes the gauge <prefix>_<key>
+        """
+
+        self.counters = dict()
+        self.histograms = dict()
+        self.gauges = dict()
+        self.collectors = dict()
+
+    def counter(self, name, **labels):
+        """
+        Returns the counter with the name & the labels. It's created the first time.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = Counter()
+
+        return counter
+
+    def histogram(self, name, **labels):
+        """
+        Returns the histogram with the name & the labels. It's created the first time.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+
+        return histogram
+
+    def gauge(self, name, function, **labels):
+        """
+        Registers a gauge. function() is called every time the metrics are read.
+        """
+
+        self.gauges[(name, tuple(sorted(labels.items())))] = function
+
+    def collector(self, prefix, function):
+        """
+        Registers a collector. function() returns a dict ( e.g. stats() of the DB executor ) and is called every time the metrics are read.
+        """
+
+        self.collectors[prefix] = function
+
+    def snapshot(self):
+        """
+        Returns all the metrics inside a dict -> { "counters" : [...], "gauges" : [...], "histograms" : [...] }
+        Every entry is a dict with the name, the labels & the value(s) of a metric.
+        """
+
+        gauges = [
+            {"name": name, "labels": dict(labels), "value": function()}
+            for (name, labels), function in self.gauges.items()
+        ]
+
+        for prefix, function in self.collectors.items():
+            for key, value in function().items():
+                gauges.append({"name": "{0}_{1}".format(prefix, key), "labels": {}, "value": value})
+
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": counter.value}
+                for (name, labels), counter in self.counters.items()
+            ],
+            "gauges": gauges,
+            "histograms": [
+                dict(name=name, labels=dict(labels), **histogram.summary())
+                for (name, labels), histogram in self.histograms.items()
+            ],
+        }
+
+    def render(self, output_format=TEXT_FORMAT):
+        """
+        Returns the metrics ( str ) in the text or in the JSON format
+        """
+
+        snapshot = self.snapshot()
+
+        if output_format == JSON_FORMAT:
+            return json.dumps(snapshot, indent=1) + "\n"
+
+        lines = []
+
+        for metric_type in ("counters", "gauges"):
+            lines.append("# {0}".format(metric_type))
+            for metric in snapshot[metric_type]:
+                lines.append("{0} {1}".format(format_metric_name(metric["name"], metric["labels"]), format_value(metric["value"])))
+
+        lines.append("# histograms ( seconds )")
+        for metric in snapshot["histograms"]:
+            for suffix in ("count", "sum", "avg", "max"):
+                lines.append("{0} {1}".format(format_metric_name(metric["name"] + "_" + suffix, metric["labels"]), format_value(metric[suffix])))
+
+            for fraction in HISTOGRAM_QUANTILES:
+                quantile_labels = dict(metric["labels"], quantile="{0:g}".format(fraction))
+                lines.append("{0} {1}".format(format_metric_name(metric["name"], quantile_labels), format_value(metric["p{0:g}".format(fraction * 100)])))
+
+        return "\n".join(lines) + "\n"
+
+
+def format_metric_name(name, labels):
+    """
+    Returns name{label="value",...} or only the name if there are no labels
+    """
+
+    if not labels:
+        return name
+
+    return "{0}{{{1}}}".format(name, ",".join('{0}="{1}"'.format(key, value) for key, value in sorted(labels.items())))
+
+
+def format_value(value):
+    """
+    Integers are written as they are, floats with up to 9 significant digits
+    """
+
+    if isinstance(value, float):
+        return "{0:.9g}".format(value)
+
+    return str(value)
+
+
+def parse_admin_request(request):
+    """
+    Returns the output format ( TEXT_FORMAT or JSON_FORMAT ) of an admin request line ( bytes ). Anything unknown gets the text format.
+    """
+
+    command = request.strip().lower()
+
+    return JSON_FORMAT if command == JSON_FORMAT.encode() else TEXT_FORMAT
+
+
+def query_admin_socket(address, output_format=TEXT_FORMAT, timeout=5.0):
+    """
+    Sends a request to the admin socket of a server and returns the answer ( str ).
+    address -- > ( HOST, PORT ) of --admin-port or the path of --admin-socket
+    """
+
+    if isinstance(address, str):
+        admin_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        admin_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    with admin_socket:
+        admin_socket.settimeout(timeout)
+        admin_socket.connect(address)
+        admin_socket.sendall(output_format.encode() + b"\n")
+
+        chunks = []
+        while True:
+            data = admin_socket.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+
+    return b"".join(chunks).decode("utf-8")
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Prints the metrics of a running server. Run it from outside the top level directory : python -m <top_level>.Server.metrics")
+    argument_parser.add_argument("--host", default="127.0.0.1", help="Host of the admin port. Defaults to 127.0.0.1")
+    argument_parser.add_argument("--port", type=int, default=None, help="The --admin-port of the server")
+    argument_parser.add_argument("--unix-socket", default=None, help="The --admin-socket of the server")
+    argument_parser.add_argument("--json", action="store_true", help="Print the JSON format instead of the text format")
+    arguments = argument_parser.parse_args()
+
+    if arguments.unix_socket is not None:
+        admin_address = arguments.unix_socket
+    elif arguments.port is not None:
+        admin_address = (arguments.host, arguments.port)
+    else:
+        argument_parser.error("--port or --unix-socket is required")
+
+    print(query_admin_socket(admin_address, JSON_FORMAT if arguments.json else TEXT_FORMAT), end="")
@@ -0,0 +1,392 @@
+"""
+Store & forward of the {CLIENT_MESSAGE} messages whose receiver has no communication socket.
+
+Without an inbox the server answers {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} and the message is lost.
+The OfflineInbox keeps the messages of every offline username until the username sends {CLIENT_COMMUNICATION_DATA} again:
+
+send_message_to_another_client() -- > store() -- > memory tier ( per username deque ) -- > spill file ( SQLite ), once the memory tier is full
+save_client_for_communication() -- > take() & take_spilled() in batches -- > one write of all the {MESSAGE_FROM_CLIENT} messages of a batch
+
+The server only stores messages for usernames of the users table ( Read Server.send_message_to_another_client() ), any other receiver gets
+{CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} right away.
+
+Limits:
+- limit_per_user : the most messages stored for a username. A message above the limit ( or above another limit ) isn't stored, the sender gets
+  {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} like before.
+- limit_per_sender : the most messages stored from a single sender ( the server passes the host of the sending connection, the usernames of the
+  communication sockets aren't authenticated ). A single client can't fill max_messages for everyone else.
+- memory_messages : the most messages kept in memory. Above it the inboxes that received their last message the longest time ago are moved to the spill file,
+  until only 3/4 of memory_messages are left in memory ( a single transaction, so a full memory tier doesn't cost a commit per message ).
+- max_messages : the most messages stored in total, memory & spill file.
+
+Ordering : the messages of a username are delivered in the order they were stored. The spilled part of an inbox is always older than the part in memory,
+because an inbox is only ever spilled as a whole and appended to the spill file. take() therefore returns nothing while a part of the inbox is spilled,
+take_spilled() has to read that part first. The server keeps the order while an inbox is drained as well ( Read Server.send_message_to_another_client() ).
+
+The spill file is only ever touched by the spill thread, the event loop never waits for SQLite. The spill thread runs one statement batch after the other,
+so a read always sees every spill that was submitted before it. The read messages are handed back to the event loop through the DB executor
+( DatabaseExecutor.call_on_event_loop() ), like the results of the registration pipeline.
+
+Delivery is at most once : a message is removed from the inbox as soon as it's handed to the connection of the receiver. A spilled batch is removed when
+it's read, a receiver that disconnects while its batch is read doesn't get it.
+
+The spill file is scratch space, not a durable store. It's created on the first spill, emptied when it's opened and deleted when the server exits.
+"""
+
+import os  # Remove the spill file
+import sqlite3  # The spill file
+import tempfile  # Default location of the spill file
+import atexit  # Delete the spill file when the process exits
+from collections import OrderedDict, deque  # Memory tier : inboxes in LRU order, messages in FIFO order
+from concurrent.futures import ThreadPoolExecutor  # The spill thread
+
+# A spill moves inboxes to the file until the memory tier is down to this fraction of memory_messages
+SPILL_LOW_WATERMARK = 0.75
+
+CREATE_SPILL_TABLE = """
+CREATE TABLE IF NOT EXISTS offline_messages (
+    Sequence INTEGER PRIMARY KEY,
+    Username TEXT NOT NULL,
+    Sender TEXT NOT NULL,
+    Message TEXT NOT NULL,
+    SenderKey TEXT NOT NULL
+)
+"""
+CREATE_SPILL_INDEX = "CREATE INDEX IF NOT EXISTS offline_messages_by_username ON offline_messages ( Username, Sequence )"
+INSERT_SPILLED_MESSAGE = "INSERT INTO offline_messages ( Username, Sender, Message, SenderKey ) VALUES ( ?, ?, ?, ? )"
+SELECT_SPILLED_MESSAGES = "SELECT Sequence, Sender, Message, SenderKey FROM offline_messages WHERE Username = ? ORDER BY Sequence LIMIT ?"
+DELETE_SPILLED_MESSAGES = "DELETE FROM offline_messages WHERE Username = ? AND Sequence <= ?"
+
+
+class OfflineInbox:
+    def __init__(self, executor, limit_per_user=1000, limit_per_sender=10000, memory_messages=10000, max_messages=1000000, file_name=None):
+        """
+        executor -- > The DB executor, its event loop gets the messages read from the spill file ( Read db_executor.py )
+        limit_per_user -- > The most messages stored for a single username. 0 disables the inbox.
+        limit_per_sender -- > The most messages stored from a single sender
+        memory_messages -- > The most messages kept in memory, the rest is spilled to the file
+        max_messages -- > The most messages stored in total
+        file_name -- > The spill file. Defaults to a temporary file.
+        """
+
+        if limit_per_user < 0 or limit_per_sender < 0 or memory_messages < 0 or max_messages < 0:
+            raise ValueError("The offline inbox needs limit_per_user >= 0, limit_per_sender >= 0, memory_messages >= 0 and max_messages >= 0")
+
+        self.executor = executor
+        self.limit_per_user = limit_per_user
+        self.limit_per_sender = limit_per_sender
+        self.memory_messages = memory_messages
+        self.max_messages = max_messages
+        self.file_name = file_name
+
+        # keys : Username | values : deque of ( SENDER USERNAME, MESSAGE, SENDER KEY ). The inbox that received a message the longest time ago comes first.
+        self.memory_inboxes = OrderedDict()
+        self.memory_size = 0
+
+        # keys : Username | values : Number of messages stored ( memory & spill file ) / Number of messages inside the spill file / Number of spilled messages being read
+        self.message_counts = dict()
+        self.spilled_counts = dict()
+        self.reading_counts = dict()
+        self.size = 0
+
+        # keys : Sender key | values : Number of messages stored from the sender
+        self.sender_counts = dict()
+
+        # A single thread, the statements on the spill file run in the order they were submitted. Started on the first spill.
+        self.spill_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="offline_inbox")
+
+        # Opened by the spill thread on the first spill
+        self.spill_connection = None
+        self.spill_file_name = None
+
+        self.stored = 0
+        self.delivered = 0
+        self.rejected = 0
+        self.spills = 0
+        self.spilled_messages = 0
+        self.failed_spills = 0
+        self.lost_messages = 0
+
+    def __len__(self):
+        """Returns the number of stored messages"""
+        return self.size
+
+    def __contains__(self, username):
+        """Checks if there are stored messages for the username"""
+        return username in self.message_counts
+
+    def is_spilled(self, username):
+        """Checks if the oldest messages of the username are inside the spill file ( or being read from it ). take() doesn't return anything until take_spilled() read them."""
+        return username in self.spilled_counts or username in self.reading_counts
+
+    def store(self, username, sender_username, message, sender_key=None):
+        """
+        Stores the message for the offline username. Returns False if a limit doesn't allow it, the message isn't stored in that case.
+        sender_key -- > Counted against limit_per_sender. Defaults to the sender username.
+        """
+
+        if sender_key is None:
+            sender_key = sender_username
+
+        if (self.message_counts.get(username, 0) >= self.limit_per_user or self.sender_counts.get(sender_key, 0) >= self.limit_per_sender
+                or self.size >= self.max_messages):
+            self.rejected += 1
+            return False
+
+        memory_inbox = self.memory_inboxes.get(username)
+        if memory_inbox is None:
+            memory_inbox = self.memory_inboxes[username] = deque()
+        else:
+            self.memory_inboxes.move_to_end(username)
+
+        memory_inbox.append((sender_username, message, sender_key))
+        self.memory_size += 1
+        self.message_counts[username] = self.message_counts.get(username, 0) + 1
+        self.sender_counts[sender_key] = self.sender_counts.get(sender_key, 0) + 1
+        self.size += 1
+        self.stored += 1
+
+        if self.memory_size > self.memory_messages:
+            self.spill_inboxes()
+
+        return True
+
+    def take(self, username, count):
+        """
+        Removes & returns the oldest ( up to count ) messages of the username from the memory tier. A list of tuples -> ( SENDER USERNAME, MESSAGE ), oldest first.
+        Returns an empty list while is_spilled(username), the spilled messages are older and have to be taken with take_spilled() first.
+        """
+
+        memory_inbox = self.memory_inboxes.get(username)
+        if memory_inbox is None or self.is_spilled(username):
+            return []
+
+        taken_messages = []
+        while memory_inbox and len(taken_messages) < count:
+            sender_username, message, sender_key = memory_inbox.popleft()
+            taken_messages.append((sender_username, message))
+            self.release_sender(sender_key)
+
+        self.memory_size -= len(taken_messages)
+        if not memory_inbox:
+            del self.memory_inboxes[username]
+
+        self.release_messages(username, len(taken_messages))
+        self.delivered += len(taken_messages)
+
+        return taken_messages
+
+    def take_spilled(self, username, count, callback, client_session=None):
+        """
+        Removes the oldest ( up to count ) spilled messages of the username on the spill thread. callback(taken_messages) is called on the event loop thread
+        with the list of tuples -> ( SENDER USERNAME, MESSAGE ), oldest first. A failed read hands an empty list to the callback, the messages are lost.
+        Returns False without reading anything if the username has no spilled messages or a read of them is already running ( its callback comes first ).
+        client_session -- > Handed to the callback_error_handler of the executor if the callback raises
+        """
+
+        spilled_count = self.spilled_counts.get(username)
+        if spilled_count is None or username in self.reading_counts:
+            return False
+
+        reading_count = min(count, spilled_count)
+        if spilled_count > reading_count:
+            self.spilled_counts[username] = spilled_count - reading_count
+        else:
+            del self.spilled_counts[username]
+        self.reading_counts[username] = reading_count
+
+        future = self.spill_thread.submit(self.read_spilled_messages, username, reading_count)
+        future.add_done_callback(lambda future: self.executor.call_on_event_loop(
+            lambda future: self.finish_take_spilled(username, future, callback), future, client_session
+        ))
+
+        return True
+
+    def finish_take_spilled(self, username, future, callback):
+        """
+        Not intended for use outside class. Runs on the event loop thread once the spill thread read the messages of take_spilled().
+        """
+
+        reading_count = self.reading_counts.pop(username)
+
+        # The spill thread read exactly the reading_count oldest rows of the username, unless a spill or the read itself failed
+        rows = future.result() if not future.cancelled() and future.exception() is None else []
+
+        taken_messages = []
+        for sender_username, message, sender_key in rows:
+            taken_messages.append((sender_username, message))
+            self.release_sender(sender_key)
+
+        self.release_messages(username, reading_count)
+        self.delivered += len(taken_messages)
+        self.lost_messages += reading_count - len(taken_messages)
+
+        callback(taken_messages)
+
+    def release_messages(self, username, count):
+        """
+        Not intended for use outside class. The count messages of the username left the inbox.
+        """
+
+        if not count:
+            return
+
+        message_count = self.message_counts[username] - count
+        if message_count:
+            self.message_counts[username] = message_count
+        else:
+            del self.message_counts[username]
+
+        self.size -= count
+
+    def release_sender(self, sender_key):
+        """
+        Not intended for use outside class. A message of the sender left the inbox.
+        """
+
+        sender_count = self.sender_counts[sender_key] - 1
+        if sender_count:
+            self.sender_counts[sender_key] = sender_count
+        else:
+            del self.sender_counts[sender_key]
+
+    def spill_inboxes(self):
+        """
+        Not intended for use outside class. Moves the memory part of the least recently written inboxes to the end of their part inside the spill file,
+        until the memory tier is down to SPILL_LOW_WATERMARK. The spill thread writes everything in a single transaction.
+        An inbox that is being read isn't spilled, its memory part has to stay behind the messages that are being read.
+        """
+
+        memory_size_target = int(self.memory_messages * SPILL_LOW_WATERMARK)
+        spilled_rows = []
+        reading_inboxes = []
+
+        while self.memory_size > memory_size_target and self.memory_inboxes:
+            username, memory_inbox = self.memory_inboxes.popitem(last=False)
+
+            if username in self.reading_counts:
+                reading_inboxes.append((username, memory_inbox))
+                continue
+
+            spilled_rows.extend((username, sender_username, message, sender_key) for sender_username, message, sender_key in memory_inbox)
+
+            self.spilled_counts[username] = self.spilled_counts.get(username, 0) + len(memory_inbox)
+            self.memory_size -= len(memory_inbox)
+            self.spilled_messages += len(memory_inbox)
+
+        # They received their last message the longest time ago
+        for username, memory_inbox in reversed(reading_inboxes):
+            self.memory_inboxes[username] = memory_inbox
+            self.memory_inboxes.move_to_end(username, last=False)
+
+        if not spilled_rows:
+            return
+
+        future = self.spill_thread.submit(self.write_spilled_messages, spilled_rows)
+        future.add_done_callback(lambda future: self.spill_done(future, spilled_rows))
+        self.spills += 1
+
+    def spill_done(self, future, spilled_rows):
+        """
+        Not intended for use outside class. Runs on the spill thread. A failed spill is accounted for on the event loop thread.
+        """
+
+        if future.cancelled() or future.exception() is not None:
+            self.executor.call_on_event_loop(lambda future: self.finish_failed_spill(spilled_rows), future)
+
+    def finish_failed_spill(self, spilled_rows):
+        """
+        Not intended for use outside class. The spilled messages are lost. The spilled counts stay, the reads of the usernames find fewer messages & count them as lost.
+        """
+
+        self.failed_spills += 1
+        for username, sender_username, message, sender_key in spilled_rows:
+            self.release_sender(sender_key)
+
+    def write_spilled_messages(self, spilled_rows):
+        """
+        Not intended for use outside class. Runs on the spill thread.
+        """
+
+        if self.spill_connection is None:
+            self.open_spill_file()
+
+        self.spill_connection.executemany(INSERT_SPILLED_MESSAGE, spilled_rows)
+        self.spill_connection.commit()
+
+    def read_spilled_messages(self, username, count):
+        """
+        Not intended for use outside class. Runs on the spill thread. Removes & returns the oldest ( up to count ) spilled messages of the username.
+        A list of tuples -> ( SENDER USERNAME, MESSAGE, SENDER KEY )
+        """
+
+        rows = self.spill_connection.execute(SELECT_SPILLED_MESSAGES, (username, count)).fetchall()
+
+        if rows:
+            self.spill_connection.execute(DELETE_SPILLED_MESSAGES, (username, rows[-1][0]))
+            self.spill_connection.commit()
+
+        return [(sender_username, message, sender_key) for sequence, sender_username, message, sender_key in rows]
+
+    def open_spill_file(self):
+        """
+        Not intended for use outside class. Runs on the spill thread. Creates the spill file ( an existing file is emptied ).
+        """
+
+        if self.file_name is None:
+            file_descriptor, self.spill_file_name = tempfile.mkstemp(prefix="offline_inbox_", suffix=".db")
+            os.close(file_descriptor)
+        else:
+            self.spill_file_name = self.file_name
+
+        # close() runs on another thread, once the spill thread stopped
+        self.spill_connection = sqlite3.connect(self.spill_file_name, check_same_thread=False)
+
+        # Scratch data : losing it in a crash is fine, waiting for the disk isn't
+        self.spill_connection.execute("PRAGMA journal_mode = MEMORY")
+        self.spill_connection.execute("PRAGMA synchronous = OFF")
+        # The file of an older version of the inbox has fewer columns
+        self.spill_connection.execute("DROP TABLE IF EXISTS offline_messages")
+        self.spill_connection.execute(CREATE_SPILL_TABLE)
+        self.spill_connection.execute(CREATE_SPILL_INDEX)
+        self.spill_connection.commit()
+
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Waits for the statements of the spill thread, stops it and deletes the spill file. The messages inside the spill file are lost.
+        """
+
+        self.spill_thread.shutdown(wait=True)
+
+        if self.spill_connection is None:
+            return
+
+        self.spill_connection.close()
+        self.spill_connection = None
+
+        try:
+            os.remove(self.spill_file_name)
+        except OSError:
+            pass
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the inbox
+        """
+
+        return {
+            "messages": self.size,
+            "in_memory": self.memory_size,
+            "spilled": self.size - self.memory_size,
+            "usernames": len(self.message_counts),
+            "senders": len(self.sender_counts),
+            "stored": self.stored,
+            "delivered": self.delivered,
+            "rejected": self.rejected,
+            "spills": self.spills,
+            "spilled_messages": self.spilled_messages,
+            "failed_spills": self.failed_spills,
+            "lost": self.lost_messages,
+        }
@@ -0,0 +1,175 @@
+"""
+Hashes & verifies the passwords of the logins and the registrations on a pool of processes.
+
+A password hash ( Read DB/passwords.py ) costs tens of milliseconds of CPU on purpose. Inside the event loop every login would stall all the
+connected clients for that long. The PasswordHasher runs them inside a ProcessPoolExecutor instead : the hashes of several logins run on several CPUs
+next to the event loop, they don't take the threads of the DB executor away from the queries and the memory of scrypt ( 16 MB per hash ) stays out of the server process.
+
+The results are handed back to the event loop by the DB executor ( DatabaseExecutor.call_on_event_loop() ), the same way the finished queries are :
+the callbacks run on the event loop thread and can keep using send_to_client() & the registry without locks.
+
+workers=0 hashes on the event loop thread itself. It's only meant for comparisons ( Read Benchmarks/bench_password_hashing.py ).
+"""
+
+import multiprocessing  # Start method of the hashing processes
+import os  # The hashing processes watch the server process
+import threading  # Watcher thread inside every hashing process
+import time  # Latency of the hashes
+from collections import deque  # Latency samples
+from concurrent.futures import Future, ProcessPoolExecutor  # Pool of hashing processes
+from ..DB import passwords  # The hash functions & the stored format
+from .db_executor import LATENCY_SAMPLES, average, percentile  # Same latency statistics as the DB executor
+
+
+class PasswordHasher:
+    def __init__(self, db_executor, workers=2, scheme=passwords.SCRYPT, cost=None):
+        """
+        Starts workers hashing processes. The callbacks are handed back to the event loop by the db_executor ( Read db_executor.py ).
+        scheme, cost -- > Used for the new hashes ( Read DB/passwords.py ). The stored hashes are verified with their own scheme & cost.
+        """
+
+        if workers < 0:
+            raise ValueError("The password hasher needs workers >= 0")
+
+        self.db_executor = db_executor
+        self.workers = workers
+        self.scheme = scheme
+        self.cost = passwords.check_scheme(scheme, cost)
+
+        # The processes are spawned, not forked : the server already runs the threads of the DB executor & of the log pipeline at this point
+        self.process_pool = None
+        if workers:
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=watch_server_process, initargs=(os.getpid(),)
+            )
+
+            # Start all the processes now, the first logins shouldn't wait for a new interpreter
+            for warm_up_future in [self.process_pool.submit(int) for i in range(workers)]:
+                warm_up_future.result()
+
+        # Verified instead of a missing user, so an unknown username takes as long as a wrong password
+        self.dummy_hash = passwords.hash_password("", scheme, self.cost)
+
+        # Only touched on the event loop thread
+        self.submitted_hashes = 0
+        self.completed_hashes = 0
+        self.failed_hashes = 0
+        self.max_in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def hash(self, callback, password, client_session=None):
+        """
+        Hashes the password with the scheme & the cost of the hasher. callback(future) is called on the event loop thread,
+        future.result() returns the value to store inside the Password column.
+        client_session -- > The session the callback answers, closed by the server if the callback raises ( Read db_executor.py )
+        """
+
+        return self.submit(callback, client_session, passwords.hash_password, password, self.scheme, self.cost)
+
+    def verify(self, callback, password, stored_password, client_session=None):
+        """
+        Checks the password against the stored password ( None for a missing user, which is never verified but takes as long ).
+        callback(future) is called on the event loop thread, future.result() is True if the password matches.
+        """
+
+        if stored_password is None:
+            return self.submit(callback, client_session, verify_missing_password, password, self.dummy_hash)
+
+        return self.submit(callback, client_session, passwords.verify_password, password, stored_password)
+
+    def needs_rehash(self, stored_password):
+        """Checks if the stored password has to be replaced by a hash with the scheme & the cost of the hasher ( cheap, no hashing )"""
+        return passwords.needs_rehash(stored_password, self.scheme, self.cost)
+
+    def submit(self, callback, client_session, hash_function, *hash_arguments):
+        """
+        Not intended for use outside class. Runs hash_function(*hash_arguments) on a hashing process.
+        """
+
+        self.submitted_hashes += 1
+        in_flight = self.submitted_hashes - self.completed_hashes
+        if in_flight > self.max_in_flight:
+            self.max_in_flight = in_flight
+
+        submit_time = time.perf_counter()
+
+        if self.process_pool is None:
+            future = Future()
+            try:
+                future.set_result(hash_function(*hash_arguments))
+            except Exception as exception:
+                future.set_exception(exception)
+
+            self.db_executor.run_callback(lambda future: self.hash_done(callback, submit_time, future), future, client_session)
+            return future
+
+        future = self.process_pool.submit(hash_function, *hash_arguments)
+        future.add_done_callback(
+            lambda future: self.db_executor.call_on_event_loop(lambda future: self.hash_done(callback, submit_time, future), future, client_session)
+        )
+
+        return future
+
+    def hash_done(self, callback, submit_time, future):
+        """
+        Not intended for use outside class. Runs on the event loop thread.
+        """
+
+        self.completed_hashes += 1
+        self.latencies.append(time.perf_counter() - submit_time)
+
+        if future.cancelled() or future.exception() is not None:
+            self.failed_hashes += 1
+
+        callback(future)
+
+    def stats(self):
+        """
+        Returns a dict with the counters and the latencies ( in milliseconds, queue wait included ) of the hasher, used to size the pool
+        """
+
+        latencies = sorted(self.latencies)
+
+        return {
+            "workers": self.workers,
+            "cost": self.cost,
+            "submitted": self.submitted_hashes,
+            "completed": self.completed_hashes,
+            "failed": self.failed_hashes,
+            "in_flight": self.submitted_hashes - self.completed_hashes,
+            "max_in_flight": self.max_in_flight,
+            "hash_ms_avg": average(latencies) * 1000,
+            "hash_ms_p99": percentile(latencies, 0.99) * 1000,
+        }
+
+    def shutdown(self):
+        """
+        Waits for the submitted hashes and stops the hashing processes
+        """
+
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=True)
+
+
+def watch_server_process(server_pid):
+    """
+    Runs once inside every hashing process. A terminated server can't shut the pool down, the process stops itself once the server is gone.
+    """
+
+    def watch():
+        while os.getppid() == server_pid:
+            time.sleep(1.0)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="server-watcher", daemon=True).start()
+
+
+def verify_missing_password(password, dummy_hash):
+    """
+    Runs on a hashing process. Verifies the password against the dummy hash and returns False anyway.
+    """
+
+    passwords.verify_password(password, dummy_hash)
+
+    return False
@@ -0,0 +1,187 @@
+"""
+Presence of the usernames : which usernames have a communication socket right now, on this worker ( the connection registry ) or on a sibling worker ( remote_users ).
+
+Before, a client only found out that a username was offline by getting {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} back. Now a client can subscribe to the roster:
+
+{CLIENT_PRESENCE_SUBSCRIBE} -- > The roster once, as one or more {SERVER_PRESENCE_SNAPSHOT} parts ( MAX_FRAME_SIZE limits a single message )
+                                 Afterwards {SERVER_PRESENCE_DELTA} with the usernames that came online & went offline since the last delta
+{CLIENT_PRESENCE_UNSUBSCRIBE} -- > No more deltas
+
+The deltas aren't sent per change. The handlers only mark the username that's about to change ( mark_changed() ), together with its state before the change.
+Once per tick the service compares the marked usernames with their state now : a username that logged out & in again within the tick ( a reconnect ) isn't sent at all,
+every other one is sent once. The delta of a tick is encoded at most once per protocol and every subscriber gets the same frames, exactly like a channel post.
+A login / logout storm costs O(changed usernames) to encode and O(subscribers x changed usernames) bytes to send per tick, independent of the number of online users.
+Only a new subscriber costs O(online users), for its snapshot.
+
+A client applies the deltas as set operations. A subscriber that joined in the middle of a tick can get a username inside the delta that its snapshot already showed.
+Without subscribers nothing is marked at all.
+"""
+
+from ..Protocol import messages  # Opcodes of the snapshot & the delta
+from ..Protocol.roster_codec import encode_usernames  # The username lists of both messages
+
+
+class PresenceService:
+    def __init__(self, is_online, encode_message, send_frame, tick=0.5, chunk_size=1000):
+        """
+        is_online -- > Called with a username, checks if it has a communication socket on any worker
+        encode_message -- > Called with ( BINARY, OPCODE, *FIELDS ), returns the frame ( bytes ) of a server message
+        send_frame -- > Called with ( SESSION, FRAME ) to send an encoded frame. May close the session, which unsubscribes it.
+        tick -- > Seconds the changes are collected before a delta is sent
+        chunk_size -- > The most usernames per snapshot part & per list of a delta
+
+        subscribers -- > keys : Subscribed session | values : None. A dict keeps the subscribe order & removes in O(1).
+        pending_changes -- > keys : Username marked since the last delta | values : Whether it was online at the last delta
+        """
+
+        if tick <= 0 or chunk_size < 1:
+            raise ValueError("The presence needs tick > 0 and chunk_size >= 1")
+
+        self.is_online = is_online
+        self.encode_message = encode_message
+        self.send_frame = send_frame
+        self.tick = tick
+        self.chunk_size = chunk_size
+
+        self.subscribers = dict()
+        self.pending_changes = dict()
+        self.next_flush_time = None
+
+        self.snapshots_sent = 0
+        self.deltas_sent = 0
+        self.changes_marked = 0
+        self.changes_sent = 0
+
+    def __len__(self):
+        """Returns the number of subscribers"""
+        return len(self.subscribers)
+
+    def subscribe(self, client_session, usernames):
+        """
+        Sends the snapshot of the online usernames ( iterable ) to the session and adds it to the subscribers.
+        A session that was subscribed already gets a new snapshot.
+        """
+
+        usernames = list(usernames)
+        binary = client_session.binary_protocol
+        chunk_size = self.chunk_size
+
+        # An empty roster is a single empty part. Every part but the last one has MORE PARTS = 1.
+        parts = [usernames[index:index + chunk_size] for index in range(0, len(usernames), chunk_size)] or [[]]
+        last_part = len(parts) - 1
+
+        # All the parts are sent with a single write
+        snapshot_frame = b"".join([
+            self.encode_message(binary, messages.SERVER_PRESENCE_SNAPSHOT, int(index < last_part), encode_usernames(part))
+            for index, part in enumerate(parts)
+        ])
+
+        self.subscribers[client_session] = None
+        self.snapshots_sent += 1
+        self.send_frame(client_session, snapshot_frame)
+
+    def unsubscribe(self, client_session):
+        """
+        Removes the session from the subscribers. Returns False if it wasn't subscribed.
+        """
+
+        if client_session not in self.subscribers:
+            return False
+
+        del self.subscribers[client_session]
+
+        if not self.subscribers:
+            # Nobody is left to send the marked changes to
+            self.pending_changes.clear()
+            self.next_flush_time = None
+
+        return True
+
+    def mark_changed(self, username, was_online, now):
+        """
+        Called right before the username comes online or goes offline, with its state before the change. The first mark of a tick keeps the state of the last delta.
+        """
+
+        if not self.subscribers or username in self.pending_changes:
+            return
+
+        self.pending_changes[username] = was_online
+        self.changes_marked += 1
+
+        if self.next_flush_time is None:
+            self.next_flush_time = now + self.tick
+
+    def next_timeout(self, now):
+        """
+        Returns the seconds until the next delta is due ( 0 if it's overdue ) or None if no change is marked
+        """
+
+        if self.next_flush_time is None:
+            return None
+
+        return max(0.0, self.next_flush_time - now)
+
+    def flush(self, now):
+        """
+        Sends the delta of the marked usernames to every subscriber once the tick is over. Returns the number of usernames inside the delta.
+        """
+
+        if self.next_flush_time is None or now < self.next_flush_time:
+            return 0
+
+        pending_changes = self.pending_changes
+        self.pending_changes = dict()
+        self.next_flush_time = None
+
+        is_online = self.is_online
+        online_usernames = []
+        offline_usernames = []
+        for username, was_online in pending_changes.items():
+            online = is_online(username)
+            if online != was_online:
+                (online_usernames if online else offline_usernames).append(username)
+
+        changes = len(online_usernames) + len(offline_usernames)
+        if not changes:
+            return 0
+
+        # The same lists for both protocols, only the frames differ
+        chunk_size = self.chunk_size
+        delta_fields = [
+            (encode_usernames(online_usernames[index:index + chunk_size]), encode_usernames(offline_usernames[index:index + chunk_size]))
+            for index in range(0, max(len(online_usernames), len(offline_usernames)), chunk_size)
+        ]
+
+        # keys : binary_protocol of the subscriber ( False / True ) | values : All the delta frames in that protocol, joined for a single write
+        frames = dict()
+
+        # A slow subscriber can be closed by send_frame(), which unsubscribes it while the subscribers are iterated
+        for client_session in tuple(self.subscribers):
+            binary = client_session.binary_protocol
+            frame = frames.get(binary)
+            if frame is None:
+                frame = frames[binary] = b"".join([
+                    self.encode_message(binary, messages.SERVER_PRESENCE_DELTA, online_field, offline_field)
+                    for online_field, offline_field in delta_fields
+                ])
+
+            self.send_frame(client_session, frame)
+            self.deltas_sent += 1
+
+        self.changes_sent += changes
+
+        return changes
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the service
+        """
+
+        return {
+            "subscribers": len(self.subscribers),
+            "pending_changes": len(self.pending_changes),
+            "snapshots_sent": self.snapshots_sent,
+            "deltas_sent": self.deltas_sent,
+            "changes_marked": self.changes_marked,
+            "changes_sent": self.changes_sent,
+        }
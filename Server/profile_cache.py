@@ -0,0 +1,126 @@
+"""
+Cache of the {CLIENT_LOGIN_INFO_UID_SUCCESSFUL} responses.
+
+A reconnect storm logs in the same users over and over. Every UID login used to run a DB query, rebuild the profile dict and serialize it.
+The ProfileCache keeps the finished response frames ( bytes, ready to be written to the socket ) of the most recently used UIDs.
+A UID has one response per encoding ( text & binary protocol, Read ../Protocol/messages.py ), both are kept inside the same entry.
+
+- LRU : at most max_entries responses are kept, the least recently used one is evicted first
+- TTL : a response is only served for ttl seconds after it was cached
+- invalidation : every path that writes a user must call invalidate(UID). A lookup that started before an invalidation never puts its stale
+  result into the cache ( Read lookup_token() ).
+
+Every server process ( worker ) has its own cache. Writes on a sibling worker aren't seen, the TTL bounds how long such a response can be served.
+"""
+
+import time  # Expiration of the entries
+from collections import OrderedDict  # Keeps the entries in LRU order
+
+
+class ProfileCache:
+    def __init__(self, max_entries=10000, ttl=60.0):
+        """
+        max_entries -- > The most responses kept. 0 disables the cache.
+        ttl -- > Seconds a response is served after it was cached
+        """
+
+        if max_entries < 0 or ttl <= 0:
+            raise ValueError("The profile cache needs max_entries >= 0 and ttl > 0")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # keys : UID | values : ( EXPIRATION TIME, { ENCODING : RESPONSE FRAME } ). The least recently used UID comes first.
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, UID, encoding):
+        """
+        Returns the cached response frame of the UID in the given encoding or None
+        """
+
+        entry = self.entries.get(UID)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.monotonic():
+            del self.entries[UID]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        response_frame = entry[1].get(encoding)
+        if response_frame is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(UID)
+        self.hits += 1
+
+        return response_frame
+
+    def lookup_token(self):
+        """
+        Call this before the DB lookup starts and hand the token to put(). The put is skipped if an invalidation happened in between.
+        """
+
+        return self.invalidations
+
+    def put(self, UID, encoding, response_frame, lookup_token):
+        """
+        Caches the response frame of the UID in the given encoding, evicting the least recently used UIDs when the cache is full.
+        The responses of the other encodings of the UID are kept and expire together with it.
+        Returns False if the response wasn't cached ( the cache is disabled or it was invalidated since lookup_token() ).
+        """
+
+        if not self.max_entries or lookup_token != self.invalidations:
+            return False
+
+        entry = self.entries.get(UID)
+        if entry is None or entry[0] <= time.monotonic():
+            entry = self.entries[UID] = (time.monotonic() + self.ttl, dict())
+
+        entry[1][encoding] = response_frame
+        self.entries.move_to_end(UID)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return True
+
+    def invalidate(self, UID):
+        """
+        Drops the cached responses ( all the encodings ) of the UID. Call this every time the user with the UID is written to the DB.
+        """
+
+        self.invalidations += 1
+        self.entries.pop(UID, None)
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the cache, used to size it
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,182 @@
+"""
+Token bucket rate limits of the client messages, so a single chatty client can't monopolize the event loop of the server.
+
+Every limit is a rate ( messages per second ) and a burst ( the most messages accepted at once after a silent period ). Three kinds of limits:
+
+connection -- > all the messages of one connection
+user -- > all the messages of the connections bound to one username ( {CLIENT_COMMUNICATION_DATA} ), even across reconnects
+header -- > the messages of one connection with a given header, e.g. a strict limit on {CLIENT_LOGIN_INFO_USERNAME_PASSWORD} against credential stuffing
+
+A message has to get a token from every bucket that applies to it. If one of them is empty, no token is taken and the server stops reading from
+the connection until the bucket refilled ( Read Server.throttle_client_session() ): the data stays inside the kernel buffers & TCP slows the client down,
+the server doesn't buffer anything for it. In the multi-process mode every worker limits its own connections.
+
+All the limits are disabled by default.
+"""
+
+from ..Protocol import text_protocol  # Header names of the --rate-limit-header option
+
+# Resolution ( in seconds ) of the wheel that resumes the throttled connections
+RATE_LIMIT_TICK = 0.01
+
+# The longest wait that is timed exactly, a longer one is checked again after this many seconds
+RATE_LIMIT_HORIZON = 10.0
+
+# Labels of the limits inside the metrics
+CONNECTION_LIMIT = "connection"
+USER_LIMIT = "user"
+HEADER_LIMIT = "header"
+
+
+class TokenBucket:
+    # One bucket per connection & limited header, __slots__ keeps them small
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        """
+        A full bucket. Refilled with rate tokens per second, up to burst tokens.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        Refills the bucket and returns 0 if it has a token, otherwise the seconds until it has one. No token is taken.
+        """
+
+        tokens = self.tokens + (now - self.updated) * self.rate
+        self.tokens = tokens if tokens < self.burst else self.burst
+        self.updated = now
+
+        if self.tokens >= 1:
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now):
+        """Checks if the bucket refilled completely, it's not different from a new bucket in that case"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    def __init__(self, connection_limit=None, user_limit=None, header_limits=None):
+        """
+        connection_limit, user_limit -- > tuple -> ( RATE, BURST ) or None
+        header_limits -- > keys : Opcode of a client message | values : tuple -> ( RATE, BURST ). None for no header limits.
+        """
+
+        self.connection_limit = connection_limit
+        self.user_limit = user_limit
+        self.header_limits = dict(header_limits or {})
+
+        for rate, burst in [limit for limit in (connection_limit, user_limit) if limit is not None] + list(self.header_limits.values()):
+            if rate <= 0 or burst < 1:
+                raise ValueError("A rate limit needs a rate > 0 and a burst >= 1")
+
+        # The server skips the limiter completely when nothing is limited
+        self.enabled = bool(connection_limit or user_limit or self.header_limits)
+
+        # keys : Username | values : TokenBucket. Full buckets are pruned once the dict doubled since the last pruning.
+        self.user_buckets = dict()
+        self.user_buckets_prune_size = 1024
+
+    def check(self, client_session, opcode, now):
+        """
+        Takes a token from every bucket of the message ( opcode ) of the session. now -- > time.monotonic() or a value read from it shortly before.
+        Returns a tuple -> ( 0, None ) if the message may be handled, otherwise ( SECONDS TO WAIT, LIMIT ) of the emptiest bucket and no token is taken.
+        LIMIT -- > CONNECTION_LIMIT, USER_LIMIT or the opcode of the limited header
+        """
+
+        # keys : None for the connection bucket, the opcode for a header bucket | values : TokenBucket
+        session_buckets = client_session.rate_buckets
+        if session_buckets is None:
+            session_buckets = client_session.rate_buckets = dict()
+
+        buckets = []
+
+        if self.connection_limit is not None:
+            bucket = session_buckets.get(None)
+            if bucket is None:
+                bucket = session_buckets[None] = TokenBucket(*self.connection_limit, now)
+            buckets.append((bucket, CONNECTION_LIMIT))
+
+        header_limit = self.header_limits.get(opcode)
+        if header_limit is not None:
+            bucket = session_buckets.get(opcode)
+            if bucket is None:
+                bucket = session_buckets[opcode] = TokenBucket(*header_limit, now)
+            buckets.append((bucket, opcode))
+
+        if self.user_limit is not None and client_session.username is not None:
+            bucket = self.user_buckets.get(client_session.username)
+            if bucket is None:
+                # Pruned before the new bucket is added, it's full as well and would be pruned with the others
+                if len(self.user_buckets) >= self.user_buckets_prune_size:
+                    self.prune_user_buckets(now)
+                bucket = self.user_buckets[client_session.username] = TokenBucket(*self.user_limit, now)
+            buckets.append((bucket, USER_LIMIT))
+
+        longest_wait = 0.0
+        limit = None
+        for bucket, bucket_limit in buckets:
+            wait = bucket.wait_time(now)
+            if wait > longest_wait:
+                longest_wait = wait
+                limit = bucket_limit
+
+        if longest_wait:
+            return (longest_wait, limit)
+
+        for bucket, bucket_limit in buckets:
+            bucket.tokens -= 1
+
+        return (0.0, None)
+
+    def prune_user_buckets(self, now):
+        """
+        Not intended for use outside class. Forgets the full buckets of the usernames, a new bucket is created full anyway.
+        """
+
+        for username in [username for username, bucket in self.user_buckets.items() if bucket.is_full(now)]:
+            del self.user_buckets[username]
+
+        self.user_buckets_prune_size = max(1024, 2 * len(self.user_buckets))
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the limiter
+        """
+
+        return {
+            "user_buckets": len(self.user_buckets),
+        }
+
+
+def parse_rate_limit(rate_limit):
+    """
+    Returns a tuple -> ( RATE, BURST ) of an option like "20" or "20:40" ( RATE[:BURST], the burst defaults to the rate ).
+    Raises ValueError for anything else.
+    """
+
+    rate, separator, burst = rate_limit.partition(":")
+    rate = float(rate)
+
+    return (rate, float(burst) if separator else max(rate, 1.0))
+
+
+def parse_header_rate_limit(header_rate_limit):
+    """
+    Returns a tuple -> ( OPCODE, ( RATE, BURST ) ) of an option like "CLIENT_LOGIN_INFO_USERNAME_PASSWORD=5:10" ( HEADER=RATE[:BURST] ).
+    Raises ValueError for an unknown header.
+    """
+
+    header, separator, rate_limit = header_rate_limit.partition("=")
+
+    opcode = text_protocol.OPCODES_BY_CLIENT_HEADER.get("{{{0}}}".format(header.strip("{}")))
+    if opcode is None or not separator:
+        raise ValueError("Unknown client header : {0}".format(header))
+
+    return (opcode, parse_rate_limit(rate_limit))
@@ -0,0 +1,185 @@
+"""
+Group commit write path of the registrations.
+
+Committing every registration on its own costs a full fsync per user. The RegistrationPipeline hands the inserts to a single writer thread
+instead. The writer collects the registrations that arrive within batch_window seconds ( at most batch_size of them ) and commits them
+together in one transaction, so a whole batch shares one fsync. The DB runs in WAL mode : the readers of the DB executor keep reading while the writer commits.
+
+Every row is inserted inside its own SAVEPOINT. A row that violates a UNIQUE constraint ( or fails for any other reason of its own ) is rolled back alone,
+the other rows of the batch are still committed. A row whose values can't be stored at all ( e.g. a UID beyond 64 bits ) is rejected before it's queued.
+The callback of every registration runs on the event loop thread ( through the DB executor ) once the transaction that holds its row was committed.
+"""
+
+import queue  # Registrations waiting for the writer thread
+import sqlite3  # Errors of a single row
+import threading  # The writer thread
+import time  # Batch window
+from concurrent.futures import Future  # Result of a single registration
+from ..DB import queries  # Parameterized INSERT of the users table
+
+
+class RegistrationPipeline:
+    def __init__(self, db_path, db_executor, batch_size=64, batch_window=0.002):
+        """
+        Starts the writer thread with its own connection to the DB at db_path.
+        The callbacks are handed back to the event loop by the db_executor ( Read db_executor.py ).
+        batch_size -- > The most registrations committed in a single transaction
+        batch_window -- > Seconds the writer waits for more registrations after the first one of a batch arrived
+        """
+
+        if batch_size < 1:
+            raise ValueError("The batch size must be at least 1")
+
+        self.db_path = db_path
+        self.db_executor = db_executor
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        # ( USER VALUES, FUTURE, CALLBACK, CLIENT SESSION ) of the registrations that weren't committed yet. None stops the writer.
+        self.pending_registrations = queue.Queue()
+
+        # Only touched by the writer thread
+        self.committed_batches = 0
+        self.committed_rows = 0
+        self.rejected_rows = 0
+        self.failed_rows = 0
+        self.largest_batch = 0
+
+        # Only touched by the thread that submits
+        self.invalid_rows = 0
+
+        self.writer_thread = threading.Thread(target=self.run_writer, name="db-writer", daemon=True)
+        self.writer_thread.start()
+
+    def submit(self, callback, user_values, client_session=None):
+        """
+        Queues the insert of a user ( user_values in the order of queries.USER_COLUMNS ).
+        Once its transaction was committed, callback(future) is called on the event loop thread. future.result() is True if the user was added
+        and False if the UID or the username is already taken or the row couldn't be stored. It raises the exception of a transaction that failed as a whole.
+        client_session -- > The session the callback answers, closed by the server if the callback raises ( Read db_executor.py )
+        """
+
+        future = Future()
+
+        # The writer never sees a row that SQLite can't store, it's answered right away ( still through the event loop, like every other result )
+        if not queries.is_valid_user_row(user_values):
+            self.invalid_rows += 1
+            future.set_result(False)
+            self.db_executor.call_on_event_loop(callback, future, client_session)
+            return future
+
+        self.pending_registrations.put((user_values, future, callback, client_session))
+
+        return future
+
+    def run_writer(self):
+        """
+        Not intended for use outside class. The loop of the writer thread.
+        """
+
+        # isolation_level=None : the writer opens & commits the transactions itself
+        DB_CONNECTION = queries.connect(self.db_path, isolation_level=None)
+        queries.enable_wal(DB_CONNECTION)
+
+        # A reply means that the row is durable, every commit has to reach the disk
+        DB_CONNECTION.execute("PRAGMA synchronous = FULL")
+
+        while True:
+            registration = self.pending_registrations.get()
+            if registration is None:
+                break
+
+            batch = [registration]
+            stop_writer = False
+
+            # Collect the registrations that arrive within the batch window
+            batch_deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = batch_deadline - time.monotonic()
+
+                try:
+                    registration = self.pending_registrations.get(timeout=timeout) if timeout > 0 else self.pending_registrations.get_nowait()
+                except queue.Empty:
+                    break
+
+                if registration is None:
+                    stop_writer = True
+                    break
+                batch.append(registration)
+
+            self.commit_batch(DB_CONNECTION, batch)
+
+            if stop_writer:
+                break
+
+        DB_CONNECTION.close()
+
+    def commit_batch(self, DB_CONNECTION, batch):
+        """
+        Not intended for use outside class. Inserts the batch in a single transaction and hands the results back to the event loop.
+        """
+
+        results = []
+
+        try:
+            DB_CONNECTION.execute("BEGIN IMMEDIATE")
+
+            for user_values, future, callback, client_session in batch:
+                DB_CONNECTION.execute("SAVEPOINT registration")
+                try:
+                    queries.insert_user(DB_CONNECTION, user_values)
+                    results.append(True)
+                except sqlite3.IntegrityError:
+                    # Only this row is rolled back
+                    DB_CONNECTION.execute("ROLLBACK TO registration")
+                    results.append(False)
+                except (sqlite3.Error, OverflowError, ValueError):
+                    # Any other error of the row itself ( a value that can't be bound, ... ). If it ended the whole transaction, ROLLBACK TO raises and the batch fails below.
+                    DB_CONNECTION.execute("ROLLBACK TO registration")
+                    results.append(None)
+                DB_CONNECTION.execute("RELEASE registration")
+
+            DB_CONNECTION.execute("COMMIT")
+        except Exception as exception:
+            # The transaction failed as a whole ( disk full, DB locked for too long, ... ). None of the rows was added.
+            if DB_CONNECTION.in_transaction:
+                DB_CONNECTION.execute("ROLLBACK")
+
+            for user_values, future, callback, client_session in batch:
+                future.set_exception(exception)
+                self.db_executor.call_on_event_loop(callback, future, client_session)
+            return
+
+        self.committed_batches += 1
+        self.committed_rows += results.count(True)
+        self.rejected_rows += results.count(False)
+        self.failed_rows += results.count(None)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        for (user_values, future, callback, client_session), result in zip(batch, results):
+            future.set_result(bool(result))
+            self.db_executor.call_on_event_loop(callback, future, client_session)
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the pipeline, used to tune the batch size & window
+        """
+
+        return {
+            "pending": self.pending_registrations.qsize(),
+            "committed_batches": self.committed_batches,
+            "committed_rows": self.committed_rows,
+            "rejected_rows": self.rejected_rows,
+            "failed_rows": self.failed_rows,
+            "invalid_rows": self.invalid_rows,
+            "average_batch": (self.committed_rows + self.rejected_rows + self.failed_rows) / self.committed_batches if self.committed_batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+    def shutdown(self):
+        """
+        Commits the registrations that are already queued and stops the writer thread
+        """
+
+        self.pending_registrations.put(None)
+        self.writer_thread.join()
@@ -1,206 +1,1377 @@
 import socket # Used for handling connections
 import selectors # High level I/O multiplexing
 import logging # Used for stream & file handling in order to monitor connections to the server socket
-import sqlite3 # Connect to the DB in order to send responses back to the clients in order to check login/register data
-from sqlite3.dbapi2 import IntegrityError
 import sys # Close the server when needed
+import os # Build the paths of the DB & log files relative to this module
+import argparse # Command line options of the server ( host, port, log file )
+import time # Latencies of the handlers
+from ..Protocol.framing import FrameTooLargeException, encode_frame, RECV_BUFFER_SIZE # Length-prefixed frames. From outside toplevel > python -m <top_level>.Server.server
+from ..Protocol import messages # Opcodes & fields of the messages, independent of their encoding
+from ..Protocol import text_protocol, binary_protocol # The two encodings a client can speak ( negotiated with {CLIENT_PROTOCOL} )
+from ..Protocol.messages import MalformedMessageException # Raised by both codecs for a message that can't be decoded
+from .client_session import ClientSession # Per-connection state ( frame decoder, outbound queue )
+from .connection_registry import ConnectionRegistry # Finds the sessions by file descriptor & by username in O(1)
+from .worker_pool import WorkerLink, WorkerPool # Multi-process mode : SO_REUSEPORT workers & the links between them
+from .db_executor import DatabaseExecutor # Runs the sqlite3 queries on a pool of threads, away from the selector loop
+from .registration_pipeline import RegistrationPipeline # Commits the registrations in batches ( group commit )
+from .password_hasher import PasswordHasher # Hashes & verifies the passwords on a pool of processes, away from the selector loop
+from .profile_cache import ProfileCache # LRU/TTL cache of the UID login responses
+from .session_tokens import SessionTokens, SECRET_SIZE # Signed tokens of the session logins, checked without the DB
+from .log_pipeline import LogPipeline, STREAM_OUTPUT, FILE_OUTPUT # Formats & writes the log records on a background thread
+from .offline_inbox import OfflineInbox # Stores the messages of offline usernames until they connect again
+from .timer_wheel import TimerWheel # Handshake, heartbeat & idle timeouts of the connections, expired in O(expired connections)
+from .rate_limiter import RateLimiter, parse_rate_limit, parse_header_rate_limit, RATE_LIMIT_TICK, RATE_LIMIT_HORIZON, CONNECTION_LIMIT, USER_LIMIT, HEADER_LIMIT # Token bucket limits of the client messages
+from .channel_registry import ChannelRegistry, is_valid_channel_name, get_fanout_size_class, FANOUT_SIZE_CLASSES # Group channels, fanned out with one encoding per protocol
+from .presence import PresenceService # Roster snapshots & the online / offline deltas, coalesced per tick
+from .metrics import MetricsRegistry, MAX_ADMIN_REQUEST_SIZE, parse_admin_request # Counters, gauges & latency histograms, read through the admin socket
+from ..DB import queries # Parameterized statements & indexes of the users table
+from ..DB import passwords # Schemes of the stored password hashes
+
+# The server is started as a module from outside the top level directory, so the paths can't be relative to the working directory
+SERVER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = queries.DB_PATH
 
 class Server:
-    def __init__(self, IPv4, PORT, monitoringFileName):
+    def __init__(self, IPv4, PORT, monitoringFileName, outbound_high_watermark=256 * 1024, outbound_low_watermark=64 * 1024, outbound_max_size=4 * 1024 * 1024, reuse_port=False, db_workers=4, db_path=DB_PATH, register_batch_size=64, register_batch_window=0.002, profile_cache_size=10000, profile_cache_ttl=60.0, log_max_bytes=10 * 1024 * 1024, log_backup_count=5, log_queue_size=10000, log_info_sample=1, admin_port=None, admin_socket=None, offline_inbox_limit=1000, offline_sender_limit=10000, offline_memory_messages=10000, offline_max_messages=1000000, offline_inbox_file=None, offline_drain_batch=256, handshake_timeout=30.0, heartbeat_interval=30.0, idle_timeout=90.0, timer_tick=0.25, rate_limit_connection=None, rate_limit_user=None, rate_limit_headers=None, password_workers=2, password_scheme=passwords.SCRYPT, password_cost=None, session_token_ttl=3600.0, session_secret=None, presence_tick=0.5, presence_chunk_size=1000, legacy_bind=False):
         """
         A server-type socket using IPv4 & tcp connected ( AF_INET, SOCK_STREAM ).
         It will monitor the connections made to the server as well using a stream & a file handler.
         The monitoringFileName doens't have to contain any extensions. ( Correct input : myfile <> Wrong input : myfile.log )
+
+        The outbound watermarks ( in bytes ) protect the server from peers that don't read their data:
+        outbound_high_watermark -- > Stop reading from a client once this many bytes are waiting to be written to it
+        outbound_low_watermark -- > Start reading from the client again once its outbound queue drained below this size
+        outbound_max_size -- > Close the connection to a client that lets its outbound queue grow above this size
+
+        reuse_port -- > Set SO_REUSEPORT on the server socket, so several worker processes can listen on the same address ( Read worker_pool.py )
+        db_workers -- > Number of threads ( each with its own DB connection ) that run the queries ( Read db_executor.py )
+        db_path -- > The users DB. Defaults to DB/dummy_db.db
+        register_batch_size, register_batch_window -- > The most registrations committed together & how long ( in seconds ) the writer waits for them ( Read registration_pipeline.py )
+        profile_cache_size, profile_cache_ttl -- > The most UID login responses cached ( 0 disables the cache ) & for how many seconds ( Read profile_cache.py )
+        log_max_bytes, log_backup_count -- > The log file is rotated before it grows above log_max_bytes ( 0 disables the rotation ), log_backup_count rotated files are kept
+        log_queue_size -- > The most log records waiting for the log writer thread. The records logged while the queue is full are dropped & counted ( Read log_pipeline.py )
+        log_info_sample -- > Only every n-th INFO record is logged. 1 logs all of them.
+        admin_port, admin_socket -- > The local TCP port ( bound to 127.0.0.1 ) and / or the Unix socket path that answer with the metrics ( Read metrics.py ). None disables them.
+                                     In the multi-process mode every worker adds its index to the port & to the path.
+        offline_inbox_limit -- > The most messages stored for an offline username until it connects again. 0 disables the inbox ( Read offline_inbox.py )
+        offline_sender_limit -- > The most offline messages stored from a single sender ( the host of the sending connection )
+        offline_memory_messages, offline_max_messages -- > The most stored messages kept in memory ( the rest is spilled to the offline_inbox_file ) & stored in total
+        offline_inbox_file -- > The spill file of the inbox. Defaults to a temporary file. In the multi-process mode every worker adds its index to the path.
+        offline_drain_batch -- > The most stored messages sent with a single write once the username connects again
+        handshake_timeout -- > Seconds a connection without a username ( login & register sockets ) may stay silent before it's closed
+        heartbeat_interval -- > Seconds of silence after which a communication socket gets a {SERVER_HEARTBEAT}, answered by the client with {CLIENT_HEARTBEAT}
+        idle_timeout -- > Seconds a communication socket may stay silent ( heartbeat answers included ) before it's closed. Reaps the half-open peers that never answer.
+                          0 disables any of the three timeouts.
+        timer_tick -- > Resolution ( in seconds ) of the timeouts ( Read timer_wheel.py )
+        rate_limit_connection, rate_limit_user -- > tuple -> ( MESSAGES PER SECOND, BURST ) for every connection / every username. None disables the limit ( Read rate_limiter.py )
+        rate_limit_headers -- > keys : Opcode of a client message | values : tuple -> ( MESSAGES PER SECOND, BURST ) for every connection. None limits no header.
+        password_workers -- > Processes that hash & verify the passwords ( Read password_hasher.py ). 0 hashes on the event loop, only meant for comparisons.
+        password_scheme, password_cost -- > Scheme & cost of the new password hashes, None for the default cost of the scheme ( Read DB/passwords.py )
+        session_token_ttl -- > Seconds a session token stays valid for {CLIENT_SESSION_RESUME} ( Read session_tokens.py )
+        session_secret -- > Key of the session tokens ( bytes ). None for a random key of this server, the workers of the multi-process mode need the same key.
+        presence_tick -- > Seconds the online / offline changes are collected before a single delta is sent to the presence subscribers ( Read presence.py )
+        presence_chunk_size -- > The most usernames per presence message. Bigger rosters are sent in parts, every message has to stay below MAX_FRAME_SIZE.
+        legacy_bind -- > Accept {CLIENT_COMMUNICATION_DATA}, the communication socket of the old clients. It names a username without any proof : anyone can take
+                         the username over, receive its messages and its stored offline messages. Only meant for the benchmarks & for old clients on a trusted network.
+        """
+
+        self.monitoringFileName = monitoringFileName
+
+        if not 0 <= outbound_low_watermark <= outbound_high_watermark <= outbound_max_size:
+            raise ValueError("The outbound watermarks must respect : 0 <= low <= high <= max")
+
+        self.outbound_high_watermark = outbound_high_watermark
+        self.outbound_low_watermark = outbound_low_watermark
+        self.outbound_max_size = outbound_max_size
+
+        """
+        The connection registry stores a session for every connected client socket ( keyed by its file descriptor ) and the communication session of every connected username.
+        A client can send a message to the server and also specify who should receive it. We can redirect the message from the server to the specified client that should get the message by searching for its username inside the registry.
+        Every session has its own frame decoder ( the frames can be split or merged between multiple .recv() calls ) and outbound queue.
+        """
+        self.connection_registry = ConnectionRegistry()
+
+        """
+        Only used in the multi-process mode. The links to the sibling workers and the usernames they host.
+
+        worker_links_by_fd -- > keys : File descriptor of the link | values : WorkerLink
+        remote_users -- > keys : Username connected to a sibling worker | values : WorkerLink to that worker
+        """
+        self.worker_index = None
+        self.worker_links_by_fd = dict()
+        self.remote_users = dict()
+
+        # Create the non-blocking server socket so it can be a multiplex server
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if reuse_port:
+            # Every worker binds its own server socket to the same address, the kernel balances the connections between them
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.server_socket.bind(
+            (IPv4, PORT)
+        )
+        self.server_socket.setblocking(False)
+        # the backlog specifies the number of unaccepted connections that the system will allow before refusing new connections.
+        self.server_socket.listen(100)
+
+        # Get the stream & file loggers in order to monitor connections to the server. The records are written by the thread of the log pipeline.
+        self.log_pipeline = LogPipeline(self.monitoringFileName, self.create_log_formatter(), log_max_bytes, log_backup_count, log_queue_size)
+        self.stream_logger, self.file_logger = self.create_file_stream_loggers(log_info_sample)
+
+        # Make sure the indexes of the login & the UID lookup exist and the DB runs in WAL mode before the first query runs
+        DB_CONNECTION = queries.connect(db_path)
+        queries.create_schema(DB_CONNECTION)
+        queries.enable_wal(DB_CONNECTION)
+        DB_CONNECTION.close()
+
+        # The queries run on the threads of the DB executor, every thread has its own connection with the database. A failing callback only closes its own session.
+        self.db_executor = DatabaseExecutor(db_path, db_workers, self.handle_callback_error)
+
+        # The registrations are written by a single writer thread that commits them in batches
+        self.registration_pipeline = RegistrationPipeline(db_path, self.db_executor, register_batch_size, register_batch_window)
+
+        # The passwords are hashed & verified on their own processes. The plaintext passwords of an old DB are replaced by hashes on the next login.
+        self.password_hasher = PasswordHasher(self.db_executor, password_workers, password_scheme, password_cost)
+
+        # The session logins get a signed token. A reconnect with the token binds its username again without the DB & without hashing the password.
+        self.session_tokens = SessionTokens(session_secret, session_token_ttl)
+
+        # The serialized responses of the recent UID logins. Every write of a user has to invalidate its UID.
+        self.profile_cache = ProfileCache(profile_cache_size, profile_cache_ttl)
+
+        # The messages for usernames without a communication socket, delivered once they send {CLIENT_COMMUNICATION_DATA}
+        if offline_drain_batch < 1:
+            raise ValueError("The offline inbox needs offline_drain_batch >= 1")
+        self.offline_inbox = OfflineInbox(self.db_executor, offline_inbox_limit, offline_sender_limit, offline_memory_messages, offline_max_messages, offline_inbox_file)
+        self.offline_drain_batch = offline_drain_batch
+
+        # keys : Receiver username that is being looked up inside the DB | values : list of the messages for it that wait for the lookup ( CLIENT SESSION, SENDER USERNAME, MESSAGE )
+        self.offline_lookups = dict()
+
+        # The members of the group channels ( Read channel_registry.py )
+        self.channel_registry = ChannelRegistry()
+
+        # The presence subscribers get the roster once and afterwards a delta per tick with the usernames that changed
+        self.presence = PresenceService(self.is_user_online, self.encode_server_message, self.send_frame_to_client, presence_tick, presence_chunk_size)
+
+        # Every connection has one timer inside the wheel, at the earliest of its deadlines. Messages don't touch the wheel, they only update last_activity,
+        # the deadline is checked again when the timer expires ( Read check_connection_timer() ).
+        if handshake_timeout < 0 or heartbeat_interval < 0 or idle_timeout < 0 or timer_tick <= 0:
+            raise ValueError("The connection timeouts must be >= 0 ( 0 disables them ) and timer_tick > 0")
+        self.handshake_timeout = handshake_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.timer_wheel = TimerWheel(timer_tick, max(handshake_timeout, heartbeat_interval, idle_timeout, timer_tick), time.monotonic())
+
+        # Time of the current round of the event loop, read once per round instead of once per message
+        self.loop_time = time.monotonic()
+
+        # A connection that hit a rate limit isn't read until its buckets refilled. The wheel resumes it ( keys : ClientSession ).
+        self.rate_limiter = RateLimiter(rate_limit_connection, rate_limit_user, rate_limit_headers)
+        self.rate_limit_wheel = TimerWheel(RATE_LIMIT_TICK, RATE_LIMIT_HORIZON, self.loop_time)
+
+        # Create the default selector
+        self.selector = selectors.DefaultSelector() # Kqueue-based selector. Kqueue is a scalable event notification.
+
+        # Set up the server socket to be the fileobj, set the event mask to be selectors.EVENT_READ because we want the server fileobj to be available for reading. It work similarly to event listeners in JS. The >>data<< parameter works is the callback handler
+        self.selector.register(self.server_socket, selectors.EVENT_READ, self.selector_register_accept_new_connection)
+
+        # The DB executor wakes up the selector every time a query finished
+        self.selector.register(self.db_executor.completion_socket, selectors.EVENT_READ, self.selector_register_db_completions)
+
+        # keys : Opcode of a client message | values : Handler called with the session & the fields of the message
+        self.client_message_handlers = {
+            messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD: self.client_login_username_password,
+            messages.CLIENT_LOGIN_INFO_UID_NOT_VALID: self.client_login_uid_not_valid,
+            messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL: self.client_login_uid,
+            messages.CLIENT_REGISTER_DATA: self.register_user,
+            # Without the legacy bind only {CLIENT_SESSION_LOGIN} & {CLIENT_SESSION_RESUME} bind a username, both prove it ( password or signed token )
+            messages.CLIENT_COMMUNICATION_DATA: self.save_client_for_communication if legacy_bind else self.refuse_legacy_bind,
+            messages.CLIENT_MESSAGE: self.send_message_to_another_client,
+            messages.CLIENT_PROTOCOL: self.negotiate_protocol,
+            messages.CLIENT_CHANNEL_JOIN: self.join_channel,
+            messages.CLIENT_CHANNEL_LEAVE: self.leave_channel,
+            messages.CLIENT_CHANNEL_POST: self.post_to_channel,
+            messages.CLIENT_HEARTBEAT: self.client_heartbeat,
+            messages.CLIENT_SESSION_LOGIN: self.client_session_login,
+            messages.CLIENT_SESSION_RESUME: self.client_session_resume,
+            messages.CLIENT_PRESENCE_SUBSCRIBE: self.subscribe_presence,
+            messages.CLIENT_PRESENCE_UNSUBSCRIBE: self.unsubscribe_presence,
+        }
+
+        self.admin_port = admin_port
+        self.admin_socket_path = admin_socket
+        self.create_metrics()
+
+    def create_metrics(self):
+        """
+        Not intended for use outside class. Creates the metrics registry and the metrics recorded by the handlers.
+        The counters & histograms used on every message are looked up once here, recording them is a plain attribute update.
+        """
+
+        self.metrics = MetricsRegistry()
+
+        self.connections_accepted = self.metrics.counter("connections_accepted")
+        self.connections_closed = self.metrics.counter("connections_closed")
+        self.slow_client_disconnects = self.metrics.counter("slow_client_disconnects")
+        self.malformed_messages = self.metrics.counter("malformed_messages")
+
+        # keys : Opcode ( None for an unknown header ) | values : Counter of the received messages with the header
+        self.messages_received = {
+            opcode: self.metrics.counter("messages_received", header=header.strip("{}"))
+            for opcode, header in text_protocol.CLIENT_HEADERS.items()
+        }
+        self.messages_received[None] = self.metrics.counter("messages_received", header="UNKNOWN")
+
+        # Time spent inside the handler on the event loop ( keys : Opcode ) & time until the response was sent for the handlers that wait for the DB ( keys : Handler name )
+        self.handler_latencies = {
+            opcode: self.metrics.histogram("handler_seconds", handler=handler.__name__)
+            for opcode, handler in self.client_message_handlers.items()
+        }
+        self.request_latencies = {
+            handler.__name__: self.metrics.histogram("request_seconds", handler=handler.__name__)
+            for handler in (self.client_login_username_password, self.client_login_uid, self.register_user, self.client_session_login)
+        }
+
+        self.metrics.gauge("connected_sockets", lambda: len(self.connection_registry))
+        self.metrics.gauge("connected_users", lambda: len(self.connection_registry.sessions_by_username))
+        self.metrics.gauge("remote_users", lambda: len(self.remote_users))
+        self.metrics.gauge("worker_links", lambda: len(self.worker_links_by_fd))
+
+        # Time of a whole fan-out on the event loop, grouped by the member count of the channel ( keys : Size class label )
+        self.channel_fanout_latencies = {
+            size_class: self.metrics.histogram("channel_fanout_seconds", members=size_class)
+            for size_class in [get_fanout_size_class(size_bound) for size_bound in FANOUT_SIZE_CLASSES] + [get_fanout_size_class(FANOUT_SIZE_CLASSES[-1] + 1)]
+        }
+        self.channel_deliveries = self.metrics.counter("channel_deliveries")
+
+        self.handshake_timeouts = self.metrics.counter("connection_timeouts", reason="handshake")
+        self.idle_timeouts = self.metrics.counter("connection_timeouts", reason="idle")
+        self.heartbeats_sent = self.metrics.counter("heartbeats_sent")
+
+        # Stored passwords replaced by a hash with the current scheme & cost after a successful login
+        self.password_upgrades = self.metrics.counter("password_upgrades")
+
+        # keys : CONNECTION_LIMIT, USER_LIMIT or the opcode of a limited header | values : Counter of the messages that had to wait for that limit
+        self.rate_limited_messages = {
+            CONNECTION_LIMIT: self.metrics.counter("rate_limited_messages", limit=CONNECTION_LIMIT),
+            USER_LIMIT: self.metrics.counter("rate_limited_messages", limit=USER_LIMIT),
+        }
+        for opcode in self.rate_limiter.header_limits:
+            self.rate_limited_messages[opcode] = self.metrics.counter(
+                "rate_limited_messages", limit=HEADER_LIMIT, header=text_protocol.CLIENT_HEADERS[opcode].strip("{}")
+            )
+        self.metrics.gauge("throttled_sockets", lambda: len(self.rate_limit_wheel))
+
+        self.metrics.collector("db_executor", self.db_executor.stats)
+        self.metrics.collector("registration_pipeline", self.registration_pipeline.stats)
+        self.metrics.collector("password_hasher", self.password_hasher.stats)
+        self.metrics.collector("profile_cache", self.profile_cache.stats)
+        self.metrics.collector("session_tokens", self.session_tokens.stats)
+        self.metrics.collector("offline_inbox", self.offline_inbox.stats)
+        self.metrics.collector("channels", self.channel_registry.stats)
+        self.metrics.collector("presence", self.presence.stats)
+        self.metrics.collector("timer_wheel", self.timer_wheel.stats)
+        self.metrics.collector("rate_limiter", self.rate_limiter.stats)
+        self.metrics.collector("log_pipeline", self.log_pipeline.stats)
+
+    def create_admin_sockets(self):
+        """
+        Not intended for use outside class. Returns the list of the listening ( non-blocking ) admin sockets, empty if the admin socket is disabled.
+        In the multi-process mode the index of the worker is added to the port & to the path, so every worker can be asked for its own metrics.
+        """
+
+        admin_sockets = []
+        worker_offset = self.worker_index or 0
+
+        if self.admin_port is not None:
+            admin_server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            admin_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # Only local processes can read the metrics
+            admin_server_socket.bind(("127.0.0.1", self.admin_port + worker_offset))
+            admin_sockets.append(admin_server_socket)
+
+        if self.admin_socket_path is not None:
+            admin_socket_path = self.admin_socket_path if self.worker_index is None else "{0}.{1}".format(self.admin_socket_path, worker_offset)
+
+            # A socket file left behind by a previous run
+            if os.path.exists(admin_socket_path):
+                os.remove(admin_socket_path)
+
+            admin_server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            admin_server_socket.bind(admin_socket_path)
+            admin_sockets.append(admin_server_socket)
+
+        for admin_server_socket in admin_sockets:
+            admin_server_socket.setblocking(False)
+            admin_server_socket.listen(16)
+
+        return admin_sockets
+
+    def render_admin_response(self, admin_request):
+        """
+        Not intended for use outside class. Returns the answer ( bytes ) to an admin request line ( bytes ).
+        """
+
+        return self.metrics.render(parse_admin_request(admin_request)).encode("utf-8")
+
+    def selector_register_accept_admin_connection(self, selector, admin_server_socket, mask):
+        """
+        Not intended for use outside class. It is only intended for the selector to accept the connections to the admin socket.
+        """
+
+        try:
+            admin_client_socket, admin_client_address = admin_server_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+
+        admin_client_socket.setblocking(False)
+
+        # The session only provides the outbound queue, admin connections are never added to the connection registry
+        admin_session = ClientSession(admin_client_socket, admin_client_address)
+        self.admin_sessions[admin_session.fd] = (admin_session, bytearray())
+        self.selector.register(admin_client_socket, selectors.EVENT_READ, self.selector_register_handle_admin_request)
+
+    def selector_register_handle_admin_request(self, selector, admin_client_socket, mask):
+        """
+        Not intended for use outside class. Reads the request line of an admin connection, answers it with the metrics and closes the connection.
+        """
+
+        admin_session, admin_request = self.admin_sessions[admin_client_socket.fileno()]
+
+        if mask & selectors.EVENT_READ:
+            try:
+                data = admin_client_socket.recv(MAX_ADMIN_REQUEST_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = b""
+
+            if not data:
+                self.close_admin_connection(admin_session)
+                return
+
+            admin_request += data
+            if b"\n" not in admin_request and len(admin_request) < MAX_ADMIN_REQUEST_SIZE:
+                return
+
+            admin_session.queue_outbound(self.render_admin_response(admin_request.split(b"\n", 1)[0]))
+
+        try:
+            flushed = admin_session.flush_outbound()
+        except OSError:
+            flushed = True
+
+        if flushed:
+            self.close_admin_connection(admin_session)
+        else:
+            self.selector.modify(admin_client_socket, selectors.EVENT_WRITE, self.selector_register_handle_admin_request)
+
+    def close_admin_connection(self, admin_session):
+        """
+        Not intended for use outside class.
+        """
+
+        del self.admin_sessions[admin_session.fd]
+        self.selector.unregister(admin_session.client_socket_token)
+        admin_session.client_socket_token.close()
+
+    def selector_register_accept_new_connection(self, selector, server_socket, mask):
+        """
+        Not intended for use outside class. It is only intended for the selector to handle connections.
+        """
+
+        # Get the client socket token and its address + set it to a non blocking socket
+        client_socket_token, client_socket_address = server_socket.accept()
+        client_socket_token.setblocking(False)
+        client_session = ClientSession(client_socket_token, client_socket_address)
+        client_session.last_activity = self.loop_time
+        self.connection_registry.add(client_session)
+        self.connections_accepted.increment()
+        self.schedule_connection_timer(client_session)
+
+        # Use the stream & file handlers to register the new connection
+        logger_info_message = "New connection established with >> {0}".format(
+            client_socket_address
+        )
+
+        self.file_logger.info(logger_info_message)
+        self.stream_logger.info(logger_info_message)
+
+        # Register a callback handler for handling messages from the client socket
+        self.selector.register(client_socket_token, selectors.EVENT_READ, self.selector_register_handle_messages)
+
+    def selector_register_db_completions(self, selector, completion_socket, mask):
+        """
+        Not intended for use outside class. It is only intended for the selector to run the callbacks of the finished DB queries.
+        """
+
+        self.db_executor.run_completion_callbacks()
+
+    def selector_register_handle_messages(self, selector, client_socket_token, mask):
+        """
+        Not intended for use outside class. It is only intended for the selector to handle messages from the client socket and to write the queued responses to it.
+        Read ../Documentation/server_client_communication_blueprint.txt
+        """
+
+        client_session = self.connection_registry.get_by_fd(client_socket_token.fileno())
+
+        # The connection was closed by an earlier event of the same select() round ( e.g. a failed relay to it ). Its socket is already closed.
+        if client_session is None:
+            return
+
+        # The kernel has room again for the data that couldn't be written before
+        if mask & selectors.EVENT_WRITE:
+            self.flush_client_session(client_session)
+
+            if client_session.closed:
+                return
+
+            # The previous batch of the offline inbox was written completely, send the next one
+            if client_session.offline_inbox_pending and not client_session.outbound_queue_size:
+                self.drain_offline_inbox(client_session)
+
+        # A throttled session might still get the read event of the round it was throttled in. Its next messages wait behind the throttled ones.
+        if not mask & selectors.EVENT_READ or client_session.throttled_frames is not None:
+            return
+
+        # Anything the peer sends ( even EOF ) proves that it's alive
+        client_session.last_activity = self.loop_time
+
+        client_frames = self.read_session_frames(client_session)
+        if client_frames is None:
+            self.close_client_connection(client_session)
+            return
+
+        self.handle_client_frames(client_session, client_frames)
+
+    def handle_client_frames(self, client_session, client_frames):
+        """
+        Not intended for use outside class. Handles the frames in order, until a rate limit is hit. The rest of the frames waits with the session.
+        """
+
+        for index, client_frame in enumerate(client_frames):
+            throttle_wait = self.handle_client_message(client_frame, client_session)
+            if throttle_wait:
+                self.throttle_client_session(client_session, client_frames[index:], throttle_wait)
+                return
+
+            # A failed write inside the handler might have closed the connection
+            if client_session.closed:
+                return
+
+    def throttle_client_session(self, client_session, client_frames, throttle_wait):
+        """
+        Not intended for use outside class. The session hit a rate limit. It isn't read anymore ( its data stays inside the kernel buffers, TCP slows the peer down )
+        and the frames that were already read are kept until resume_client_session() handles them, throttle_wait seconds later.
+        """
+
+        client_session.throttled_frames = client_frames
+        self.rate_limit_wheel.schedule(client_session, self.loop_time + throttle_wait)
+        self.check_outbound_watermarks(client_session)
+
+    def resume_client_session(self, client_session):
+        """
+        Not intended for use outside class. Handles the frames of a throttled session ( as many as its buckets allow ) and reads from it again once all of them were handled.
+        """
+
+        if client_session.closed:
+            return
+
+        client_frames = client_session.throttled_frames
+        client_session.throttled_frames = None
+        self.handle_client_frames(client_session, client_frames)
+
+        if not client_session.closed and client_session.throttled_frames is None:
+            self.check_outbound_watermarks(client_session)
+
+    def read_session_frames(self, session):
+        """
+        Not intended for use outside class.
+        Reads the data that is waiting on the socket of the session and returns the list of the complete frames inside it ( might be empty ).
+        Returns None if the connection was closed / reset by the peer or if the peer broke the framing.
+        """
+
+        try:
+            data = session.client_socket_token.recv(RECV_BUFFER_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return []
+        except (ConnectionResetError, ConnectionAbortedError):
+            # Handle a reset connection just like a closed one
+            return None
+
+        if not data:
+            return None
+
+        # A single read can contain several messages or only a part of one
+        try:
+            return session.frame_decoder.feed(data)
+        except FrameTooLargeException as exception:
+            self.stream_logger.critical("{0}. Client address : {1}".format(exception.error_msg, session.client_address))
+            self.file_logger.critical("{0}. Client address : {1}".format(exception.error_msg, session.client_address))
+            return None
+
+    def encode_server_message(self, binary, opcode, *fields):
+        """
+        Not intended for use outside class. Returns the frame ( bytes ) of the server message, in the binary or in the text encoding.
+        """
+
+        if binary:
+            return encode_frame(binary_protocol.encode_message(opcode, *fields))
+
+        return encode_frame(text_protocol.format_server_message(opcode, *fields).encode("utf-8"))
+
+    def send_to_client(self, client_session, opcode, *fields):
+        """
+        Encodes the message in the protocol of the client session ( text or binary ), queues it and writes as much of it as possible right away.
+        Whatever the kernel doesn't accept is written once the selector reports the socket as writable.
+        Messages for sessions that are no longer connected are dropped.
+        """
+
+        self.send_frame_to_client(client_session, self.encode_server_message(client_session.binary_protocol, opcode, *fields))
+
+    def send_frame_to_client(self, client_session, frame):
         """
+        Same as send_to_client() for a message that was already encoded & framed ( bytes ). Used to send the cached responses without encoding them again.
+        """
+
+        if client_session.closed:
+            return
+
+        if not client_session.outbound_queue_size:
+            # Opportunistic write. Most of the time the whole message fits in the kernel buffer and neither the queue nor the selector is involved.
+            try:
+                sent = client_session.client_socket_token.send(frame)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                self.close_client_connection(client_session)
+                return
+
+            if sent == len(frame):
+                return
+
+            # Short write. Queue the rest and wait for EVENT_WRITE
+            client_session.queue_outbound(memoryview(frame)[sent:] if sent else frame)
+            self.check_outbound_watermarks(client_session)
+        else:
+            client_session.queue_outbound(frame)
+
+            # The socket is already waiting for EVENT_WRITE, only check the watermarks
+            self.check_outbound_watermarks(client_session)
+
+    def flush_client_session(self, client_session):
+        """
+        Not intended for use outside class. Writes the outbound queue of the session and updates the selector registration & the watermarks.
+        """
+
+        try:
+            client_session.flush_outbound()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            self.close_client_connection(client_session)
+            return
+
+        self.check_outbound_watermarks(client_session)
+
+    def client_outbound_size(self, client_session):
+        """
+        Not intended for use outside class. Returns the number of bytes that are queued for the client but weren't written to the socket yet.
+        """
+
+        return client_session.outbound_queue_size
+
+    def check_outbound_watermarks(self, client_session):
+        """
+        Not intended for use outside class.
+        Pauses reading from the client when its outbound queue passes the high watermark, resumes once it drained below the low watermark
+        and closes the connection when the queue passes the maximum size.
+        Afterwards the selector registration is updated : EVENT_WRITE only while there is data queued, EVENT_READ only while reading isn't paused.
+        """
+
+        outbound_queue_size = client_session.outbound_queue_size
+
+        if outbound_queue_size > self.outbound_max_size:
+            logger_message = "Outbound queue limit exceeded ( {0} bytes ). Closing the connection to the slow client {1}".format(
+                outbound_queue_size, client_session.client_address
+            )
+            self.stream_logger.critical(logger_message)
+            self.file_logger.critical(logger_message)
+            self.slow_client_disconnects.increment()
+            self.close_client_connection(client_session)
+            return
+
+        if outbound_queue_size > self.outbound_high_watermark:
+            client_session.reading_paused = True
+        elif outbound_queue_size <= self.outbound_low_watermark:
+            client_session.reading_paused = False
+
+        events = 0 if client_session.reading_paused or client_session.throttled_frames is not None else selectors.EVENT_READ
+        if outbound_queue_size:
+            events |= selectors.EVENT_WRITE
+
+        # Changing the registration costs a system call, skip it when nothing changed
+        if self.selector.get_key(client_session.client_socket_token).events != events:
+            self.selector.modify(client_session.client_socket_token, events, self.selector_register_handle_messages)
+
+    def handle_client_message(self, client_frame, client_session):
+        """
+        Not intended for use outside class. Decodes a single, complete client message ( the payload of a frame ) with the protocol of the session
+        and calls the handler that belongs to its opcode. Messages with an unknown header are ignored, a client that sends a malformed message is disconnected.
+        Returns 0 once the message was handled ( or dropped ). If a rate limit doesn't allow the message yet, it isn't handled and the seconds until it's allowed are returned,
+        the caller has to stop reading from the client and pass the same frame again afterwards.
+        """
+
+        try:
+            if client_session.binary_protocol:
+                opcode, fields = binary_protocol.decode_message(client_frame)
+            else:
+                opcode, fields = text_protocol.parse_client_message(client_frame.decode("utf-8"))
+        except (MalformedMessageException, UnicodeDecodeError) as exception:
+            self.malformed_messages.increment()
+
+            logger_message = "{0}. Client address : {1}".format(getattr(exception, "error_msg", exception), client_session.client_address)
+            self.stream_logger.critical(logger_message)
+            self.file_logger.critical(logger_message)
+            self.close_client_connection(client_session)
+            return 0
+
+        # Unknown headers cost the loop as well, they count against the connection & user limits
+        if self.rate_limiter.enabled:
+            throttle_wait, limit = self.rate_limiter.check(client_session, opcode, self.loop_time)
+            if throttle_wait:
+                self.rate_limited_messages[limit].increment()
+                return throttle_wait
+
+        client_message_handler = self.client_message_handlers.get(opcode)
+        if client_message_handler is None:
+            # Unknown header, or a server message sent by a client
+            self.messages_received[None].increment()
+            return 0
+
+        self.messages_received[opcode].increment()
+
+        handler_start_time = time.perf_counter()
+        client_message_handler(client_session, *fields)
+        self.handler_latencies[opcode].observe(time.perf_counter() - handler_start_time)
+
+        return 0
+
+    def negotiate_protocol(self, client_session, protocol_name):
+        """
+        Switches the encoding of the connection. The client sends {CLIENT_PROTOCOL}{<PROTOCOL NAME>} as its first message.
+
+        The answer is {SERVER_PROTOCOL}{<PROTOCOL NAME>}, still encoded in the old protocol. It contains the requested name if the server switched,
+        otherwise the name of the protocol that stays in use. Every following message in both directions uses the new encoding.
+        """
+
+        if protocol_name == messages.BINARY_PROTOCOL_NAME:
+            binary = True
+        elif protocol_name == messages.TEXT_PROTOCOL_NAME:
+            binary = False
+        else:
+            binary = client_session.binary_protocol
+            protocol_name = messages.BINARY_PROTOCOL_NAME if binary else messages.TEXT_PROTOCOL_NAME
+
+        self.send_to_client(client_session, messages.SERVER_PROTOCOL, protocol_name)
+        client_session.binary_protocol = binary
+
+    def client_login_uid_not_valid(self, client_session):
+        """
+        Not intended for use outside class. The client couldn't use the UID it got from the first step of the login.
+        """
+
+        # Use the stream and the file logger to log the failed login - step 2 UID - attempt
+        failed_uid_logger_critical_message = "Wrong UID. Client address : {0}".format(
+            client_session.client_address
+        )
+        self.stream_logger.critical(failed_uid_logger_critical_message)
+        self.file_logger.critical(failed_uid_logger_critical_message)
+
+    def handle_callback_error(self, client_session, exception):
+        """
+        Not intended for use outside class. Called by the DB executor with the exception of a callback ( of a query, a hash or a registration ) instead of raising it on the event loop.
+        The request of the session can't be answered anymore, only that session is closed.
+        """
+
+        logger_message = "A callback failed >> {0!r} <<. Client address : {1}".format(
+            exception, client_session.client_address if client_session is not None else None
+        )
+        self.stream_logger.error(logger_message)
+        self.file_logger.error(logger_message)
+
+        if client_session is not None:
+            self.close_client_connection(client_session)
+
+    def get_future_result(self, future, failed_result, request_name, client_session=None):
+        """
+        Not intended for use outside class. Returns the result of a finished query or hash, or failed_result if it raised ( or was cancelled ).
+        The exception is logged, the caller answers the client with its usual error response.
+        """
+
+        if not future.cancelled():
+            exception = future.exception()
+            if exception is None:
+                return future.result()
+        else:
+            exception = "cancelled"
+
+        logger_message = "The {0} failed >> {1} <<. Client address : {2}".format(
+            request_name, exception, client_session.client_address if client_session is not None else None
+        )
+        self.stream_logger.error(logger_message)
+        self.file_logger.error(logger_message)
+
+        return failed_result
+
+    def close_client_connection(self, client_session):
+        """
+        Not intended for use outside class. Forgets everything about the client session ( including its username ), unregisters its socket from the selector and closes it.
+        """
+
+        # Delete the session and its username from the registry. Both are dict operations, a disconnect doesn't depend on the number of connected users.
+        if not self.connection_registry.remove(client_session):
+            # Already closed
+            return
+        client_session.closed = True
+        self.connections_closed.increment()
+
+        # The membership of the channels & the presence subscription belong to the connection
+        self.channel_registry.leave_all(client_session)
+        self.presence.unsubscribe(client_session)
+        self.timer_wheel.cancel(client_session)
+        self.rate_limit_wheel.cancel(client_session)
+
+        # The username was still bound to this session, the sibling workers & the presence subscribers have to forget it as well
+        if client_session.username is not None:
+            self.presence.mark_changed(client_session.username, True, self.loop_time)
+            self.send_to_all_workers(messages.WORKER_USER_OFFLINE, client_session.username)
+
+        client_socket_token = client_session.client_socket_token
+
+        # Unregister the client socket from the selector && close its connection to the server.
+        self.selector.unregister(client_socket_token)
+        client_socket_token.close()
+
+        # Use the stream & file loggers in order to monitor the lost connection to the client
+        logger_info_string = "Connection lost with {0}".format(client_session.client_address)
+        self.stream_logger.info(logger_info_string)
+        self.file_logger.info(logger_info_string)
+
+    def attach_worker_links(self, worker_index, worker_link_sockets):
+        """
+        Turns the server into the worker with the given index of a WorkerPool.
+        worker_link_sockets -- > keys : Index of a sibling worker | values : Unix socket connected to that worker
+        """
+
+        self.worker_index = worker_index
+
+        # Every worker spills its offline inbox into its own file
+        if self.offline_inbox.file_name is not None:
+            self.offline_inbox.file_name = "{0}.{1}".format(self.offline_inbox.file_name, worker_index)
+
+        for sibling_worker_index, link_socket in worker_link_sockets.items():
+            link_socket.setblocking(False)
+            worker_link = WorkerLink(link_socket, sibling_worker_index)
+            self.worker_links_by_fd[worker_link.fd] = worker_link
+            self.selector.register(link_socket, selectors.EVENT_READ, self.selector_register_handle_worker_link)
+
+    def selector_register_handle_worker_link(self, selector, link_socket, mask):
+        """
+        Not intended for use outside class. It is only intended for the selector to handle the messages from a sibling worker and to write the queued messages to it.
+        """
+
+        worker_link = self.worker_links_by_fd[link_socket.fileno()]
+
+        if mask & selectors.EVENT_WRITE:
+            self.flush_worker_link(worker_link)
+
+            if worker_link.closed:
+                return
+
+        if not mask & selectors.EVENT_READ:
+            return
+
+        worker_frames = self.read_session_frames(worker_link)
+        if worker_frames is None:
+            self.close_worker_link(worker_link)
+            return
+
+        for worker_frame in worker_frames:
+            self.handle_worker_message(worker_frame, worker_link)
+
+    def handle_worker_message(self, worker_frame, worker_link):
+        """
+        Not intended for use outside class. Handles a single message from a sibling worker. The links always use the binary protocol:
+
+        WORKER_USER_ONLINE ( USERNAME ) -- > The username has a communication socket on the sibling worker. A local communication socket of the username loses it,
+                                            the messages stored for it here are forwarded to that worker.
+        WORKER_USER_OFFLINE ( USERNAME ) -- > The communication socket of the username on the sibling worker was closed
+        WORKER_CLIENT_MESSAGE ( RECEIVER USERNAME, SENDER USERNAME, MESSAGE ) -- > Send the message to the local receiver, encoded in its protocol. Stored if the receiver is offline.
+        WORKER_CHANNEL_POST ( CHANNEL, SENDER USERNAME, MESSAGE ) -- > A member on the sibling worker posted to the channel. Fanned out to the local members.
+        """
+
+        try:
+            opcode, fields = binary_protocol.decode_message(worker_frame)
+        except MalformedMessageException as exception:
+            logger_message = "{0}. Worker : {1}".format(exception.error_msg, worker_link.worker_index)
+            self.stream_logger.critical(logger_message)
+            self.file_logger.critical(logger_message)
+            return
+
+        if opcode == messages.WORKER_CLIENT_MESSAGE:
+            receiver_username, sender_username, sender_message = fields
+
+            # The receiver might have disconnected in the meantime. The message is stored for it in that case ( dropped if the inbox is full ).
+            # The stored messages of a receiver are sent before any new one.
+            client_receiver_session = self.connection_registry.get_by_username(receiver_username)
+            if client_receiver_session is not None and not client_receiver_session.offline_inbox_pending:
+                self.send_to_client(client_receiver_session, messages.MESSAGE_FROM_CLIENT, sender_username, sender_message)
+            else:
+                self.store_offline_message(None, sender_username, receiver_username, sender_message)
+        elif opcode == messages.WORKER_USER_ONLINE:
+            username = fields[0]
+            self.presence.mark_changed(username, self.is_user_online(username), self.loop_time)
+
+            # The newest communication socket receives the messages : an older local socket of the username loses it, like in save_client_for_communication()
+            previous_session = self.connection_registry.release_username(username)
+            if previous_session is not None:
+                self.channel_registry.leave_all(previous_session)
+                self.presence.unsubscribe(previous_session)
+
+            self.remote_users[username] = worker_link
+
+            # The messages stored here go through the same link as the new ones, so they arrive first
+            self.forward_offline_inbox(username, worker_link)
+        elif opcode == messages.WORKER_USER_OFFLINE:
+            username = fields[0]
+
+            # The user might have reconnected to another worker already
+            if self.remote_users.get(username) is worker_link:
+                self.presence.mark_changed(username, True, self.loop_time)
+                del self.remote_users[username]
+        elif opcode == messages.WORKER_CHANNEL_POST:
+            channel_name, sender_username, sender_message = fields
+            self.fan_out_channel_message(channel_name, sender_username, sender_message)
+
+    def send_to_worker(self, worker_link, opcode, *fields):
+        """
+        Encodes the message ( binary protocol ) and sends it to the sibling worker. The links aren't limited by the watermarks, they carry the traffic of many clients.
+        """
+
+        self.send_frame_to_worker(worker_link, encode_frame(binary_protocol.encode_message(opcode, *fields)))
+
+    def send_frame_to_worker(self, worker_link, frame):
+        """
+        Not intended for use outside class. Same as send_to_worker() for a message that was already encoded & framed ( bytes ).
+        """
+
+        if worker_link.closed:
+            return
+
+        queue_was_empty = not worker_link.outbound_queue_size
+        worker_link.queue_outbound(frame)
+
+        if queue_was_empty:
+            self.flush_worker_link(worker_link)
+
+    def send_to_all_workers(self, opcode, *fields):
+        """
+        Sends the message to every sibling worker. Does nothing outside of the multi-process mode.
+        """
+
+        if not self.worker_links_by_fd:
+            return
+
+        # Encoded once for all the links
+        frame = encode_frame(binary_protocol.encode_message(opcode, *fields))
+        for worker_link in list(self.worker_links_by_fd.values()):
+            self.send_frame_to_worker(worker_link, frame)
+
+    def flush_worker_link(self, worker_link):
+        """
+        Not intended for use outside class. Writes the outbound queue of the link and waits for EVENT_WRITE while something is left.
+        """
+
+        try:
+            flushed = worker_link.flush_outbound()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            self.close_worker_link(worker_link)
+            return
+
+        events = selectors.EVENT_READ if flushed else selectors.EVENT_READ | selectors.EVENT_WRITE
+        if self.selector.get_key(worker_link.client_socket_token).events != events:
+            self.selector.modify(worker_link.client_socket_token, events, self.selector_register_handle_worker_link)
+
+    def close_worker_link(self, worker_link):
+        """
+        Not intended for use outside class. The sibling worker is gone, so are the users connected to it.
+        """
+
+        if worker_link.closed:
+            return
+        worker_link.closed = True
+
+        del self.worker_links_by_fd[worker_link.fd]
+        for username in [username for username, link in self.remote_users.items() if link is worker_link]:
+            self.presence.mark_changed(username, True, self.loop_time)
+            del self.remote_users[username]
+
+        self.selector.unregister(worker_link.client_socket_token)
+        worker_link.client_socket_token.close()
+
+        logger_message = "Lost the link to the worker {0}".format(worker_link.worker_index)
+        self.stream_logger.critical(logger_message)
+        self.file_logger.critical(logger_message)
+
+    def send_message_to_another_client(self, client_session, sender_username, receiver_username, sender_message, receiver_exists=False):
+        """
+        Send the given message from the client to another client. The sender & receiver usernames and the message are the fields of the client message.
+        Look inside the connection registry that contains the sessions of all the currently registered clients and their usernames, look for the session, and send the message only to the given username.
+        The cost of a message doesn't depend on the number of connected users.
+
+        STEPS:
+
+        1. The username and the message were already extracted from the client message by its codec
+        2. Look for the given username inside the connection registry and try to get the session of the client.
+        3. If the given username was not connected to the server at the moment, store the message inside the offline inbox of the username ( Read offline_inbox.py ).
+           The first message for an offline username is only stored once the DB executor found the username inside the users table, the messages that follow
+           wait behind that lookup. An unknown username, a full inbox ( or a disabled one ) return a response that contains that message back to the client.
+           Otherwise, send the message to the client
+
+        receiver_exists -- > The receiver was already looked up inside the DB
+        """
+
+        # The older messages for the receiver wait for its lookup, this one waits behind them
+        waiting_messages = self.offline_lookups.get(receiver_username)
+        if waiting_messages is not None and not receiver_exists:
+            if len(waiting_messages) < self.offline_inbox.limit_per_user:
+                waiting_messages.append((client_session, sender_username, sender_message))
+            else:
+                self.send_to_client(client_session, messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND)
+            return
+
+        ############################# STEP 2 #############################
+        # 2. Look for the given username inside the connection registry and try to get the session of the client.
+        # In the multi-process mode the receiver might be connected to a sibling worker instead.
+        client_receiver_session = self.connection_registry.get_by_username(receiver_username)
+        client_receiver_worker_link = None
+        if client_receiver_session is None:
+            client_receiver_worker_link = self.remote_users.get(receiver_username)
+
+        ############################# STEP 2 #############################
+        ############################# STEP 3 #############################
+        # 3. If the given username was not connected to the server at the moment, store the message ( or return a response that contains that message back to the client ). Otherwise, send the message to the client
+        # A receiver whose stored messages are still being sent ( or forwarded to its worker ) gets the new message after them, through the inbox as well.
+        if client_receiver_session is None and client_receiver_worker_link is None:
+            if receiver_exists or receiver_username in self.offline_inbox:
+                self.store_offline_message(client_session, sender_username, receiver_username, sender_message)
+            else:
+                self.look_up_offline_receiver(client_session, sender_username, receiver_username, sender_message)
+        elif (client_receiver_session is not None and client_receiver_session.offline_inbox_pending) or (client_receiver_worker_link is not None and receiver_username in self.offline_inbox):
+            self.store_offline_message(client_session, sender_username, receiver_username, sender_message)
+        else:
+            # SERVER: {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>}, encoded in the protocol of the receiver
+            # Send the message only to the receiver
+            if client_receiver_session is not None:
+                self.send_to_client(client_receiver_session, messages.MESSAGE_FROM_CLIENT, sender_username, sender_message)
+            else:
+                # The worker of the receiver encodes the message for it
+                self.send_to_worker(client_receiver_worker_link, messages.WORKER_CLIENT_MESSAGE, receiver_username, sender_username, sender_message)
+
+        ############################# STEP 3 #############################
+
+    def look_up_offline_receiver(self, client_session, sender_username, receiver_username, sender_message):
+        """
+        Not intended for use outside class. Checks on the DB executor if the offline receiver is a user before its first message is stored.
+        """
+
+        # Nothing would be stored anyway
+        if not self.offline_inbox.limit_per_user:
+            self.send_to_client(client_session, messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND)
+            return
+
+        self.offline_lookups[receiver_username] = [(client_session, sender_username, sender_message)]
+        self.db_executor.submit(lambda query_future: self.finish_look_up_offline_receiver(receiver_username, query_future), queries.username_exists, receiver_username)
+
+    def finish_look_up_offline_receiver(self, receiver_username, query_future):
+        """
+        Not intended for use outside class. Runs on the event loop once the DB executor looked up the receiver. The waiting messages are sent ( or stored ) in the order they arrived.
+
+        SERVER : {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} -- > For every waiting message, if the receiver isn't a user
+        """
+
+        waiting_messages = self.offline_lookups.pop(receiver_username)
+        receiver_exists = self.get_future_result(query_future, False, "receiver lookup")
+
+        for client_session, sender_username, sender_message in waiting_messages:
+            if receiver_exists:
+                self.send_message_to_another_client(client_session, sender_username, receiver_username, sender_message, receiver_exists=True)
+            else:
+                self.send_to_client(client_session, messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND)
+
+    def store_offline_message(self, client_session, sender_username, receiver_username, sender_message):
+        """
+        Not intended for use outside class. Stores the message for the receiver, counted against the limit of the host of the sending connection.
+        The client session is None for a message forwarded by a sibling worker, its sender username is counted instead.
+
+        SERVER : {CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND} -- > If a limit of the inbox doesn't allow the message
+        """
+
+        sender_key = client_session.client_address[0] if client_session is not None and client_session.client_address else sender_username
+
+        if not self.offline_inbox.store(receiver_username, sender_username, sender_message, sender_key) and client_session is not None:
+            self.send_to_client(client_session, messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND)
+
+    def save_client_for_communication(self, client_session, client_username):
+        """
+        This method will save the client so it can communicate with other clients.
+        The session of the client will be bound to its username inside self.connection_registry. A newer communication socket of the same username replaces the older one.
+
+        CLIENT : {CLIENT_COMMUNICATION_DATA}{<USERNAME>}
+        """
+
+        # A session that changes its username releases the old one
+        if client_session.username is not None and client_session.username != client_username:
+            self.presence.mark_changed(client_session.username, True, self.loop_time)
+        self.presence.mark_changed(client_username, self.is_user_online(client_username), self.loop_time)
+        previous_session = self.connection_registry.bind_username(client_session, client_username)
+
+        # The older communication socket of the username stays connected without a username. Its channels & its presence subscription belong to the username, it can't post or follow the roster anymore.
+        if previous_session is not None:
+            self.channel_registry.leave_all(previous_session)
+            self.presence.unsubscribe(previous_session)
+
+        # The communication socket is past the handshake, its timer follows the heartbeat & idle timeouts from now on
+        self.schedule_connection_timer(client_session)
+
+        # Tell the sibling workers where to forward the messages for this username
+        self.send_to_all_workers(messages.WORKER_USER_ONLINE, client_username)
+
+        # Use the stream and file logger to register the new client and its username
+        logger_message = "New communication socket with the username {0} connected. Address : {1}".format(
+            client_username,
+            client_session.client_address
+        )
+        self.stream_logger.info(logger_message)
+        self.file_logger.info(logger_message)
 
-        self.monitoringFileName = monitoringFileName
+        # The messages that were sent to the username while it was offline
+        if client_username in self.offline_inbox:
+            self.drain_offline_inbox(client_session)
 
+    def refuse_legacy_bind(self, client_session, client_username):
         """
-        The currently_connected_users dict will store all the connected usernames and their addresses. 
-        A client can send a message to the server and also specify who should receive it. We can redirect the message from the server to the specified client that should get the message by searching for its address inside the dict.
-        
-        The structure of the dict:
-        
-        keys : Username ( from DB, after the client has been registered )
-        values : Client socket token
+        Handles {CLIENT_COMMUNICATION_DATA} while the legacy bind is disabled. The username isn't bound and the message isn't answered, the old clients never waited for an answer.
+
+        CLIENT : {CLIENT_COMMUNICATION_DATA}{<USERNAME>}
         """
-        self.currently_connected_users = dict()
 
-        # Create the non-blocking server socket so it can be a multiplex server
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.bind(
-            (IPv4, PORT)
+        logger_message = "REFUSED UNAUTHENTICATED BIND OF {0} FROM {1}. Start the server with --legacy-bind for the old clients".format(
+            client_username,
+            client_session.client_address
         )
-        self.server_socket.setblocking(False)
-        # the backlog specifies the number of unaccepted connections that the system will allow before refusing new connections.
-        self.server_socket.listen(100)
+        self.stream_logger.warning(logger_message)
+        self.file_logger.warning(logger_message)
+
+    def drain_offline_inbox(self, client_session):
+        """
+        Not intended for use outside class. Sends the stored messages of the username of the session, oldest first, offline_drain_batch messages with a single write.
+        As soon as a batch isn't written completely, the session is marked with offline_inbox_pending and the next batch is sent once its outbound queue is empty.
+        The spilled messages are read on the spill thread of the inbox, the session stays pending until finish_take_spilled() got them.
+        New messages for a pending session are stored behind the old ones.
 
-        # Get the stream & file loggers in order to monitor connections to the server
-        self.stream_logger, self.file_logger = self.create_file_stream_loggers()
+        SERVER : {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>} -- > For every stored message, encoded in the protocol of the receiver
+        """
 
-        # Create connection with the database
-        self.DB_CONNECTION = sqlite3.connect("../DB/dummy_db.db")
-        self.DB_CURSOR = self.DB_CONNECTION.cursor()
+        username = client_session.username
 
-        # Create the default selector
-        self.selector = selectors.DefaultSelector() # Kqueue-based selector. Kqueue is a scalable event notification.
+        # A newer communication socket took over the username, the stored messages are sent to it instead
+        while username is not None and not client_session.closed:
+            if self.offline_inbox.is_spilled(username):
+                client_session.offline_inbox_pending = True
+                self.offline_inbox.take_spilled(
+                    username, self.offline_drain_batch, lambda stored_messages: self.finish_take_spilled(username, stored_messages), client_session
+                )
+                return
 
-        # Set up the server socket to be the fileobj, set the event mask to be selectors.EVENT_READ because we want the server fileobj to be available for reading. It work similarly to event listeners in JS. The >>data<< parameter works is the callback handler
-        self.selector.register(self.server_socket, selectors.EVENT_READ, self.selector_register_accept_new_connection)
+            stored_messages = self.offline_inbox.take(username, self.offline_drain_batch)
+            if not stored_messages:
+                break
+
+            self.send_stored_messages(client_session, stored_messages)
 
-    def selector_register_accept_new_connection(self, selector, server_socket):
+            if self.client_outbound_size(client_session):
+                client_session.offline_inbox_pending = username in self.offline_inbox
+                return
+
+        client_session.offline_inbox_pending = False
+
+    def send_stored_messages(self, client_session, stored_messages):
         """
-        Not intended for use outside class. It is only intended for the selector to handle connections.
+        Not intended for use outside class. Sends a batch of stored messages ( tuples -> ( SENDER USERNAME, MESSAGE ) ) with a single write.
         """
 
-        # Get the client socket token and its address + set it to a non blocking socket
-        client_socket_token, client_socket_address = server_socket.accept()
-        client_socket_token.setblocking(False)
+        binary = client_session.binary_protocol
+        self.send_frame_to_client(client_session, b"".join([
+            self.encode_server_message(binary, messages.MESSAGE_FROM_CLIENT, sender_username, sender_message)
+            for sender_username, sender_message in stored_messages
+        ]))
 
-        # Use the stream & file handlers to register the new connection
-        logger_info_message = "New connection established with >> {0}".format(
-            client_socket_address
-        )
+    def forward_offline_inbox(self, username, worker_link):
+        """
+        Not intended for use outside class. Forwards the stored messages of a username that connected to the sibling worker, oldest first.
+        The new messages for the username are stored behind them until the inbox is empty.
+        """
 
-        self.file_logger.info(logger_info_message)
-        self.stream_logger.info(logger_info_message)
+        while username in self.offline_inbox and self.remote_users.get(username) is worker_link:
+            if self.offline_inbox.is_spilled(username):
+                self.offline_inbox.take_spilled(username, self.offline_drain_batch, lambda stored_messages: self.finish_take_spilled(username, stored_messages))
+                return
 
-        # Register a callback handler for handling messages from the client socket
-        self.selector.register(client_socket_token, selectors.EVENT_READ, self.selector_register_handle_messages)
+            for sender_username, sender_message in self.offline_inbox.take(username, self.offline_drain_batch):
+                self.send_to_worker(worker_link, messages.WORKER_CLIENT_MESSAGE, username, sender_username, sender_message)
 
-    def selector_register_handle_messages(self, selector, client_socket_token):
+    def finish_take_spilled(self, username, stored_messages):
         """
-        Not intended for use outside class. It is only intended for the selector to handle messages from the client socket.
-        Read ../Documentation/server_client_communication_blueprint.txt
+        Not intended for use outside class. Runs on the event loop once the spill thread read a batch of the stored messages of the username.
+        The batch goes to wherever the username is connected now and the rest of the inbox follows.
         """
 
-        # Get the client message & its address
-        client_message = client_socket_token.recv(1024).decode("utf-8")
-        client_address = client_socket_token.getpeername()
+        client_receiver_session = self.connection_registry.get_by_username(username)
+        if client_receiver_session is not None:
+            if stored_messages:
+                self.send_stored_messages(client_receiver_session, stored_messages)
+            self.resume_offline_inbox(client_receiver_session)
+            return
+
+        worker_link = self.remote_users.get(username)
+        if worker_link is not None:
+            for sender_username, sender_message in stored_messages:
+                self.send_to_worker(worker_link, messages.WORKER_CLIENT_MESSAGE, username, sender_username, sender_message)
+            self.forward_offline_inbox(username, worker_link)
+            return
+
+        if stored_messages:
+            # Delivery is at most once, the batch was removed from the inbox when it was read
+            logger_message = "{0} stored messages of {1} are lost, the username went offline while they were read".format(len(stored_messages), username)
+            self.stream_logger.warning(logger_message)
+            self.file_logger.warning(logger_message)
+
+    def resume_offline_inbox(self, client_session):
+        """
+        Not intended for use outside class. Continues the drain of a session after a batch was read from the spill file : right away if its outbound queue is empty,
+        otherwise once it was written ( Read selector_register_handle_messages() ).
+        """
 
-        if client_message:
-            if client_message.startswith("{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}"):
-                self.client_login_username_password(client_message, client_socket_token)
-            elif client_message.startswith("{CLIENT_LOGIN_INFO_UID_NOT_VALID}"):
-                # Use the stream and the file logger to log the failed login - step 2 UID - attempt
-                failed_uid_logger_critical_message = "Wrong UID. Client address : {0}".format(
-                    client_address
-                )
-                self.stream_logger.critical(failed_uid_logger_critical_message)
-                self.file_logger.critical(failed_uid_logger_critical_message)
-            elif client_message.startswith("{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}"):
-                self.client_login_uid(client_message, client_socket_token)
-            elif client_message.startswith("{CLIENT_REGISTER_DATA}"):
-                self.register_user(client_message, client_socket_token)
-            elif client_message.startswith("{CLIENT_COMMUNICATION_DATA}"):
-                self.save_client_for_communication(client_message, client_socket_token)
-            elif client_message.startswith("{CLIENT_MESSAGE}"):
-                self.send_message_to_another_client(client_message, client_socket_token)
+        if self.client_outbound_size(client_session):
+            client_session.offline_inbox_pending = True
         else:
-            # Delete the registered client from the currently connected users dict
-            if client_socket_token in self.currently_connected_users.values():
-                key_to_delete = None
+            self.drain_offline_inbox(client_session)
 
-                for key, value in self.currently_connected_users.items():
-                    if value == client_socket_token:
-                        key_to_delete = key
-                        break
-                    else:
-                        continue
-            
-                self.currently_connected_users.pop(key_to_delete)
+    def client_heartbeat(self, client_session):
+        """
+        The answer of the client to {SERVER_HEARTBEAT}. Nothing else to do, every received message updates the last activity of the session.
 
-            # Unregister the client socket from the selector && close its connection to the server.
-            self.selector.unregister(client_socket_token)
-            client_socket_token.close()
+        CLIENT : {CLIENT_HEARTBEAT}
+        """
 
-            # Use the stream & file loggers in order to monitor the lost connection to the client
-            logger_info_string = "Connection lost with {0}".format(client_address)
-            self.stream_logger.info(logger_info_string)
-            self.file_logger.info(logger_info_string)
+    def schedule_connection_timer(self, client_session):
+        """
+        Not intended for use outside class. Moves the timer of the session to its earliest deadline, or removes it if no timeout applies to the session:
 
-    def send_message_to_another_client(self, client_message, client_socket_token):
+        Without a username -- > last activity + handshake_timeout
+        Communication socket -- > last activity + idle_timeout, and the next heartbeat : heartbeat_interval after the last activity or after the last heartbeat
         """
-        Send the given message from the client to another client by reading the client_message and extracting the username and the message out of the body.
-        Afterwards, look inside the dictionary that contains all the addresses for all the currently registered clients and their usernames, look for the address, and send the message to the given username
 
-        STEPS:
-        
-        1. Extract the username and the message from the client message body
-        2. Look for the given username inside the dictionary that contains all the currently connected users and try to get the address of the client.
-        3. If the given username was not connected to the server at the moment, return a response that contains that message back to the client. Otherwise, send the message to the client
+        last_activity = client_session.last_activity
+
+        if client_session.username is None:
+            deadline = last_activity + self.handshake_timeout if self.handshake_timeout else None
+        else:
+            deadline = last_activity + self.idle_timeout if self.idle_timeout else None
+
+            if self.heartbeat_interval:
+                heartbeat_deadline = max(last_activity, client_session.heartbeat_time) + self.heartbeat_interval
+                if deadline is None or heartbeat_deadline < deadline:
+                    deadline = heartbeat_deadline
+
+        if deadline is None:
+            self.timer_wheel.cancel(client_session)
+        else:
+            self.timer_wheel.schedule(client_session, deadline)
+
+    def expire_connection_timers(self):
+        """
+        Not intended for use outside class. Checks the sessions whose timer expired. The sessions that were active in the meantime are only scheduled again.
+        """
+
+        for client_session in self.timer_wheel.expire(self.loop_time):
+            self.check_connection_timer(client_session)
+
+    def check_connection_timer(self, client_session):
         """
+        Not intended for use outside class. Closes the session if it was silent for too long, sends it a heartbeat if it's due and schedules its next timer.
 
-        client_receiver_address_found = True
-        client_receiver_address = None
+        SERVER : {SERVER_HEARTBEAT} -- > The client answers with {CLIENT_HEARTBEAT}
+        """
 
-        ############################# STEP 1 #############################
-        # 1. Extract the username and the message from the client message body
-        client_message_body = client_message[client_message.index("}")+2:-1]
-        sender_username, receiver_username, sender_message = client_message_body.split("_")
+        if client_session.closed:
+            return
 
-        ############################# STEP 1 #############################
-        ############################# STEP 2 #############################
-        # 2. Look for the given username inside the dictionary that contains all the currently connected users and try to get the address of the client.
-        try:
-            client_receiver_address = self.currently_connected_users[receiver_username]
-        except KeyError:
-            client_receiver_address_found = False
-        
-        ############################# STEP 2 #############################
-        ############################# STEP 3 #############################
-        # 3. If the given username was not connected to the server at the moment, return a response that contains that message back to the client. Otherwise, send the message to the client
-        if not client_receiver_address_found:
-            server_response_client_message_error_username_not_found = "{CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND}"
-            client_socket_token.send(server_response_client_message_error_username_not_found.encode("utf-8"))
+        now = self.loop_time
+        silence = now - client_session.last_activity
+
+        if client_session.username is None:
+            if self.handshake_timeout and silence >= self.handshake_timeout:
+                self.close_timed_out_connection(client_session, "Handshake timeout", self.handshake_timeouts)
+                return
         else:
-            # Format the message from the server
-            # SERVER: {MESSAGE_FROM_CLIENT}{<Sender_username>_<message>;<Receiver_Addr>}
+            if self.idle_timeout and silence >= self.idle_timeout:
+                self.close_timed_out_connection(client_session, "Idle timeout", self.idle_timeouts)
+                return
 
-            HEADER = "{MESSAGE_FROM_CLIENT}"
+            if self.heartbeat_interval and now - max(client_session.last_activity, client_session.heartbeat_time) >= self.heartbeat_interval:
+                client_session.heartbeat_time = now
+                self.heartbeats_sent.increment()
+                self.send_to_client(client_session, messages.SERVER_HEARTBEAT)
 
-            body_message = "{0}_{1};{2}".format(
-                sender_username, sender_message, self.currently_connected_users.get(receiver_username).getpeername()
-            )
+                # A peer that's gone for good might make the write fail
+                if client_session.closed:
+                    return
 
-            BODY = "{{{0}}}".format(
-                body_message
-            )
+        self.schedule_connection_timer(client_session)
 
-            server_message = "{0}{1}".format(
-                HEADER, BODY
-            )
+    def close_timed_out_connection(self, client_session, reason, timeout_counter):
+        """
+        Not intended for use outside class.
+        """
 
-            # Send the message to all the clients. Each client will then separately check for the address to match
-            for client in self.currently_connected_users.values():
-                try:
-                    client.send(server_message.encode("utf-8"))
-                except BrokenPipeError:
-                    pass
+        timeout_counter.increment()
 
-        ############################# STEP 3 #############################
+        logger_info_message = "{0}. Client address : {1}".format(reason, client_session.client_address)
+        self.stream_logger.info(logger_info_message)
+        self.file_logger.info(logger_info_message)
 
-    def save_client_for_communication(self, client_message, client_socket_token):
+        self.close_client_connection(client_session)
+
+    def join_channel(self, client_session, channel_name):
         """
-        This method will save the client so it can communicate with other clients. 
-        The client will be saved inside self.currently_connected_users. The username will be the key, the address of the client will be the address.
+        Adds the communication socket to the members of the channel. Only a socket that sent {CLIENT_COMMUNICATION_DATA} can join, the posts carry its username.
 
-        CLIENT : {CLIENT_COMMUNICATION_DATA}{<USERNAME>}
+        CLIENT : {CLIENT_CHANNEL_JOIN}{<CHANNEL>}
+        SERVER : {SERVER_CHANNEL_JOINED}{<CHANNEL>} -- > Also if the socket was a member already
+        SERVER : {SERVER_CHANNEL_ERROR}{<CHANNEL>} -- > No username or invalid channel name
         """
 
-        # Get the username out of the client_message
-        client_username = client_message[client_message.index("}")+2:-1]
-        self.currently_connected_users[client_username] = client_socket_token
+        if client_session.username is None or not is_valid_channel_name(channel_name):
+            self.send_to_client(client_session, messages.SERVER_CHANNEL_ERROR, channel_name)
+            return
 
-        # Use the stream and file logger to register the new client and its username
-        logger_message = "New communication socket with the username {0} connected. Address : {1}".format(
-            client_username,
-            client_socket_token.getpeername()
-        )
-        self.stream_logger.info(logger_message)
-        self.file_logger.info(logger_message)
+        self.channel_registry.join(client_session, channel_name)
+        self.send_to_client(client_session, messages.SERVER_CHANNEL_JOINED, channel_name)
+
+    def leave_channel(self, client_session, channel_name):
+        """
+        Removes the communication socket from the members of the channel.
+
+        CLIENT : {CLIENT_CHANNEL_LEAVE}{<CHANNEL>}
+        SERVER : {SERVER_CHANNEL_LEFT}{<CHANNEL>} or {SERVER_CHANNEL_ERROR}{<CHANNEL>} -- > The socket wasn't a member
+        """
+
+        if self.channel_registry.leave(client_session, channel_name):
+            self.send_to_client(client_session, messages.SERVER_CHANNEL_LEFT, channel_name)
+        else:
+            self.send_to_client(client_session, messages.SERVER_CHANNEL_ERROR, channel_name)
+
+    def post_to_channel(self, client_session, channel_name, sender_message):
+        """
+        Sends the message to every other member of the channel, on this worker and on the sibling workers. Only members can post.
+
+        CLIENT : {CLIENT_CHANNEL_POST}{<CHANNEL>_<MESSAGE>}
+        SERVER : {MESSAGE_FROM_CHANNEL}{<Channel>_<Sender_username>_<message>} -- > To every other member
+        SERVER : {SERVER_CHANNEL_ERROR}{<CHANNEL>} -- > To the sender, if it isn't a member or has no username ( anymore )
+        """
+
+        # Every post carries the username of the sender, a socket whose username was taken over by a newer communication socket can't post
+        if client_session.username is None or not self.channel_registry.is_member(client_session, channel_name):
+            self.send_to_client(client_session, messages.SERVER_CHANNEL_ERROR, channel_name)
+            return
+
+        self.fan_out_channel_message(channel_name, client_session.username, sender_message, client_session)
+
+        # Every sibling worker gets the post once and fans it out to its own members
+        self.send_to_all_workers(messages.WORKER_CHANNEL_POST, channel_name, client_session.username, sender_message)
+
+    def fan_out_channel_message(self, channel_name, sender_username, sender_message, sender_session=None):
+        """
+        Not intended for use outside class. Sends {MESSAGE_FROM_CHANNEL} to the local members of the channel, except the sender_session.
+        The message is encoded & framed at most once per protocol, every member gets the same bytes object. The per member work is a single
+        send_frame_to_client() ( a queue append and a write attempt ), no member causes any formatting or encoding.
+        """
 
-    def register_user(self, client_message, client_socket_token):
+        members = self.channel_registry.members(channel_name)
+        if not members:
+            return
+
+        start_time = time.perf_counter()
+        member_count = len(members)
+
+        # keys : binary_protocol of the member ( False / True ) | values : Frame of the message in that protocol
+        frames = dict()
+        delivered_members = 0
+
+        # A slow member can be closed by send_frame_to_client(), which removes it from the members while they are iterated
+        for member_session in tuple(members):
+            if member_session is sender_session:
+                continue
+
+            binary = member_session.binary_protocol
+            frame = frames.get(binary)
+            if frame is None:
+                frame = frames[binary] = self.encode_server_message(binary, messages.MESSAGE_FROM_CHANNEL, channel_name, sender_username, sender_message)
+
+            self.send_frame_to_client(member_session, frame)
+            delivered_members += 1
+
+        self.channel_deliveries.increment(delivered_members)
+        self.channel_fanout_latencies[get_fanout_size_class(member_count)].observe(time.perf_counter() - start_time)
+
+    def is_user_online(self, username):
+        """
+        Checks if the username has a communication socket, on this worker or on a sibling worker
+        """
+
+        return username in self.connection_registry or username in self.remote_users
+
+    def subscribe_presence(self, client_session):
+        """
+        Sends the online usernames to the communication socket and afterwards the usernames that came online & went offline, once per presence tick ( Read presence.py ).
+        Only a socket that sent {CLIENT_COMMUNICATION_DATA} can subscribe, the roster isn't public.
+
+        CLIENT : {CLIENT_PRESENCE_SUBSCRIBE}
+        SERVER : {SERVER_PRESENCE_SNAPSHOT}{<MORE PARTS>_<USERNAMES>} -- > The roster, split into parts of at most presence_chunk_size usernames. The last part has MORE PARTS = 0.
+        SERVER : {SERVER_PRESENCE_DELTA}{<ONLINE USERNAMES>_<OFFLINE USERNAMES>} -- > Once per tick with changes, until the socket unsubscribes or is closed
+        """
+
+        if client_session.username is None:
+            return
+
+        online_usernames = self.connection_registry.usernames()
+        if self.remote_users:
+            # A username that moved to another worker can be in both for a moment
+            online_usernames = online_usernames | self.remote_users.keys()
+
+        self.presence.subscribe(client_session, online_usernames)
+
+    def unsubscribe_presence(self, client_session):
+        """
+        Stops the presence deltas of the socket.
+
+        CLIENT : {CLIENT_PRESENCE_UNSUBSCRIBE}
+        """
+
+        self.presence.unsubscribe(client_session)
+
+    def register_user(self, client_session, *user_values):
         '''
         This method will register a new user to the DB and will send a response back to the client.
 
@@ -209,56 +1380,79 @@ class Server:
         2. {SERVER_REGISTER_INFO_SUCCESSFUL} -- Send this when the server has successfully added a new user to the database
 
         Steps:
-        
-        1. Extract the body from the client message
-        2. Try to add the new user to the DB and log the interaction using the stream- and file logger
+
+        1. The values of the user were already extracted from the client message by its codec. They come in the order of messages.USER_FIELDS ( the columns of the users table ).
+        2. Hash the password ( on the password hasher ), try to add the new user to the DB ( through the registration pipeline ) and log the interaction using the stream- and file logger
         3. Send the response back to the client
         '''
 
-        SERVER_RESPONSE = None
-
-        ############################################## STEP 1 ##############################################
-        # 1. Extract the body from the client message
+        ############################################## STEP 2 ##############################################
+        # 2. Only the hash of the password is stored. Step 2 continues inside insert_registered_user() once the password was hashed.
 
-        client_message_body = client_message[client_message.index("}")+2:-1]
+        # user_values[2] is the password
+        request_start_time = time.perf_counter()
 
-        # Example user data -- > user_data = "UID:12345|Username:testUsername|Password:testPassword|FirstName:testFirstName|LastName:testLastName|Age:17|City:testCity|PostalCode:12345|StreetName:testStreetName|HouseNumber:11|Salary:800"
-        user_data_pipe_split = client_message_body.split("|")
-        user_data = dict()
-        for data in user_data_pipe_split:
-            key, value = data.split(":")
-            user_data[key] = value
+        # A row that the DB can't store ( e.g. a UID beyond 64 bits ) is answered right away, its password isn't hashed for nothing
+        if not queries.is_valid_user_row(user_values):
+            self.send_register_response(client_session, None, request_start_time, False)
+            return
 
-        # Update the types inside the user_data where necessary ( the values that should be integers, are strings )
-        user_data["UID"] = int(user_data["UID"])
-        user_data["Age"] = int(user_data["Age"])
-        user_data["PostalCode"] = int(user_data["PostalCode"])
-        user_data["HouseNumber"] = int(user_data["HouseNumber"])
-        user_data["Salary"] = int(user_data["Salary"])
+        self.password_hasher.hash(
+            lambda hash_future: self.insert_registered_user(client_session, list(user_values), request_start_time, hash_future),
+            user_values[2], client_session
+        )
 
-        ############################################## STEP 1 ##############################################
         ############################################## STEP 2 ##############################################
-        # 2. Try to add the new user to the DB
 
-        try:
-            user_sql_query = "INSERT INTO users VALUES({0}, '{1}', '{2}', '{3}', '{4}', {5}, '{6}', {7}, '{8}', {9}, {10})".format(*user_data.values())
+    def insert_registered_user(self, client_session, user_values, request_start_time, hash_future):
+        """
+        Not intended for use outside class. Replaces the password of register_user() with its hash and queues the insert of the user.
+        """
+
+        # Steps 2 & 3 continue inside finish_register_user() once the batch with the new row was committed. user_values[0] is the UID.
+        user_values[2] = self.get_future_result(hash_future, None, "password hash of a registration", client_session)
+        if user_values[2] is None:
+            self.send_register_response(client_session, None, request_start_time, False)
+            return
 
-            self.DB_CURSOR.execute(user_sql_query)
-            self.DB_CONNECTION.commit()
+        self.registration_pipeline.submit(
+            lambda query_future: self.finish_register_user(client_session, user_values[0], request_start_time, query_future),
+            user_values, client_session
+        )
+
+    def finish_register_user(self, client_session, UID, request_start_time, query_future):
+        """
+        Not intended for use outside class. Hands the result of the insert to send_register_response().
+        """
+
+        # The transaction of the batch may have failed as a whole ( DB locked, disk full, ... ). None of its users was added, every client of the batch gets the error response.
+        registered = self.get_future_result(query_future, False, "registration commit", client_session)
+        self.send_register_response(client_session, UID, request_start_time, registered)
+
+    def send_register_response(self, client_session, UID, request_start_time, registered):
+        """
+        Not intended for use outside class. Logs the result of the insert and sends the response of register_user() back to the client.
+        """
 
-            SERVER_RESPONSE = "{SERVER_REGISTER_INFO_SUCCESSFUL}"
+        SERVER_RESPONSE = None
+
+        ############################################## STEP 2 ##############################################
+        if registered:
+            SERVER_RESPONSE = messages.SERVER_REGISTER_INFO_SUCCESSFUL
+
+            # The UID was written, a cached response of it is stale
+            self.profile_cache.invalidate(UID)
 
             logger_message = "User successfully registered to the DB. Address -- > {0}".format(
-                client_socket_token.getpeername()
+                client_session.client_address
             )
             self.stream_logger.info(logger_message)
             self.file_logger.info(logger_message)
-        except IntegrityError:
-            print("SERVER REGISTER INTEGRITY ERROR")
-            SERVER_RESPONSE = "{SERVER_REGISTER_INFO_ERROR}"
+        else:
+            SERVER_RESPONSE = messages.SERVER_REGISTER_INFO_ERROR
 
             logger_message = "User couldn't register to the DB. Address -- > {0}".format(
-                client_socket_token.getpeername()
+                client_session.client_address
             ) 
             self.stream_logger.critical(logger_message)
             self.file_logger.critical(logger_message)
@@ -267,97 +1461,102 @@ class Server:
         ############################################## STEP 3 ##############################################
         # 3. Send the response back to the client
 
-        client_socket_token.send(SERVER_RESPONSE.encode("utf-8"))
+        self.send_to_client(client_session, SERVER_RESPONSE)
+        self.request_latencies["register_user"].observe(time.perf_counter() - request_start_time)
 
         ############################################## STEP 3 ##############################################
 
-    def client_login_uid(self, client_message, client_socket_token):
+    def client_login_uid(self, client_session, client_UID):
         """
-        Sends all the values of the user back to the client based on the given UID that we'll get from the body from the client_message 
+        Sends all the values of the user back to the client based on the given UID ( the field of the client message )
 
-        {SERVER_LOGIN_INFO_UID_SUCCESSFULL}{UID:<UID>|Username:<>|Password:<>|FirstName:<>|...}
+        {SERVER_LOGIN_INFO_UID_SUCCESSFUL}{1|<UID>|<Username>|<FirstName>|...} -- > The profile of the user ( Read ../Protocol/profile_codec.py )
+        The password is never sent back, the profile doesn't contain it ( the DB only stores its hash ).
 
         Following steps:
-        
-        1. Extract the UID from the body
-        2. Get all the values of the user from the DB based on the given UID from the body
+
+        1. The UID was already extracted from the client message by its codec
+        2. Get the response from the profile cache or, on a miss, all the values of the user from the DB based on the given UID from the body
         3. Use the stream- and file logger to log the successful connection to the server
-        4. Pack all the values of the user inside a dict and send it back to the client
+        4. Encode all the values of the user in the protocol of the client and send them back to it ( the framed response is cached )
         """
-        
-        ######################### STEP 1 #########################
-        # 1. Extract the UID from the body
-        client_message_body = client_message[client_message.index("}")+2:-1]
 
-        client_UID = client_message_body.split(":")[1]
-        ######################### STEP 1 #########################
         ######################### STEP 2 #########################
-        # 2. Get all the values of the user from the DB based on the given UID from the body
-        user_data = self.DB_get_user_data_with_UID(client_UID)
+        # 2. A cached response is sent right away. Text & binary clients get different responses, both are cached.
+        request_start_time = time.perf_counter()
+
+        response_frame = self.profile_cache.get(client_UID, client_session.binary_protocol)
+        if response_frame is not None:
+            self.send_uid_login_response(client_session, client_UID, request_start_time, response_frame)
+            return
+
+        # Get all the values of the user from the DB based on the given UID from the body. Steps 3 & 4 continue inside finish_client_login_uid().
+        lookup_token = self.profile_cache.lookup_token()
+        self.db_executor.submit(
+            lambda query_future: self.finish_client_login_uid(client_session, client_UID, lookup_token, request_start_time, query_future),
+            self.DB_get_user_data_with_UID, client_UID, client_session=client_session
+        )
         ######################### STEP 2 #########################
+
+    def finish_client_login_uid(self, client_session, client_UID, lookup_token, request_start_time, query_future):
+        """
+        Not intended for use outside class. Serializes & caches the user data of client_login_uid() and sends it back to the client.
+        An unknown UID ( or a failed lookup ) is answered like a wrong login : SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
+        """
+
+        user_row = self.get_future_result(query_future, None, "UID lookup", client_session)
+        if user_row is None:
+            self.client_login_uid_not_valid(client_session)
+            self.send_to_client(client_session, messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG)
+            self.request_latencies["client_login_uid"].observe(time.perf_counter() - request_start_time)
+            return
+
+        ######################### STEP 4 #########################
+        # 4. Encode the row of the user as it came from the DB ( the profile codec for the text protocol ). The framed response is cached, the next login of the UID skips the DB & the encoding.
+        response_frame = self.encode_server_message(client_session.binary_protocol, messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, *user_row)
+        self.profile_cache.put(client_UID, client_session.binary_protocol, response_frame, lookup_token)
+        ######################### STEP 4 #########################
+
+        self.send_uid_login_response(client_session, client_UID, request_start_time, response_frame)
+
+    def send_uid_login_response(self, client_session, client_UID, request_start_time, response_frame):
+        """
+        Not intended for use outside class. Logs the UID login and sends the framed response of client_login_uid() back to the client.
+        """
+
         ######################### STEP 3 #########################
         # 3. Use the stream- and file logger to log the successful connection to the server
-
-        self.currently_connected_users[user_data.get("Username")] = client_socket_token.getpeername()
+        # The UID login socket is short lived, the username is only bound to the communication socket ( {CLIENT_COMMUNICATION_DATA} )
 
         logger_user_registered_message = "Successful UID login > UID : {0} | Address : {1}".format(
-            user_data.get("UID"),
-            client_socket_token.getpeername()
+            client_UID,
+            client_session.client_address
         )
         self.stream_logger.info(logger_user_registered_message)
         self.file_logger.info(logger_user_registered_message)
         ######################### STEP 3 #########################
-        ######################### STEP 4 #########################
-        # 4. Pack all the values of the user inside a dict and send it back to the client
-        user_data = str(user_data)
-        client_socket_token.send(user_data.encode("utf-8"))
-        ######################### STEP 4 #########################
 
-    def DB_get_user_data_with_UID(self, client_UID):
-        """
-        Returns the user data base on the given UID
+        self.send_frame_to_client(client_session, response_frame)
+        self.request_latencies["client_login_uid"].observe(time.perf_counter() - request_start_time)
 
-        Return value ( type : dict ):
-        {
-            'UID' : <UID>,
-            'Username' : <Username>,
-            'Password' : <Password>,
-            ...
-        }
+    def DB_get_user_data_with_UID(self, DB_CONNECTION, client_UID):
         """
+        Runs on a thread of the DB executor. Returns the row ( tuple in the order of USER_FIELDS ) of the given UID, straight from the DB.
+        The stored password hash is left out by the query itself, knowing a UID mustn't be enough to get it ( the Password field is empty ).
+        """
+
+        return queries.get_profile_by_uid(DB_CONNECTION, client_UID)
 
-        # Execute the sql query and fetch the data
-        sql_execute_query = "SELECT * FROM users WHERE UID='{0}'".format(client_UID)
-        self.DB_CURSOR.execute(sql_execute_query)
-        db_user_data = self.DB_CURSOR.fetchone()
-
-        # Create the dict that contains all the user data that will be returned
-        return_user_data_dict = dict()
-        return_user_data_dict["UID"] =  db_user_data[0]
-        return_user_data_dict["Username"] = db_user_data[1]
-        return_user_data_dict["Password"] = db_user_data[2]
-        return_user_data_dict["FirstName"] = db_user_data[3]
-        return_user_data_dict["LastName"] = db_user_data[4]
-        return_user_data_dict["Age"] = db_user_data[5]
-        return_user_data_dict["City"] = db_user_data[6]
-        return_user_data_dict["PostalCode"] = db_user_data[7]
-        return_user_data_dict["StreetName"] = db_user_data[8]
-        return_user_data_dict["HouseNumber"] = db_user_data[9]
-        return_user_data_dict["Salary"] = db_user_data[10]
-
-        # Return the dict that contains the user data
-        return return_user_data_dict
-
-    def client_login_username_password(self, client_message, client_socket_token):
-        """
-        The user is at the first point of the login. They want to log in using the username and the password. 
-        The body structure looks like this : {USERNAME:{0}|PASSWORD:{1}}. 
+    def client_login_username_password(self, client_session, client_message_Username, client_message_Password):
+        """
+        The user is at the first point of the login. They want to log in using the username and the password.
+        The text body structure looks like this : {USERNAME:{0}|PASSWORD:{1}}.
         Following steps:
-        
-        1. Extract the username & the password from the body
-        2. Check to see if the username and the password are valid credentials inside the db
+
+        1. The username & the password were already extracted from the client message by its codec
+        2. Look up the UID & the stored password hash of the username inside the db and verify the password against it ( on the password hasher )
         3. Send the response back to the client
-        
+
         RESPONSE FROM THE SERVER:
 
         Successful:
@@ -367,81 +1566,271 @@ class Server:
         SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
         """
 
-        ######################### STEP 1 #########################
-        # Extract the body from the client message ( delete the additionally addeded curly braces at the start & the end of the body before extracting the credentials out of it )
-        client_message_body = client_message[client_message.index("}")+2:-1]
+        ######################### STEP 2 #########################
+        # Step 2 continues inside verify_client_password() once the DB executor found the stored password
+        request_start_time = time.perf_counter()
+        self.db_executor.submit(
+            lambda query_future: self.verify_client_password(client_session, client_message_Password, request_start_time, query_future),
+            self.DB_get_username_credentials, client_message_Username, client_session=client_session
+        )
+        ######################### STEP 2 #########################
+
+    def verify_client_password(self, client_session, client_message_Password, request_start_time, query_future):
+        """
+        Not intended for use outside class. Verifies the password of client_login_username_password() against the stored password.
+        """
 
-        # Extract username & password
-        client_message_Username, client_message_Password = client_message_body.split("|")
-        client_message_Username = client_message_Username.split(":")[1]
-        client_message_Password = client_message_Password.split(":")[1]
-        ######################### STEP 1 #########################
         ######################### STEP 2 #########################
-        user_credentials = self.DB_check_username_password_credentials(client_message_Username, client_message_Password)
+        # An unknown username is verified against a dummy hash, it's answered as late as a wrong password. Step 3 continues inside finish_client_login_username_password().
+        # A failed lookup is answered the same way.
+        user_credentials = self.get_future_result(query_future, None, "credentials lookup", client_session)
+        stored_password = user_credentials[1] if user_credentials is not None else None
+
+        self.password_hasher.verify(
+            lambda verify_future: self.finish_client_login_username_password(client_session, user_credentials, client_message_Password, request_start_time, verify_future),
+            client_message_Password, stored_password, client_session
+        )
         ######################### STEP 2 #########################
+
+    def finish_client_login_username_password(self, client_session, user_credentials, client_message_Password, request_start_time, verify_future):
+        """
+        Not intended for use outside class. Sends the response of client_login_username_password() back to the client.
+        """
+
         ######################### STEP 3 #########################
-        server_response_message = None
+        server_response_fields = ()
 
-        if user_credentials[0]:
-            # ( True , UID )
-            UID = user_credentials[1]
+        if self.get_future_result(verify_future, False, "password verification", client_session):
+            # ( UID, STORED PASSWORD )
+            UID, stored_password = user_credentials
 
-            server_response_message = "SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL_{0}".format(UID)
+            # A plaintext password of an old DB or a hash with an outdated cost is replaced, the response doesn't wait for it
+            if self.password_hasher.needs_rehash(stored_password):
+                self.upgrade_password_hash(UID, stored_password, client_message_Password)
+
+            server_response_opcode = messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL
+            server_response_fields = (UID,)
 
             # Use the stream and the file logger to register the successful login - step 1 -
-            logger_info_message = "SUCCESSFUL STEP 1 LOGIN FROM {0}".format(client_socket_token.getpeername())
+            logger_info_message = "SUCCESSFUL STEP 1 LOGIN FROM {0}".format(client_session.client_address)
             self.stream_logger.info(logger_info_message)
             self.file_logger.info(logger_info_message)
         else:
-            # ( False, None )
-            server_response_message = "SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG"
+            # Unknown username or wrong password
+            server_response_opcode = messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
 
             # Use the stream- and file logger to register the failed login attempt
-            logger_error_message = "FAILED STREAM LOG FROM {0}".format(client_socket_token.getpeername())
+            logger_error_message = "FAILED STREAM LOG FROM {0}".format(client_session.client_address)
             self.stream_logger.error(logger_error_message)
             self.file_logger.error(logger_error_message)
 
 
         # Send the response back to the client
-        client_socket_token.send(server_response_message.encode("utf-8"))
+        self.send_to_client(client_session, server_response_opcode, *server_response_fields)
+        self.request_latencies["client_login_username_password"].observe(time.perf_counter() - request_start_time)
         ######################### STEP 3 #########################
 
-    def DB_check_username_password_credentials(self, username, password):
+    def DB_get_username_credentials(self, DB_CONNECTION, username):
         """
-        Checks if the given username & password can be found in the db.
+        Runs on a thread of the DB executor. Looks up the given username in the db.
         If found returns:
-        (True, UID) > The UID is the UID found on the row for the given username & password
+        (UID, STORED PASSWORD) > The stored password is a hash ( or the plaintext password of an old DB ), verified by the password hasher
         If not found returns:
-        (False, None)
+        None
+        """
+
+        # Fetch the UID & the stored password from the DB using the connection of the DB thread
+        return queries.get_credentials_by_username(DB_CONNECTION, username)
+
+    def client_session_login(self, client_session, client_message_Username, client_message_Password):
+        """
+        The login in a single round trip : the username & the password are verified, the profile & a session token are sent back
+        and the connection becomes the communication socket of the username right away ( no UID login, no {CLIENT_COMMUNICATION_DATA} ).
+        Following steps:
+
+        1. The username & the password were already extracted from the client message by its codec
+        2. Look up the whole row of the username inside the db and verify the password against its stored password ( on the password hasher )
+        3. Send the session token & the profile and bind the username to the connection
+
+        RESPONSE FROM THE SERVER:
+
+        Successful:
+        {SERVER_SESSION}{<TOKEN>|1|<UID>|<Username>|<FirstName>|...} -- > The token & the profile, followed by the stored offline messages of the username
+
+        Username or password wrong ( the connection stays open for another attempt ):
+        SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG
+        """
+
+        ######################### STEP 2 #########################
+        # Step 2 continues inside verify_session_password() once the DB executor found the row of the username
+        request_start_time = time.perf_counter()
+        self.db_executor.submit(
+            lambda query_future: self.verify_session_password(client_session, client_message_Password, request_start_time, query_future),
+            self.DB_get_user_data_with_username, client_message_Username, client_session=client_session
+        )
+        ######################### STEP 2 #########################
+
+    def verify_session_password(self, client_session, client_message_Password, request_start_time, query_future):
+        """
+        Not intended for use outside class. Verifies the password of client_session_login() against the stored password.
         """
 
-        # Fetch the data from the DB using the cursor
-        sql_select_query = "SELECT UID, Username, Password FROM users WHERE Username='{0}' AND Password='{1}'".format(
-            username, password
+        ######################### STEP 2 #########################
+        # Same as verify_client_password() : an unknown username ( or a failed lookup ) is verified against the dummy hash
+        db_user_data = self.get_future_result(query_future, None, "session login lookup", client_session)
+        stored_password = db_user_data[2] if db_user_data is not None else None
+
+        self.password_hasher.verify(
+            lambda verify_future: self.finish_client_session_login(client_session, db_user_data, client_message_Password, request_start_time, verify_future),
+            client_message_Password, stored_password, client_session
         )
-        self.DB_CURSOR.execute(sql_select_query)
-        fetched_user_credentials_UID_username_password = self.DB_CURSOR.fetchone()
+        ######################### STEP 2 #########################
+
+    def finish_client_session_login(self, client_session, db_user_data, client_message_Password, request_start_time, verify_future):
+        """
+        Not intended for use outside class. Sends the response of client_session_login() and binds the username to the connection.
+        """
+
+        ######################### STEP 3 #########################
+        # The client may have disconnected while its password was verified
+        if client_session.closed:
+            return
 
-        if fetched_user_credentials_UID_username_password:
-            return (True, fetched_user_credentials_UID_username_password[0])
+        if self.get_future_result(verify_future, False, "password verification", client_session):
+            UID, username, stored_password = db_user_data[:3]
+
+            if self.password_hasher.needs_rehash(stored_password):
+                self.upgrade_password_hash(UID, stored_password, client_message_Password)
+
+            # The stored password never leaves the server. The session message is sent before the stored offline messages of the username.
+            self.send_to_client(
+                client_session, messages.SERVER_SESSION, self.session_tokens.issue(UID, username), UID, username, "", *db_user_data[3:]
+            )
+            self.save_client_for_communication(client_session, username)
         else:
-            return (False, None)
+            self.send_to_client(client_session, messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG)
+
+            logger_error_message = "FAILED SESSION LOGIN FROM {0}".format(client_session.client_address)
+            self.stream_logger.error(logger_error_message)
+            self.file_logger.error(logger_error_message)
+
+        self.request_latencies["client_session_login"].observe(time.perf_counter() - request_start_time)
+        ######################### STEP 3 #########################
+
+    def DB_get_user_data_with_username(self, DB_CONNECTION, username):
+        """
+        Runs on a thread of the DB executor. Returns the row ( tuple in the order of USER_FIELDS ) of the username or None.
+        """
+
+        return queries.get_user_by_username(DB_CONNECTION, username)
+
+    def client_session_resume(self, client_session, session_token):
+        """
+        A reconnect with the token of an earlier session login. The token is checked by its signature only ( no DB, no password hash ),
+        the connection becomes the communication socket of its username and gets a new token with a new expiry.
+
+        CLIENT : {CLIENT_SESSION_RESUME}{<TOKEN>}
+
+        RESPONSE FROM THE SERVER:
+
+        Successful:
+        {SERVER_SESSION_RESUMED}{<NEW TOKEN>}
+
+        Forged or expired token ( the client has to log in again ):
+        {SERVER_SESSION_INVALID}
+        """
+
+        session_identity = self.session_tokens.verify(session_token)
+        if session_identity is None:
+            self.send_to_client(client_session, messages.SERVER_SESSION_INVALID)
+            return
+
+        UID, username = session_identity
+
+        self.send_to_client(client_session, messages.SERVER_SESSION_RESUMED, self.session_tokens.issue(UID, username))
+        self.save_client_for_communication(client_session, username)
+
+    def upgrade_password_hash(self, UID, stored_password, password):
+        """
+        Not intended for use outside class. Hashes the verified password with the current scheme & cost and replaces the stored password with it.
+        """
+
+        self.password_hasher.hash(lambda hash_future: self.store_upgraded_password_hash(UID, stored_password, hash_future), password)
+
+    def store_upgraded_password_hash(self, UID, stored_password, hash_future):
+        """
+        Not intended for use outside class. Replaces the stored password with the hash of upgrade_password_hash().
+        """
+
+        # The old password stays valid, the next login tries again
+        new_stored_password = self.get_future_result(hash_future, None, "password hash upgrade")
+        if new_stored_password is not None:
+            self.db_executor.submit(self.finish_upgrade_password_hash, queries.update_password, UID, stored_password, new_stored_password)
+
+    def finish_upgrade_password_hash(self, query_future):
+        """
+        Not intended for use outside class. Counts the replaced password. A concurrent login of the same user may have replaced it already.
+        """
+
+        # The old password stays valid, the next login tries again
+        if self.get_future_result(query_future, False, "stored password replacement"):
+            self.password_upgrades.increment()
 
-    def create_file_stream_loggers(self):
+    def serve_forever(self):
         """
-        Returns a stream and a file logger inside a tuple -> ( STREAM_LOGGER, FILE_LOGGER ) 
+        Runs the selector loop. Every ready socket calls the callback handler it was registered with.
+        """
+
+        # Opened here and not inside __init__(), the index of a worker is only known once its links are attached
+        # keys : File descriptor of an admin connection | values : ( ClientSession, REQUEST BUFFER )
+        self.admin_sessions = dict()
+        for admin_server_socket in self.create_admin_sockets():
+            self.selector.register(admin_server_socket, selectors.EVENT_READ, self.selector_register_accept_admin_connection)
+
+        while True:
+            # select() sleeps until the next connection timer, throttled session or presence delta is due, an idle server without connections doesn't wake up at all
+            now = time.monotonic()
+            select_timeout = self.timer_wheel.next_timeout(now)
+            throttle_timeout = self.rate_limit_wheel.next_timeout(now)
+            if throttle_timeout is not None and (select_timeout is None or throttle_timeout < select_timeout):
+                select_timeout = throttle_timeout
+            presence_timeout = self.presence.next_timeout(now)
+            if presence_timeout is not None and (select_timeout is None or presence_timeout < select_timeout):
+                select_timeout = presence_timeout
+
+            select_events = self.selector.select(select_timeout)
+            self.loop_time = time.monotonic()
+
+            for key, mask in select_events:
+                key.data(self.selector, key.fileobj, mask)
+
+            for client_session in self.rate_limit_wheel.expire(self.loop_time):
+                self.resume_client_session(client_session)
+
+            self.expire_connection_timers()
+
+            # The changes of this round are sent together with the others of the tick
+            self.presence.flush(self.loop_time)
+
+    def create_log_formatter(self):
+        """
+        Returns the formatter used by the both loggers
+        """
+
+        return logging.Formatter("{asctime} [ {levelname:8} ] > {message}", datefmt="%d.%m.%Y <> %H:%M:%S", style="{")
+
+    def create_file_stream_loggers(self, log_info_sample=1):
+        """
+        Returns a stream and a file logger inside a tuple -> ( STREAM_LOGGER, FILE_LOGGER )
         Both loggers are level 50 loggers.
+        The handlers only queue the records, the log pipeline formats & writes them on its own thread. Only every log_info_sample-th INFO record is kept.
         """
 
-        # Create the formatter used by the both loggers
-        HANDLER_FORMATTER = logging.Formatter("{asctime} [ {levelname:8} ] > {message}", datefmt="%d.%m.%Y <> %H:%M:%S", style="{")
-        
-        # Create the handlers and set the formatter to both of them
-        STREAM_HANDLER = logging.StreamHandler()
-        STREAM_HANDLER.setFormatter(HANDLER_FORMATTER)
+        # Create the handlers. The formatter used by the both loggers belongs to the log pipeline.
+        sample_rates = {logging.INFO: log_info_sample} if log_info_sample > 1 else None
 
-        FILE_HANDLER =  logging.FileHandler(self.monitoringFileName)
-        FILE_HANDLER.setFormatter(HANDLER_FORMATTER)
+        STREAM_HANDLER = self.log_pipeline.create_handler(STREAM_OUTPUT, sample_rates)
+        FILE_HANDLER = self.log_pipeline.create_handler(FILE_OUTPUT, sample_rates)
 
         # Create the loggers and  add the handlers to them
         file_logger = logging.getLogger("file_logger")
@@ -458,11 +1847,100 @@ class Server:
         return ( stream_logger, file_logger )
 
 
-server = Server(socket.gethostname(), 55555, "connections.log")
-
-try:
-    while True:
-        for key, mask in server.selector.select():
-            key.data(server.selector, key.fileobj)
-except (ConnectionResetError, ConnectionAbortedError, ConnectionRefusedError):
-    pass
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Starts the multiplex server. Run it from outside the top level directory : python -m <top_level>.Server.server")
+    argument_parser.add_argument("--host", default=socket.gethostname(), help="The IPv4 address / hostname the server binds to. Defaults to the hostname of the machine.")
+    argument_parser.add_argument("--port", type=int, default=55555, help="Defaults to 55555")
+    argument_parser.add_argument("--log-file", default=os.path.join(SERVER_DIRECTORY, "connections.log"), help="The file used to monitor the connections. Defaults to Server/connections.log")
+    argument_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes sharing the port with SO_REUSEPORT. Defaults to 1 ( single process )")
+    argument_parser.add_argument("--db", default=DB_PATH, help="The users DB. Defaults to DB/dummy_db.db")
+    argument_parser.add_argument("--register-batch-size", type=int, default=64, help="The most registrations committed in one transaction. Defaults to 64")
+    argument_parser.add_argument("--register-batch-window", type=float, default=0.002, help="Seconds the DB writer waits for more registrations before it commits. Defaults to 0.002")
+    argument_parser.add_argument("--profile-cache-size", type=int, default=10000, help="The most UID login responses cached. 0 disables the cache. Defaults to 10000")
+    argument_parser.add_argument("--profile-cache-ttl", type=float, default=60.0, help="Seconds a cached UID login response is served. Defaults to 60")
+    argument_parser.add_argument("--db-workers", type=int, default=4, help="Threads running the DB queries, each with its own connection. Defaults to 4")
+    argument_parser.add_argument("--engine", choices=("selectors", "asyncio"), default="selectors", help="The event loop that serves the connections. Defaults to selectors")
+    argument_parser.add_argument("--log-max-bytes", type=int, default=10 * 1024 * 1024, help="Rotate the log file before it grows above this size. 0 disables the rotation. Defaults to 10 MB")
+    argument_parser.add_argument("--log-backups", type=int, default=5, help="Rotated log files kept. Defaults to 5")
+    argument_parser.add_argument("--log-queue-size", type=int, default=10000, help="The most log records waiting to be written. Records beyond it are dropped & counted. Defaults to 10000")
+    argument_parser.add_argument("--log-info-sample", type=int, default=1, help="Log only every n-th INFO record ( connections, logins ). Defaults to 1 ( all of them )")
+    argument_parser.add_argument("--admin-port", type=int, default=None, help="Local TCP port ( 127.0.0.1 ) that answers with the metrics of the server. Workers add their index. Disabled by default")
+    argument_parser.add_argument("--admin-socket", default=None, help="Unix socket path that answers with the metrics of the server. Workers add .<index>. Disabled by default")
+    argument_parser.add_argument("--offline-inbox-limit", type=int, default=1000, help="The most messages stored for an offline username until it connects again. 0 disables the inbox. Defaults to 1000")
+    argument_parser.add_argument("--offline-sender-limit", type=int, default=10000, help="The most offline messages stored from a single sending host. Defaults to 10000")
+    argument_parser.add_argument("--offline-memory-messages", type=int, default=10000, help="The most stored messages kept in memory, the rest is spilled to the inbox file. Defaults to 10000")
+    argument_parser.add_argument("--offline-max-messages", type=int, default=1000000, help="The most offline messages stored in total. Defaults to 1000000")
+    argument_parser.add_argument("--offline-inbox-file", default=None, help="The spill file of the offline inbox ( emptied at start ). Workers add .<index>. Defaults to a temporary file")
+    argument_parser.add_argument("--offline-drain-batch", type=int, default=256, help="The most stored messages sent with a single write to a reconnecting username. Defaults to 256")
+    argument_parser.add_argument("--handshake-timeout", type=float, default=30.0, help="Seconds a connection without a username ( login & register sockets ) may stay silent. 0 disables it. Defaults to 30")
+    argument_parser.add_argument("--heartbeat-interval", type=float, default=30.0, help="Seconds of silence after which a communication socket gets a heartbeat. 0 disables the heartbeats. Defaults to 30")
+    argument_parser.add_argument("--idle-timeout", type=float, default=90.0, help="Seconds a communication socket may stay silent ( heartbeat answers included ) before it's disconnected. 0 disables it. Defaults to 90")
+    argument_parser.add_argument("--rate-limit-connection", type=parse_rate_limit, default=None, metavar="RATE[:BURST]", help="Messages per second ( & burst ) of every connection. Disabled by default")
+    argument_parser.add_argument("--rate-limit-user", type=parse_rate_limit, default=None, metavar="RATE[:BURST]", help="Messages per second ( & burst ) of every username, across its connections. Disabled by default")
+    argument_parser.add_argument("--rate-limit-header", type=parse_header_rate_limit, action="append", metavar="HEADER=RATE[:BURST]", help="Messages per second ( & burst ) of one header on every connection, e.g. CLIENT_LOGIN_INFO_USERNAME_PASSWORD=5:10. Can be repeated")
+    argument_parser.add_argument("--password-workers", type=int, default=2, help="Processes hashing & verifying the passwords. 0 hashes on the event loop ( comparisons only ). Defaults to 2")
+    argument_parser.add_argument("--password-scheme", choices=(passwords.SCRYPT, passwords.PBKDF2), default=passwords.SCRYPT, help="Scheme of the new password hashes. Defaults to scrypt")
+    argument_parser.add_argument("--password-cost", type=int, default=None, help="N of scrypt or iterations of PBKDF2 for the new password hashes. Defaults to {0} & {1}".format(passwords.DEFAULT_COSTS[passwords.SCRYPT], passwords.DEFAULT_COSTS[passwords.PBKDF2]))
+    argument_parser.add_argument("--session-token-ttl", type=float, default=3600.0, help="Seconds a session token can resume a session. Defaults to 3600")
+    argument_parser.add_argument("--timer-tick", type=float, default=0.25, help="Resolution of the connection timeouts in seconds. Defaults to 0.25")
+    argument_parser.add_argument("--presence-tick", type=float, default=0.5, help="Seconds the online / offline changes are collected into one presence delta. Defaults to 0.5")
+    argument_parser.add_argument("--presence-chunk-size", type=int, default=1000, help="The most usernames per presence message, bigger rosters are sent in parts. Defaults to 1000")
+    argument_parser.add_argument("--legacy-bind", action="store_true", help="Accept {CLIENT_COMMUNICATION_DATA} of the old clients, which binds any username without a password. Disabled by default")
+    arguments = argument_parser.parse_args()
+
+    if arguments.engine == "asyncio":
+        # Imported here, the asyncio engine imports this module itself
+        from .async_server import AsyncServer
+
+        if arguments.workers > 1:
+            argument_parser.error("The asyncio engine runs in a single process, --workers isn't supported")
+
+    # Options shared by all the engines & workers
+    server_options = dict(
+        db_workers=arguments.db_workers,
+        db_path=arguments.db,
+        register_batch_size=arguments.register_batch_size,
+        register_batch_window=arguments.register_batch_window,
+        profile_cache_size=arguments.profile_cache_size,
+        profile_cache_ttl=arguments.profile_cache_ttl,
+        log_max_bytes=arguments.log_max_bytes,
+        log_backup_count=arguments.log_backups,
+        log_queue_size=arguments.log_queue_size,
+        log_info_sample=arguments.log_info_sample,
+        admin_port=arguments.admin_port,
+        admin_socket=arguments.admin_socket,
+        offline_inbox_limit=arguments.offline_inbox_limit,
+        offline_sender_limit=arguments.offline_sender_limit,
+        offline_memory_messages=arguments.offline_memory_messages,
+        offline_max_messages=arguments.offline_max_messages,
+        offline_inbox_file=arguments.offline_inbox_file,
+        offline_drain_batch=arguments.offline_drain_batch,
+        handshake_timeout=arguments.handshake_timeout,
+        heartbeat_interval=arguments.heartbeat_interval,
+        idle_timeout=arguments.idle_timeout,
+        timer_tick=arguments.timer_tick,
+        rate_limit_connection=arguments.rate_limit_connection,
+        rate_limit_user=arguments.rate_limit_user,
+        rate_limit_headers=dict(arguments.rate_limit_header or []),
+        password_workers=arguments.password_workers,
+        password_scheme=arguments.password_scheme,
+        password_cost=arguments.password_cost,
+        session_token_ttl=arguments.session_token_ttl,
+        presence_tick=arguments.presence_tick,
+        presence_chunk_size=arguments.presence_chunk_size,
+        legacy_bind=arguments.legacy_bind,
+        # Generated once, so every worker accepts the session tokens of the others
+        session_secret=os.urandom(SECRET_SIZE)
+    )
+
+    try:
+        if arguments.engine == "asyncio":
+            server = AsyncServer(arguments.host, arguments.port, arguments.log_file, **server_options)
+            server.serve_forever()
+        elif arguments.workers > 1:
+            WorkerPool(arguments.host, arguments.port, arguments.log_file, arguments.workers, Server, server_options).run()
+        else:
+            server = Server(arguments.host, arguments.port, arguments.log_file, **server_options)
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,101 @@
+"""
+Session tokens of the single round trip login ( {CLIENT_SESSION_LOGIN} ) and of the reconnects ( {CLIENT_SESSION_RESUME} ).
+
+A token is signed by the server, not stored by it : <PAYLOAD HEX>.<HMAC-SHA256 HEX> with the payload <UID>:<EXPIRY>:<USERNAME>.
+Checking a token is one HMAC, so a reconnect binds its username without a query and without a password hash. Every worker of the
+multi-process mode can check the tokens of the others, they share the secret ( Read Server/server.py, __main__ ).
+
+A resumed session gets a new token with a new expiry, so a client that reconnects from time to time stays logged in. A token can't be revoked
+before it expires : restart the server with another secret to log every session out.
+"""
+
+import hashlib  # SHA-256 of the signatures
+import hmac  # Signatures & their constant time comparison
+import os  # Random secret
+import time  # Expiry of the tokens
+
+# Length of the signature inside a token ( the first 16 bytes of the HMAC )
+SIGNATURE_SIZE = 16
+
+SECRET_SIZE = 32
+
+
+class SessionTokens:
+    def __init__(self, secret=None, ttl=3600.0):
+        """
+        secret -- > Key of the signatures ( bytes ). None for a random one, the tokens are only valid until the server restarts in that case.
+        ttl -- > Seconds a token stays valid after it was issued
+        """
+
+        if ttl <= 0:
+            raise ValueError("The session tokens need a ttl > 0")
+
+        self.secret = secret if secret is not None else os.urandom(SECRET_SIZE)
+        self.ttl = ttl
+
+        # Only touched on the event loop thread
+        self.issued_tokens = 0
+        self.resumed_sessions = 0
+        self.rejected_tokens = 0
+        self.expired_tokens = 0
+
+    def sign(self, payload):
+        """
+        Not intended for use outside class. Returns the signature of the payload ( bytes ) as hex.
+        """
+
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:SIGNATURE_SIZE].hex()
+
+    def issue(self, UID, username, now=None):
+        """
+        Returns a new token of the user, valid for ttl seconds
+        """
+
+        expiry = int((time.time() if now is None else now) + self.ttl)
+        payload = "{0}:{1}:{2}".format(UID, expiry, username).encode("utf-8")
+
+        self.issued_tokens += 1
+
+        return "{0}.{1}".format(payload.hex(), self.sign(payload))
+
+    def verify(self, token, now=None):
+        """
+        Returns a tuple -> ( UID, USERNAME ) of a valid token or None for a forged, malformed or expired token
+        """
+
+        try:
+            payload_hex, signature = token.split(".")
+            payload = bytes.fromhex(payload_hex)
+            UID, expiry, username = payload.decode("utf-8").split(":", 2)
+            UID, expiry = int(UID), int(expiry)
+
+            # compare_digest() raises TypeError for a str with non-ASCII characters, the signatures are compared as bytes
+            signature = signature.encode("ascii")
+        except (ValueError, TypeError):
+            self.rejected_tokens += 1
+            return None
+
+        if not hmac.compare_digest(self.sign(payload).encode("ascii"), signature):
+            self.rejected_tokens += 1
+            return None
+
+        if expiry < (time.time() if now is None else now):
+            self.expired_tokens += 1
+            return None
+
+        self.resumed_sessions += 1
+
+        return (UID, username)
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the tokens
+        """
+
+        return {
+            "ttl": self.ttl,
+            "issued": self.issued_tokens,
+            "resumed": self.resumed_sessions,
+            "rejected": self.rejected_tokens,
+            "expired": self.expired_tokens,
+        }
@@ -0,0 +1,131 @@
+"""
+Hashed timer wheel for the connection timeouts of the server ( handshake, heartbeat & idle timeouts ).
+
+The time is cut into ticks of tick_seconds. Every slot of the wheel holds the keys whose deadline falls into one tick, the slot of a deadline
+is its tick modulo the number of slots. Scheduling & cancelling a key is a dict operation, expiring a tick only looks at the keys of its slot:
+the cost of a tick depends on the number of expired keys, not on the number of scheduled keys.
+
+The wheel covers slot_count * tick_seconds into the future. A deadline beyond that is put into the last slot that's covered and expires early,
+the owner of the key checks its real deadline and schedules the key again ( the server does that for every expired connection anyway ).
+Deadlines are rounded up to the next tick, a key never expires before its deadline.
+
+next_timeout() returns the time until the next tick with a key, it's used as the timeout of select(), so an idle server doesn't wake up at all.
+"""
+
+import math  # Round the deadlines up to their tick
+
+
+class TimerWheel:
+    def __init__(self, tick_seconds, horizon_seconds, now):
+        """
+        tick_seconds -- > Resolution of the deadlines
+        horizon_seconds -- > The longest delay that is expired exactly, longer ones are expired early ( Read the module docstring )
+        now -- > Current time of the clock the deadlines are based on ( e.g. time.monotonic() )
+        """
+
+        if tick_seconds <= 0 or horizon_seconds <= 0:
+            raise ValueError("The timer wheel needs tick_seconds > 0 and horizon_seconds > 0")
+
+        self.tick_seconds = tick_seconds
+        self.slot_count = math.ceil(horizon_seconds / tick_seconds) + 1
+
+        # Every slot -- > keys : Scheduled key | values : Tick of its deadline
+        self.slots = [dict() for i in range(self.slot_count)]
+
+        # keys : Scheduled key | values : Index of its slot
+        self.slot_by_key = dict()
+
+        # The last tick that was expired
+        self.current_tick = math.floor(now / tick_seconds)
+
+        # The earliest tick with a key or None if it has to be searched again ( after an expire() )
+        self.next_tick = None
+
+    def __len__(self):
+        """Returns the number of scheduled keys"""
+        return len(self.slot_by_key)
+
+    def __contains__(self, key):
+        """Checks if the key is scheduled"""
+        return key in self.slot_by_key
+
+    def schedule(self, key, deadline):
+        """
+        Schedules the key to expire at the deadline. A key that is already scheduled is moved to the new deadline.
+        """
+
+        tick = max(math.ceil(deadline / self.tick_seconds), self.current_tick + 1)
+        tick = min(tick, self.current_tick + self.slot_count - 1)
+
+        slot_index = tick % self.slot_count
+        previous_slot_index = self.slot_by_key.get(key)
+        if previous_slot_index is not None and previous_slot_index != slot_index:
+            del self.slots[previous_slot_index][key]
+
+        self.slots[slot_index][key] = tick
+        self.slot_by_key[key] = slot_index
+
+        if self.next_tick is not None and tick < self.next_tick:
+            self.next_tick = tick
+
+    def cancel(self, key):
+        """
+        Removes the key from the wheel. Does nothing if it isn't scheduled.
+        """
+
+        slot_index = self.slot_by_key.pop(key, None)
+        if slot_index is not None:
+            del self.slots[slot_index][key]
+
+    def expire(self, now):
+        """
+        Removes & returns the list of the keys whose deadline is not after now.
+        """
+
+        now_tick = math.floor(now / self.tick_seconds)
+        if now_tick <= self.current_tick:
+            return []
+
+        expired_keys = []
+
+        # After a pause longer than the wheel every slot is due once
+        for tick in range(self.current_tick + 1, min(now_tick, self.current_tick + self.slot_count) + 1):
+            slot = self.slots[tick % self.slot_count]
+            if slot:
+                expired_keys.extend(slot)
+                slot.clear()
+
+        for key in expired_keys:
+            del self.slot_by_key[key]
+
+        self.current_tick = now_tick
+        self.next_tick = None
+
+        return expired_keys
+
+    def next_timeout(self, now):
+        """
+        Returns the seconds until the next tick with a key ( 0 if it's due already ) or None if the wheel is empty.
+        """
+
+        if not self.slot_by_key:
+            return None
+
+        if self.next_tick is None:
+            # The keys all fall within one revolution after the current tick, the first slot with a key holds the earliest one
+            for tick in range(self.current_tick + 1, self.current_tick + self.slot_count):
+                if self.slots[tick % self.slot_count]:
+                    self.next_tick = tick
+                    break
+
+        return max(0.0, self.next_tick * self.tick_seconds - now)
+
+    def stats(self):
+        """
+        Returns a dict with the counters of the wheel
+        """
+
+        return {
+            "scheduled": len(self.slot_by_key),
+            "slots": self.slot_count,
+        }
@@ -0,0 +1,140 @@
+"""
+Multi-process mode of the server.
+
+The WorkerPool forks N worker processes. Every worker is a complete Server with its own selector, its own DB connection and its own
+listening socket. All the listening sockets are bound to the same address with SO_REUSEPORT, so the kernel spreads the new connections over the workers.
+
+A user can only be reached through the worker that accepted its communication socket. That's why every pair of workers is connected
+by a Unix socket pair ( the routing layer ). The workers use these links to tell each other which usernames they host and to forward
+{CLIENT_MESSAGE} traffic to the worker of the receiver. The links use the same framing as the clients.
+"""
+
+import os  # fork() the workers
+import socket  # Unix socket pairs between the workers
+import signal  # Stop the workers together with the pool
+import traceback  # A crashing worker must not fall back into the code of the parent
+from .client_session import ClientSession  # A worker link is a session with a frame decoder & an outbound queue
+
+
+class WorkerLink(ClientSession):
+    __slots__ = ("worker_index",)
+
+    def __init__(self, link_socket, worker_index):
+        """
+        The connection from the current worker to the sibling worker with the given index
+        """
+
+        super().__init__(link_socket, "worker-{0}".format(worker_index))
+        self.worker_index = worker_index
+
+
+class WorkerPool:
+    def __init__(self, IPv4, PORT, monitoringFileName, number_of_workers, server_class, server_options=None):
+        """
+        Prepares number_of_workers workers. Every worker runs server_class(IPv4, PORT, monitoringFileName, reuse_port=True, **server_options).
+        Nothing is started before .run() is called.
+        """
+
+        if number_of_workers < 1:
+            raise ValueError("The pool needs at least one worker")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("The multi-process mode needs SO_REUSEPORT ( Linux, BSD, macOS )")
+
+        self.IPv4 = IPv4
+        self.PORT = PORT
+        self.monitoringFileName = monitoringFileName
+        self.number_of_workers = number_of_workers
+        self.server_class = server_class
+        self.server_options = server_options or dict()
+
+        # Process ids of the running workers
+        self.worker_pids = []
+
+    def create_worker_links(self):
+        """
+        Returns the full mesh of links between the workers.
+        links[i][j] is the socket that worker i uses to talk to worker j.
+        """
+
+        links = [dict() for i in range(self.number_of_workers)]
+
+        for i in range(self.number_of_workers):
+            for j in range(i + 1, self.number_of_workers):
+                links[i][j], links[j][i] = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        return links
+
+    def run_worker(self, worker_index, worker_link_sockets):
+        """
+        Not intended for use outside class. Runs inside the forked worker process and never returns.
+        """
+
+        exit_code = 0
+        try:
+            # The parent decides when the workers stop
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            server = self.server_class(self.IPv4, self.PORT, self.monitoringFileName, reuse_port=True, **self.server_options)
+            server.attach_worker_links(worker_index, worker_link_sockets)
+            server.serve_forever()
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def run(self):
+        """
+        Forks the workers and waits for them. The pool stops all the workers as soon as one of them exits ( its links are broken )
+        or the pool itself receives SIGINT / SIGTERM.
+        """
+
+        links = self.create_worker_links()
+
+        for worker_index in range(self.number_of_workers):
+            pid = os.fork()
+
+            if pid == 0:
+                # Keep only the links of this worker
+                for i in range(self.number_of_workers):
+                    if i != worker_index:
+                        for link_socket in links[i].values():
+                            link_socket.close()
+
+                self.run_worker(worker_index, links[worker_index])
+
+            self.worker_pids.append(pid)
+
+        # The parent doesn't route anything
+        for worker_links in links:
+            for link_socket in worker_links.values():
+                link_socket.close()
+
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: self.stop())
+
+        try:
+            os.wait()
+        except (KeyboardInterrupt, ChildProcessError):
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Terminates all the workers that are still running and waits for them
+        """
+
+        worker_pids, self.worker_pids = self.worker_pids, []
+
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        for pid in worker_pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
@@ -0,0 +1,6 @@
+"""
+Behavior tests of the protocol codecs & the server components, written with unittest ( no dependency outside the standard library ).
+
+The modules use relative imports like the rest of the project, run them from outside the top level directory:
+python -m unittest discover -s <top_level>/Tests -t .
+"""
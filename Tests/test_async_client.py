@@ -0,0 +1,54 @@
+import asyncio  # Fake server of the client
+import socket  # A port nobody listens on
+import unittest
+from ..Client.async_client import AsyncClient, ConnectionClosedException, CONNECTION_CLOSED
+from ..Protocol.framing import encode_frame
+from ..Protocol.messages import MalformedMessageException
+
+
+class AsyncClientTest(unittest.TestCase):
+    def read_after_frame(self, frame):
+        """Connects a client to a server that sends the frame and returns what the client read"""
+
+        async def send_frame(reader, writer):
+            writer.write(encode_frame(frame))
+            await writer.drain()
+
+        async def run():
+            server = await asyncio.start_server(send_frame, "127.0.0.1", 0)
+            async with server:
+                chat_client = AsyncClient("127.0.0.1", server.sockets[0].getsockname()[1], request_timeout=5)
+                await chat_client.connect()
+                received_message = await asyncio.wait_for(chat_client.incoming.get(), 5)
+                await chat_client.close()
+                return received_message, chat_client
+
+        return asyncio.run(run())
+
+    def test_undecodable_text_frame_closes_the_connection_as_malformed(self):
+        (opcode, fields), chat_client = self.read_after_frame(b"MESSAGE_FROM_CLIENT_alice_\xc3\x28")
+
+        self.assertEqual(opcode, CONNECTION_CLOSED)
+        self.assertIsInstance(fields[0], MalformedMessageException)
+        self.assertIs(chat_client.close_exception, fields[0])
+        self.assertTrue(chat_client.closed)
+
+    def test_malformed_text_frame_closes_the_connection(self):
+        (opcode, fields), chat_client = self.read_after_frame(b"{SERVER_PRESENCE_SNAPSHOT}{-1_alice}")
+
+        self.assertEqual(opcode, CONNECTION_CLOSED)
+        self.assertIsInstance(fields[0], MalformedMessageException)
+
+    def test_unreachable_server_raises_connection_closed(self):
+        # The port is free again once the socket is closed
+        with socket.socket() as free_socket:
+            free_socket.bind(("127.0.0.1", 0))
+            port = free_socket.getsockname()[1]
+
+        chat_client = AsyncClient("127.0.0.1", port, request_timeout=5)
+        with self.assertRaises(ConnectionClosedException):
+            asyncio.run(chat_client.connect())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from ..Protocol import messages
+from ..Protocol.binary_protocol import encode_message, decode_message, encode_varint, decode_varint
+from ..Protocol.messages import FIELD_TYPES, MAX_UNSIGNED, MalformedMessageException
+
+# Values of every field type that need the bigger encodings as well ( multi byte varints, multi byte UTF-8, "_" & "|" inside a field )
+SAMPLE_FIELDS = {
+    "u": (0, 0x7F, 0x80, 300, MAX_UNSIGNED),
+    "s": ("", "alice", "a_b|c:{d}", "grüße ✓", "x" * 300),
+}
+
+
+def create_fields(field_types, index):
+    """
+    Returns fields of the types, picking the sample at index ( modulo the samples of the type )
+    """
+
+    return tuple(SAMPLE_FIELDS[field_type][(index + i) % len(SAMPLE_FIELDS[field_type])] for i, field_type in enumerate(field_types))
+
+
+class VarintTest(unittest.TestCase):
+    def test_round_trip(self):
+        for value in (0, 1, 0x7F, 0x80, 0x3FFF, 0x4000, 2 ** 32, MAX_UNSIGNED):
+            varint = encode_varint(value)
+            self.assertEqual(decode_varint(varint, 0), (value, len(varint)))
+
+    def test_biggest_value_fits_into_9_bytes(self):
+        self.assertEqual(len(encode_varint(MAX_UNSIGNED)), 9)
+
+    def test_out_of_range_values_are_rejected(self):
+        for value in (-1, -2 ** 63, MAX_UNSIGNED + 1, 2 ** 70):
+            with self.assertRaises(ValueError):
+                encode_varint(value)
+
+    def test_oversized_varint_is_malformed(self):
+        # 2 ** 63 needs a 10th byte
+        with self.assertRaises(MalformedMessageException):
+            decode_varint(b"\x80" * 9 + b"\x01", 0)
+
+    def test_truncated_varint_is_malformed(self):
+        with self.assertRaises(MalformedMessageException):
+            decode_varint(b"\xff\xff", 0)
+
+
+class BinaryProtocolTest(unittest.TestCase):
+    def test_every_opcode_round_trips(self):
+        for opcode, field_types in FIELD_TYPES.items():
+            for index in range(5):
+                fields = create_fields(field_types, index)
+                with self.subTest(opcode=hex(opcode), index=index):
+                    self.assertEqual(decode_message(encode_message(opcode, *fields)), (opcode, fields))
+
+    def test_wrong_number_of_fields_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            encode_message(messages.CLIENT_MESSAGE, "alice", "bob")
+
+    def test_out_of_range_field_is_rejected_by_the_encoder(self):
+        for UID in (-1, MAX_UNSIGNED + 1):
+            with self.assertRaises(ValueError):
+                encode_message(messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL, UID)
+
+    def test_oversized_integer_field_is_malformed(self):
+        payload = bytes((messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL,)) + b"\xff" * 9 + b"\x01"
+        with self.assertRaises(MalformedMessageException):
+            decode_message(payload)
+
+    def test_every_truncation_is_malformed(self):
+        payload = encode_message(messages.CLIENT_REGISTER_DATA, *create_fields(messages.USER_FIELD_TYPES, 4))
+        for size in range(1, len(payload)):
+            with self.subTest(size=size), self.assertRaises(MalformedMessageException):
+                decode_message(payload[:size])
+
+    def test_trailing_bytes_are_malformed(self):
+        with self.assertRaises(MalformedMessageException):
+            decode_message(encode_message(messages.CLIENT_CHANNEL_JOIN, "lobby") + b"\x00")
+
+    def test_string_longer_than_the_payload_is_malformed(self):
+        with self.assertRaises(MalformedMessageException):
+            decode_message(bytes((messages.CLIENT_CHANNEL_JOIN, 10)) + b"lobby")
+
+    def test_invalid_utf8_is_malformed(self):
+        with self.assertRaises(MalformedMessageException):
+            decode_message(bytes((messages.CLIENT_CHANNEL_JOIN, 2)) + b"\xc3\x28")
+
+    def test_empty_payload_and_unknown_opcode_are_malformed(self):
+        for payload in (b"", b"\x00", b"\xff"):
+            with self.subTest(payload=payload), self.assertRaises(MalformedMessageException):
+                decode_message(payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
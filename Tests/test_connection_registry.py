@@ -0,0 +1,85 @@
+import socket  # Every session needs a socket with a file descriptor
+import unittest
+from ..Server.client_session import ClientSession
+from ..Server.connection_registry import ConnectionRegistry
+
+
+class ConnectionRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.connection_registry = ConnectionRegistry()
+        self.sockets = []
+
+    def tearDown(self):
+        for client_socket in self.sockets:
+            client_socket.close()
+
+    def create_session(self):
+        client_socket = socket.socket()
+        self.sockets.append(client_socket)
+
+        client_session = ClientSession(client_socket, ("127.0.0.1", len(self.sockets)))
+        self.connection_registry.add(client_session)
+        return client_session
+
+    def test_sessions_are_found_by_fd_and_username(self):
+        client_session = self.create_session()
+        self.assertIsNone(self.connection_registry.bind_username(client_session, "alice"))
+
+        self.assertIs(self.connection_registry.get_by_fd(client_session.fd), client_session)
+        self.assertIs(self.connection_registry.get_by_username("alice"), client_session)
+        self.assertIn("alice", self.connection_registry)
+        self.assertEqual(list(self.connection_registry.usernames()), ["alice"])
+        self.assertEqual(list(self.connection_registry), [client_session])
+
+    def test_newer_session_takes_the_username_over(self):
+        first_session = self.create_session()
+        second_session = self.create_session()
+        self.connection_registry.bind_username(first_session, "alice")
+
+        self.assertIs(self.connection_registry.bind_username(second_session, "alice"), first_session)
+        self.assertIsNone(first_session.username)
+        self.assertIs(self.connection_registry.get_by_username("alice"), second_session)
+
+        # The session that lost the username doesn't release it when it disconnects
+        self.assertTrue(self.connection_registry.remove(first_session))
+        self.assertIs(self.connection_registry.get_by_username("alice"), second_session)
+
+    def test_rebinding_a_session_releases_its_previous_username(self):
+        client_session = self.create_session()
+        self.connection_registry.bind_username(client_session, "alice")
+
+        self.assertIsNone(self.connection_registry.bind_username(client_session, "bob"))
+        self.assertNotIn("alice", self.connection_registry)
+        self.assertIs(self.connection_registry.get_by_username("bob"), client_session)
+
+    def test_binding_the_same_username_again(self):
+        client_session = self.create_session()
+        self.connection_registry.bind_username(client_session, "alice")
+
+        self.assertIsNone(self.connection_registry.bind_username(client_session, "alice"))
+        self.assertEqual(client_session.username, "alice")
+        self.assertIs(self.connection_registry.get_by_username("alice"), client_session)
+
+    def test_release_username_keeps_the_session_connected(self):
+        client_session = self.create_session()
+        self.connection_registry.bind_username(client_session, "alice")
+
+        self.assertIs(self.connection_registry.release_username("alice"), client_session)
+        self.assertIsNone(client_session.username)
+        self.assertNotIn("alice", self.connection_registry)
+        self.assertIs(self.connection_registry.get_by_fd(client_session.fd), client_session)
+        self.assertIsNone(self.connection_registry.release_username("alice"))
+
+    def test_remove_releases_the_username_once(self):
+        client_session = self.create_session()
+        self.connection_registry.bind_username(client_session, "alice")
+
+        self.assertTrue(self.connection_registry.remove(client_session))
+        self.assertFalse(self.connection_registry.remove(client_session))
+        self.assertNotIn("alice", self.connection_registry)
+        self.assertIsNone(self.connection_registry.get_by_fd(client_session.fd))
+        self.assertEqual(len(self.connection_registry), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
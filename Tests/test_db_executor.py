@@ -0,0 +1,79 @@
+import os  # Path of the test DB
+import selectors  # Wait for the completion socket like the event loop does
+import shutil  # Remove the test DB
+import tempfile  # Every test gets its own DB
+import unittest
+from concurrent.futures import Future
+from ..Server.db_executor import DatabaseExecutor
+
+
+class DatabaseExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.callback_errors = []
+        self.executor = DatabaseExecutor(os.path.join(self.directory, "users.db"), 2, lambda client_session, exception: self.callback_errors.append((client_session, exception)))
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.directory)
+
+    def run_callbacks(self, expected_callbacks, results):
+        """Runs the completion callbacks like the event loop until expected_callbacks of them ran ( results & errors )"""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.executor.completion_socket, selectors.EVENT_READ)
+            while len(results) + len(self.callback_errors) < expected_callbacks:
+                self.assertTrue(selector.select(timeout=5), "No completion within 5 seconds")
+                self.executor.run_completion_callbacks()
+
+    def test_callbacks_get_the_query_results(self):
+        results = []
+        self.executor.submit(lambda future: results.append(future.result()), lambda DB_CONNECTION, value: DB_CONNECTION.execute("SELECT ?", (value,)).fetchone()[0], 42)
+        self.run_callbacks(1, results)
+
+        self.assertEqual(results, [42])
+        self.assertEqual(self.executor.stats()["completed"], 1)
+
+    def test_failing_callback_is_reported_with_its_session_and_the_others_still_run(self):
+        results = []
+        failing_session = object()
+
+        def failing_callback(future):
+            # e.g. an unknown UID : the row is None
+            return (*future.result(),)
+
+        self.executor.submit(failing_callback, lambda DB_CONNECTION: None, client_session=failing_session)
+        self.executor.submit(lambda future: results.append(future.result()), lambda DB_CONNECTION: "other")
+        self.run_callbacks(2, results)
+
+        self.assertEqual(results, ["other"])
+        self.assertEqual(len(self.callback_errors), 1)
+        self.assertIs(self.callback_errors[0][0], failing_session)
+        self.assertIsInstance(self.callback_errors[0][1], TypeError)
+        self.assertEqual(self.executor.stats()["failed_callbacks"], 1)
+
+    def test_failed_query_reaches_its_callback(self):
+        results = []
+
+        def failing_query(DB_CONNECTION):
+            raise ValueError("broken query")
+
+        self.executor.submit(lambda future: results.append(future.exception()), failing_query)
+        self.run_callbacks(1, results)
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(self.executor.stats()["failed"], 1)
+        self.assertEqual(self.callback_errors, [])
+
+    def test_futures_resolved_elsewhere_are_guarded_as_well(self):
+        failing_session = object()
+        future = Future()
+        future.set_result(None)
+
+        self.executor.call_on_event_loop(lambda future: future.result()[0], future, failing_session)
+        self.run_callbacks(1, [])
+
+        self.assertIs(self.callback_errors[0][0], failing_session)
+
+
+if __name__ == "__main__":
+    unittest.main()
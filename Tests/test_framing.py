@@ -0,0 +1,77 @@
+import socket  # receive_frame() reads a blocking socket
+import unittest
+from ..Protocol.framing import FrameDecoder, FrameTooLargeException, encode_frame, receive_frame, FRAME_HEADER_SIZE
+
+PAYLOADS = (b"{CLIENT_HEARTBEAT}{}", b"", b"x" * 70000, "grüße ✓".encode("utf-8"))
+
+
+class FrameDecoderTest(unittest.TestCase):
+    def test_glued_frames_come_out_of_one_feed(self):
+        frame_decoder = FrameDecoder()
+        self.assertEqual(frame_decoder.feed(b"".join(encode_frame(payload) for payload in PAYLOADS)), list(PAYLOADS))
+
+    def test_stream_split_at_every_byte(self):
+        stream = b"".join(encode_frame(payload) for payload in PAYLOADS[:2] + PAYLOADS[3:])
+        for split in range(len(stream) + 1):
+            frame_decoder = FrameDecoder()
+            with self.subTest(split=split):
+                frames = frame_decoder.feed(stream[:split]) + frame_decoder.feed(stream[split:])
+                self.assertEqual(frames, list(PAYLOADS[:2] + PAYLOADS[3:]))
+
+    def test_length_prefix_split_byte_by_byte(self):
+        frame_decoder = FrameDecoder()
+        frame = encode_frame(b"hello")
+
+        for i in range(FRAME_HEADER_SIZE):
+            self.assertEqual(frame_decoder.feed(frame[i:i + 1]), [])
+        self.assertEqual(frame_decoder.feed(frame[FRAME_HEADER_SIZE:-1]), [])
+        self.assertEqual(frame_decoder.feed(frame[-1:]), [b"hello"])
+
+    def test_partial_frame_is_kept_until_complete(self):
+        frame_decoder = FrameDecoder()
+        stream = encode_frame(b"first") + encode_frame(b"second")
+
+        self.assertEqual(frame_decoder.feed(stream[:-3]), [b"first"])
+        self.assertEqual(frame_decoder.feed(stream[-3:]), [b"second"])
+        self.assertEqual(frame_decoder.feed(b""), [])
+
+    def test_oversized_frame_is_rejected(self):
+        frame_decoder = FrameDecoder(max_frame_size=16)
+
+        self.assertEqual(frame_decoder.feed(encode_frame(b"x" * 16)), [b"x" * 16])
+        with self.assertRaises(FrameTooLargeException):
+            frame_decoder.feed(encode_frame(b"x" * 17))
+
+    def test_oversized_length_prefix_is_rejected_before_the_payload(self):
+        frame_decoder = FrameDecoder()
+        # Only the prefix arrived, nothing of the 4 GiB payload
+        with self.assertRaises(FrameTooLargeException):
+            frame_decoder.feed(b"\xff\xff\xff\xff")
+
+
+class ReceiveFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.sender_socket, self.receiver_socket = socket.socketpair()
+        self.receiver_socket.settimeout(5)
+
+    def tearDown(self):
+        self.sender_socket.close()
+        self.receiver_socket.close()
+
+    def test_glued_frames_are_returned_one_by_one(self):
+        frame_decoder = FrameDecoder()
+        self.sender_socket.sendall(encode_frame(b"first") + encode_frame(b"second"))
+
+        self.assertEqual(receive_frame(self.receiver_socket, frame_decoder), b"first")
+        self.assertEqual(receive_frame(self.receiver_socket, frame_decoder), b"second")
+
+    def test_closed_connection_in_the_middle_of_a_frame(self):
+        frame_decoder = FrameDecoder()
+        self.sender_socket.sendall(encode_frame(b"hello")[:6])
+        self.sender_socket.close()
+
+        self.assertIsNone(receive_frame(self.receiver_socket, frame_decoder))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os  # Paths of the test DB & of the spill file
+import selectors  # Wait for the spill thread like the event loop does
+import shutil  # Remove the test files
+import tempfile  # Every test gets its own files
+import unittest
+from ..Server.db_executor import DatabaseExecutor
+from ..Server.offline_inbox import OfflineInbox
+
+
+class OfflineInboxTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.executor = DatabaseExecutor(os.path.join(self.directory, "users.db"), 1)
+        self.inboxes = []
+
+    def tearDown(self):
+        for offline_inbox in self.inboxes:
+            offline_inbox.close()
+        self.executor.shutdown()
+        shutil.rmtree(self.directory)
+
+    def create_inbox(self, **limits):
+        offline_inbox = OfflineInbox(self.executor, file_name=os.path.join(self.directory, "spill.db"), **limits)
+        self.inboxes.append(offline_inbox)
+        return offline_inbox
+
+    def take_spilled(self, offline_inbox, username, count):
+        """Takes a spilled batch and runs the completion callbacks like the event loop until it's there"""
+        taken_batches = []
+        self.assertTrue(offline_inbox.take_spilled(username, count, taken_batches.append))
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.executor.completion_socket, selectors.EVENT_READ)
+            while not taken_batches:
+                self.assertTrue(selector.select(timeout=5), "No spilled batch within 5 seconds")
+                self.executor.run_completion_callbacks()
+
+        return taken_batches[0]
+
+    def take_all(self, offline_inbox, username, count):
+        """Drains the inbox of the username like the server does"""
+        taken_messages = []
+        while username in offline_inbox:
+            if offline_inbox.is_spilled(username):
+                taken_messages.extend(self.take_spilled(offline_inbox, username, count))
+            else:
+                taken_messages.extend(offline_inbox.take(username, count))
+        return taken_messages
+
+    def test_messages_are_taken_oldest_first(self):
+        offline_inbox = self.create_inbox()
+        for i in range(5):
+            self.assertTrue(offline_inbox.store("alice", "bob", "message {0}".format(i)))
+
+        self.assertEqual(offline_inbox.take("alice", 3), [("bob", "message 0"), ("bob", "message 1"), ("bob", "message 2")])
+        self.assertEqual(offline_inbox.take("alice", 3), [("bob", "message 3"), ("bob", "message 4")])
+        self.assertNotIn("alice", offline_inbox)
+        self.assertEqual(len(offline_inbox), 0)
+
+    def test_limit_per_user_and_total_limit(self):
+        offline_inbox = self.create_inbox(limit_per_user=2, max_messages=3)
+
+        self.assertEqual([offline_inbox.store("alice", "bob", "hi") for i in range(3)], [True, True, False])
+        self.assertTrue(offline_inbox.store("carol", "bob", "hi"))
+        self.assertFalse(offline_inbox.store("dave", "bob", "hi"))
+        self.assertEqual(offline_inbox.stats()["rejected"], 2)
+
+    def test_limit_per_sender_is_released_by_take(self):
+        offline_inbox = self.create_inbox(limit_per_sender=2)
+
+        self.assertTrue(offline_inbox.store("alice", "bob", "hi", "10.0.0.1"))
+        self.assertTrue(offline_inbox.store("carol", "mallory", "hi", "10.0.0.1"))
+        # Same host, whatever sender username it claims
+        self.assertFalse(offline_inbox.store("dave", "eve", "hi", "10.0.0.1"))
+        self.assertTrue(offline_inbox.store("dave", "eve", "hi", "10.0.0.2"))
+
+        offline_inbox.take("alice", 1)
+        self.assertTrue(offline_inbox.store("dave", "eve", "hi", "10.0.0.1"))
+
+    def test_spilled_messages_come_first_and_are_read_on_the_spill_thread(self):
+        offline_inbox = self.create_inbox(memory_messages=4)
+        for i in range(10):
+            self.assertTrue(offline_inbox.store("alice", "bob", "message {0}".format(i)))
+
+        self.assertTrue(offline_inbox.is_spilled("alice"))
+        # The memory part is newer than the spilled one
+        self.assertEqual(offline_inbox.take("alice", 10), [])
+
+        taken_messages = self.take_all(offline_inbox, "alice", 3)
+
+        self.assertEqual(taken_messages, [("bob", "message {0}".format(i)) for i in range(10)])
+        self.assertEqual(offline_inbox.stats()["delivered"], 10)
+        self.assertEqual(len(offline_inbox), 0)
+        self.assertEqual(offline_inbox.sender_counts, {})
+
+    def test_one_read_per_username_at_a_time(self):
+        offline_inbox = self.create_inbox(memory_messages=2)
+        for i in range(6):
+            offline_inbox.store("alice", "bob", "message {0}".format(i))
+
+        self.assertTrue(offline_inbox.take_spilled("alice", 1, lambda taken_messages: None))
+        self.assertFalse(offline_inbox.take_spilled("alice", 1, lambda taken_messages: None))
+        self.assertFalse(offline_inbox.take_spilled("carol", 1, lambda taken_messages: None))
+
+    def test_order_survives_repeated_spills(self):
+        offline_inbox = self.create_inbox(memory_messages=4)
+        expected_messages = []
+
+        for i in range(30):
+            offline_inbox.store("alice", "bob", "message {0}".format(i))
+            expected_messages.append(("bob", "message {0}".format(i)))
+            # Another username fills the memory tier, alice is spilled again & again
+            offline_inbox.store("carol", "bob", "filler")
+
+        taken_messages = self.take_all(offline_inbox, "alice", 4)
+
+        self.assertEqual(taken_messages, expected_messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
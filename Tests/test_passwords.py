@@ -0,0 +1,107 @@
+import hashlib  # scrypt is missing from some builds of Python
+import os  # Path of the test DB
+import shutil  # Remove the test DB
+import tempfile  # Every test gets its own DB
+import unittest
+from ..DB import queries
+from ..DB.passwords import (
+    SCRYPT, PBKDF2, PasswordSchemeException, hash_password, verify_password, needs_rehash, parse_password_hash, is_password_hash, migrate_passwords
+)
+
+# Far below the defaults, the tests check the format & not the cost
+TEST_COSTS = {SCRYPT: 2 ** 4, PBKDF2: 1000}
+SCHEMES = [scheme for scheme in TEST_COSTS if scheme != SCRYPT or hasattr(hashlib, "scrypt")]
+
+
+class PasswordsTest(unittest.TestCase):
+    def test_round_trip(self):
+        for scheme in SCHEMES:
+            for password in ("secret", "", "grüße ✓ $ |"):
+                with self.subTest(scheme=scheme, password=password):
+                    stored_password = hash_password(password, scheme, TEST_COSTS[scheme])
+
+                    self.assertTrue(stored_password.startswith(scheme + "$"))
+                    if password:
+                        self.assertNotIn(password, stored_password)
+                    self.assertTrue(verify_password(password, stored_password))
+
+    def test_wrong_password(self):
+        for scheme in SCHEMES:
+            with self.subTest(scheme=scheme):
+                stored_password = hash_password("secret", scheme, TEST_COSTS[scheme])
+
+                self.assertFalse(verify_password("Secret", stored_password))
+                self.assertFalse(verify_password("", stored_password))
+                # The stored value itself isn't the password
+                self.assertFalse(verify_password(stored_password, stored_password))
+
+    def test_salts_differ(self):
+        self.assertNotEqual(hash_password("secret", PBKDF2, 1000), hash_password("secret", PBKDF2, 1000))
+
+    def test_parse_password_hash(self):
+        scheme, cost, salt, password_hash = parse_password_hash(hash_password("secret", PBKDF2, 1000))
+
+        self.assertEqual((scheme, cost, len(salt), len(password_hash)), (PBKDF2, 1000, 16, 32))
+        for stored_password in ("secret", "pbkdf2_sha256$1000$zz$00", "pbkdf2_sha256$many$00$00", "scrypt$16$8$1$00", "scrypt$16$4$1$00$00", ""):
+            with self.subTest(stored_password=stored_password):
+                self.assertIsNone(parse_password_hash(stored_password))
+
+    def test_plaintext_legacy_row(self):
+        self.assertFalse(is_password_hash("secret"))
+        self.assertTrue(verify_password("secret", "secret"))
+        self.assertFalse(verify_password("secreT", "secret"))
+        self.assertTrue(verify_password("grüße", "grüße"))
+        self.assertTrue(needs_rehash("secret", PBKDF2, 1000))
+
+    def test_needs_rehash_when_the_scheme_or_the_cost_changes(self):
+        stored_password = hash_password("secret", PBKDF2, 1000)
+
+        self.assertFalse(needs_rehash(stored_password, PBKDF2, 1000))
+        self.assertTrue(needs_rehash(stored_password, PBKDF2, 2000))
+        if SCRYPT in SCHEMES:
+            self.assertTrue(needs_rehash(stored_password, SCRYPT, TEST_COSTS[SCRYPT]))
+
+    def test_invalid_scheme_or_cost_is_rejected(self):
+        for scheme, cost in (("md5", None), (PBKDF2, 1), (SCRYPT, 3)):
+            with self.subTest(scheme=scheme, cost=cost), self.assertRaises(PasswordSchemeException):
+                hash_password("secret", scheme, cost)
+
+
+class MigratePasswordsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, "users.db")
+
+        DB_CONNECTION = queries.connect(self.db_path)
+        queries.create_schema(DB_CONNECTION)
+        self.hashed_password = hash_password("hashed", PBKDF2, 1000)
+        for UID, password in ((1, "first"), (2, "second"), (3, self.hashed_password)):
+            DB_CONNECTION.execute(queries.INSERT_USER, (UID, "user{0}".format(UID), password, "First", "Last", 30, "City", 10115, "Street", 1, 2000))
+        DB_CONNECTION.commit()
+        DB_CONNECTION.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_passwords(self):
+        DB_CONNECTION = queries.connect(self.db_path)
+        try:
+            return dict(DB_CONNECTION.execute(queries.SELECT_ALL_PASSWORDS))
+        finally:
+            DB_CONNECTION.close()
+
+    def test_only_plaintext_rows_are_migrated(self):
+        self.assertEqual(migrate_passwords(self.db_path, PBKDF2, 1000, workers=1, batch_size=1), 2)
+
+        stored_passwords = self.read_passwords()
+        self.assertTrue(verify_password("first", stored_passwords[1]))
+        self.assertTrue(verify_password("second", stored_passwords[2]))
+        self.assertTrue(all(is_password_hash(stored_password) for stored_password in stored_passwords.values()))
+        self.assertEqual(stored_passwords[3], self.hashed_password)
+
+        # A second run has nothing left to do
+        self.assertEqual(migrate_passwords(self.db_path, PBKDF2, 1000, workers=1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
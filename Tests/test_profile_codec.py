@@ -0,0 +1,48 @@
+import unittest
+from ..Protocol.messages import MAX_UNSIGNED, MalformedMessageException
+from ..Protocol.profile_codec import encode_profile, decode_profile
+
+USER_ROW = (MAX_UNSIGNED, "alice", "secret", "Alice", "Smith", 30, "Berlin", 10115, "Main street", 7, 2000)
+
+
+def without_password(row):
+    return row[:2] + ("",) + row[3:]
+
+
+class ProfileCodecTest(unittest.TestCase):
+    def test_round_trip_leaves_the_password_out(self):
+        profile = encode_profile(USER_ROW)
+
+        self.assertNotIn("secret", profile)
+        self.assertEqual(decode_profile(profile), without_password(USER_ROW))
+
+    def test_fields_with_separators_and_backslashes_round_trip(self):
+        for first_name in ("A|B", "A\\B", "\\p", "|", "\\", "a\\\\|p|", "grüße ✓", ""):
+            row = USER_ROW[:3] + (first_name,) + USER_ROW[4:]
+            with self.subTest(first_name=first_name):
+                self.assertEqual(decode_profile(encode_profile(row)), without_password(row))
+
+    def test_unknown_version_is_malformed(self):
+        for profile in ("2" + encode_profile(USER_ROW)[1:], "", "garbage"):
+            with self.subTest(profile=profile), self.assertRaises(MalformedMessageException):
+                decode_profile(profile)
+
+    def test_wrong_number_of_fields_is_malformed(self):
+        profile = encode_profile(USER_ROW)
+        for bad_profile in (profile.rsplit("|", 1)[0], profile + "|extra"):
+            with self.subTest(profile=bad_profile), self.assertRaises(MalformedMessageException):
+                decode_profile(bad_profile)
+
+    def test_bad_integer_is_malformed(self):
+        profile = encode_profile(USER_ROW)
+        for bad_profile in (profile.replace("|30|", "|thirty|"), profile.replace("|30|", "|-30|"), profile.replace("|2000", "|1" + "0" * 19)):
+            with self.subTest(profile=bad_profile), self.assertRaises(MalformedMessageException):
+                decode_profile(bad_profile)
+
+    def test_unknown_escape_sequence_is_malformed(self):
+        with self.assertRaises(MalformedMessageException):
+            decode_profile(encode_profile(USER_ROW).replace("Berlin", "Ber\\xlin"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import types  # The limiter only needs the username & the buckets of a session
+import unittest
+from ..Protocol import messages
+from ..Server.rate_limiter import RateLimiter, parse_rate_limit, parse_header_rate_limit, CONNECTION_LIMIT, USER_LIMIT
+
+
+def create_session(username=None):
+    return types.SimpleNamespace(username=username, rate_buckets=None)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        rate_limiter = RateLimiter(connection_limit=(10, 3))
+        client_session = create_session()
+
+        for i in range(3):
+            self.assertEqual(rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 0.0), (0.0, None))
+
+        wait, limit = rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 0.0)
+        self.assertAlmostEqual(wait, 0.1)
+        self.assertEqual(limit, CONNECTION_LIMIT)
+
+        # One token after 1 / rate seconds
+        self.assertEqual(rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 0.1), (0.0, None))
+        self.assertEqual(rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 0.1)[1], CONNECTION_LIMIT)
+
+    def test_bucket_refills_up_to_the_burst_only(self):
+        rate_limiter = RateLimiter(connection_limit=(10, 2))
+        client_session = create_session()
+
+        results = [rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 100.0)[1] for i in range(3)]
+        self.assertEqual(results, [None, None, CONNECTION_LIMIT])
+
+    def test_denied_message_takes_no_token(self):
+        rate_limiter = RateLimiter(connection_limit=(1, 5), header_limits={messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD: (1, 1)})
+        client_session = create_session()
+
+        self.assertEqual(rate_limiter.check(client_session, messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, 0.0), (0.0, None))
+        wait, limit = rate_limiter.check(client_session, messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, 0.0)
+        self.assertEqual(limit, messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD)
+        self.assertAlmostEqual(wait, 1.0)
+
+        # The denied login didn't use a token of the connection bucket, 4 are left for the other messages
+        results = [rate_limiter.check(client_session, messages.CLIENT_MESSAGE, 0.0)[1] for i in range(5)]
+        self.assertEqual(results, [None, None, None, None, CONNECTION_LIMIT])
+
+    def test_user_limit_is_shared_by_the_connections_of_a_username(self):
+        rate_limiter = RateLimiter(user_limit=(1, 2))
+        first_session = create_session("alice")
+        second_session = create_session("alice")
+
+        self.assertEqual(rate_limiter.check(first_session, messages.CLIENT_MESSAGE, 0.0), (0.0, None))
+        self.assertEqual(rate_limiter.check(second_session, messages.CLIENT_MESSAGE, 0.0), (0.0, None))
+        self.assertEqual(rate_limiter.check(second_session, messages.CLIENT_MESSAGE, 0.0)[1], USER_LIMIT)
+
+        # Connections without a username aren't limited by it
+        self.assertEqual(rate_limiter.check(create_session(), messages.CLIENT_MESSAGE, 0.0), (0.0, None))
+        self.assertEqual(rate_limiter.check(create_session("bob"), messages.CLIENT_MESSAGE, 0.0), (0.0, None))
+
+    def test_full_user_buckets_are_pruned(self):
+        rate_limiter = RateLimiter(user_limit=(1, 1))
+        for i in range(1024):
+            rate_limiter.check(create_session("user{0}".format(i)), messages.CLIENT_MESSAGE, 0.0)
+        self.assertEqual(rate_limiter.stats()["user_buckets"], 1024)
+
+        # All the old buckets refilled, the new one is the only one left after the pruning
+        late_session = create_session("late")
+        self.assertEqual(rate_limiter.check(late_session, messages.CLIENT_MESSAGE, 10.0), (0.0, None))
+        self.assertEqual(rate_limiter.stats()["user_buckets"], 1)
+
+        # The token of the message came from the bucket that is kept
+        self.assertEqual(rate_limiter.check(late_session, messages.CLIENT_MESSAGE, 10.0)[1], USER_LIMIT)
+
+    def test_limiter_without_limits_is_disabled(self):
+        self.assertFalse(RateLimiter().enabled)
+        self.assertTrue(RateLimiter(connection_limit=(1, 1)).enabled)
+
+    def test_invalid_limits_are_rejected(self):
+        for limits in ({"connection_limit": (0, 1)}, {"user_limit": (1, 0.5)}, {"header_limits": {messages.CLIENT_MESSAGE: (-1, 1)}}):
+            with self.subTest(limits=limits), self.assertRaises(ValueError):
+                RateLimiter(**limits)
+
+
+class ParseRateLimitTest(unittest.TestCase):
+    def test_rate_and_burst(self):
+        self.assertEqual(parse_rate_limit("20"), (20.0, 20.0))
+        self.assertEqual(parse_rate_limit("20:40"), (20.0, 40.0))
+        self.assertEqual(parse_rate_limit("0.5"), (0.5, 1.0))
+
+        with self.assertRaises(ValueError):
+            parse_rate_limit("fast")
+
+    def test_header_rate_limit(self):
+        self.assertEqual(
+            parse_header_rate_limit("CLIENT_LOGIN_INFO_USERNAME_PASSWORD=5:10"),
+            (messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, (5.0, 10.0))
+        )
+
+        for header_rate_limit in ("CLIENT_UNKNOWN=5", "CLIENT_MESSAGE"):
+            with self.subTest(header_rate_limit=header_rate_limit), self.assertRaises(ValueError):
+                parse_header_rate_limit(header_rate_limit)
+
+
+if __name__ == "__main__":
+    unittest.main()
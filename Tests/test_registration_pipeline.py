@@ -0,0 +1,134 @@
+import os  # Paths of the test DBs
+import shutil  # Remove the test DBs
+import tempfile  # Every test gets its own DB
+import threading  # Wait for the callbacks of the writer thread
+import unittest
+from ..DB import queries
+from ..Server.registration_pipeline import RegistrationPipeline
+
+
+def create_user_row(UID, username):
+    """
+    Returns a valid row of the users table ( in the order of queries.USER_COLUMNS )
+    """
+
+    return [UID, username, "password-" + username, "First", "Last", 30, "City", 12345, "Street", 7, 2000]
+
+
+class FakeExecutor:
+    def __init__(self):
+        """Stands in for the DB executor : calls the callbacks right away ( on the writer thread ) and remembers their results"""
+        self.results = []
+        self.done = threading.Condition()
+
+    def call_on_event_loop(self, callback, future, client_session=None):
+        with self.done:
+            self.results.append(future)
+            self.done.notify_all()
+        callback(future)
+
+    def wait_for(self, amount):
+        with self.done:
+            self.done.wait_for(lambda: len(self.results) >= amount, timeout=5)
+
+
+class FutureRecorder:
+    def __init__(self, results):
+        """The future of a registration that appends its result ( or its exception ) to results"""
+        self.results = results
+
+    def set_result(self, result):
+        self.results.append(result)
+
+    def set_exception(self, exception):
+        self.results.append(exception)
+
+
+class RegistrationPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, "users.db")
+
+        DB_CONNECTION = queries.connect(self.db_path)
+        queries.create_schema(DB_CONNECTION)
+        DB_CONNECTION.close()
+
+        self.executor = FakeExecutor()
+        self.pipeline = RegistrationPipeline(self.db_path, self.executor, batch_size=16, batch_window=0.05)
+
+    def tearDown(self):
+        self.pipeline.shutdown()
+        shutil.rmtree(self.directory)
+
+    def count_users(self):
+        DB_CONNECTION = queries.connect(self.db_path)
+        try:
+            return DB_CONNECTION.execute(queries.COUNT_USERS).fetchone()[0]
+        finally:
+            DB_CONNECTION.close()
+
+    def submit(self, user_values):
+        """Submits the row and returns the future of its result"""
+        return self.pipeline.submit(lambda future: None, user_values)
+
+    def test_duplicate_row_is_rejected_alone(self):
+        futures = [self.submit(create_user_row(1, "alice")), self.submit(create_user_row(1, "bob")), self.submit(create_user_row(2, "carol"))]
+        self.executor.wait_for(3)
+
+        self.assertEqual([future.result() for future in futures], [True, False, True])
+        self.assertEqual(self.count_users(), 2)
+
+    def test_invalid_rows_never_reach_the_writer(self):
+        oversized_UID = create_user_row(2 ** 64, "big")
+        negative_age = create_user_row(3, "young")
+        negative_age[5] = -1
+        missing_columns = create_user_row(4, "short")[:5]
+
+        futures = [self.submit(oversized_UID), self.submit(negative_age), self.submit(missing_columns)]
+        self.executor.wait_for(3)
+
+        self.assertEqual([future.result() for future in futures], [False, False, False])
+        self.assertEqual(self.pipeline.stats()["invalid_rows"], 3)
+        self.assertEqual(self.pipeline.stats()["committed_batches"], 0)
+
+    def test_row_error_other_than_a_constraint_fails_only_that_row(self):
+        # Bypasses submit(), which would reject the row before the writer sees it
+        results = []
+        batch = [(user_values, future, lambda future: None, None) for user_values, future in (
+            (create_user_row(1, "alice"), FutureRecorder(results)),
+            (create_user_row(2 ** 64, "big"), FutureRecorder(results)),
+            (create_user_row(3, "carol"), FutureRecorder(results)),
+        )]
+
+        DB_CONNECTION = queries.connect(self.db_path, isolation_level=None)
+        try:
+            self.pipeline.commit_batch(DB_CONNECTION, batch)
+        finally:
+            DB_CONNECTION.close()
+
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(self.count_users(), 2)
+        self.assertEqual(self.pipeline.stats()["failed_rows"], 1)
+
+    def test_failed_transaction_fails_every_row_of_the_batch(self):
+        locking_connection = queries.connect(self.db_path, isolation_level=None)
+        locking_connection.execute("BEGIN EXCLUSIVE")
+
+        results = []
+        batch = [(create_user_row(UID, "user{0}".format(UID)), FutureRecorder(results), lambda future: None, None) for UID in (1, 2)]
+
+        DB_CONNECTION = queries.connect(self.db_path, isolation_level=None, timeout=0)
+        try:
+            self.pipeline.commit_batch(DB_CONNECTION, batch)
+        finally:
+            DB_CONNECTION.close()
+            locking_connection.execute("ROLLBACK")
+            locking_connection.close()
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        self.assertEqual(self.count_users(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
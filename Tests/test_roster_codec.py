@@ -0,0 +1,39 @@
+import unittest
+from ..Protocol import messages
+from ..Protocol.messages import MalformedMessageException
+from ..Protocol.roster_codec import encode_usernames, decode_usernames
+from ..Protocol.text_protocol import format_server_message, parse_server_message
+
+USERNAME_LISTS = (
+    [],
+    ["alice"],
+    ["alice", "bob", "carol"],
+    ["a|b", "c_d", "e\\f", "\\p", "\\u", "|_\\", "grüße ✓"],
+    ["user{0}".format(i) for i in range(1000)],
+)
+
+
+class RosterCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        for usernames in USERNAME_LISTS:
+            with self.subTest(usernames=usernames[:5]):
+                self.assertEqual(decode_usernames(encode_usernames(usernames)), usernames)
+
+    def test_escaped_list_survives_the_text_protocol(self):
+        usernames_field = encode_usernames(USERNAME_LISTS[3])
+        self.assertNotIn("_", usernames_field)
+
+        opcode, fields = parse_server_message(format_server_message(messages.SERVER_PRESENCE_DELTA, usernames_field, ""))
+
+        self.assertEqual(opcode, messages.SERVER_PRESENCE_DELTA)
+        self.assertEqual(decode_usernames(fields[0]), USERNAME_LISTS[3])
+        self.assertEqual(decode_usernames(fields[1]), [])
+
+    def test_unknown_escape_sequence_is_malformed(self):
+        for usernames_field in ("alice|b\\xob", "\\n"):
+            with self.subTest(usernames_field=usernames_field), self.assertRaises(MalformedMessageException):
+                decode_usernames(usernames_field)
+
+
+if __name__ == "__main__":
+    unittest.main()
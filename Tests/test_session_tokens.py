@@ -0,0 +1,68 @@
+import unittest
+from ..Server.session_tokens import SessionTokens, SIGNATURE_SIZE
+
+
+class SessionTokensTest(unittest.TestCase):
+    def setUp(self):
+        self.session_tokens = SessionTokens(b"k" * 32, ttl=60)
+        self.token = self.session_tokens.issue(42, "alice", now=1000)
+
+    def test_round_trip(self):
+        self.assertEqual(self.session_tokens.verify(self.token, now=1000), (42, "alice"))
+        self.assertEqual(self.session_tokens.stats()["resumed"], 1)
+
+    def test_username_with_separators_round_trips(self):
+        token = self.session_tokens.issue(1, "a:b.c_grüße", now=1000)
+        self.assertEqual(self.session_tokens.verify(token, now=1000), (1, "a:b.c_grüße"))
+
+    def test_expiry_boundary(self):
+        self.assertEqual(self.session_tokens.verify(self.token, now=1060), (42, "alice"))
+        self.assertIsNone(self.session_tokens.verify(self.token, now=1061))
+        self.assertEqual(self.session_tokens.stats()["expired"], 1)
+
+    def test_token_of_another_secret_is_rejected(self):
+        token = SessionTokens(b"x" * 32, ttl=60).issue(42, "alice", now=1000)
+        self.assertIsNone(self.session_tokens.verify(token, now=1000))
+
+    def test_forged_payload_is_rejected(self):
+        payload_hex, signature = self.token.split(".")
+        forged_payload_hex = "42:1000060:mallory".encode("utf-8").hex()
+
+        self.assertIsNone(self.session_tokens.verify("{0}.{1}".format(forged_payload_hex, signature), now=1000))
+        self.assertEqual(self.session_tokens.stats()["rejected"], 1)
+
+    def test_malformed_tokens_are_rejected(self):
+        payload_hex, signature = self.token.split(".")
+        bad_tokens = (
+            "",
+            payload_hex,
+            self.token + ".extra",
+            self.token[:-1],
+            payload_hex + "." + signature[:-2],
+            payload_hex[:-1] + "." + signature,
+            "zz" + payload_hex[2:] + "." + signature,
+            payload_hex + "." + "z" * 2 * SIGNATURE_SIZE,
+            "3a3a." + signature,
+            "313a31." + signature,
+            "ff3a313a61." + signature,
+        )
+
+        for bad_token in bad_tokens:
+            with self.subTest(token=bad_token):
+                self.assertIsNone(self.session_tokens.verify(bad_token, now=1000))
+
+        self.assertEqual(self.session_tokens.stats()["rejected"], len(bad_tokens))
+
+    def test_non_ascii_signature_is_rejected(self):
+        payload_hex = self.token.split(".")[0]
+        for signature in ("é" * 2 * SIGNATURE_SIZE, "é", "\udcff" * 32, "٣" * 2 * SIGNATURE_SIZE):
+            with self.subTest(signature=signature):
+                self.assertIsNone(self.session_tokens.verify("{0}.{1}".format(payload_hex, signature), now=1000))
+
+    def test_invalid_ttl_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SessionTokens(ttl=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from ..Protocol import messages
+from ..Protocol.messages import MAX_UNSIGNED, MalformedMessageException
+from ..Protocol.text_protocol import format_client_message, parse_client_message, format_server_message, parse_server_message
+
+USER_ROW = (MAX_UNSIGNED, "alice", "secret", "Alice", "Smith", 30, "Berlin", 10115, "Main street", 7, 2000)
+# A profile never carries the password
+PROFILE_ROW = USER_ROW[:2] + ("",) + USER_ROW[3:]
+
+CLIENT_MESSAGES = (
+    (messages.CLIENT_LOGIN_INFO_USERNAME_PASSWORD, ("alice", "secret")),
+    (messages.CLIENT_LOGIN_INFO_UID_NOT_VALID, ()),
+    (messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL, (0,)),
+    (messages.CLIENT_LOGIN_INFO_UID_SUCCESSFUL, (MAX_UNSIGNED,)),
+    (messages.CLIENT_REGISTER_DATA, USER_ROW),
+    (messages.CLIENT_COMMUNICATION_DATA, ("alice",)),
+    (messages.CLIENT_MESSAGE, ("alice", "bob", "hello_there")),
+    (messages.CLIENT_PROTOCOL, (messages.BINARY_PROTOCOL_NAME,)),
+    (messages.CLIENT_CHANNEL_JOIN, ("lobby",)),
+    (messages.CLIENT_CHANNEL_LEAVE, ("lobby",)),
+    (messages.CLIENT_CHANNEL_POST, ("lobby", "hi_all")),
+    (messages.CLIENT_HEARTBEAT, ()),
+    (messages.CLIENT_SESSION_LOGIN, ("alice", "secret")),
+    (messages.CLIENT_SESSION_RESUME, ("token",)),
+    (messages.CLIENT_PRESENCE_SUBSCRIBE, ()),
+    (messages.CLIENT_PRESENCE_UNSUBSCRIBE, ()),
+)
+
+SERVER_MESSAGES = (
+    (messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL, (MAX_UNSIGNED,)),
+    (messages.SERVER_LOGIN_INFO_USERNAME_PASSWORD_WRONG, ()),
+    (messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, PROFILE_ROW),
+    (messages.SERVER_REGISTER_INFO_SUCCESSFUL, ()),
+    (messages.SERVER_REGISTER_INFO_ERROR, ()),
+    (messages.CLIENT_MESSAGE_ERROR_USERNAME_NOT_FOUND, ()),
+    (messages.MESSAGE_FROM_CLIENT, ("alice", "hello_there")),
+    (messages.SERVER_PROTOCOL, (messages.BINARY_PROTOCOL_NAME,)),
+    (messages.MESSAGE_FROM_CHANNEL, ("lobby", "alice", "hi_all")),
+    (messages.SERVER_CHANNEL_JOINED, ("lobby",)),
+    (messages.SERVER_CHANNEL_LEFT, ("lobby",)),
+    (messages.SERVER_CHANNEL_ERROR, ("lobby",)),
+    (messages.SERVER_HEARTBEAT, ()),
+    (messages.SERVER_SESSION, ("token",) + PROFILE_ROW),
+    (messages.SERVER_SESSION_RESUMED, ("token",)),
+    (messages.SERVER_SESSION_INVALID, ()),
+    (messages.SERVER_PRESENCE_SNAPSHOT, (1, "alice,bob")),
+    (messages.SERVER_PRESENCE_DELTA, ("alice", "bob")),
+)
+
+
+class TextProtocolTest(unittest.TestCase):
+    def test_client_messages_round_trip(self):
+        for opcode, fields in CLIENT_MESSAGES:
+            with self.subTest(opcode=hex(opcode)):
+                self.assertEqual(parse_client_message(format_client_message(opcode, *fields)), (opcode, fields))
+
+    def test_server_messages_round_trip(self):
+        for opcode, fields in SERVER_MESSAGES:
+            with self.subTest(opcode=hex(opcode)):
+                self.assertEqual(parse_server_message(format_server_message(opcode, *fields)), (opcode, fields))
+
+    def test_unknown_messages_have_no_opcode(self):
+        self.assertEqual(parse_client_message("{CLIENT_UNKNOWN}{body}"), (None, ()))
+        self.assertEqual(parse_server_message("{SERVER_UNKNOWN}{body}"), (None, ()))
+
+    def test_out_of_range_UID_is_malformed(self):
+        for UID in ("-1", str(MAX_UNSIGNED + 1), "99999999999999999999", " 5", "+5", "5.0", "", "١"):
+            with self.subTest(UID=UID), self.assertRaises(MalformedMessageException):
+                parse_client_message("{{CLIENT_LOGIN_INFO_UID_SUCCESSFUL}}{{UID:{0}}}".format(UID))
+
+    def test_out_of_range_register_field_is_malformed(self):
+        register_message = format_client_message(messages.CLIENT_REGISTER_DATA, *USER_ROW)
+        for bad_message in (register_message.replace("Age:30", "Age:-30"), register_message.replace("Salary:2000", "Salary:1" + "0" * 19)):
+            with self.subTest(message=bad_message), self.assertRaises(MalformedMessageException):
+                parse_client_message(bad_message)
+
+    def test_malformed_bodies(self):
+        for client_message in ("{CLIENT_MESSAGE}{alice}", "{CLIENT_LOGIN_INFO_USERNAME_PASSWORD}{USERNAME:alice}", "{CLIENT_REGISTER_DATA}{UID:1}"):
+            with self.subTest(message=client_message), self.assertRaises(MalformedMessageException):
+                parse_client_message(client_message)
+
+    def test_out_of_range_server_integers_are_malformed(self):
+        for server_message in (
+            "SERVER_LOGIN_INFO_USERNAME_PASSWORD_SUCCESSFUL_-1",
+            "{SERVER_PRESENCE_SNAPSHOT}{-1_alice}",
+            format_server_message(messages.SERVER_LOGIN_INFO_UID_SUCCESSFUL, *PROFILE_ROW).replace("|30|", "|-30|"),
+        ):
+            with self.subTest(message=server_message), self.assertRaises(MalformedMessageException):
+                parse_server_message(server_message)
+
+
+if __name__ == "__main__":
+    unittest.main()
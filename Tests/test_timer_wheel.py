@@ -0,0 +1,87 @@
+import unittest
+from ..Server.timer_wheel import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+    def setUp(self):
+        # Ticks of 0.5 seconds, 10 seconds are expired exactly
+        self.timer_wheel = TimerWheel(0.5, 10, now=100.0)
+
+    def test_keys_expire_at_their_deadline_and_never_before(self):
+        self.timer_wheel.schedule("a", 101.2)
+        self.timer_wheel.schedule("b", 103.0)
+
+        self.assertEqual(self.timer_wheel.expire(101.4), [])
+        self.assertEqual(self.timer_wheel.expire(101.5), ["a"])
+        self.assertEqual(self.timer_wheel.expire(102.9), [])
+        self.assertEqual(self.timer_wheel.expire(103.0), ["b"])
+        self.assertEqual(len(self.timer_wheel), 0)
+
+    def test_cancelled_key_never_expires(self):
+        self.timer_wheel.schedule("a", 101.0)
+        self.timer_wheel.schedule("b", 101.0)
+        self.timer_wheel.cancel("a")
+        # Cancelling a key that isn't scheduled does nothing
+        self.timer_wheel.cancel("a")
+        self.timer_wheel.cancel("unknown")
+
+        self.assertNotIn("a", self.timer_wheel)
+        self.assertEqual(self.timer_wheel.expire(105.0), ["b"])
+
+    def test_rescheduled_key_moves_to_its_new_deadline(self):
+        self.timer_wheel.schedule("a", 101.0)
+        self.timer_wheel.schedule("a", 104.0)
+
+        self.assertEqual(self.timer_wheel.expire(103.0), [])
+        self.assertEqual(self.timer_wheel.expire(104.0), ["a"])
+
+    def test_deadline_in_the_past_expires_with_the_next_tick(self):
+        self.timer_wheel.schedule("a", 50.0)
+
+        self.assertEqual(self.timer_wheel.expire(100.4), [])
+        self.assertEqual(self.timer_wheel.expire(100.5), ["a"])
+
+    def test_deadline_beyond_the_horizon_expires_early(self):
+        self.timer_wheel.schedule("a", 1000.0)
+
+        expired_keys = []
+        now = 100.0
+        while not expired_keys:
+            now += 0.5
+            expired_keys = self.timer_wheel.expire(now)
+
+        self.assertEqual(expired_keys, ["a"])
+        self.assertLessEqual(now, 100.0 + 10.5)
+
+    def test_pause_longer_than_the_wheel_expires_every_key(self):
+        for i in range(20):
+            self.timer_wheel.schedule(i, 100.0 + i * 0.5)
+
+        self.assertEqual(sorted(self.timer_wheel.expire(500.0)), list(range(20)))
+        self.assertEqual(self.timer_wheel.expire(500.0), [])
+
+        # The wheel keeps working after the pause
+        self.timer_wheel.schedule("a", 501.0)
+        self.assertEqual(self.timer_wheel.expire(501.0), ["a"])
+
+    def test_next_timeout(self):
+        self.assertIsNone(self.timer_wheel.next_timeout(100.0))
+
+        self.timer_wheel.schedule("a", 103.0)
+        self.assertAlmostEqual(self.timer_wheel.next_timeout(100.0), 3.0)
+
+        self.timer_wheel.schedule("b", 101.0)
+        self.assertAlmostEqual(self.timer_wheel.next_timeout(100.0), 1.0)
+
+        self.timer_wheel.expire(101.0)
+        self.assertAlmostEqual(self.timer_wheel.next_timeout(101.0), 2.0)
+        self.assertEqual(self.timer_wheel.next_timeout(104.0), 0.0)
+
+    def test_invalid_arguments_are_rejected(self):
+        for tick_seconds, horizon_seconds in ((0, 10), (1, 0), (-1, 10)):
+            with self.subTest(tick_seconds=tick_seconds, horizon_seconds=horizon_seconds), self.assertRaises(ValueError):
+                TimerWheel(tick_seconds, horizon_seconds, now=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
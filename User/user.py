@@ -1,4 +1,10 @@
 class User:
+    # The names of messages.USER_FIELDS. No __dict__ per user : a process that keeps thousands of sessions keeps thousands of users.
+    __slots__ = (
+        "UID", "Username", "Password", "FirstName", "LastName", "Age",
+        "City", "PostalCode", "StreetName", "HouseNumber", "Salary"
+    )
+
     def __init__(self, UID, username, password, firstName, lastName, age, city, postalCode, streetName, houseNumber, salary):
         """Creates a new user"""
 
@@ -14,6 +20,13 @@ class User:
         self.HouseNumber = houseNumber
         self.Salary = salary
 
+    def to_row(self):
+        """Returns a tuple with all the data in the order of messages.USER_FIELDS ( Read ../Protocol/profile_codec.py )"""
+        return (
+            self.UID, self.Username, self.Password, self.FirstName, self.LastName, self.Age,
+            self.City, self.PostalCode, self.StreetName, self.HouseNumber, self.Salary
+        )
+
     def get_data(self):
         """Returns all data in form of a string"""
         return \